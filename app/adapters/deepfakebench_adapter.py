@@ -6,13 +6,15 @@ Provides unified interface for 12 DeepfakeBench models
 import os
 import sys
 import logging
+import time
 import cv2
 import json
 import numpy as np
 import torch
 from pathlib import Path
-from typing import Dict, List, Tuple, Optional
+from typing import Callable, Dict, List, Tuple, Optional
 from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 
 # Add project root to path
 project_root = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -21,8 +23,78 @@ sys.path.insert(0, project_root)
 from tools.weight_registry import WEIGHT_REGISTRY
 from tools.build_dfbench_model import build_model_and_transforms
 
+try:
+    from utils import adaptive_sampling
+    from utils.frame_preprocess import PreprocessPlan
+    from utils.metrics import metrics
+    from utils.video_frames import KeyframeCache, VideoFrameSource, read_frames
+except ImportError:
+    from app.utils import adaptive_sampling
+    from app.utils.frame_preprocess import PreprocessPlan
+    from app.utils.metrics import metrics
+    from app.utils.video_frames import KeyframeCache, VideoFrameSource, read_frames
+
 logger = logging.getLogger(__name__)
 
+# model_key -> (weight filename, registry entry)
+WEIGHTS_BY_MODEL = {meta["model_key"]: (wf, meta) for wf, meta in WEIGHT_REGISTRY.items()}
+
+# Ways of calling a detector, tried in this order (see DeepfakeBenchAdapter._resolve_call_style)
+CALL_STYLES = ("dict_inference", "dict", "tensor")
+
+# Per-frame fusion of model probabilities in ensemble analysis (see analyze_video_ensemble)
+ENSEMBLE_FUSIONS = ("mean", "max")
+
+# Frame sampling in analyze_video: every frame of the fps grid, or coarse-to-fine (see score_video_adaptive)
+SAMPLING_MODES = ("uniform", "adaptive")
+
+
+def output_logits(output) -> torch.Tensor:
+    """The tensor to score in a model output: prob, cls, logits or pred, else the first tensor."""
+    if not isinstance(output, dict):
+        return output
+    
+    for key in ["prob", "cls", "logits", "pred"]:
+        if key in output:
+            return output[key]
+    for value in output.values():
+        if isinstance(value, torch.Tensor):
+            return value
+    raise ValueError(f"Model output has no tensor: {list(output.keys())}")
+
+
+def fake_probabilities(output, batch_size: int) -> torch.Tensor:
+    """
+    Fake-class probability for every frame of a batch, shape [batch_size].
+    
+    Handles the output conventions of the DeepfakeBench detectors:
+    - {'cls': logits, 'prob': ...}: prob is already softmax(cls)[:, 1]
+    - one logit per frame: sigmoid
+    - two logits per frame: softmax, class 1 (fake)
+    - more classes: softmax, last class
+    """
+    logits = output_logits(output)
+    
+    if isinstance(output, dict) and "prob" in output and "cls" in output:
+        return logits.reshape(batch_size, -1)[:, 0]
+    
+    if logits.dim() <= 1:
+        if logits.numel() == batch_size:
+            return torch.sigmoid(logits.reshape(batch_size))
+        if batch_size == 1:
+            # Unbatched output of a single frame
+            if logits.numel() == 2:
+                return torch.softmax(logits, dim=0)[1:]
+            return torch.sigmoid(logits.reshape(-1)[:1])
+        raise ValueError(f"Cannot split output of shape {tuple(logits.shape)} into {batch_size} frames")
+    
+    logits = logits.reshape(batch_size, -1)
+    if logits.shape[1] == 2:
+        return torch.softmax(logits, dim=1)[:, 1]
+    if logits.shape[1] == 1:
+        return torch.sigmoid(logits[:, 0])
+    return torch.softmax(logits, dim=1)[:, -1]
+
 
 class DeepfakeBenchAdapter:
     """Adapter for DeepfakeBench models with video analysis and visualization."""
@@ -43,37 +115,62 @@ class DeepfakeBenchAdapter:
         "meso4Inception": {"name": "MesoNet-4 Inception", "speed": "Fast", "accuracy": "Medium"},
     }
     
-    def __init__(self, model_key: str = "xception", device: str = "cuda"):
+    WEIGHTS_DIR = "models/vendors/DeepfakeBench/training/weights"
+
+    def __init__(self, model_key: str = "xception", device: str = "cuda", batch_size: int = 8,
+                 decode_backend: str = "opencv", decode_prefetch: int = 16, keyframe_cache_size: int = 16):
         """
         Initialize DeepfakeBench adapter.
         
         Args:
             model_key: Model identifier (e.g., 'xception', 'meso4')
             device: Device to use ('cuda' or 'cpu')
+            batch_size: Sampled frames run through the model in one forward pass
+            decode_backend: Video decoder, 'opencv' or 'pyav' (see utils.video_frames)
+            decode_prefetch: Sampled frames decoded ahead on a background thread (0 = inline)
+            keyframe_cache_size: Highest-scoring frames kept (JPEG) for segment keyframes;
+                other keyframes are re-read from the video
         """
+        if batch_size < 1:
+            raise ValueError("batch_size must be >= 1")
+        
         self.model_key = model_key
         self.device = device if torch.cuda.is_available() and device == "cuda" else "cpu"
+        self.batch_size = batch_size
+        self.decode_backend = decode_backend
+        self.decode_prefetch = decode_prefetch
+        self.keyframe_cache_size = keyframe_cache_size
         self.model = None
         self.transform_fn = None
         self.input_size = None
-        self.weights_dir = "models/vendors/DeepfakeBench/training/weights"
+        self.preprocess_plan = None
+        self.call_style = None
+        self.weights_dir = self.WEIGHTS_DIR
         
         logger.info(f"Initializing DeepfakeBench adapter with model: {model_key}, device: {self.device}")
         self._load_model()
     
+    @classmethod
+    def get_weight_path(cls, model_key: str) -> Optional[str]:
+        """Return the weight file path registered for a model key (None if unknown)."""
+        entry = WEIGHTS_BY_MODEL.get(model_key)
+        return os.path.join(cls.WEIGHTS_DIR, entry[0]) if entry else None
+
+    def memory_bytes(self) -> int:
+        """Bytes held by the model's parameters and buffers (model pool budget)."""
+        tensors = list(self.model.parameters()) + list(self.model.buffers())
+        return sum(t.numel() * t.element_size() for t in tensors)
+
     def _load_model(self):
         """Load the specified DeepfakeBench model."""
         try:
             # Find weight file and input size
-            weight_filename = None
-            for wf, meta in WEIGHT_REGISTRY.items():
-                if meta["model_key"] == self.model_key:
-                    weight_filename = wf
-                    self.input_size = meta["input_size"]
-                    break
-            
-            if not weight_filename:
+            entry = WEIGHTS_BY_MODEL.get(self.model_key)
+            if not entry:
                 raise ValueError(f"Unknown model key: {self.model_key}")
+            weight_filename, meta = entry
+            self.input_size = meta["input_size"]
+            self.preprocess_plan = PreprocessPlan(self.input_size)
             
             weight_path = os.path.join(self.weights_dir, weight_filename)
             
@@ -81,11 +178,11 @@ class DeepfakeBenchAdapter:
                 raise FileNotFoundError(f"Model weights not found: {weight_path}")
             
             # Build model
-            logger.warning(f"🏗️ Building model: {self.model_key} (from weight file: {weight_filename})")
+            logger.info(f"🏗️ Building model: {self.model_key} (from weight file: {weight_filename})")
             self.model, self.transform_fn = build_model_and_transforms(self.model_key)
             
             # Load weights
-            logger.warning(f"📦 Loading weights from: {weight_path}")
+            logger.info(f"📦 Loading weights from: {weight_path}")
             checkpoint = torch.load(weight_path, map_location="cpu")
             
             if isinstance(checkpoint, dict):
@@ -99,136 +196,105 @@ class DeepfakeBenchAdapter:
             self.model.to(self.device)
             self.model.eval()
             
-            logger.info(f"Model {self.model_key} loaded successfully")
+            self.call_style = self._resolve_call_style()
+            logger.info(f"Model {self.model_key} loaded successfully (called as {self.call_style})")
             
         except Exception as e:
             logger.error(f"Failed to load model: {e}")
             raise
     
-    def _is_black_or_low_contrast(self, frame: np.ndarray) -> bool:
+    @staticmethod
+    def _is_black_or_low_contrast(luminance: Tuple[float, float]) -> bool:
         """
-        Detect if a frame is black or has very low contrast.
+        Detect if a frame is black or has very low contrast, from the
+        (mean, std) of its grayscale pixels.
         These frames often cause false positives in deepfake detection.
         """
-        # Convert to grayscale
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-        
-        # Check mean brightness (black screen check)
-        mean_brightness = np.mean(gray)
-        if mean_brightness < 15:  # Very dark frame
-            return True
+        mean_brightness, contrast = luminance
         
-        # Check contrast (std deviation of pixel values)
-        contrast = np.std(gray)
-        if contrast < 10:  # Very low contrast (uniform color)
-            return True
-        
-        return False
+        # Very dark frame (black screen check), or very low contrast (uniform color)
+        return mean_brightness < 15 or contrast < 10
     
     def _preprocess_frame(self, frame: np.ndarray) -> torch.Tensor:
-        """Preprocess a single frame for inference."""
-        if self.transform_fn is not None:
-            return self.transform_fn(frame)
-        
-        # Default preprocessing
-        from torchvision import transforms
-        
-        transform = transforms.Compose([
-            transforms.ToPILImage(),
-            transforms.Resize((self.input_size, self.input_size)),
-            transforms.ToTensor(),
-            transforms.Normalize(mean=[0.485, 0.456, 0.406], std=[0.229, 0.224, 0.225]),
-        ])
-        
-        tensor = transform(frame)
-        return tensor.unsqueeze(0)
+        """Preprocess a single RGB frame for inference into a [1, C, H, W] tensor."""
+        frames = self.preprocess_plan.new_batch(1, transform_fn=self.transform_fn)
+        frames.add(frame, bgr=False)
+        return frames.tensor()
     
-    # Add frame counter for debugging
-    _frame_count = 0
+    def _call_model(self, batch: torch.Tensor, call_style: str):
+        """Run the model on a [B, C, H, W] batch using one of CALL_STYLES."""
+        if call_style == "tensor":
+            return self.model(batch)
+        
+        # Some models (like UCF) require a label field during inference
+        # Provide a dummy label (0 = real) per frame
+        data_dict = {
+            "image": batch,
+            "label": torch.zeros(batch.shape[0], dtype=torch.long, device=batch.device)
+        }
+        if call_style == "dict_inference":
+            return self.model(data_dict, inference=True)
+        return self.model(data_dict)
     
-    def _run_inference(self, frame_tensor: torch.Tensor) -> float:
-        """Run inference on a single frame."""
-        frame_tensor = frame_tensor.to(self.device)
+    def _resolve_call_style(self) -> str:
+        """
+        Find how the model wants to be called, once at load time.
+        
+        Detectors take a data dict with or without the inference flag, a few
+        take the bare tensor; a one-frame probe tries them in that order. If
+        none works, the error of the last style (bare tensor) is raised.
+        """
+        probe = torch.zeros(1, 3, self.input_size, self.input_size, device=self.device)
         
         with torch.no_grad():
-            # Some models (like UCF) require a label field during inference
-            # Provide a dummy label (0 = real) for inference
-            data_dict = {
-                "image": frame_tensor,
-                "label": torch.tensor([0], dtype=torch.long).to(self.device)
-            }
-            
-            try:
-                output = self.model(data_dict, inference=True)
-            except TypeError:
+            for call_style in CALL_STYLES[:-1]:
                 try:
-                    output = self.model(data_dict)
-                except (TypeError, KeyError):
-                    output = self.model(frame_tensor)
-            
-            # Handle different output formats
-            if isinstance(output, dict):
-                # DEBUG: Print first frame output structure
-                if DeepfakeBenchAdapter._frame_count == 0:
-                    logger.warning(f"🔍 Model output keys: {output.keys()}")
-                    for k, v in output.items():
-                        if isinstance(v, torch.Tensor):
-                            logger.warning(f"🔍   {k}: shape={v.shape}, value={v.cpu().numpy()}")
-                
-                # Try to get logits from known output keys (avoid using 'or' with tensors)
-                logits = None
-                for key in ["prob", "cls", "logits", "pred"]:
-                    if key in output:
-                        logits = output[key]
-                        break
-                
-                # If still None, take the first tensor found
-                if logits is None:
-                    for key, value in output.items():
-                        if isinstance(value, torch.Tensor):
-                            logits = value
-                            break
-            else:
-                logits = output
+                    self._call_model(probe, call_style)
+                    return call_style
+                except Exception as e:
+                    logger.debug(f"Model {self.model_key} cannot be called as {call_style}: {e}")
             
-            # Increment frame count
-            DeepfakeBenchAdapter._frame_count += 1
-            
-            # Convert to probability
-            # Check if logits is already a probability (from xception's 'prob' output)
-            if isinstance(output, dict) and 'prob' in output and 'cls' in output:
-                # xception model returns: {'cls': logits, 'prob': fake_prob, 'feat': features}
-                # where prob is already softmax(cls, dim=1)[:, 1] (i.e., Fake probability)
-                prob = logits.item() if logits.dim() == 0 or (logits.dim() == 1 and len(logits) == 1) else logits[0].item()
-                
-                # DEBUG: Print first 10 frames with raw cls logits, and any frame > 80%
-                if DeepfakeBenchAdapter._frame_count <= 10 or prob > 0.8:
-                    raw_logits = output['cls'][0].cpu().numpy()
-                    probs = torch.softmax(output['cls'], dim=1)[0]
-                    logger.warning(f"🔍 Frame {DeepfakeBenchAdapter._frame_count} - Raw logits: {raw_logits}, Probs: [Real={probs[0]:.4f}, Fake={probs[1]:.4f}], Final prob={prob:.4f}")
-            elif logits.dim() == 1:
-                if len(logits) == 2:
-                    probs = torch.softmax(logits, dim=0)
-                    prob = probs[1].item()  # Probability of class 1 (fake)
-                    # DEBUG: Print first 10 frames
-                    if DeepfakeBenchAdapter._frame_count <= 10:
-                        logger.warning(f"🔍 Frame {DeepfakeBenchAdapter._frame_count} - Logits: {logits.cpu().numpy()}, Probs: [Real={probs[0]:.4f}, Fake={probs[1]:.4f}]")
-                else:
-                    prob = torch.sigmoid(logits[0]).item()
-            elif logits.shape[-1] == 2:
-                probs = torch.softmax(logits, dim=1)[0]
-                prob = probs[1].item()  # Probability of class 1 (fake)
-                # DEBUG: Print first 10 frames
-                if DeepfakeBenchAdapter._frame_count <= 10:
-                    logger.warning(f"🔍 Frame {DeepfakeBenchAdapter._frame_count} - Raw logits: {logits[0].cpu().numpy()}, Probs: [Real={probs[0]:.4f}, Fake={probs[1]:.4f}]")
-            elif logits.shape[-1] == 1:
-                prob = torch.sigmoid(logits[0, 0]).item()
-            else:
-                prob = torch.softmax(logits, dim=1)[0, -1].item()
+            self._call_model(probe, CALL_STYLES[-1])
+            return CALL_STYLES[-1]
+    
+    def _run_inference(self, batch: torch.Tensor, first_frame_number: int = 0) -> List[float]:
+        """
+        Run inference on a batch of frames.
+        
+        first_frame_number (0-based, within the current video) is only used
+        for debug logging; it is passed in rather than kept on the adapter so
+        one pooled adapter can serve concurrent jobs.
+        
+        Returns:
+            Fake probability per frame
+        """
+        batch = batch.to(self.device)
+        
+        with torch.no_grad():
+            output = self._call_model(batch, self.call_style)
+            probs = fake_probabilities(output, batch.shape[0]).float().cpu().numpy()
+        
+        # Raw outputs are only copied to the host when debug logging is on
+        if logger.isEnabledFor(logging.DEBUG):
+            if isinstance(output, dict) and first_frame_number == 0:
+                logger.debug(f"🔍 Model output keys: {output.keys()}")
+                for k, v in output.items():
+                    if isinstance(v, torch.Tensor):
+                        logger.debug(f"🔍   {k}: shape={v.shape}, value={v[:1].cpu().numpy()}")
             
-            return prob
+            # Raw class logits where the model reports them next to 'prob'
+            raw_logits = output["cls"] if isinstance(output, dict) and "cls" in output else output_logits(output)
+            raw_logits = raw_logits.reshape(len(probs), -1)
+            for i, prob in enumerate(probs):
+                # First 10 frames of the video, and any frame > 80%
+                frame_count = first_frame_number + i + 1
+                if frame_count <= 10 or prob > 0.8:
+                    logger.debug(f"🔍 Frame {frame_count} - Raw logits: {raw_logits[i].cpu().numpy()}, Final prob={prob:.4f}")
+        
+        return probs.tolist()
     
-    def analyze_video(self, video_path: str, fps: float = 3.0, threshold: float = 0.5, progress_callback=None) -> Dict:
+    def analyze_video(self, video_path: str, fps: float = 3.0, threshold: float = 0.5, progress_callback=None,
+                      sampling: str = "uniform", frame_budget: int = 0) -> Dict:
         """
         Analyze a video and return detection results.
         
@@ -237,160 +303,276 @@ class DeepfakeBenchAdapter:
             fps: Frame sampling rate
             threshold: Detection threshold
             progress_callback: Optional callback function(progress, stage, message) for progress updates
+            sampling: One of SAMPLING_MODES; "adaptive" scores a coarse pass and
+                only refines where the outcome is uncertain (see score_video_adaptive)
+            frame_budget: Cap on frames scored with adaptive sampling (0 = no cap)
         
         Returns:
-            Dictionary with analysis results
+            Dictionary with analysis results; adaptive sampling adds 'sampling'
         """
-        logger.warning(f"🎬 STARTING VIDEO ANALYSIS WITH MODEL: {self.model_key.upper()}")
-        logger.info(f"Analyzing video: {video_path}")
-        
-        # Reset frame counter for debugging
-        DeepfakeBenchAdapter._frame_count = 0
-        
-        cap = cv2.VideoCapture(video_path)
-        if not cap.isOpened():
-            raise RuntimeError(f"Failed to open video: {video_path}")
+        if sampling not in SAMPLING_MODES:
+            raise ValueError(f"Unknown sampling '{sampling}', expected one of {SAMPLING_MODES}")
         
-        source_fps = cap.get(cv2.CAP_PROP_FPS) or 25.0
-        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-        frame_step = max(int(round(source_fps / fps)), 1)
-        
-        scores = []
-        frames_data = []  # Store frames for keyframe extraction
-        frame_idx = 0
-        output_idx = 0
-        
-        while True:
-            ret, frame = cap.read()
-            if not ret:
-                break
-            
-            if frame_idx % frame_step == 0:
-                timestamp = output_idx / fps
-                rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                
-                # Check if frame is black or low contrast (common false positive trigger)
-                is_anomalous = self._is_black_or_low_contrast(frame)
-                
-                # Preprocess and run inference
-                frame_tensor = self._preprocess_frame(rgb_frame)
-                prob = self._run_inference(frame_tensor)
-                
-                # Log if high-score frame is actually a black/low-contrast frame
-                if is_anomalous and prob > 0.7:
-                    logger.warning(f"🚫 Frame {output_idx} at {timestamp:.2f}s: Black/low-contrast frame with high score {prob:.4f} - will be excluded from overall score")
-                
-                scores.append({
-                    "frame": output_idx,
-                    "timestamp": timestamp,
-                    "probability": prob,
-                    "is_anomalous": is_anomalous  # Mark anomalous frames
-                })
-                
-                # Store frame data for keyframe extraction
-                frames_data.append({
-                    "frame_bgr": frame.copy(),
-                    "timestamp": timestamp,
-                    "probability": prob,
-                    "frame_idx": output_idx
-                })
-                
-                output_idx += 1
-                
-                # Update progress every frame for short videos, every 3 frames for longer ones
-                update_frequency = 1 if output_idx < 30 else 3
-                if progress_callback and output_idx % update_frequency == 0:
-                    # Progress from 30% to 80% during frame analysis
-                    progress = 30 + int((frame_idx / total_frames) * 50)
-                    progress_callback(progress, "Analyzing video...", f"Processed {output_idx} frames")
-                    logger.debug(f"Progress update: {progress}% - Frame {output_idx}/{total_frames}")
-            
-            frame_idx += 1
+        logger.info(f"🎬 STARTING VIDEO ANALYSIS WITH MODEL: {self.model_key.upper()}")
+        logger.info(f"Analyzing video: {video_path}")
         
-        cap.release()
+        scorer = VideoScorer(self, self.batch_size)
+        sampling_info = None
+        if sampling == "adaptive":
+            scores, source_indices, sampling_info = score_video_adaptive(
+                scorer, video_path, fps, threshold, self.batch_size, frame_budget, self.decode_backend,
+                self.decode_prefetch, self.model_key, progress_callback)
+        else:
+            score_video(video_path, fps, self.batch_size, scorer.score, self.decode_backend, self.decode_prefetch,
+                        self.model_key, progress_callback)
+            scores, source_indices = scorer.scores, scorer.source_indices
         
         # Update progress - frame analysis complete
         if progress_callback:
             progress_callback(80, "Analyzing results...", "Processing detection scores")
         
-        # Analyze results
-        if not scores:
-            return {
-                "success": False,
-                "error": "No frames processed"
-            }
-        
-        # Calculate metrics - exclude anomalous frames (black/low-contrast)
-        valid_scores = [s for s in scores if not s.get("is_anomalous", False)]
-        all_probs = [s["probability"] for s in scores]
-        
-        if len(valid_scores) > 0:
-            valid_probs = [s["probability"] for s in valid_scores]
-            overall_score = float(np.mean(valid_probs))  # Use average of valid frames only
-            average_score = float(np.mean(valid_probs))
-        else:
-            # If all frames are anomalous (unlikely), fall back to all frames
-            valid_probs = all_probs
-            overall_score = float(np.mean(all_probs))
-            average_score = float(np.mean(all_probs))
-        
-        max_score = float(np.max(all_probs))  # Keep max for debugging
-        anomalous_count = len(scores) - len(valid_scores)
+        summary = summarize_scores(scores, source_indices, scorer.keyframe_cache, video_path, fps,
+                                   threshold, self.decode_backend, self.model_key, progress_callback)
+        if not summary["success"]:
+            return summary
         
-        # DEBUG: Print score statistics
-        logger.warning(f"🔍 SCORE STATS - Total frames: {len(scores)}, Valid frames: {len(valid_scores)}, Anomalous: {anomalous_count}")
-        logger.warning(f"🔍 SCORE STATS - Min: {np.min(all_probs):.4f}, Max: {max_score:.4f}, Mean (all): {np.mean(all_probs):.4f}")
-        logger.warning(f"🔍 Overall Score (Valid frames avg): {overall_score:.4f} ({overall_score*100:.2f}%)")
-        logger.warning(f"🔍 Max Score (single frame): {max_score:.4f} ({max_score*100:.2f}%)")
-        
-        # Find the frame with max score (for debugging)
-        max_idx = np.argmax(all_probs)
-        max_frame_info = scores[max_idx]
-        logger.warning(f"🔍 MAX SCORE FRAME: Frame #{max_frame_info['frame']} at {max_frame_info['timestamp']:.2f}s = {max_frame_info['probability']:.4f} (Anomalous: {max_frame_info.get('is_anomalous', False)})")
-        
-        # Smooth scores (use all probabilities for timeline display)
-        window = 5
-        if len(all_probs) >= window:
-            smoothed = np.convolve(all_probs, np.ones(window)/window, mode='same')
-        else:
-            smoothed = np.array(all_probs)
+        result = {
+            "success": True,
+            "model": self.model_key,
+            "model_name": self.model_name(self.model_key),
+            **{key: value for key, value in summary.items() if key != "success"}
+        }
+        if sampling_info:
+            result["sampling"] = sampling_info
+        return result
+    
+    @classmethod
+    def model_name(cls, model_key: str) -> str:
+        """Display name of a model key"""
+        return cls.AVAILABLE_MODELS.get(model_key, {}).get("name", model_key)
+    
+    # ((weights dir, its mtime), model list) - see get_available_models
+    _available_models_cache = None
+
+    @classmethod
+    def get_available_models(cls) -> List[Dict]:
+        """
+        Get list of available models with metadata.
         
-        # Update progress - finding segments
+        The list is cached and rebuilt only when the weights directory's
+        mtime changes (adding or removing a weight file updates it), so a
+        call costs one stat instead of one per model.
+        """
+        try:
+            dir_state = (cls.WEIGHTS_DIR, os.stat(cls.WEIGHTS_DIR).st_mtime_ns)
+        except OSError:
+            dir_state = (cls.WEIGHTS_DIR, None)
+
+        cached = cls._available_models_cache
+        if cached is None or cached[0] != dir_state:
+            models = []
+            for key, info in cls.AVAILABLE_MODELS.items():
+                weight_path = cls.get_weight_path(key)
+                models.append({
+                    "key": key,
+                    "name": info["name"],
+                    "speed": info["speed"],
+                    "accuracy": info["accuracy"],
+                    "available": bool(weight_path) and os.path.exists(weight_path)
+                })
+            cached = cls._available_models_cache = (dir_state, models)
+
+        return [dict(model) for model in cached[1]]
+
+
+class VideoScorer:
+    """
+    Scores of one model over one video, fed batch by batch (see score_video)
+    
+    Holds the per-video state, so a pooled adapter can serve concurrent
+    jobs: the frame scores, the source frame number of each sampled frame
+    (to re-read keyframes), the highest-scoring frames for segment
+    keyframes and the model's preprocessing buffers.
+    """
+    
+    def __init__(self, adapter: DeepfakeBenchAdapter, batch_size: int):
+        self.adapter = adapter
+        self.scores = []
+        self.source_indices = []
+        # Memory does not grow with video length
+        self.keyframe_cache = KeyframeCache(adapter.keyframe_cache_size)
+        self._frames = adapter.preprocess_plan.new_batch(batch_size, adapter.device, adapter.transform_fn)
+    
+    def score(self, batch: List[Dict]) -> List[float]:
+        """Score a batch of sampled frames (VideoFrameSource items); returns the fake probabilities"""
+        adapter = self.adapter
+        model_label = adapter.model_key
+        
+        self._frames.clear()
+        with metrics.stage(model_label, "preprocess"):
+            # Luminance comes from the frame resized to model input size;
+            # black or low-contrast frames are a common false positive trigger
+            anomalous = [adapter._is_black_or_low_contrast(self._frames.add(sampled["frame"])) for sampled in batch]
+            frames = self._frames.tensor()
+        with metrics.stage(model_label, "forward"):
+            probs = adapter._run_inference(frames, batch[0]["index"])
+        
+        for sampled, is_anomalous, prob in zip(batch, anomalous, probs):
+            # Log if high-score frame is actually a black/low-contrast frame
+            if is_anomalous and prob > 0.7:
+                logger.info(f"🚫 Frame {sampled['index']} at {sampled['timestamp']:.2f}s: Black/low-contrast frame with high score {prob:.4f} - will be excluded from overall score")
+            
+            self.scores.append({
+                "frame": sampled["index"],
+                "timestamp": sampled["timestamp"],
+                "probability": prob,
+                "is_anomalous": is_anomalous  # Mark anomalous frames
+            })
+            
+            self.source_indices.append(sampled["source_index"])
+            self.keyframe_cache.offer(sampled["index"], prob, sampled["frame"])
+        return probs
+
+
+def score_video(video_path: str, fps: float, batch_size: int, score_batch: Callable[[List[Dict]], object],
+                decode_backend: str = "opencv", decode_prefetch: int = 16, metrics_label: str = "deepfakebench",
+                progress_callback=None, indices: Optional[List[int]] = None,
+                progress_range: Tuple[int, int] = (30, 80)) -> int:
+    """
+    Decode the frames of a video sampled at fps once, and pass them to
+    score_batch in batches of batch_size. Returns the number of sampled frames.
+    
+    Decode latency is recorded per sampled frame, covering skipped frames too.
+    Progress goes through progress_range (30% to 80%), once per batch.
+    With indices, only those sampled frames are scored.
+    """
+    pending = []
+    scored = 0
+    progress_start, progress_end = progress_range
+    
+    # Frames are decoded ahead on a background thread while earlier batches run
+    with VideoFrameSource(video_path, fps, backend=decode_backend, prefetch=decode_prefetch,
+                          indices=indices) as source:
+        total_frames = max(source.total_frames, 1)
+        
+        for sampled in source:
+            metrics.observe(metrics_label, "decode", sampled["decode_seconds"])
+            pending.append(sampled)
+            
+            if len(pending) == batch_size:
+                score_batch(pending)
+                scored += len(pending)
+                pending = []
+                
+                if progress_callback:
+                    progress = progress_start + int((sampled["source_index"] / total_frames) * (progress_end - progress_start))
+                    progress_callback(progress, "Analyzing video...", f"Processed {scored} frames")
+                    logger.debug(f"Progress update: {progress}% - Frame {sampled['source_index']}/{total_frames}")
+        
+        if pending:
+            score_batch(pending)
+            scored += len(pending)
+    
+    return scored
+
+
+def score_video_adaptive(scorer: VideoScorer, video_path: str, fps: float, threshold: float, batch_size: int,
+                         frame_budget: int = 0, decode_backend: str = "opencv", decode_prefetch: int = 16,
+                         metrics_label: str = "deepfakebench", progress_callback=None,
+                         coarse_fps: float = adaptive_sampling.COARSE_FPS) -> Tuple[List[Dict], List[int], Dict]:
+    """
+    Coarse-to-fine scoring of the frames of a video sampled at fps.
+    
+    A coarse pass scores about coarse_fps; a fine pass then scores every
+    fps-grid frame in the gaps where the coarse scores approach the
+    threshold or the scene cuts (see utils/adaptive_sampling.py), within
+    frame_budget frames in all (0 = no cap). Frames left unscored are
+    interpolated, so the scores cover the whole grid like score_video's.
+    
+    Returns:
+        (frame scores, their source frame numbers, sampling summary)
+    """
+    with VideoFrameSource(video_path, fps, backend=decode_backend, prefetch=0) as probe:
+        grid_frames, frame_step = probe.sampled_frames, probe.frame_step
+    
+    if grid_frames == 0:
+        # Without a frame count there is no grid to plan on
+        logger.warning(f"Frame count of {video_path} unknown, adaptive sampling falls back to uniform")
+        score_video(video_path, fps, batch_size, scorer.score, decode_backend, decode_prefetch,
+                    metrics_label, progress_callback)
+        return scorer.scores, scorer.source_indices, {
+            "mode": "uniform",
+            "frame_budget": frame_budget,
+            "scored_frames": len(scorer.scores),
+            "grid_frames": len(scorer.scores)
+        }
+    
+    stride = adaptive_sampling.coarse_stride(fps, grid_frames, frame_budget, coarse_fps)
+    signatures = {}
+    
+    def score_coarse(batch: List[Dict]):
+        for sampled in batch:
+            signatures[sampled["index"]] = adaptive_sampling.frame_signature(sampled["frame"])
+        scorer.score(batch)
+    
+    if progress_callback:
+        progress_callback(30, "Analyzing video...", f"Coarse pass at {fps / stride:.2g} fps")
+    score_video(video_path, fps, batch_size, score_coarse, decode_backend, decode_prefetch, metrics_label,
+                progress_callback, indices=list(range(0, grid_frames, stride)), progress_range=(30, 55))
+    
+    coarse = {s["frame"]: s["probability"] for s in scorer.scores}
+    cuts = adaptive_sampling.scene_cuts(signatures)
+    fine = adaptive_sampling.plan_refinement(coarse, grid_frames, threshold, cuts=cuts, frame_budget=frame_budget)
+    logger.info(f"Adaptive sampling: {len(coarse)} coarse frames, {len(cuts)} scene cuts, "
+                f"refining {len(fine)} of {grid_frames} grid frames")
+    
+    if fine:
         if progress_callback:
-            progress_callback(85, "Finding suspicious segments...", "Detecting anomalies")
-        
-        # Find suspicious segments
-        segments = []
-        in_segment = False
-        segment_start = 0
-        
-        for i, prob in enumerate(smoothed):
-            if not in_segment and prob >= threshold:
-                in_segment = True
-                segment_start = i
-            elif in_segment and prob < threshold:
-                in_segment = False
-                start_ts = scores[segment_start]["timestamp"]
-                end_ts = scores[i-1]["timestamp"]
-                if end_ts - start_ts >= 1.0:  # Minimum 1 second
-                    # Find peak frame in this segment
-                    segment_probs = [scores[j]["probability"] for j in range(segment_start, i)]
-                    peak_idx = segment_start + int(np.argmax(segment_probs))
-                    
-                    segments.append({
-                        "start": start_ts,
-                        "end": end_ts,
-                        "duration": end_ts - start_ts,
-                        "peak_score": float(smoothed[peak_idx]),
-                        "peak_time": scores[peak_idx]["timestamp"],
-                        "keyframe_idx": peak_idx
-                    })
-        
-        if in_segment:
+            progress_callback(55, "Analyzing video...", f"Refining {len(fine)} frames")
+        score_video(video_path, fps, batch_size, scorer.score, decode_backend, decode_prefetch, metrics_label,
+                    progress_callback, indices=fine, progress_range=(55, 80))
+    
+    scores = adaptive_sampling.fill_grid({s["frame"]: s for s in scorer.scores}, fps)
+    return scores, [s["frame"] * frame_step for s in scores], {
+        "mode": "adaptive",
+        "coarse_fps": fps / stride,
+        "frame_budget": frame_budget,
+        "scored_frames": len(scorer.scores),
+        "grid_frames": len(scores),
+        "scene_cuts": [index / fps for index in cuts]
+    }
+
+
+def find_suspicious_segments(scores: List[Dict], threshold: float) -> List[Dict]:
+    """
+    Runs of at least 1 second where the smoothed (5-frame mean) probability
+    reaches threshold, each with its peak frame (keyframe_idx, an index into scores).
+    """
+    all_probs = [s["probability"] for s in scores]
+    
+    # Smooth scores (use all probabilities for timeline display)
+    window = 5
+    if len(all_probs) >= window:
+        smoothed = np.convolve(all_probs, np.ones(window)/window, mode='same')
+    else:
+        smoothed = np.array(all_probs)
+    
+    # Find suspicious segments
+    segments = []
+    in_segment = False
+    segment_start = 0
+    
+    for i, prob in enumerate(smoothed):
+        if not in_segment and prob >= threshold:
+            in_segment = True
+            segment_start = i
+        elif in_segment and prob < threshold:
+            in_segment = False
             start_ts = scores[segment_start]["timestamp"]
-            end_ts = scores[-1]["timestamp"]
-            if end_ts - start_ts >= 1.0:
-                segment_probs = [scores[j]["probability"] for j in range(segment_start, len(scores))]
+            end_ts = scores[i-1]["timestamp"]
+            if end_ts - start_ts >= 1.0:  # Minimum 1 second
+                # Find peak frame in this segment
+                segment_probs = [scores[j]["probability"] for j in range(segment_start, i)]
                 peak_idx = segment_start + int(np.argmax(segment_probs))
                 
                 segments.append({
@@ -401,64 +583,229 @@ class DeepfakeBenchAdapter:
                     "peak_time": scores[peak_idx]["timestamp"],
                     "keyframe_idx": peak_idx
                 })
+    
+    if in_segment:
+        start_ts = scores[segment_start]["timestamp"]
+        end_ts = scores[-1]["timestamp"]
+        if end_ts - start_ts >= 1.0:
+            segment_probs = [scores[j]["probability"] for j in range(segment_start, len(scores))]
+            peak_idx = segment_start + int(np.argmax(segment_probs))
+            
+            segments.append({
+                "start": start_ts,
+                "end": end_ts,
+                "duration": end_ts - start_ts,
+                "peak_score": float(smoothed[peak_idx]),
+                "peak_time": scores[peak_idx]["timestamp"],
+                "keyframe_idx": peak_idx
+            })
+    
+    return segments
+
+
+def summarize_scores(scores: List[Dict], source_indices: List[int], keyframe_cache: KeyframeCache, video_path: str,
+                     fps: float, threshold: float, decode_backend: str = "opencv", metrics_label: str = "deepfakebench",
+                     progress_callback=None, keyframe_prefix: str = "") -> Dict:
+    """
+    Overall score, verdict and suspicious segments of a video from its frame
+    scores. Segment keyframes are written to keyframes/ next to the video,
+    named {keyframe_prefix}segment_{n}_keyframe.jpg.
+    """
+    # Analyze results
+    if not scores:
+        return {
+            "success": False,
+            "error": "No frames processed"
+        }
+    
+    postprocess_start = time.perf_counter()
+    
+    # Calculate metrics - exclude anomalous frames (black/low-contrast)
+    valid_scores = [s for s in scores if not s.get("is_anomalous", False)]
+    all_probs = [s["probability"] for s in scores]
+    
+    if len(valid_scores) > 0:
+        valid_probs = [s["probability"] for s in valid_scores]
+        overall_score = float(np.mean(valid_probs))  # Use average of valid frames only
+        average_score = float(np.mean(valid_probs))
+    else:
+        # If all frames are anomalous (unlikely), fall back to all frames
+        valid_probs = all_probs
+        overall_score = float(np.mean(all_probs))
+        average_score = float(np.mean(all_probs))
+    
+    max_score = float(np.max(all_probs))  # Keep max for debugging
+    anomalous_count = len(scores) - len(valid_scores)
+    
+    # DEBUG: Print score statistics
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug(f"🔍 SCORE STATS - Total frames: {len(scores)}, Valid frames: {len(valid_scores)}, Anomalous: {anomalous_count}")
+        logger.debug(f"🔍 SCORE STATS - Min: {np.min(all_probs):.4f}, Max: {max_score:.4f}, Mean (all): {np.mean(all_probs):.4f}")
+        logger.debug(f"🔍 Overall Score (Valid frames avg): {overall_score:.4f} ({overall_score*100:.2f}%)")
+        logger.debug(f"🔍 Max Score (single frame): {max_score:.4f} ({max_score*100:.2f}%)")
         
-        # Update progress - extracting keyframes
-        if progress_callback:
-            progress_callback(90, "Extracting keyframes...", f"Found {len(segments)} suspicious segments")
-        
-        # Save keyframes for suspicious segments
-        keyframe_dir = os.path.join(os.path.dirname(video_path), "keyframes")
-        os.makedirs(keyframe_dir, exist_ok=True)
+        # Find the frame with max score (for debugging)
+        max_frame_info = scores[int(np.argmax(all_probs))]
+        logger.debug(f"🔍 MAX SCORE FRAME: Frame #{max_frame_info['frame']} at {max_frame_info['timestamp']:.2f}s = {max_frame_info['probability']:.4f} (Anomalous: {max_frame_info.get('is_anomalous', False)})")
+    
+    # Update progress - finding segments
+    if progress_callback:
+        progress_callback(85, "Finding suspicious segments...", "Detecting anomalies")
+    
+    segments = find_suspicious_segments(scores, threshold)
+    
+    metrics.observe(metrics_label, "postprocess", time.perf_counter() - postprocess_start)
+    
+    # Update progress - extracting keyframes
+    if progress_callback:
+        progress_callback(90, "Extracting keyframes...", f"Found {len(segments)} suspicious segments")
+    
+    # Save keyframes for suspicious segments
+    keyframe_dir = os.path.join(os.path.dirname(video_path), "keyframes")
+    os.makedirs(keyframe_dir, exist_ok=True)
+    
+    with metrics.stage(metrics_label, "persist"):
+        # Keyframes that dropped out of the cache are re-read from the video
+        uncached = [s["keyframe_idx"] for s in segments if keyframe_cache.get(s["keyframe_idx"]) is None]
+        reread = read_frames(video_path, [source_indices[idx] for idx in uncached], backend=decode_backend)
+        if uncached:
+            logger.info(f"Re-read {len(reread)} of {len(uncached)} uncached keyframes from {video_path}")
         
         for i, segment in enumerate(segments):
             keyframe_idx = segment["keyframe_idx"]
-            if keyframe_idx < len(frames_data):
-                frame_bgr = frames_data[keyframe_idx]["frame_bgr"]
-                keyframe_path = os.path.join(keyframe_dir, f"segment_{i+1}_keyframe.jpg")
-                cv2.imwrite(keyframe_path, frame_bgr)
-                segment["keyframe_path"] = f"keyframes/segment_{i+1}_keyframe.jpg"
-                logger.info(f"Saved keyframe for segment {i+1} at {keyframe_path}")
-        
-        return {
-            "success": True,
-            "model": self.model_key,
-            "model_name": self.AVAILABLE_MODELS.get(self.model_key, {}).get("name", self.model_key),
-            "overall_score": overall_score,
-            "average_score": average_score,
-            "threshold": threshold,
-            "total_frames": len(scores),
-            "fps": fps,
-            "suspicious_segments": segments,
-            "frame_scores": scores,  # Return all scores for threshold adjustment
-            "verdict": "FAKE" if overall_score >= threshold else "REAL",
-            "confidence": overall_score
-        }
-    
-    @classmethod
-    def get_available_models(cls) -> List[Dict]:
-        """Get list of available models with metadata."""
-        models = []
-        for key, info in cls.AVAILABLE_MODELS.items():
-            # Check if weights exist
-            weight_file = None
-            for wf, meta in WEIGHT_REGISTRY.items():
-                if meta["model_key"] == key:
-                    weight_file = wf
-                    break
-            
-            if weight_file:
-                weight_path = os.path.join("models/vendors/DeepfakeBench/training/weights", weight_file)
-                available = os.path.exists(weight_path)
+            keyframe_filename = f"{keyframe_prefix}segment_{i+1}_keyframe.jpg"
+            keyframe_path = os.path.join(keyframe_dir, keyframe_filename)
+            jpeg = keyframe_cache.get(keyframe_idx)
+            if jpeg is not None:
+                with open(keyframe_path, "wb") as f:
+                    f.write(jpeg)
+            elif source_indices[keyframe_idx] in reread:
+                cv2.imwrite(keyframe_path, reread[source_indices[keyframe_idx]])
             else:
-                available = False
-            
-            models.append({
-                "key": key,
-                "name": info["name"],
-                "speed": info["speed"],
-                "accuracy": info["accuracy"],
-                "available": available
-            })
-        
-        return models
+                continue
+            segment["keyframe_path"] = f"keyframes/{keyframe_filename}"
+            logger.info(f"Saved keyframe for segment {i+1} at {keyframe_path}")
+    
+    return {
+        "success": True,
+        "overall_score": overall_score,
+        "average_score": average_score,
+        "threshold": threshold,
+        "total_frames": len(scores),
+        "fps": fps,
+        "suspicious_segments": segments,
+        "frame_scores": scores,  # Return all scores for threshold adjustment
+        "verdict": "FAKE" if overall_score >= threshold else "REAL",
+        "confidence": overall_score
+    }
+
+
+def fuse_probabilities(model_probs: List[List[float]], fusion: str = "mean") -> List[float]:
+    """Per-frame fusion of several models' fake probabilities (one list per model)"""
+    stacked = np.asarray(model_probs, dtype=np.float64)
+    if fusion == "mean":
+        return stacked.mean(axis=0).tolist()
+    if fusion == "max":
+        return stacked.max(axis=0).tolist()
+    raise ValueError(f"Unknown fusion '{fusion}', expected one of {ENSEMBLE_FUSIONS}")
+
 
+def analyze_video_ensemble(adapters: List[DeepfakeBenchAdapter], video_path: str, fps: float = 3.0,
+                           threshold: float = 0.5, fusion: str = "mean", workers: int = 1,
+                           progress_callback=None) -> Dict:
+    """
+    Analyze a video with several models, decoding and sampling it once.
+    
+    Every batch of sampled frames goes to each model, on up to `workers`
+    threads (1 runs the models in turn; 0 = one per model). Either way the
+    video is decoded once instead of once per model. More than one thread
+    brings wall time towards the slowest model, but each thread runs its own
+    intra-op thread team, so it only helps with spare cores or a GPU. Decoding settings come from the first adapter; the batch size is
+    the smallest of the adapters'.
+    
+    Returns:
+        A result shaped like analyze_video's for the fused scores, plus
+        'ensemble' (model keys), 'fusion' and 'models' (each model's own
+        analyze_video result). Fused frame scores carry
+        'model_probabilities'; a fused frame is anomalous if any model
+        flagged it. Per-model keyframes are named {model}_segment_{n}_keyframe.jpg.
+    """
+    keys = [adapter.model_key for adapter in adapters]
+    if not keys:
+        raise ValueError("An ensemble needs at least one model")
+    if len(set(keys)) != len(keys):
+        raise ValueError(f"Duplicate models in ensemble: {keys}")
+    if fusion not in ENSEMBLE_FUSIONS:
+        raise ValueError(f"Unknown fusion '{fusion}', expected one of {ENSEMBLE_FUSIONS}")
+    
+    logger.info(f"🎬 STARTING ENSEMBLE VIDEO ANALYSIS WITH MODELS: {', '.join(keys)} ({fusion})")
+    logger.info(f"Analyzing video: {video_path}")
+    
+    lead = adapters[0]
+    batch_size = min(adapter.batch_size for adapter in adapters)
+    scorers = [VideoScorer(adapter, batch_size) for adapter in adapters]
+    ensemble_label = "+".join(keys)
+    
+    fused_scores = []
+    fused_source_indices = []
+    fused_keyframes = KeyframeCache(lead.keyframe_cache_size)
+    
+    workers = min(workers or len(scorers), len(scorers))
+    fan_out = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="deepfakebench-ensemble") if workers > 1 else None
+    
+    def score_batch(batch):
+        if fan_out is not None:
+            model_probs = list(fan_out.map(lambda scorer: scorer.score(batch), scorers))
+        else:
+            model_probs = [scorer.score(batch) for scorer in scorers]
+        
+        first = len(fused_scores)
+        for i, (sampled, prob) in enumerate(zip(batch, fuse_probabilities(model_probs, fusion))):
+            model_scores = [scorer.scores[first + i] for scorer in scorers]
+            fused_scores.append({
+                "frame": sampled["index"],
+                "timestamp": sampled["timestamp"],
+                "probability": prob,
+                "is_anomalous": any(s["is_anomalous"] for s in model_scores),
+                "model_probabilities": {key: s["probability"] for key, s in zip(keys, model_scores)}
+            })
+            fused_source_indices.append(sampled["source_index"])
+            fused_keyframes.offer(sampled["index"], prob, sampled["frame"])
+    
+    try:
+        score_video(video_path, fps, batch_size, score_batch, lead.decode_backend, lead.decode_prefetch,
+                    ensemble_label, progress_callback)
+    finally:
+        if fan_out is not None:
+            fan_out.shutdown()
+    
+    if progress_callback:
+        progress_callback(80, "Analyzing results...", "Processing detection scores")
+    
+    models = {}
+    for scorer in scorers:
+        adapter = scorer.adapter
+        summary = summarize_scores(scorer.scores, scorer.source_indices, scorer.keyframe_cache, video_path, fps,
+                                   threshold, adapter.decode_backend, adapter.model_key,
+                                   keyframe_prefix=f"{adapter.model_key}_")
+        models[adapter.model_key] = {
+            "success": summary["success"],
+            "model": adapter.model_key,
+            "model_name": DeepfakeBenchAdapter.model_name(adapter.model_key),
+            **{key: value for key, value in summary.items() if key != "success"}
+        }
+    
+    summary = summarize_scores(fused_scores, fused_source_indices, fused_keyframes, video_path, fps, threshold,
+                               lead.decode_backend, ensemble_label, progress_callback)
+    if not summary["success"]:
+        return summary
+    
+    return {
+        "success": True,
+        "model": ensemble_label,
+        "model_name": " + ".join(DeepfakeBenchAdapter.model_name(key) for key in keys),
+        **{key: value for key, value in summary.items() if key != "success"},
+        "ensemble": keys,
+        "fusion": fusion,
+        "models": models
+    }
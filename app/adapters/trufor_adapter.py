@@ -8,15 +8,19 @@ from classic cheapfakes to more recent manipulations based on deep learning.
 Based on: https://grip-unina.github.io/TruFor/
 """
 
+import asyncio
 import logging
+import math
 import os
 import sys
+import threading
+import time
 import numpy as np
 import torch
 import torch.nn.functional as F
 from PIL import Image, ImageOps
 import cv2
-from typing import Dict, Any, Optional, Tuple
+from typing import Dict, Any, List, Optional, Tuple
 import tempfile
 import shutil
 import io
@@ -35,27 +39,148 @@ except ImportError as e:
     logging.error(f"Failed to import TruFor modules: {e}")
     raise
 
+try:
+    from .trufor_attention import ATTENTION_IMPLS, DEFAULT_ATTENTION, set_attention_impl
+    from .trufor_batcher import TruForBatcher
+    from .trufor_onnx import BACKENDS, DEFAULT_BACKEND, load_onnx_session
+    from .trufor_optimize import optimize_trufor_for_inference
+    from .trufor_options import ALL_OUTPUTS, DEFAULT_RESOLUTION, OUTPUT_RESOLUTIONS, parse_outputs
+    from .trufor_tiling import (
+        DEFAULT_TILE_SIZE, DEFAULT_TILE_OVERLAP, DEFAULT_TILE_MEMORY_MB, run_tiled, tiles_per_batch
+    )
+except ImportError:
+    from app.adapters.trufor_attention import ATTENTION_IMPLS, DEFAULT_ATTENTION, set_attention_impl
+    from app.adapters.trufor_batcher import TruForBatcher
+    from app.adapters.trufor_onnx import BACKENDS, DEFAULT_BACKEND, load_onnx_session
+    from app.adapters.trufor_optimize import optimize_trufor_for_inference
+    from app.adapters.trufor_options import (
+        ALL_OUTPUTS, DEFAULT_RESOLUTION, OUTPUT_RESOLUTIONS, parse_outputs
+    )
+    from app.adapters.trufor_tiling import (
+        DEFAULT_TILE_SIZE, DEFAULT_TILE_OVERLAP, DEFAULT_TILE_MEMORY_MB, run_tiled, tiles_per_batch
+    )
+
+try:
+    from utils.metrics import metrics
+except ImportError:
+    from app.utils.metrics import metrics
+
 logger = logging.getLogger(__name__)
 
+# Model input side; images are resized to fit it (except in tiled mode)
+MODEL_INPUT_SIZE = 512
+
+# EXIF orientations that swap width and height
+_TRANSPOSING_ORIENTATIONS = (5, 6, 7, 8)
+
+# Serializes creation of the integrity head, so concurrent first detections share one
+_INTEGRITY_HEAD_LOCK = threading.Lock()
+
+
+def build_trufor_model(model_path: Optional[str], device: torch.device, attention: str = DEFAULT_ATTENTION):
+    """
+    Build the TruFor network and optionally load its checkpoint
+
+    Args:
+        model_path: Path to the TruFor checkpoint, or None for randomly initialized
+            weights (used by benchmarks and parity tests)
+        device: Device to place the model on
+        attention: Attention implementation, 'sdpa' (fused scaled_dot_product_attention)
+            or 'manual' (original code); both load the same weights
+
+    Returns:
+        Tuple of (model in eval mode, frozen config)
+    """
+    cfg = config.clone()
+    cfg.defrost()
+    cfg.merge_from_file(os.path.join(trufor_path, 'trufor.yaml'))
+    if model_path:
+        cfg.TEST.MODEL_FILE = model_path
+    cfg.freeze()
+
+    if cfg.MODEL.NAME == 'detconfcmx':
+        model = confcmx(cfg=cfg)
+    else:
+        raise NotImplementedError(f'Model {cfg.MODEL.NAME} not implemented')
+    set_attention_impl(model, attention)
+
+    if model_path:
+        checkpoint = torch.load(model_path, map_location=device, weights_only=False)
+        model.load_state_dict(checkpoint['state_dict'])
+
+    model = model.to(device)
+    model.eval()
+    return model, cfg
+
 
 class TruForAdapter:
     """
     Adapter for TruFor model integration
     """
     
-    def __init__(self, model_path: str = "models/trufor.pth.tar", device: str = "auto"):
+    def __init__(self, model_path: str = "models/trufor.pth.tar", device: str = "auto",
+                 max_batch_size: int = 1, max_wait_ms: float = 10.0,
+                 tile_size: int = DEFAULT_TILE_SIZE, tile_overlap: int = DEFAULT_TILE_OVERLAP,
+                 tile_memory_mb: float = DEFAULT_TILE_MEMORY_MB, reduced_decode: bool = True,
+                 backend: str = DEFAULT_BACKEND, onnx_path: Optional[str] = None,
+                 onnx_threads: Optional[int] = None, optimize: bool = True,
+                 attention: str = DEFAULT_ATTENTION, batcher_initializer=None):
         """
         Initialize TruFor adapter
         
         Args:
             model_path: Path to the TruFor model weights
             device: Device to run inference on ('auto', 'cpu', 'cuda:0', etc.)
+            max_batch_size: Maximum number of concurrent requests stacked into one
+                forward pass (1 disables micro-batching)
+            max_wait_ms: How long the batcher waits for more requests to fill a batch
+            tile_size: Tile side for tiled full-resolution analysis
+            tile_overlap: Overlap between neighbouring tiles
+            tile_memory_mb: Memory budget that bounds how many tiles run per forward pass
+            reduced_decode: Decode large JPEGs near the model input size using
+                DCT-domain downscaling instead of decoding them at full size
+            backend: 'torch' (eager PyTorch) or 'onnx' (ONNX Runtime on CPU, see
+                app.adapters.trufor_onnx)
+            onnx_path: Exported ONNX graph for the onnx backend; exported from
+                model_path on first use if missing
+            onnx_threads: ONNX Runtime intra-op threads (None = runtime default)
+            optimize: Apply the inference rewrites of app.adapters.trufor_optimize
+                (DnCNN BatchNorm folding and conv+ReLU fusion, ImageNet
+                normalization folded into the patch embedding) to the torch model
+            attention: Encoder attention implementation for the torch backend,
+                'sdpa' (fused scaled_dot_product_attention) or 'manual'
+            batcher_initializer: Called in the micro-batcher thread before its first
+                forward pass (thread count and affinity, see app.utils.thread_topology)
         """
+        if backend not in BACKENDS:
+            raise ValueError(f"Unsupported backend: {backend}. Allowed: {', '.join(BACKENDS)}")
+        if attention not in ATTENTION_IMPLS:
+            raise ValueError(f"Unsupported attention: {attention}. Allowed: {', '.join(ATTENTION_IMPLS)}")
+        if backend == "onnx" and tile_size != MODEL_INPUT_SIZE:
+            raise ValueError(f"The onnx backend has a fixed {MODEL_INPUT_SIZE}x{MODEL_INPUT_SIZE} input; tile_size must match")
+
         self.model_path = model_path
-        self.device = self._setup_device(device)
+        self.backend = backend
+        self.onnx_path = onnx_path
+        self.onnx_threads = onnx_threads
+        self.optimize = optimize
+        self.attention = attention
+        self.device = self._setup_device("cpu" if backend == "onnx" else device)
         self.model = None
+        self.forward_fn = None  # torch module or ONNX Runtime session, same calling convention
         self.config = None
+        self.batcher = None
+        self.tile_size = tile_size
+        self.tile_overlap = tile_overlap
+        self.tile_batch_size = tiles_per_batch(tile_size, tile_memory_mb)
+        self.reduced_decode = reduced_decode
         self._load_model()
+        self._get_integrity_head()
+        
+        if max_batch_size > 1:
+            self.batcher = TruForBatcher(self.forward_fn, max_batch_size=max_batch_size, max_wait_ms=max_wait_ms,
+                                         initializer=batcher_initializer)
+            logger.info(f"TruFor micro-batching enabled (max_batch_size={max_batch_size}, max_wait_ms={max_wait_ms})")
     
     def _setup_device(self, device: str) -> torch.device:
         """Setup the device for inference"""
@@ -68,27 +193,19 @@ class TruForAdapter:
         return torch.device(device)
     
     def _load_model(self):
-        """Load the TruFor model and configuration"""
+        """Load the TruFor model and configuration (or the ONNX Runtime session)"""
         try:
-            # Load configuration
-            self.config = config.clone()
-            self.config.defrost()
-            self.config.merge_from_file(os.path.join(trufor_path, 'trufor.yaml'))
-            self.config.TEST.MODEL_FILE = self.model_path
-            self.config.freeze()
-            
-            # Load model
-            logger.info(f"Loading TruFor model from {self.model_path}")
-            checkpoint = torch.load(self.model_path, map_location=self.device, weights_only=False)
-            
-            if self.config.MODEL.NAME == 'detconfcmx':
-                self.model = confcmx(cfg=self.config)
-            else:
-                raise NotImplementedError(f'Model {self.config.MODEL.NAME} not implemented')
+            if self.backend == "onnx":
+                logger.info(f"Loading TruFor ONNX Runtime session (checkpoint {self.model_path})")
+                self.forward_fn = load_onnx_session(self.onnx_path, self.model_path, self.onnx_threads)
+                logger.info(f"TruFor ONNX session loaded from {self.forward_fn.onnx_path}")
+                return
             
-            self.model.load_state_dict(checkpoint['state_dict'])
-            self.model = self.model.to(self.device)
-            self.model.eval()
+            logger.info(f"Loading TruFor model from {self.model_path}")
+            self.model, self.config = build_trufor_model(self.model_path, self.device, self.attention)
+            if self.optimize:
+                optimize_trufor_for_inference(self.model, channels_last=self.device.type == "cpu")
+            self.forward_fn = self.model
             
             logger.info("TruFor model loaded successfully")
             
@@ -96,37 +213,80 @@ class TruForAdapter:
             logger.error(f"Failed to load TruFor model: {e}")
             raise
     
-    def _preprocess_image(self, image_bytes: bytes) -> Tuple[torch.Tensor, dict]:
+    def _load_image(self, image_bytes: bytes, target_size: Optional[int] = None) -> Tuple[Image.Image, Tuple[int, int]]:
         """
-        Preprocess image for TruFor inference with proper padding and metadata
+        Decode image bytes to an upright RGB PIL image
+        
+        With target_size, JPEGs are decoded at the smallest 1/2, 1/4 or 1/8 DCT
+        scale whose sides stay at least as large as the image resized to fit
+        target_size, so most of the full-resolution decode is skipped. Other
+        formats are decoded at full size. EXIF orientation is applied to the
+        decoded (possibly reduced) image.
         
-        Args:
-            image_bytes: Raw image bytes
-            
         Returns:
-            Tuple of (preprocessed image tensor, metadata for postprocessing)
+            Tuple of (image, (W0, H0) upright size of the original image)
         """
-        # Convert bytes to PIL Image
+        # Convert bytes to PIL Image (header only, pixels are decoded on first access)
         pil_image = Image.open(io.BytesIO(image_bytes))
+        W0, H0 = pil_image.size
+        
+        if target_size and self.reduced_decode and pil_image.format == 'JPEG':
+            s = target_size / max(W0, H0)
+            if s < 0.5:
+                pil_image.draft(None, (math.ceil(W0 * s), math.ceil(H0 * s)))
+        
+        if pil_image.getexif().get(0x0112, 1) in _TRANSPOSING_ORIENTATIONS:
+            W0, H0 = H0, W0
         
         # Convert to RGB if necessary
         if pil_image.mode != 'RGB':
             pil_image = pil_image.convert('RGB')
         
         # Apply EXIF orientation correction
-        pil_image = ImageOps.exif_transpose(pil_image)
+        return ImageOps.exif_transpose(pil_image), (W0, H0)
+    
+    @staticmethod
+    def _make_thumbnail(pil_image: Image.Image, max_side: int) -> np.ndarray:
+        """Downscale an already decoded image to fit max_side (never upscales)"""
+        W, H = pil_image.size
+        s = max_side / max(W, H)
+        if s < 1:
+            pil_image = pil_image.resize((max(1, round(W * s)), max(1, round(H * s))),
+                                         Image.BILINEAR, reducing_gap=2.0)
+        return np.asarray(pil_image)
+    
+    def _preprocess_image(self, image_bytes: bytes, thumbnail_size: Optional[int] = None) -> Tuple[torch.Tensor, dict]:
+        """
+        Preprocess image for TruFor inference with proper padding and metadata
+        
+        Args:
+            image_bytes: Raw image bytes
+            thumbnail_size: If set, a preview of at most this size is made from
+                the same decode and returned as meta['thumbnail'] (RGB uint8)
+            
+        Returns:
+            Tuple of (preprocessed image tensor, metadata for postprocessing)
+        """
+        L = MODEL_INPUT_SIZE  # Target size
         
-        # Get original dimensions
-        # PIL.Image.size returns (width, height)
-        W0, H0 = pil_image.size  # W0=width, H0=height
-        L = 512  # Target size
+        # Original dimensions (W0=width, H0=height); large JPEGs are decoded closer to L
+        with metrics.stage("trufor", "decode"):
+            pil_image, (W0, H0) = self._load_image(image_bytes, target_size=L)
         
-        print(f'Original image dimensions: W={W0}, H={H0} (PIL returns width×height)')
+        logger.debug(f'Original image dimensions: W={W0}, H={H0}, decoded at {pil_image.size[0]}×{pil_image.size[1]}')
+        
+        with metrics.stage("trufor", "preprocess"):
+            return self._resize_and_pad(pil_image, W0, H0, thumbnail_size)
+    
+    def _resize_and_pad(self, pil_image: Image.Image, W0: int, H0: int,
+                        thumbnail_size: Optional[int]) -> Tuple[torch.Tensor, dict]:
+        """Resize a decoded image into the padded model input, see _preprocess_image"""
+        L = MODEL_INPUT_SIZE
         
         # Calculate scale factor to fit in 512x512 while maintaining aspect ratio
         s = L / max(W0, H0)
         W1, H1 = int(round(W0 * s)), int(round(H0 * s))
-        print(f'Resized dimensions: W={W1}, H={H1}')
+        logger.debug(f'Resized dimensions: W={W1}, H={H1}')
         
         # Resize maintaining aspect ratio
         pil_resized = pil_image.resize((W1, H1), Image.BICUBIC)
@@ -137,7 +297,7 @@ class TruForAdapter:
         right = pad_w - left
         top = pad_h // 2
         bottom = pad_h - top
-        print(f'Padding: left={left}, right={right}, top={top}, bottom={bottom}')
+        logger.debug(f'Padding: left={left}, right={right}, top={top}, bottom={bottom}')
         
         # Convert to tensor and normalize
         tensor = TF.to_tensor(pil_resized)  # [0,1]
@@ -154,29 +314,95 @@ class TruForAdapter:
             'left': left, 'right': right, 'top': top, 'bottom': bottom  # Padding info
         }
         
+        # Preview thumbnail from the decoded pixels (the model-size copy when it is a large enough downscale)
+        if thumbnail_size:
+            max_side = min(thumbnail_size, max(W0, H0))
+            downscaled = pil_resized.size[0] <= pil_image.size[0]
+            source = pil_resized if downscaled and max_side <= max(W1, H1) else pil_image
+            meta['thumbnail'] = self._make_thumbnail(source, max_side)
+        
         return tensor.to(self.device), meta
     
-    def _restore_to_orig(self, prob_map: torch.Tensor, meta: dict) -> np.ndarray:
+    def _map_size(self, meta: dict, resolution: str) -> Tuple[int, int]:
+        """
+        Compute the (H, W) output size of the maps for a requested resolution
+        
+        Maps keep the original aspect ratio and are never larger than the original image.
+        """
+        if resolution not in OUTPUT_RESOLUTIONS:
+            raise ValueError(f"Unsupported resolution: {resolution}. Allowed: {', '.join(OUTPUT_RESOLUTIONS)}")
+        
+        H0, W0 = meta['H0'], meta['W0']
+        max_side = OUTPUT_RESOLUTIONS[resolution]
+        if max_side is None or max(H0, W0) <= max_side:
+            return H0, W0
+        
+        if W0 > H0:
+            return max(1, int(max_side * H0 / W0)), max_side
+        return max_side, max(1, int(max_side * W0 / H0))
+    
+    def _crop_padding(self, maps: torch.Tensor, meta: dict) -> torch.Tensor:
+        """Remove reflection padding: (B, C, 512, 512) → (B, C, H1, W1)"""
+        # Note: PyTorch uses [batch, channel, height, width] format
+        return maps[..., meta['top']:512-meta['bottom'], meta['left']:512-meta['right']]
+    
+    def _restore_maps(self, maps: torch.Tensor, meta: dict, size: Tuple[int, int]) -> np.ndarray:
         """
-        Restore probability map to original image size by removing padding and resizing
+        Crop padding and resize all map channels to the requested size in one call
         
         Args:
-            prob_map: Probability map tensor (1, 1, 512, 512)
+            maps: Stacked maps tensor (1, C, 512, 512)
             meta: Metadata from preprocessing
+            size: Target (H, W), see _map_size
             
         Returns:
-            Restored probability map as numpy array (H0, W0)
+            Restored maps as a float32 numpy array (C, H, W)
         """
-        # Remove padding: 512×512 → (H1, W1)
-        # Note: PyTorch uses [batch, channel, height, width] format
-        x = prob_map[..., meta['top']:512-meta['bottom'], meta['left']:512-meta['right']]
+        x = self._crop_padding(maps, meta)
+        
+        if tuple(x.shape[-2:]) != tuple(size):
+            # Antialias when shrinking so previews average the model output instead of sampling it
+            shrinking = size[0] < x.shape[-2] or size[1] < x.shape[-1]
+            x = F.interpolate(x, size=size, mode='bilinear', align_corners=False, antialias=shrinking)
+        
+        return x[0].cpu().numpy().astype(np.float32, copy=False)
+    
+    def _forward(self, rgb_tensor: torch.Tensor):
+        """
+        Run the TruFor network on a single preprocessed image
         
-        # Resize to original dimensions: (H1, W1) → (H0, W0)
-        # F.interpolate expects size=(height, width), so use (H0, W0)
-        # PIL.Image.size returns (width, height), so W0=width, H0=height
-        x = F.interpolate(x, size=(meta['H0'], meta['W0']), mode='bilinear', align_corners=False)
+        With micro-batching enabled the tensor is queued on the batcher and this
+        call blocks until the shared forward pass completes, so concurrent callers
+        (one per inference worker thread) end up in the same batch.
         
-        return x.squeeze().cpu().numpy()  # Returns (H0, W0) array
+        Returns:
+            Tuple of (pred_logits, conf_logits, det_logit, npp) with a batch dimension of 1
+        """
+        if self.batcher is not None:
+            return self.batcher.infer(rgb_tensor)
+        
+        with torch.no_grad():
+            return self.forward_fn(rgb_tensor)
+    
+    def warmup(self) -> float:
+        """
+        Run one forward pass on a blank model-size input
+
+        The first pass pays for one-time setup (oneDNN primitive creation,
+        allocator growth, ONNX Runtime arenas, the batcher thread); doing it at
+        startup keeps that cost out of the first request.
+
+        Returns:
+            Seconds the warm-up pass took
+        """
+        started = time.perf_counter()
+        self._forward(torch.zeros(1, 3, MODEL_INPUT_SIZE, MODEL_INPUT_SIZE, device=self.device))
+        return time.perf_counter() - started
+    
+    def close(self):
+        """Stop background workers owned by the adapter"""
+        if self.batcher is not None:
+            self.batcher.close()
     
     def _weighted_statistics_pooling(self, x: torch.Tensor, log_w: torch.Tensor = None) -> torch.Tensor:
         """
@@ -222,20 +448,49 @@ class TruForAdapter:
             
             # Combine features
             combined_features = torch.cat((f1, f2), -1)  # (1, 8)
+            return self._integrity_from_features(combined_features, det_logit)
             
-            # Use a simple linear layer to map features to integrity score
-            # This approximates the official detection head
-            if not hasattr(self, '_integrity_head'):
-                self._integrity_head = torch.nn.Linear(8, 1).to(self.device)
-                # Initialize with reasonable weights
-                torch.nn.init.normal_(self._integrity_head.weight, 0, 0.1)
-                torch.nn.init.constant_(self._integrity_head.bias, 0.5)
+        except Exception as e:
+            logger.warning(f"Confidence-weighted pooling failed, using fallback: {e}")
+            # Fallback to simple sigmoid of det_logit
+            return torch.sigmoid(det_logit).flatten()[0].item()
+    
+    def _get_integrity_head(self) -> torch.nn.Linear:
+        """
+        Linear layer mapping the 8 pooled features to an integrity logit
+        
+        It approximates the official detection head and is randomly
+        initialized, so it is created once per adapter (at load time, or on
+        first use for adapters built without __init__) and shared by every
+        detection thread.
+        """
+        head = getattr(self, '_integrity_head', None)
+        if head is None:
+            with _INTEGRITY_HEAD_LOCK:
+                head = getattr(self, '_integrity_head', None)
+                if head is None:
+                    head = torch.nn.Linear(8, 1).to(self.device)
+                    # Initialize with reasonable weights
+                    torch.nn.init.normal_(head.weight, 0, 0.1)
+                    torch.nn.init.constant_(head.bias, 0.5)
+                    self._integrity_head = head
+        return head
+    
+    def _integrity_from_features(self, combined_features: torch.Tensor, det_logit: torch.Tensor) -> float:
+        """
+        Map pooled (1, 8) confidence-weighted features to an integrity score
+        
+        Shared by the standard path and tiled analysis, which pools the features over all tiles.
+        """
+        try:
+            combined_features = combined_features.to(self.device)
             
             # Compute integrity score
-            integrity_logit = self._integrity_head(combined_features)
+            integrity_logit = self._get_integrity_head()(combined_features)
             integrity = torch.sigmoid(integrity_logit).flatten()[0].item()
             
-            print(f'Confidence-weighted integrity: {integrity:.4f} (features: {combined_features[0].tolist()})')
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f'Confidence-weighted integrity: {integrity:.4f} (features: {combined_features[0].tolist()})')
             
             return integrity
             
@@ -249,16 +504,15 @@ class TruForAdapter:
         Detect portrait mode/bokeh artifacts that cause false positives
         
         Args:
-            pred_map: Anomaly map (H0, W0)
-            conf_map: Confidence map (H0, W0)
+            pred_map: Anomaly map (H, W) at any resolution
+            conf_map: Confidence map (H, W)
             meta: Metadata from preprocessing
             
         Returns:
             Note about detected artifacts
         """
         try:
-            # Convert to uint8 for edge detection
-            H0, W0 = meta['H0'], meta['W0']
+            H, W = pred_map.shape
             
             # Create a simple edge detection mask
             # Use gradient magnitude as edge indicator
@@ -271,7 +525,9 @@ class TruForAdapter:
             edge_mask = edge_magnitude > edge_threshold
             
             # Dilate to create boundary band
-            kernel_size = min(15, min(H0, W0) // 20)  # Adaptive kernel size
+            # Adaptive kernel size, defined at original resolution and scaled to the map
+            kernel_size = min(15, min(meta['H0'], meta['W0']) // 20)
+            kernel_size = max(1, int(round(kernel_size * H / meta['H0']))) if kernel_size > 0 else 0
             if kernel_size > 0:
                 kernel = np.ones((kernel_size, kernel_size), np.uint8)
                 edge_mask = cv2.dilate(edge_mask.astype(np.uint8), kernel, iterations=1).astype(bool)
@@ -286,13 +542,13 @@ class TruForAdapter:
                 boundary_ratio = (high_response & edge_mask).sum() / high_response.sum()
                 
                 # Check if face interior is mostly low anomaly
-                center_h, center_w = H0 // 2, W0 // 2
-                face_region_h = slice(max(0, center_h - H0//4), min(H0, center_h + H0//4))
-                face_region_w = slice(max(0, center_w - W0//4), min(W0, center_w + W0//4))
+                center_h, center_w = H // 2, W // 2
+                face_region_h = slice(max(0, center_h - H//4), min(H, center_h + H//4))
+                face_region_w = slice(max(0, center_w - W//4), min(W, center_w + W//4))
                 face_interior = pred_map[face_region_h, face_region_w]
                 face_low_anomaly = (face_interior < 0.3).sum() / face_interior.size
                 
-                print(f'Portrait detection: boundary_ratio={boundary_ratio:.3f}, face_low_anomaly={face_low_anomaly:.3f}')
+                logger.debug(f'Portrait detection: boundary_ratio={boundary_ratio:.3f}, face_low_anomaly={face_low_anomaly:.3f}')
                 
                 # If high response is mostly on boundaries and face interior is clean (relaxed conditions)
                 if boundary_ratio > 0.5 and face_low_anomaly > 0.3:
@@ -304,17 +560,206 @@ class TruForAdapter:
             logger.warning(f"Portrait artifact detection failed: {e}")
             return ""
     
-    async def detect(self, file_bytes: bytes, filename: str, mime_type: str) -> Dict[str, Any]:
+    def _run_standard(self, file_bytes: bytes, resolution: str, thumbnail_size: Optional[int] = None,
+                      outputs: frozenset = ALL_OUTPUTS):
+        """
+        Analyze the image resized to fit the 512x512 model input
+        
+        Maps, the noiseprint and the portrait check are only computed when
+        listed in outputs; skipped parts are returned as None.
+        
+        Returns:
+            Tuple of (pred_map, conf_map, npp_map, integrity, meta, map_size, portrait_note)
+        """
+        # Preprocess image
+        rgb_tensor, meta = self._preprocess_image(file_bytes, thumbnail_size)
+        
+        # Run inference (batched with concurrent requests when enabled)
+        with metrics.stage("trufor", "forward"):
+            pred_logits, conf_logits, det_logit, npp = self._forward(rgb_tensor)
+        
+        return self._postprocess_standard(pred_logits, conf_logits, det_logit, npp, meta, resolution, outputs)
+    
+    def _postprocess_standard(self, pred_logits: torch.Tensor, conf_logits: torch.Tensor,
+                              det_logit: torch.Tensor, npp: Optional[torch.Tensor], meta: dict,
+                              resolution: str, outputs: frozenset = ALL_OUTPUTS):
+        """
+        Turn the network outputs of one image (batch dimension 1) into its
+        integrity score and the requested maps
+        
+        Returns:
+            Same tuple as _run_standard
+        """
+        # Debug statistics force extra reductions and device syncs, so only compute them when logged
+        debug = logger.isEnabledFor(logging.DEBUG)
+        
+        with torch.no_grad(), metrics.stage("trufor", "postprocess"):
+            
+            if debug:
+                logger.debug(f'pred_logits: {pred_logits.shape}, min: {pred_logits.min().item():.4f}, max: {pred_logits.max().item():.4f}')
+                logger.debug(f'conf_logits: {conf_logits.shape}, min: {conf_logits.min().item():.4f}, max: {conf_logits.max().item():.4f}')
+                logger.debug(f'det_logit: {det_logit.shape}, min: {det_logit.min().item():.4f}, max: {det_logit.max().item():.4f}')
+            
+            # Process anomaly map: model sometimes outputs 2 channels (real/fake), sometimes 1 channel (fake logit)
+            if pred_logits.shape[1] == 1:
+                a = torch.sigmoid(pred_logits[:, 0]).unsqueeze(1)  # (1,1,H,W)
+            else:
+                a = torch.softmax(pred_logits, dim=1)[:, 1].unsqueeze(1)  # (1,1,H,W) select "fake" channel
+            
+            # Process confidence map: usually 1 channel logit
+            c = torch.sigmoid(conf_logits[:, 0]).unsqueeze(1)  # (1,1,H,W)
+            
+            # Process integrity score using confidence-weighted pooling (TruFor official method)
+            # This implements the confidence correction mechanism shown in the official examples
+            integrity = self._compute_confidence_weighted_integrity(a, c, det_logit)
+            fake_prob = 1.0 - integrity
+            
+            if debug:
+                logger.debug(f'a (prob): {a.shape}, min: {a.min().item():.4f}, max: {a.max().item():.4f}')
+                logger.debug(f'c (prob): {c.shape}, min: {c.min().item():.4f}, max: {c.max().item():.4f}')
+                logger.debug(f'integrity: {integrity:.4f}, fake_prob: {fake_prob:.4f}')
+            
+            # Crop padding and resize the requested map channels to the output resolution at once
+            want_maps = "maps" in outputs
+            want_npp = "noiseprint" in outputs and npp is not None
+            channels = ([a, c] if want_maps else []) + ([npp[:, :1]] if want_npp else [])  # first noiseprint++ channel
+            map_size = self._map_size(meta, resolution)
+            pred_map = conf_map = npp_map = None
+            if channels:
+                maps = self._restore_maps(torch.cat(channels, dim=1), meta, map_size)
+            
+            if want_maps:
+                pred_map, conf_map = maps[0], maps[1]  # numpy arrays shape map_size
+                if debug:
+                    logger.debug(f'pred_map restored shape: {pred_map.shape} ({resolution} resolution, original H×W = {meta["H0"]}×{meta["W0"]})')
+                    logger.debug(f'pred_map stats: mean={pred_map.mean():.4f}, max={pred_map.max():.4f}')
+                    logger.debug(f'conf_map stats: mean={conf_map.mean():.4f}, min={conf_map.min():.4f}, max={conf_map.max():.4f}')
+            
+            # Process noiseprint++ if available
+            if want_npp:
+                # Apply zero-mean normalization for better visualization (std at model resolution)
+                npp_std = self._crop_padding(npp[:, :1], meta).std().item() + 1e-8
+                npp_map = np.clip(maps[-1] / (3 * npp_std), -1, 1)  # [-1,1]
+                npp_map = (npp_map + 1) * 0.5  # [0,1]
+            
+            # Detect portrait mode/bokeh artifacts on model-resolution maps without padding
+            portrait_note = None
+            if "portrait" in outputs:
+                native = self._crop_padding(torch.cat([a, c], dim=1), meta)[0].cpu().numpy()
+                portrait_note = self._detect_portrait_artifacts(native[0], native[1], meta)
+                logger.debug(f'Portrait detection result: "{portrait_note}"')
+        
+        return pred_map, conf_map, npp_map, integrity, meta, map_size, portrait_note
+    
+    def _run_tiled(self, file_bytes: bytes, resolution: str, thumbnail_size: Optional[int] = None,
+                   outputs: frozenset = ALL_OUTPUTS):
+        """
+        Analyze the image at native resolution with overlapping tiles
+        
+        Tiles are streamed through the network tile_batch_size at a time and
+        blended at the requested output size, see app.adapters.trufor_tiling.
+        
+        Stage latencies are recorded under the model label 'trufor-tiled';
+        'forward' covers tile normalization, the forward passes and blending.
+        Blending is skipped for score-only requests.
+        
+        Returns:
+            Same tuple as _run_standard plus the tiling statistics
+        """
+        with metrics.stage("trufor-tiled", "decode"):
+            pil_image = self._load_image(file_bytes)[0]
+            image = np.asarray(pil_image)
+        H0, W0 = image.shape[:2]
+        meta = {'W0': W0, 'H0': H0}
+        if thumbnail_size:
+            with metrics.stage("trufor-tiled", "preprocess"):
+                meta['thumbnail'] = self._make_thumbnail(pil_image, thumbnail_size)
+        del pil_image
+        map_size = self._map_size(meta, resolution)
+        
+        with metrics.stage("trufor-tiled", "forward"):
+            tiled = run_tiled(
+                self.forward_fn, image, map_size,
+                tile_size=self.tile_size, overlap=self.tile_overlap,
+                batch_size=self.tile_batch_size, device=self.device,
+                blend=bool(outputs & {"maps", "noiseprint", "portrait"}),
+                noiseprint="noiseprint" in outputs
+            )
+        del image
+        
+        with metrics.stage("trufor-tiled", "postprocess"):
+            return self._finish_tiled(tiled, meta, map_size, outputs)
+    
+    def _finish_tiled(self, tiled: dict, meta: dict, map_size: Tuple[int, int],
+                      outputs: frozenset = ALL_OUTPUTS):
+        """Integrity score, noiseprint scaling and portrait check for _run_tiled"""
+        integrity = self._integrity_from_features(tiled["features"], tiled["det_logit"])
+        pred_map, conf_map = tiled["anomaly"], tiled["confidence"]
+        
+        npp_map = None
+        if tiled["noiseprint"] is not None:
+            npp_map = np.clip(tiled["noiseprint"] / (3 * tiled["noiseprint_std"] + 1e-8), -1, 1)
+            npp_map = (npp_map + 1) * 0.5  # [0,1]
+        
+        # Portrait heuristics are defined on model-scale maps, so run them on a bounded copy
+        portrait_note = None
+        if "portrait" in outputs:
+            check_size = self._map_size(meta, "report")
+            if tuple(check_size) != tuple(pred_map.shape):
+                dsize = (check_size[1], check_size[0])
+                portrait_note = self._detect_portrait_artifacts(
+                    cv2.resize(pred_map, dsize, interpolation=cv2.INTER_AREA),
+                    cv2.resize(conf_map, dsize, interpolation=cv2.INTER_AREA), meta)
+            else:
+                portrait_note = self._detect_portrait_artifacts(pred_map, conf_map, meta)
+        if "maps" not in outputs:
+            pred_map = conf_map = None
+        
+        stats = tiled["stats"]
+        logger.info(f"Tiled TruFor analysis: {stats['tiles']} tiles ({stats['grid'][0]}x{stats['grid'][1]}), "
+                    f"{stats['tiles_per_sec']} tiles/s, peak RSS {stats['peak_rss_mb']} MB")
+        return pred_map, conf_map, npp_map, integrity, meta, map_size, portrait_note, stats
+    
+    async def detect(self, file_bytes: bytes, filename: str, mime_type: str,
+                     resolution: str = DEFAULT_RESOLUTION, tiled: bool = False,
+                     thumbnail_size: Optional[int] = None, outputs=None) -> Dict[str, Any]:
+        """
+        Detect image forgery using TruFor without blocking the event loop
+        
+        Runs detect_sync in the default thread pool. The API server uses its own
+        bounded inference executor instead and calls detect_sync directly.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            None, self.detect_sync, file_bytes, filename, mime_type, resolution, tiled, thumbnail_size, outputs
+        )
+    
+    def detect_sync(self, file_bytes: bytes, filename: str, mime_type: str,
+                    resolution: str = DEFAULT_RESOLUTION, tiled: bool = False,
+                    thumbnail_size: Optional[int] = None, outputs=None) -> Dict[str, Any]:
         """
-        Detect image forgery using TruFor
+        Detect image forgery using TruFor (blocking)
         
         Args:
             file_bytes: Raw file bytes
             filename: Original filename
             mime_type: MIME type of the file
+            resolution: Output resolution of the maps, one of OUTPUT_RESOLUTIONS.
+                Full-size maps are only materialized for 'full'.
+            tiled: Analyze the native-resolution image in overlapping tiles
+                instead of resizing it to the 512x512 model input
+            thumbnail_size: If set, 'thumbnail' holds an RGB uint8 preview of at
+                most this size, produced from the same decode as the model input
+            outputs: Result parts to compute, see parse_outputs (None = all).
+                Parts not requested are neither computed nor returned, so
+                outputs='score' only runs the forward pass and the integrity
+                pooling.
             
         Returns:
-            Detection results dictionary
+            Detection results dictionary. Maps are float32 numpy arrays of size
+            map_size; encode them with app.utils.map_encoding before putting
+            them in a response. The original image is not embedded; callers
+            serve it (and the thumbnail) by reference.
         """
         try:
             # Only support images for now
@@ -325,99 +770,20 @@ class TruForAdapter:
                     "model": "TruFor"
                 }
             
-            # Create data URL for original image
-            import base64
-            image_data_url = f"data:{mime_type};base64,{base64.b64encode(file_bytes).decode()}"
-            
-            # Preprocess image
-            rgb_tensor, meta = self._preprocess_image(file_bytes)
+            outputs = parse_outputs(outputs)
             
-            # Run inference
-            with torch.no_grad():
-                pred_logits, conf_logits, det_logit, npp = self.model(rgb_tensor)
-                
-                # Debug: Print shapes and ranges
-                print(f'pred_logits: {pred_logits.shape}, min: {pred_logits.min().item():.4f}, max: {pred_logits.max().item():.4f}')
-                print(f'conf_logits: {conf_logits.shape}, min: {conf_logits.min().item():.4f}, max: {conf_logits.max().item():.4f}')
-                print(f'det_logit: {det_logit.shape}, min: {det_logit.min().item():.4f}, max: {det_logit.max().item():.4f}')
-                
-                # Process anomaly map: model sometimes outputs 2 channels (real/fake), sometimes 1 channel (fake logit)
-                if pred_logits.shape[1] == 1:
-                    a = torch.sigmoid(pred_logits[:, 0]).unsqueeze(1)  # (1,1,H,W)
-                else:
-                    a = torch.softmax(pred_logits, dim=1)[:, 1].unsqueeze(1)  # (1,1,H,W) select "fake" channel
-                
-                # Process confidence map: usually 1 channel logit
-                c = torch.sigmoid(conf_logits[:, 0]).unsqueeze(1)  # (1,1,H,W)
-                
-                # Process integrity score using confidence-weighted pooling (TruFor official method)
-                # This implements the confidence correction mechanism shown in the official examples
-                integrity = self._compute_confidence_weighted_integrity(a, c, det_logit)
-                fake_prob = 1.0 - integrity
-                
-                # Restore maps to original image size
-                pred_map = self._restore_to_orig(a, meta)  # numpy array shape (H0, W0)
-                conf_map = self._restore_to_orig(c, meta)  # numpy array shape (H0, W0)
-                
-                # Create confidence-weighted anomaly map (like official TruFor demos)
-                weighted_pred_map = pred_map * conf_map
-                print(f'weighted_pred_map stats: mean={weighted_pred_map.mean():.4f}, max={weighted_pred_map.max():.4f}')
-                
-                # Debug: Print processed values
-                print(f'a (prob): {a.shape}, min: {a.min().item():.4f}, max: {a.max().item():.4f}')
-                print(f'c (prob): {c.shape}, min: {c.min().item():.4f}, max: {c.max().item():.4f}')
-                print(f'integrity: {integrity:.4f}, fake_prob: {fake_prob:.4f}')
-                print(f'pred_map restored shape: {pred_map.shape} (should be H×W = {meta["H0"]}×{meta["W0"]})')
-                print(f'conf_map restored shape: {conf_map.shape}')
-                print(f'pred_map stats: mean={pred_map.mean():.4f}, max={pred_map.max():.4f}')
-                print(f'conf_map stats: mean={conf_map.mean():.4f}, min={conf_map.min():.4f}, max={conf_map.max():.4f}')
-                
-                # Process noiseprint++ (restore to original size if available)
-                npp_map = None
-                if npp is not None:
-                    npp_processed = torch.squeeze(npp, 0)[0].unsqueeze(0).unsqueeze(0)  # (1,1,H,W)
-                    npp_map = self._restore_to_orig(npp_processed, meta)  # (H0, W0)
-                    
-                    # Apply zero-mean normalization for better visualization
-                    npp_std = npp_map.std() + 1e-8
-                    npp_map = np.clip(npp_map / (3 * npp_std), -1, 1)  # [-1,1]
-                    npp_map = (npp_map + 1) * 0.5  # [0,1]
-                
-                # Detect portrait mode/bokeh artifacts
-                portrait_note = self._detect_portrait_artifacts(pred_map, conf_map, meta)
-                print(f'Portrait detection result: "{portrait_note}"')
-            
-            # Determine if image is fake based on integrity score
-            is_fake = integrity < 0.5
-            confidence = abs(integrity - 0.5) * 2  # Convert to 0-1 confidence
-            
-            # Create result
-            result = {
-                "status": "success",
-                "model": "TruFor",
-                "filename": filename,
-                "is_fake": is_fake,
-                "decision": "fake" if is_fake else "real",         # For frontend compatibility
-                "confidence": float(confidence),
-                "score": float(1 - fake_prob),                     # Authenticity score for display
-                "integrity": float(integrity),                     # Higher value means more authentic
-                "fake_prob": float(fake_prob),                     # For frontend direct usage
-                "detection_score": float(integrity),               # Keep compatibility
-                "prediction_map": pred_map.tolist(),               # anomaly ∈[0,1] (original size)
-                "weighted_prediction_map": weighted_pred_map.tolist(),  # anomaly × confidence (official style)
-                "confidence_map": conf_map.tolist(),               # confidence ∈[0,1] (original size)
-                "image_size": (meta['H0'], meta['W0']),            # Original image size (H, W)
-                "has_confidence_map": True,
-                "has_noiseprint": npp_map is not None,
-                "original_image_url": image_data_url,
-                "portrait_note": portrait_note                     # Portrait mode detection hint
-            }
-            
-            # Add noiseprint++ if available
-            if npp_map is not None:
-                result["noiseprint_map"] = npp_map.tolist()
-            
-            logger.info(f"TruFor detection completed for {filename}: fake={is_fake}, confidence={confidence:.3f}")
+            # Run the standard (resized) or tiled native-resolution analysis
+            tiling = None
+            if tiled:
+                pred_map, conf_map, npp_map, integrity, meta, map_size, portrait_note, tiling = \
+                    self._run_tiled(file_bytes, resolution, thumbnail_size, outputs)
+            else:
+                pred_map, conf_map, npp_map, integrity, meta, map_size, portrait_note = \
+                    self._run_standard(file_bytes, resolution, thumbnail_size, outputs)
+            result = self._build_result(filename, resolution, outputs, pred_map, conf_map, npp_map,
+                                        integrity, meta, map_size, portrait_note, tiling)
+            logger.info(f"TruFor detection completed for {filename}: fake={result['is_fake']}, "
+                        f"confidence={result['confidence']:.3f}")
             return result
             
         except Exception as e:
@@ -428,6 +794,126 @@ class TruForAdapter:
                 "model": "TruFor"
             }
     
+    def detect_batch_sync(self, items: List[Tuple[bytes, str, str]], resolution: str = DEFAULT_RESOLUTION,
+                          thumbnail_size: Optional[int] = None, outputs=None) -> List[Dict[str, Any]]:
+        """
+        Detect image forgery in several images with one forward pass (blocking)
+        
+        The images are preprocessed to the 512x512 model input, stacked and run
+        through the network together, bypassing the micro-batcher; callers
+        bound the batch size (e.g. by tile_batch_size, the number of model-size
+        inputs that fit the memory budget). A failure affects only its image.
+        
+        Args:
+            items: (file_bytes, filename, mime_type) per image
+            resolution, thumbnail_size, outputs: As in detect_sync
+            
+        Returns:
+            One result per item, in order, each as returned by detect_sync
+        """
+        def error(message):
+            return {"status": "error", "message": message, "model": "TruFor"}
+        
+        try:
+            outputs = parse_outputs(outputs)
+        except ValueError as e:
+            return [error(str(e)) for _ in items]
+        
+        results = [None] * len(items)
+        prepared = []  # (index, tensor, meta)
+        for index, (file_bytes, filename, mime_type) in enumerate(items):
+            if not mime_type.startswith('image/'):
+                results[index] = error("TruFor currently only supports image files")
+                continue
+            try:
+                rgb_tensor, meta = self._preprocess_image(file_bytes, thumbnail_size)
+                prepared.append((index, rgb_tensor, meta))
+            except Exception as e:
+                logger.error(f"TruFor preprocessing failed for {filename}: {e}")
+                results[index] = error(f"Detection failed: {str(e)}")
+        
+        if prepared:
+            try:
+                with torch.no_grad(), metrics.stage("trufor", "forward"):
+                    batch_out = self.forward_fn(torch.cat([tensor for _, tensor, _ in prepared]))
+            except Exception as e:
+                logger.error(f"TruFor batch forward pass failed ({len(prepared)} images): {e}")
+                for index, _, _ in prepared:
+                    results[index] = error(f"Detection failed: {str(e)}")
+                prepared = []
+        
+        for position, (index, _, meta) in enumerate(prepared):
+            filename = items[index][1]
+            try:
+                pred_logits, conf_logits, det_logit, npp = (
+                    None if out is None else out[position:position + 1] for out in batch_out
+                )
+                pred_map, conf_map, npp_map, integrity, meta, map_size, portrait_note = \
+                    self._postprocess_standard(pred_logits, conf_logits, det_logit, npp, meta, resolution, outputs)
+                results[index] = self._build_result(filename, resolution, outputs, pred_map, conf_map, npp_map,
+                                                    integrity, meta, map_size, portrait_note)
+            except Exception as e:
+                logger.error(f"TruFor detection failed for {filename}: {e}")
+                results[index] = error(f"Detection failed: {str(e)}")
+        
+        analyzed = sum(result["status"] == "success" for result in results)
+        logger.info(f"TruFor batch detection completed: {analyzed} of {len(items)} images analyzed")
+        return results
+    
+    def _build_result(self, filename: str, resolution: str, outputs: frozenset,
+                      pred_map: Optional[np.ndarray], conf_map: Optional[np.ndarray],
+                      npp_map: Optional[np.ndarray], integrity: float, meta: dict,
+                      map_size: Tuple[int, int], portrait_note: Optional[str],
+                      tiling: Optional[dict] = None) -> Dict[str, Any]:
+        """Detection result dictionary of one analyzed image (see detect_sync)"""
+        fake_prob = 1.0 - integrity
+        
+        # Determine if image is fake based on integrity score
+        is_fake = integrity < 0.5
+        confidence = abs(integrity - 0.5) * 2  # Convert to 0-1 confidence
+        
+        # Create result
+        result = {
+            "status": "success",
+            "model": "TruFor",
+            "filename": filename,
+            "is_fake": is_fake,
+            "decision": "fake" if is_fake else "real",         # For frontend compatibility
+            "confidence": float(confidence),
+            "score": float(1 - fake_prob),                     # Authenticity score for display
+            "integrity": float(integrity),                     # Higher value means more authentic
+            "fake_prob": float(fake_prob),                     # For frontend direct usage
+            "detection_score": float(integrity),               # Keep compatibility
+            "image_size": (meta['H0'], meta['W0']),            # Original image size (H, W)
+            "map_size": map_size,                              # Size of the returned maps (H, W)
+            "map_resolution": resolution,
+            "has_confidence_map": conf_map is not None,
+            "has_noiseprint": npp_map is not None,
+            "outputs": sorted(outputs)                         # Result parts that were computed
+        }
+        
+        if pred_map is not None:
+            result["prediction_map"] = pred_map                          # anomaly ∈[0,1] (original size)
+            result["weighted_prediction_map"] = pred_map * conf_map      # anomaly × confidence (official style)
+            result["confidence_map"] = conf_map                          # confidence ∈[0,1] (original size)
+        
+        if portrait_note is not None:
+            result["portrait_note"] = portrait_note            # Portrait mode detection hint
+        
+        # Preview made from the preprocessing decode
+        if 'thumbnail' in meta:
+            result["thumbnail"] = meta['thumbnail']
+        
+        # Tiles/sec and peak memory of tiled analysis
+        if tiling is not None:
+            result["tiling"] = tiling
+        
+        # Add noiseprint++ if available
+        if npp_map is not None:
+            result["noiseprint_map"] = npp_map
+        
+        return result
+    
     def get_model_info(self) -> Dict[str, Any]:
         """Get information about the loaded model"""
         return {
@@ -435,6 +921,9 @@ class TruForAdapter:
             "model_type": "Image Forgery Detection and Localization",
             "architecture": "Cross-modal transformer with RGB and Noiseprint++",
             "device": str(self.device),
+            "backend": self.backend,
+            "optimized": self.optimize and self.backend == "torch",
+            "attention": self.attention if self.backend == "torch" else None,
             "supports_localization": True,
             "supports_confidence": True,
             "supports_noiseprint": True
@@ -0,0 +1,112 @@
+"""
+Fused scaled-dot-product attention for the TruFor encoder
+
+The Segformer self-attention (dual_segformer.Attention) and the CMX
+channel cross-attention (net_utils.CrossAttention) build their attention
+matrices by hand (q @ k^T, softmax, @ v), which materializes large
+temporaries at stage 1 (16384 tokens at 512x512) and copies q/k/v with
+.contiguous(). The subclasses below compute the same result with
+torch.nn.functional.scaled_dot_product_attention. They only override
+forward, so parameters and state_dict keys are unchanged and existing
+checkpoints load as-is.
+
+Requires the TruFor sources on sys.path (set up by trufor_adapter) and
+torch >= 2.1 for the scale argument of scaled_dot_product_attention (the
+cross-attention scales by head dim, not by the dimension SDPA would infer).
+"""
+
+import torch
+import torch.nn as nn
+import torch.nn.functional as F
+
+from models.cmx.encoders.dual_segformer import Attention
+from models.cmx.net_utils import CrossAttention
+
+ATTENTION_IMPLS = ("manual", "sdpa")
+DEFAULT_ATTENTION = "sdpa"
+
+
+class SdpaAttention(Attention):
+    """Segformer spatial-reduction attention on scaled_dot_product_attention"""
+
+    def forward(self, x, H, W):
+        B, N, C = x.shape
+        heads = self.num_heads
+        q = self.q(x).reshape(B, N, heads, C // heads).permute(0, 2, 1, 3)
+
+        if self.sr_ratio > 1:
+            x_ = x.permute(0, 2, 1).reshape(B, C, H, W)
+            x_ = self.sr(x_).reshape(B, C, -1).permute(0, 2, 1)
+            x_ = self.norm(x_)
+        else:
+            x_ = x
+        k, v = self.kv(x_).reshape(B, -1, 2, heads, C // heads).permute(2, 0, 3, 1, 4)
+
+        dropout_p = self.attn_drop.p if self.training else 0.0
+        x = F.scaled_dot_product_attention(q, k, v, dropout_p=dropout_p, scale=self.scale)
+        x = x.transpose(1, 2).reshape(B, N, C)
+        x = self.proj(x)
+        x = self.proj_drop(x)
+        return x
+
+
+class SdpaCrossAttention(CrossAttention):
+    """
+    CMX channel cross-attention on scaled_dot_product_attention
+
+    The original computes x1 = q1 @ softmax(k2^T v2 * scale, dim=-2) per head,
+    i.e. attention over channels. Transposed, that is
+    (softmax(v2^T k2 * scale, dim=-1) @ q1^T)^T, which is SDPA with the
+    channel-major tensors v2^T, k2^T and q1^T as query, key and value.
+    """
+
+    def forward(self, x1, x2):
+        B, N, C = x1.shape
+        heads = self.num_heads
+        # B H C/heads N
+        q1 = x1.reshape(B, N, heads, C // heads).permute(0, 2, 3, 1)
+        q2 = x2.reshape(B, N, heads, C // heads).permute(0, 2, 3, 1)
+        k1, v1 = self.kv1(x1).reshape(B, N, 2, heads, C // heads).permute(2, 0, 3, 4, 1)
+        k2, v2 = self.kv2(x2).reshape(B, N, 2, heads, C // heads).permute(2, 0, 3, 4, 1)
+
+        y1 = F.scaled_dot_product_attention(v2, k2, q1, scale=self.scale)
+        y2 = F.scaled_dot_product_attention(v1, k1, q2, scale=self.scale)
+
+        x1 = y1.permute(0, 3, 1, 2).reshape(B, N, C)
+        x2 = y2.permute(0, 3, 1, 2).reshape(B, N, C)
+        return x1, x2
+
+
+_IMPL_CLASSES = {
+    "manual": {Attention: Attention, SdpaAttention: Attention,
+               CrossAttention: CrossAttention, SdpaCrossAttention: CrossAttention},
+    "sdpa": {Attention: SdpaAttention, SdpaAttention: SdpaAttention,
+             CrossAttention: SdpaCrossAttention, SdpaCrossAttention: SdpaCrossAttention},
+}
+
+
+def set_attention_impl(model: nn.Module, impl: str) -> int:
+    """
+    Switch every attention module of a TruFor model to the given implementation
+
+    Modules are switched in place by class; weights are not touched, so this
+    can run before or after loading a checkpoint.
+
+    Args:
+        model: TruFor network (or any module containing the attention blocks)
+        impl: 'manual' (original code) or 'sdpa'
+
+    Returns:
+        Number of attention modules found
+    """
+    if impl not in ATTENTION_IMPLS:
+        raise ValueError(f"Unsupported attention implementation: {impl}. Allowed: {', '.join(ATTENTION_IMPLS)}")
+
+    mapping = _IMPL_CLASSES[impl]
+    count = 0
+    for module in model.modules():
+        target = mapping.get(type(module))
+        if target is not None:
+            module.__class__ = target
+            count += 1
+    return count
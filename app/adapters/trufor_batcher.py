@@ -0,0 +1,206 @@
+"""
+Micro-batching engine for TruFor inference
+
+Every TruFor request is padded to a fixed 512x512 tensor, so concurrent
+requests can be stacked and sent through myEncoderDecoder as a single
+forward pass. The batcher collects requests for a short window (bounded by
+max batch size and max wait time), runs one batched forward on a dedicated
+worker thread and splits the outputs back per request.
+"""
+
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import torch
+
+logger = logging.getLogger(__name__)
+
+
+class _PendingRequest:
+    """A single image waiting to be batched"""
+
+    __slots__ = ("tensor", "future", "enqueued_at")
+
+    def __init__(self, tensor: torch.Tensor):
+        self.tensor = tensor
+        self.future: Future = Future()
+        self.enqueued_at = time.monotonic()
+
+
+class TruForBatcher:
+    """
+    Collects concurrent single-image forward passes into batches
+
+    The forward function receives a batched tensor (B, C, H, W) and must
+    return a tuple of outputs whose first dimension is the batch dimension.
+    ``None`` outputs (e.g. a disabled Noiseprint++ branch) are passed through.
+    """
+
+    def __init__(
+        self,
+        forward_fn: Callable[[torch.Tensor], Tuple[Any, ...]],
+        max_batch_size: int = 4,
+        max_wait_ms: float = 10.0,
+        name: str = "trufor-batcher",
+        initializer: Optional[Callable[[], None]] = None
+    ):
+        """
+        Initialize the batcher and start its worker thread
+
+        Args:
+            forward_fn: Callable running the model on a batched tensor
+            max_batch_size: Maximum number of images per forward pass
+            max_wait_ms: Maximum time to wait for more requests once the first one arrived
+            name: Name of the worker thread
+            initializer: Called in the worker thread before the first batch
+                (e.g. thread_topology.batcher_initializer)
+        """
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be >= 1")
+        if max_wait_ms < 0:
+            raise ValueError("max_wait_ms must be >= 0")
+
+        self.forward_fn = forward_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._initializer = initializer
+
+        self._queue: "queue.Queue[Optional[_PendingRequest]]" = queue.Queue()
+        self._closed = False
+        self._lock = threading.Lock()
+        self._stats = {
+            "requests": 0,
+            "batches": 0,
+            "max_batch_seen": 0,
+            "total_wait_s": 0.0,
+            "total_forward_s": 0.0,
+        }
+
+        self._worker = threading.Thread(target=self._run, name=name, daemon=True)
+        self._worker.start()
+
+    def submit(self, tensor: torch.Tensor) -> Future:
+        """
+        Queue a single image tensor (1, C, H, W) for batched inference
+
+        Returns:
+            Future resolving to the per-request output tuple (each tensor keeps a batch dim of 1)
+        """
+        if self._closed:
+            raise RuntimeError("Batcher is closed")
+        if tensor.dim() != 4 or tensor.shape[0] != 1:
+            raise ValueError(f"Expected a single image tensor (1, C, H, W), got {tuple(tensor.shape)}")
+
+        request = _PendingRequest(tensor)
+        self._queue.put(request)
+        return request.future
+
+    def infer(self, tensor: torch.Tensor) -> Tuple[Any, ...]:
+        """Blocking helper: submit a tensor and wait for its outputs"""
+        return self.submit(tensor).result()
+
+    def close(self, timeout: Optional[float] = None):
+        """Stop the worker thread after draining already queued requests"""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(None)
+        self._worker.join(timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return batching statistics"""
+        with self._lock:
+            stats = dict(self._stats)
+        batches = stats["batches"] or 1
+        requests = stats["requests"] or 1
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000.0,
+            "requests": stats["requests"],
+            "batches": stats["batches"],
+            "max_batch_seen": stats["max_batch_seen"],
+            "avg_batch_size": stats["requests"] / batches,
+            "avg_wait_ms": stats["total_wait_s"] / requests * 1000.0,
+            "avg_forward_ms": stats["total_forward_s"] / batches * 1000.0,
+            "pending": self._queue.qsize(),
+        }
+
+    def _run(self):
+        """Worker loop: wait for a request, fill the window, run the batch"""
+        if self._initializer is not None:
+            try:
+                self._initializer()
+            except Exception as e:
+                logger.warning(f"Batcher thread initializer failed: {e}")
+        stopping = False
+        while not stopping:
+            first = self._queue.get()
+            if first is None:
+                break
+
+            batch = [first]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                try:
+                    if remaining > 0:
+                        item = self._queue.get(timeout=remaining)
+                    else:
+                        # Window elapsed, but still pick up anything already queued
+                        item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            self._run_batch(batch)
+
+        # Fail anything left behind so callers never hang
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not None and item.future.set_running_or_notify_cancel():
+                item.future.set_exception(RuntimeError("Batcher is closed"))
+
+    def _run_batch(self, batch: List[_PendingRequest]):
+        """Run one or more forward passes for a collected window"""
+        # Only tensors with identical shapes can be stacked; cancelled requests are dropped
+        groups: Dict[Tuple[int, ...], List[_PendingRequest]] = {}
+        for request in batch:
+            if request.future.set_running_or_notify_cancel():
+                groups.setdefault(tuple(request.tensor.shape), []).append(request)
+
+        for requests in groups.values():
+            started = time.monotonic()
+            try:
+                stacked = torch.cat([r.tensor for r in requests], dim=0)
+                # Grad mode is thread-local, so it must be disabled in the worker itself
+                with torch.no_grad():
+                    outputs = self.forward_fn(stacked)
+                if not isinstance(outputs, (tuple, list)):
+                    outputs = (outputs,)
+            except Exception as e:
+                logger.error(f"Batched TruFor forward failed for {len(requests)} request(s): {e}")
+                for r in requests:
+                    r.future.set_exception(e)
+                continue
+
+            elapsed = time.monotonic() - started
+            with self._lock:
+                self._stats["requests"] += len(requests)
+                self._stats["batches"] += 1
+                self._stats["max_batch_seen"] = max(self._stats["max_batch_seen"], len(requests))
+                self._stats["total_wait_s"] += sum(started - r.enqueued_at for r in requests)
+                self._stats["total_forward_s"] += elapsed
+
+            for i, r in enumerate(requests):
+                split = tuple(o[i:i + 1] if o is not None else None for o in outputs)
+                r.future.set_result(split)
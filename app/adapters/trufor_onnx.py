@@ -0,0 +1,147 @@
+"""
+ONNX Runtime backend for TruFor
+
+myEncoderDecoder (dual Segformer encoder, DnCNN Noiseprint++ extractor and
+MLP decoders) is exported once to ONNX with a fixed 512x512 input and a
+dynamic batch dimension. OnnxTruForSession runs the exported graph on the
+CPU execution provider with full graph optimizations and returns the same
+(pred_logits, conf_logits, det_logit, npp) tuple of torch tensors as the
+torch module, so it can be used wherever the model is called: the adapter's
+single-image path, TruForBatcher and tiled analysis.
+
+onnx and onnxruntime are optional dependencies; they are imported only when
+exporting or when the onnx backend is selected.
+"""
+
+import inspect
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Optional, Tuple
+
+import numpy as np
+import torch
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ("torch", "onnx")
+DEFAULT_BACKEND = "torch"
+
+ONNX_INPUT_NAME = "rgb"
+ONNX_OUTPUT_NAMES = ("pred_logits", "conf_logits", "det_logit", "npp")
+DEFAULT_OPSET = 17
+DEFAULT_ONNX_PATH = "models/trufor.onnx"
+
+
+def export_trufor_onnx(model: torch.nn.Module, output_path: str, input_size: int = 512,
+                       opset: int = DEFAULT_OPSET) -> Path:
+    """
+    Export a TruFor network to ONNX with a dynamic batch dimension
+
+    The file is written next to output_path first and moved into place when
+    complete, so a concurrently starting server never loads a partial graph.
+
+    Args:
+        model: myEncoderDecoder in eval mode (on any device, exported on CPU)
+        output_path: Destination .onnx file
+        input_size: Fixed spatial input size (the adapter pads to 512x512)
+        opset: ONNX opset version
+
+    Returns:
+        Path of the exported model
+    """
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = output_path.with_suffix(f".{os.getpid()}.tmp")
+
+    model = model.to("cpu").eval()
+    dummy = torch.zeros(1, 3, input_size, input_size)
+    dynamic_axes = {name: {0: "batch"} for name in (ONNX_INPUT_NAME,) + ONNX_OUTPUT_NAMES}
+
+    # Newer torch versions default to the dynamo exporter; TruFor exports with the TorchScript one
+    kwargs = {"dynamo": False} if "dynamo" in inspect.signature(torch.onnx.export).parameters else {}
+
+    start = time.perf_counter()
+    try:
+        with torch.no_grad():
+            torch.onnx.export(
+                model, (dummy,), str(tmp_path),
+                input_names=[ONNX_INPUT_NAME], output_names=list(ONNX_OUTPUT_NAMES),
+                dynamic_axes=dynamic_axes, opset_version=opset, do_constant_folding=True,
+                **kwargs
+            )
+        os.replace(tmp_path, output_path)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+
+    logger.info(f"Exported TruFor to {output_path} (opset {opset}) in {time.perf_counter() - start:.1f}s")
+    return output_path
+
+
+class OnnxTruForSession:
+    """
+    Callable ONNX Runtime session with the torch module's calling convention
+    """
+
+    def __init__(self, onnx_path: str, intra_op_threads: Optional[int] = None, inter_op_threads: int = 1):
+        """
+        Create the inference session
+
+        Args:
+            onnx_path: Exported TruFor graph, see export_trufor_onnx
+            intra_op_threads: Threads used inside one operator (None = ONNX Runtime default,
+                one per physical core)
+            inter_op_threads: Threads used to run independent operators in parallel
+        """
+        try:
+            import onnxruntime as ort
+        except ImportError as e:
+            raise ImportError("The onnx backend requires onnxruntime (pip install onnxruntime)") from e
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        if intra_op_threads:
+            options.intra_op_num_threads = intra_op_threads
+        options.inter_op_num_threads = inter_op_threads
+
+        self.onnx_path = str(onnx_path)
+        self.session = ort.InferenceSession(self.onnx_path, options, providers=["CPUExecutionProvider"])
+        self.output_names = [o.name for o in self.session.get_outputs()]
+        if tuple(self.output_names) != ONNX_OUTPUT_NAMES:
+            raise ValueError(f"Unexpected outputs in {self.onnx_path}: {self.output_names}")
+
+    def __call__(self, x: torch.Tensor) -> Tuple[torch.Tensor, ...]:
+        """Run a (B, 3, 512, 512) batch; returns CPU tensors like myEncoderDecoder.forward"""
+        feed = {ONNX_INPUT_NAME: np.ascontiguousarray(x.detach().cpu().numpy(), dtype=np.float32)}
+        outputs = self.session.run(self.output_names, feed)
+        return tuple(torch.from_numpy(o) for o in outputs)
+
+
+def load_onnx_session(onnx_path: Optional[str], model_path: Optional[str] = None,
+                      intra_op_threads: Optional[int] = None) -> OnnxTruForSession:
+    """
+    Open the ONNX graph, exporting it from the torch checkpoint first if it is
+    missing or older than the checkpoint
+
+    Args:
+        onnx_path: Exported graph (DEFAULT_ONNX_PATH if None)
+        model_path: TruFor checkpoint used for the export
+        intra_op_threads: See OnnxTruForSession
+    """
+    onnx_path = onnx_path or DEFAULT_ONNX_PATH
+    stale = (os.path.exists(onnx_path) and model_path and os.path.exists(model_path)
+             and os.path.getmtime(model_path) > os.path.getmtime(onnx_path))
+    if stale or not os.path.exists(onnx_path):
+        try:
+            from .trufor_adapter import build_trufor_model
+        except ImportError:
+            from app.adapters.trufor_adapter import build_trufor_model
+
+        logger.info(f"{onnx_path} not found, exporting it from {model_path or 'random weights'}")
+        model, _ = build_trufor_model(model_path, torch.device("cpu"))
+        export_trufor_onnx(model, onnx_path)
+        del model
+
+    return OnnxTruForSession(onnx_path, intra_op_threads=intra_op_threads)
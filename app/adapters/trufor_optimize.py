@@ -0,0 +1,148 @@
+"""
+Inference-time graph optimizations for TruFor
+
+Applied once when the adapter loads the model (eval mode only):
+
+- Noiseprint++ DnCNN: every BatchNorm is folded into the preceding conv,
+  conv+ReLU pairs become single ConvReLU2d modules, and the 17 full
+  resolution 64-channel convs use channels_last weights (oneDNN's preferred
+  layout on CPU).
+- ImageNet normalization (preprc_imagenet_torch, run on every forward) is
+  folded into the RGB patch-embedding conv of the Segformer encoder. The
+  conv zero-pads the *normalized* image, so a per-input-size correction map
+  is subtracted to keep border outputs exact.
+
+All rewrites are exact up to floating point rounding.
+"""
+
+import logging
+from typing import Dict, Tuple
+
+import torch
+import torch.nn as nn
+import torch.nn.functional as F
+from torch.nn.utils.fusion import fuse_conv_bn_eval
+
+logger = logging.getLogger(__name__)
+
+IMAGENET_MEAN = (0.485, 0.456, 0.406)
+IMAGENET_STD = (0.229, 0.224, 0.225)
+
+
+class ConvReLU2d(nn.Module):
+    """Conv2d followed by an in-place ReLU on its output"""
+
+    def __init__(self, conv: nn.Conv2d):
+        super().__init__()
+        self.conv = conv
+
+    def forward(self, x: torch.Tensor) -> torch.Tensor:
+        return F.relu(self.conv(x), inplace=True)
+
+
+class NormalizedInputConv2d(nn.Module):
+    """
+    Conv2d applied to (x - mean) / std, computed as conv(x) with rescaled weights
+
+    With zero padding, conv_zp((x - m) / s, W) + b = conv_zp(x, W / s) + b - D,
+    where D = conv_zp(m / s, W) is a constant map for a given input size (equal
+    to sum(W * m / s) in the interior and smaller where the window hits
+    padding). D is computed once per input size and cached.
+    """
+
+    def __init__(self, conv: nn.Conv2d, mean: Tuple[float, ...], std: Tuple[float, ...]):
+        super().__init__()
+        if conv.padding_mode != "zeros" or conv.groups != 1:
+            raise ValueError("Only zero-padded, ungrouped convs can absorb input normalization")
+
+        mean_t = torch.tensor(mean, dtype=conv.weight.dtype, device=conv.weight.device)
+        std_t = torch.tensor(std, dtype=conv.weight.dtype, device=conv.weight.device)
+
+        self.conv = nn.Conv2d(conv.in_channels, conv.out_channels, conv.kernel_size, conv.stride,
+                              conv.padding, conv.dilation, bias=True).to(conv.weight.device, conv.weight.dtype)
+        with torch.no_grad():
+            self.conv.weight.copy_(conv.weight / std_t[None, :, None, None])
+            self.conv.bias.copy_(conv.bias if conv.bias is not None else torch.zeros_like(self.conv.bias))
+
+        # Original weights applied to the constant image m / s, used to build D
+        self.register_buffer("_offset_weight", conv.weight.detach().clone(), persistent=False)
+        self.register_buffer("_offset_value", (mean_t / std_t)[None, :, None, None], persistent=False)
+        self._corrections: Dict[tuple, torch.Tensor] = {}
+
+    def _correction(self, x: torch.Tensor) -> torch.Tensor:
+        key = (x.shape[-2], x.shape[-1], x.device, x.dtype)
+        correction = self._corrections.get(key)
+        if correction is None:
+            const = self._offset_value.to(x.dtype).expand(1, -1, x.shape[-2], x.shape[-1])
+            with torch.no_grad():
+                correction = F.conv2d(const, self._offset_weight.to(x.dtype), None, self.conv.stride,
+                                      self.conv.padding, self.conv.dilation)
+            self._corrections[key] = correction
+        return correction
+
+    def forward(self, x: torch.Tensor) -> torch.Tensor:
+        return self.conv(x) - self._correction(x)
+
+
+def fuse_sequential(layers: nn.Sequential) -> Tuple[nn.Sequential, Dict[str, int]]:
+    """
+    Fold Conv2d+BatchNorm2d pairs and fuse Conv2d+ReLU pairs of a Sequential (eval mode)
+
+    Returns:
+        Tuple of (new Sequential, counts of folded BN layers and fused ReLUs)
+    """
+    modules = list(layers)
+    fused = []
+    counts = {"bn_folded": 0, "conv_relu_fused": 0}
+    i = 0
+    while i < len(modules):
+        module = modules[i]
+        if isinstance(module, nn.Conv2d):
+            if i + 1 < len(modules) and isinstance(modules[i + 1], nn.BatchNorm2d):
+                module = fuse_conv_bn_eval(module, modules[i + 1])
+                counts["bn_folded"] += 1
+                i += 1
+            if i + 1 < len(modules) and isinstance(modules[i + 1], nn.ReLU):
+                module = ConvReLU2d(module)
+                counts["conv_relu_fused"] += 1
+                i += 1
+        fused.append(module)
+        i += 1
+    return nn.Sequential(*fused), counts
+
+
+def optimize_trufor_for_inference(model: nn.Module, channels_last: bool = True) -> Dict[str, int]:
+    """
+    Apply the inference rewrites to a loaded myEncoderDecoder in place
+
+    Args:
+        model: TruFor network in eval mode (weights already loaded)
+        channels_last: Store the DnCNN conv weights in channels_last layout
+
+    Returns:
+        Summary of the applied rewrites
+    """
+    if model.training:
+        raise ValueError("BatchNorm folding requires a model in eval mode")
+
+    summary = {"bn_folded": 0, "conv_relu_fused": 0, "prepro_folded": 0}
+
+    if isinstance(getattr(model, "dncnn", None), nn.Sequential):
+        model.dncnn, counts = fuse_sequential(model.dncnn)
+        summary.update(counts)
+        if channels_last:
+            model.dncnn = model.dncnn.to(memory_format=torch.channels_last)
+
+    if getattr(getattr(model, "prepro", None), "__name__", None) == "preprc_imagenet_torch":
+        for backbone in (model.backbone, getattr(model, "backbone_conf", None)):
+            if backbone is None:
+                continue
+            embed = backbone.patch_embed1
+            embed.proj = NormalizedInputConv2d(embed.proj, IMAGENET_MEAN, IMAGENET_STD)
+            summary["prepro_folded"] += 1
+        model.prepro = None
+
+    logger.info(f"TruFor inference optimizations: {summary['bn_folded']} BatchNorms folded, "
+                f"{summary['conv_relu_fused']} conv+ReLU fused, "
+                f"ImageNet normalization folded into {summary['prepro_folded']} patch embedding(s)")
+    return summary
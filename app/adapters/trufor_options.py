@@ -0,0 +1,41 @@
+"""
+Request options of TruFor detection
+
+Output resolutions and result parts a caller can ask for. Kept free of
+torch and the TruFor sources so the API can validate requests before the
+model (and its imports) have finished loading.
+"""
+
+# Longest side of the returned maps per output resolution (None = original image size)
+OUTPUT_RESOLUTIONS = {
+    "preview": 300,    # Web UI
+    "report": 1024,    # Saved visualizations and PDF reports
+    "full": None       # Full forensic resolution, only when explicitly requested
+}
+DEFAULT_RESOLUTION = "preview"
+
+# Parts of a detection result a caller can ask for. The verdict and integrity
+# score are always computed; everything else is skipped unless requested.
+OUTPUT_PARTS = ("score", "maps", "noiseprint", "portrait")
+ALL_OUTPUTS = frozenset(OUTPUT_PARTS)
+
+
+def parse_outputs(outputs=None) -> frozenset:
+    """
+    Normalize a requested output list to a set of OUTPUT_PARTS
+
+    Accepts None or 'all' (everything), a comma separated string such as
+    'score,maps', or an iterable of part names. 'score' is always included.
+    """
+    if outputs is None:
+        return ALL_OUTPUTS
+    if isinstance(outputs, str):
+        outputs = [part.strip() for part in outputs.split(",") if part.strip()]
+    parts = {part.lower() for part in outputs}
+    if not parts or parts == {"all"}:
+        return ALL_OUTPUTS
+    unknown = parts - ALL_OUTPUTS
+    if unknown:
+        raise ValueError(f"Unsupported outputs: {', '.join(sorted(unknown))}. "
+                         f"Allowed: all, {', '.join(OUTPUT_PARTS)}")
+    return frozenset(parts | {"score"})
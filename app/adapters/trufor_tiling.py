@@ -0,0 +1,313 @@
+"""
+Tiled full-resolution TruFor inference
+
+The standard TruFor path shrinks every image to fit 512x512, which loses fine
+splices in large camera originals. Running the network at native size is not
+an option either: the full-resolution DnCNN and Segformer attention would need
+several gigabytes per megapixel.
+
+Tiled mode instead cuts the native-resolution image into overlapping tiles,
+runs them through the network a few at a time and blends the resulting maps
+with a linear ramp window, so tile seams disappear. Only the tiles of the
+current batch are materialized as tensors, and maps are accumulated directly
+at the requested output size, so memory stays bounded by the batch size and
+the output resolution rather than by the image size.
+
+Detection statistics (TruFor's confidence-weighted pooling) are pooled over
+the whole image with streaming accumulators. Every pixel is counted exactly
+once by assigning overlapping regions to the nearest tile.
+"""
+
+import math
+import os
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+import torch
+import torch.nn.functional as F
+
+DEFAULT_TILE_SIZE = 512
+DEFAULT_TILE_OVERLAP = 64
+DEFAULT_TILE_MEMORY_MB = 2048
+
+# Approximate peak working memory of one 512x512 tile in a forward pass (CPU, float32)
+TILE_MEMORY_MB_512 = 600
+
+IMAGENET_MEAN = np.array([0.485, 0.456, 0.406], dtype=np.float32)
+IMAGENET_STD = np.array([0.229, 0.224, 0.225], dtype=np.float32)
+
+
+def tile_origins(length: int, tile_size: int, overlap: int) -> List[int]:
+    """
+    Start offsets of overlapping tiles covering [0, length)
+
+    The last tile is aligned to the end of the image instead of running past it.
+    """
+    if length <= tile_size:
+        return [0]
+    stride = tile_size - overlap
+    count = math.ceil((length - tile_size) / stride) + 1
+    origins = []
+    for i in range(count):
+        start = min(i * stride, length - tile_size)
+        if not origins or start != origins[-1]:
+            origins.append(start)
+    return origins
+
+
+def ownership_bounds(origins: List[int], tile_size: int, length: int) -> List[Tuple[int, int]]:
+    """
+    Split [0, length) between tiles, giving each overlap to the nearest tile
+
+    Returns:
+        (start, end) image coordinates owned by each tile
+    """
+    starts = [0] + [(origins[i] + origins[i - 1] + tile_size) // 2 for i in range(1, len(origins))]
+    ends = starts[1:] + [length]
+    return list(zip(starts, ends))
+
+
+def blend_window(tile_size: int, overlap: int) -> np.ndarray:
+    """2D linear ramp weights that fade each tile out over the overlap"""
+    ramp = np.minimum(1.0, (np.arange(tile_size, dtype=np.float32) + 0.5) / max(overlap, 1))
+    ramp = np.minimum(ramp, ramp[::-1])
+    return np.outer(ramp, ramp).astype(np.float32)
+
+
+def tiles_per_batch(tile_size: int, memory_mb: float) -> int:
+    """Number of tiles that fit in one forward pass under a memory budget"""
+    per_tile = TILE_MEMORY_MB_512 * (tile_size / 512) ** 2
+    return max(1, int(memory_mb // per_tile))
+
+
+def peak_rss_mb() -> float:
+    """High-water mark of the resident set size of this process in MB (0 where unknown, e.g. Windows)"""
+    try:
+        import resource
+    except ImportError:
+        return 0.0
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def current_rss_mb() -> float:
+    """Resident set size of this process in MB"""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        return peak_rss_mb()
+
+
+class StreamingStatsPool:
+    """
+    Streaming version of TruFor's weighted statistics pooling
+
+    Accumulates the softmin, softmax, weighted mean and weighted mean square of
+    a map over any number of chunks; result() matches pooling the concatenated
+    chunks in one call.
+    """
+
+    def __init__(self):
+        self.lse_w = -math.inf     # logsumexp(log_w)
+        self.lse_min = -math.inf   # logsumexp(log_w - x)
+        self.lse_max = -math.inf   # logsumexp(log_w + x)
+        self.shift = None          # Reference for the weighted sums below
+        self.sum_w = 0.0
+        self.sum_wx = 0.0
+        self.sum_wxx = 0.0
+
+    @staticmethod
+    def _lse(a: float, b: torch.Tensor) -> float:
+        return torch.logaddexp(torch.tensor(a, dtype=torch.float64), torch.logsumexp(b, dim=0)).item()
+
+    def update(self, x: torch.Tensor, log_w: Optional[torch.Tensor] = None):
+        """Add a chunk of values x with log-weights log_w (uniform if None)"""
+        x = x.reshape(-1).double()
+        if x.numel() == 0:
+            return
+        log_w = torch.zeros_like(x) if log_w is None else log_w.reshape(-1).double()
+
+        self.lse_w = self._lse(self.lse_w, log_w)
+        self.lse_min = self._lse(self.lse_min, log_w - x)
+        self.lse_max = self._lse(self.lse_max, log_w + x)
+
+        chunk_max = log_w.max().item()
+        if self.shift is None:
+            self.shift = chunk_max
+        elif chunk_max > self.shift:
+            rescale = math.exp(self.shift - chunk_max)
+            self.sum_w *= rescale
+            self.sum_wx *= rescale
+            self.sum_wxx *= rescale
+            self.shift = chunk_max
+        w = torch.exp(log_w - self.shift)
+        self.sum_w += w.sum().item()
+        self.sum_wx += (w * x).sum().item()
+        self.sum_wxx += (w * x * x).sum().item()
+
+    def result(self) -> torch.Tensor:
+        """Pooled (min, max, avg, msq) features as a (1, 4) tensor"""
+        if self.shift is None:
+            raise ValueError("No values pooled")
+        return torch.tensor([[
+            -(self.lse_min - self.lse_w),
+            self.lse_max - self.lse_w,
+            self.sum_wx / self.sum_w,
+            self.sum_wxx / self.sum_w,
+        ]], dtype=torch.float32)
+
+
+def run_tiled(forward_fn: Callable, image: np.ndarray, out_size: Tuple[int, int],
+              tile_size: int = DEFAULT_TILE_SIZE, overlap: int = DEFAULT_TILE_OVERLAP,
+              batch_size: int = 1, device: torch.device = torch.device("cpu"),
+              blend: bool = True, noiseprint: bool = True) -> Dict:
+    """
+    Run TruFor over overlapping tiles of a native-resolution image
+
+    Args:
+        forward_fn: Callable taking a (B, 3, T, T) normalized tensor and returning
+            (pred_logits, conf_logits, det_logit, npp) like myEncoderDecoder
+        image: RGB uint8 image (H, W, 3)
+        out_size: (H, W) of the blended output maps
+        tile_size: Tile side in pixels (multiple of 32)
+        overlap: Overlap between neighbouring tiles in pixels
+        batch_size: Tiles per forward pass
+        device: Device the tiles are sent to
+        blend: Blend the tile maps into output-size maps; when False only the
+            pooled features and det_logit are computed (score-only requests)
+        noiseprint: Keep the Noiseprint++ channel
+
+    Returns:
+        Dictionary with blended probability maps ('anomaly', 'confidence' and
+        optionally raw 'noiseprint', each (H, W) float32 at out_size; None
+        without blend), pooled detection features ('features', (1, 8)), the
+        area-weighted mean 'det_logit', 'noiseprint_std' and tiling
+        statistics ('stats')
+    """
+    if tile_size % 32 != 0:
+        raise ValueError(f"tile_size must be a multiple of 32, got {tile_size}")
+    if not 0 <= overlap < tile_size:
+        raise ValueError(f"overlap must be in [0, tile_size), got {overlap}")
+
+    H, W = image.shape[:2]
+    out_h, out_w = out_size
+    sy, sx = out_h / H, out_w / W
+
+    ys, xs = tile_origins(H, tile_size, overlap), tile_origins(W, tile_size, overlap)
+    own_y, own_x = ownership_bounds(ys, tile_size, H), ownership_bounds(xs, tile_size, W)
+    tiles = [(iy, ix) for iy in range(len(ys)) for ix in range(len(xs))]
+    window = blend_window(tile_size, overlap)
+
+    acc = None  # Weighted map sums at output size, allocated once the channel count is known
+    weight = np.zeros((out_h, out_w), dtype=np.float32) if blend else None
+    pool_conf, pool_anomaly, pool_npp = StreamingStatsPool(), StreamingStatsPool(), [0, 0.0, 0.0]
+    det_sum, det_area = 0.0, 0
+
+    mean = torch.from_numpy(IMAGENET_MEAN).view(1, 3, 1, 1)
+    std = torch.from_numpy(IMAGENET_STD).view(1, 3, 1, 1)
+
+    use_cuda = device.type == "cuda"
+    if use_cuda:
+        torch.cuda.reset_peak_memory_stats(device)
+    peak_rss = current_rss_mb()
+    started = time.perf_counter()
+
+    for start in range(0, len(tiles), batch_size):
+        batch = tiles[start:start + batch_size]
+        crops = []
+        for iy, ix in batch:
+            crop = image[ys[iy]:ys[iy] + tile_size, xs[ix]:xs[ix] + tile_size]
+            pad_h, pad_w = tile_size - crop.shape[0], tile_size - crop.shape[1]
+            if pad_h or pad_w:
+                crop = np.pad(crop, ((0, pad_h), (0, pad_w), (0, 0)), mode="symmetric")
+            crops.append(crop)
+
+        x = torch.from_numpy(np.stack(crops)).permute(0, 3, 1, 2).float().div_(255.0)
+        x = ((x - mean) / std).to(device)
+        with torch.no_grad():
+            pred_logits, conf_logits, det_logit, npp = forward_fn(x)
+            if pred_logits.shape[1] == 1:
+                a = torch.sigmoid(pred_logits[:, :1])
+            else:
+                a = torch.softmax(pred_logits, dim=1)[:, 1:2]
+            c = torch.sigmoid(conf_logits[:, :1])
+            channels = [a, c] + ([npp[:, :1]] if npp is not None and noiseprint else [])
+            maps = torch.cat(channels, dim=1).float().cpu().numpy()
+            det_logit = det_logit.reshape(len(batch), -1)[:, 0].float().cpu()
+        del x, pred_logits, conf_logits, npp, a, c
+
+        if acc is None and blend:
+            acc = np.zeros((maps.shape[1], out_h, out_w), dtype=np.float32)
+
+        for k, (iy, ix) in enumerate(batch):
+            y0, x0 = ys[iy], xs[ix]
+            vh, vw = min(tile_size, H - y0), min(tile_size, W - x0)
+            tile_maps = maps[k, :, :vh, :vw]
+
+            # Global statistics over the region this tile owns
+            (oy0, oy1), (ox0, ox1) = own_y[iy], own_x[ix]
+            owned = torch.from_numpy(np.ascontiguousarray(tile_maps[:, oy0 - y0:oy1 - y0, ox0 - x0:ox1 - x0]))
+            pool_conf.update(owned[1])
+            pool_anomaly.update(owned[0], F.logsigmoid(owned[1]))
+            if owned.shape[0] > 2:
+                npp_values = owned[2].double()
+                pool_npp[0] += npp_values.numel()
+                pool_npp[1] += npp_values.sum().item()
+                pool_npp[2] += (npp_values * npp_values).sum().item()
+            det_sum += det_logit[k].item() * owned[0].numel()
+            det_area += owned[0].numel()
+            if not blend:
+                continue
+
+            # Blend into the output-size accumulators
+            w = window[:vh, :vw]
+            weighted = tile_maps * w
+            ty0, ty1 = int(round(y0 * sy)), max(int(round(y0 * sy)) + 1, int(round((y0 + vh) * sy)))
+            tx0, tx1 = int(round(x0 * sx)), max(int(round(x0 * sx)) + 1, int(round((x0 + vw) * sx)))
+            ty1, tx1 = min(ty1, out_h), min(tx1, out_w)
+            if (ty1 - ty0, tx1 - tx0) != (vh, vw):
+                weighted = cv2.resize(weighted.transpose(1, 2, 0), (tx1 - tx0, ty1 - ty0),
+                                      interpolation=cv2.INTER_AREA)
+                weighted = weighted.reshape(ty1 - ty0, tx1 - tx0, -1).transpose(2, 0, 1)
+                w = cv2.resize(w, (tx1 - tx0, ty1 - ty0), interpolation=cv2.INTER_AREA)
+            acc[:, ty0:ty1, tx0:tx1] += weighted
+            weight[ty0:ty1, tx0:tx1] += w
+
+        del maps
+        peak_rss = max(peak_rss, current_rss_mb())
+
+    elapsed = time.perf_counter() - started
+    if blend:
+        acc /= np.maximum(weight, 1e-6)
+
+    npp_std = 0.0
+    if pool_npp[0]:
+        npp_mean = pool_npp[1] / pool_npp[0]
+        npp_std = math.sqrt(max(0.0, pool_npp[2] / pool_npp[0] - npp_mean * npp_mean))
+
+    stats = {
+        "tile_size": tile_size,
+        "overlap": overlap,
+        "batch_size": batch_size,
+        "grid": [len(ys), len(xs)],
+        "tiles": len(tiles),
+        "elapsed_s": round(elapsed, 3),
+        "tiles_per_sec": round(len(tiles) / elapsed, 3) if elapsed > 0 else None,
+        "peak_rss_mb": round(peak_rss, 1),                 # Sampled between batches
+        "process_peak_rss_mb": round(peak_rss_mb(), 1),    # Includes peaks inside forward passes
+    }
+    if use_cuda:
+        stats["peak_device_memory_mb"] = round(torch.cuda.max_memory_allocated(device) / (1024 * 1024), 1)
+
+    return {
+        "anomaly": acc[0] if blend else None,
+        "confidence": acc[1] if blend else None,
+        "noiseprint": acc[2] if blend and acc.shape[0] > 2 else None,
+        "features": torch.cat((pool_conf.result(), pool_anomaly.result()), dim=-1),
+        "det_logit": torch.tensor([[det_sum / det_area]]),
+        "noiseprint_std": npp_std,
+        "stats": stats,
+    }
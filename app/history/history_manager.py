@@ -6,7 +6,7 @@ Manages detection job history with user isolation
 import json
 import shutil
 from pathlib import Path
-from typing import Dict, Optional
+from typing import Dict, List, Optional
 from datetime import datetime
 
 
@@ -79,6 +79,36 @@ class HistoryManager:
         self._save_metadata(job_id, metadata)
         return metadata
 
+    def create_completed_jobs(self, jobs: List[Dict]) -> int:
+        """
+        Record many finished jobs at once (batch detection)
+
+        Each entry has job_id, username, filename, detection_type, model and
+        either result (completed) or error (failed). Every job's metadata is
+        written once in its final state instead of being created as
+        'processing' and then updated.
+
+        Returns:
+            Number of jobs written
+        """
+        now = datetime.now().isoformat()
+        for job in jobs:
+            failed = job.get("error") is not None
+            self._save_metadata(job["job_id"], {
+                "job_id": job["job_id"],
+                "username": job["username"],
+                "filename": job["filename"],
+                "detection_type": job["detection_type"],
+                "model": job.get("model"),
+                "created_at": job.get("created_at", now),
+                "status": "failed" if failed else "completed",
+                "completed_at": now,
+                "result": job.get("result"),
+                "error": job.get("error"),
+                "batch_id": job.get("batch_id")
+            })
+        return len(jobs)
+
     def update_job_status(self, job_id: str, status: str, result: Dict = None, error: str = None):
         """Update job status and result"""
         metadata = self._load_metadata(job_id)
@@ -212,6 +242,27 @@ class HistoryManager:
             "average_score": round(avg_score, 2)
         }
 
+    def get_model_usage(self, detection_type: str) -> Dict[str, int]:
+        """
+        Count jobs per model for a detection type, most used first
+
+        Ensemble jobs (model keys joined with '+') count for each of their models.
+        """
+        counts: Dict[str, int] = {}
+
+        for job_dir in self.data_dir.iterdir():
+            if not job_dir.is_dir():
+                continue
+
+            metadata = self._load_metadata(job_dir.name)
+            if not metadata or metadata.get("detection_type") != detection_type or not metadata.get("model"):
+                continue
+
+            for model in metadata["model"].split("+"):
+                counts[model] = counts.get(model, 0) + 1
+
+        return dict(sorted(counts.items(), key=lambda item: item[1], reverse=True))
+
     def delete_job(self, job_id: str, username: str, role: str) -> bool:
         """
         Delete a detection job
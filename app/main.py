@@ -2,38 +2,71 @@ import logging
 import os
 import json
 import time
-import hashlib
+import shutil
 import asyncio
+import importlib
+import uuid
 from datetime import datetime
 from pathlib import Path
-from contextlib import asynccontextmanager
+from contextlib import ExitStack, asynccontextmanager
 from concurrent.futures import ThreadPoolExecutor
 from typing import Optional, List
 from pydantic import BaseModel
-from fastapi import FastAPI, File, UploadFile, HTTPException, Form, Depends, Header
+from fastapi import FastAPI, File, UploadFile, HTTPException, Form, Depends, Header, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, FileResponse
+from fastapi.responses import JSONResponse, FileResponse, PlainTextResponse, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from dotenv import load_dotenv
+from PIL import Image
 
 try:
     # Try relative imports first (when run from app directory)
-    from adapters.trufor_adapter import TruForAdapter
-    from adapters.deepfakebench_adapter import DeepfakeBenchAdapter
+    from adapters.trufor_options import OUTPUT_RESOLUTIONS, DEFAULT_RESOLUTION, ALL_OUTPUTS, parse_outputs
     from auth.user_manager import user_manager
     from auth.decorators import get_current_user, get_current_admin, get_optional_user
     from history.history_manager import history_manager
-    from reports.pdf_generator import generate_pdf_report
-    from reports.zip_generator import generate_zip_report
+    from reports.heatmap_renderer import (
+        MAPS_FILENAME, TRUFOR_VISUALIZATIONS, load_trufor_maps, render_trufor_visualizations, save_trufor_maps
+    )
+    from utils.result_cache import ResultCache, make_cache_key, weights_fingerprint
+    from utils.file_serving import serve_file
+    from utils.uploads import (
+        UploadLimitMiddleware, UploadTooLarge, discard_spooled_upload, extract_zip_images,
+        move_spooled_upload, spool_upload
+    )
+    from utils.inference_executor import InferenceExecutor, InferenceQueueFull
+    from utils.map_encoding import MAP_FORMATS, DEFAULT_MAP_FORMAT, downsample_map, encode_map
+    from utils.metrics import metrics
+    from utils.model_pool import ModelPool
+    from utils.model_readiness import LOADING_STATES, ModelReadiness
+    from utils.thread_topology import (
+        apply_process_topology, batcher_initializer, topology_from_env, total_threads, worker_initializer
+    )
+    APP_PACKAGE = ""
 except ImportError:
     # Fallback to absolute imports (when run from project root)
-    from app.adapters.trufor_adapter import TruForAdapter
-    from app.adapters.deepfakebench_adapter import DeepfakeBenchAdapter
+    from app.adapters.trufor_options import OUTPUT_RESOLUTIONS, DEFAULT_RESOLUTION, ALL_OUTPUTS, parse_outputs
     from app.auth.user_manager import user_manager
     from app.auth.decorators import get_current_user, get_current_admin, get_optional_user
     from app.history.history_manager import history_manager
-    from app.reports.pdf_generator import generate_pdf_report
-    from app.reports.zip_generator import generate_zip_report
+    from app.reports.heatmap_renderer import (
+        MAPS_FILENAME, TRUFOR_VISUALIZATIONS, load_trufor_maps, render_trufor_visualizations, save_trufor_maps
+    )
+    from app.utils.result_cache import ResultCache, make_cache_key, weights_fingerprint
+    from app.utils.file_serving import serve_file
+    from app.utils.uploads import (
+        UploadLimitMiddleware, UploadTooLarge, discard_spooled_upload, extract_zip_images,
+        move_spooled_upload, spool_upload
+    )
+    from app.utils.inference_executor import InferenceExecutor, InferenceQueueFull
+    from app.utils.map_encoding import MAP_FORMATS, DEFAULT_MAP_FORMAT, downsample_map, encode_map
+    from app.utils.metrics import metrics
+    from app.utils.model_pool import ModelPool
+    from app.utils.model_readiness import LOADING_STATES, ModelReadiness
+    from app.utils.thread_topology import (
+        apply_process_topology, batcher_initializer, topology_from_env, total_threads, worker_initializer
+    )
+    APP_PACKAGE = "app."
 
 import uvicorn
 
@@ -41,46 +74,222 @@ import uvicorn
 load_dotenv()
 
 # Configure logging
+# LOG_LEVEL=DEBUG enables per-request model debug output (map statistics, raw logits)
 logging.basicConfig(
-    level=logging.INFO,
+    level=getattr(logging, os.getenv("LOG_LEVEL", "INFO").upper(), logging.INFO),
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
 logger = logging.getLogger(__name__)
 
-# Initialize adapter as global variable
+# Initialize adapter as global variable (set by the background model loader)
 detection_adapter = None
 
-# Thread pool for CPU-intensive tasks
-executor = ThreadPoolExecutor(max_workers=2)
+# Per-model load state reported by /ready
+model_readiness = ModelReadiness()
+
+# Worker count, torch threads per worker and core pinning shared by both inference pools
+# (applied to torch by the model loader, so importing this module does not import torch)
+thread_topology = topology_from_env()
+
+# Thread pool for CPU-intensive tasks (DeepfakeBench video analysis)
+executor = ThreadPoolExecutor(
+    max_workers=thread_topology["workers"],
+    thread_name_prefix="deepfakebench",
+    initializer=worker_initializer(thread_topology)
+)
+
+# Bounded executor for TruFor inference; requests beyond the queue get 429
+inference_executor = InferenceExecutor(
+    max_workers=thread_topology["workers"],
+    max_queue_size=int(os.getenv("INFERENCE_QUEUE_SIZE", "8")),
+    name="trufor-inference",
+    initializer=worker_initializer(thread_topology)
+)
 
 # Job storage
 jobs = {}
 
+# Content-addressed cache of detection results (memory LRU + disk tier)
+result_cache = ResultCache(
+    cache_dir=os.getenv("RESULT_CACHE_DIR", "data/cache"),
+    max_memory_entries=int(os.getenv("RESULT_CACHE_MEMORY_ENTRIES", "256")),
+    max_disk_bytes=int(float(os.getenv("RESULT_CACHE_MAX_MB", "2048")) * 1024 * 1024)
+)
+
+# Retry-After (seconds) sent with 503 while the TruFor model is loading
+TRUFOR_LOADING_RETRY_AFTER = 5
+
+# TruFor maps returned by the adapter
+TRUFOR_MAP_KEYS = ['prediction_map', 'weighted_prediction_map', 'confidence_map', 'noiseprint_map']
+
+# Preview-size thumbnail stored next to the original upload in the job directory
+PREVIEW_FILENAME = "preview.jpg"
+PREVIEW_JPEG_QUALITY = 85
+
 # Constants for video analysis
 DATA_DIR = Path("data/jobs")
 DATA_DIR.mkdir(parents=True, exist_ok=True)
 
+# Uploads are streamed here before being moved into their job directory
+UPLOAD_SPOOL_DIR = DATA_DIR / ".incoming"
 
-@asynccontextmanager
-async def lifespan(app: FastAPI):
-    """Initialize resources on startup"""
-    global detection_adapter
+
+def import_app_module(name: str):
+    """
+    Import an app module on first use (e.g. 'reports.pdf_generator')
+
+    The model adapters and report generators pull in torch, the TruFor and
+    DeepfakeBench sources, matplotlib and reportlab. Importing them lazily
+    lets the server answer /health right after the process starts.
+    """
+    return importlib.import_module(APP_PACKAGE + name)
+
+
+def deepfakebench_adapter_class():
+    """DeepfakeBenchAdapter, imported on first use (torch and the detector registry)"""
+    return import_app_module("adapters.deepfakebench_adapter").DeepfakeBenchAdapter
+
+
+def load_deepfakebench_model(model_key: str):
+    """Build a DeepfakeBench adapter with its weights loaded (model pool loader)"""
+    return deepfakebench_adapter_class()(
+        model_key=model_key,
+        device="cuda",
+        batch_size=int(os.getenv("DEEPFAKEBENCH_BATCH_SIZE", "8")),
+        decode_backend=os.getenv("VIDEO_DECODE_BACKEND", "opencv"),
+        decode_prefetch=int(os.getenv("VIDEO_DECODE_PREFETCH", "16")),
+        keyframe_cache_size=int(os.getenv("DEEPFAKEBENCH_KEYFRAME_CACHE", "16"))
+    )
+
+
+# Threads fanning each frame batch out to the models of an ensemble job (0 = one per model).
+# The job runs inside one inference worker, whose intra-op thread budget every fan-out
+# thread would use in full: more than 1 oversubscribes the CPU and only pays off with
+# spare cores (beyond INFERENCE_WORKERS x INFERENCE_INTRA_OP_THREADS) or a GPU.
+DEEPFAKEBENCH_ENSEMBLE_WORKERS = int(os.getenv("DEEPFAKEBENCH_ENSEMBLE_WORKERS", "1"))
+
+# Loaded DeepfakeBench models shared by all video jobs, LRU-evicted beyond the budget
+deepfakebench_pool = ModelPool(
+    loader=load_deepfakebench_model,
+    budget_bytes=int(float(os.getenv("DEEPFAKEBENCH_POOL_MB", "2048")) * 1024 * 1024),
+    name="DeepfakeBench"
+)
+
+
+def deepfakebench_preload_keys(spec: str) -> List[str]:
+    """
+    Model keys to preload from DEEPFAKEBENCH_PRELOAD
+
+    A comma-separated list of model keys; "top:N" stands for the N models
+    used most often by past DeepfakeBench jobs. Models without weights are skipped.
+    """
+    keys = []
+    for item in (part.strip() for part in spec.split(",")):
+        if item.startswith("top:"):
+            keys.extend(list(history_manager.get_model_usage("deepfakebench"))[:int(item[4:])])
+        elif item:
+            keys.append(item)
+
+    available = {model["key"] for model in deepfakebench_adapter_class().get_available_models() if model["available"]}
+    return [key for key in dict.fromkeys(keys) if key in available]
+
+
+def load_trufor_sync():
+    """
+    Load the TruFor adapter and run its warm-up pass (blocking)
+
+    Returns:
+        The adapter, or None if the checkpoint is missing or loading failed
+    """
+    model_path = os.getenv("MODEL_PATH", "models/trufor.pth.tar")
+    if not os.path.exists(model_path):
+        logger.warning(f"TruFor model not found at {model_path}, adapter not initialized")
+        model_readiness.unavailable("trufor", f"Model not found at {model_path}")
+        return None
+
+    model_readiness.loading("trufor")
+    adapter = None
     try:
-        # Initialize TruFor model
-        model_path = os.getenv("MODEL_PATH", "models/trufor.pth.tar")
-        if os.path.exists(model_path):
-            detection_adapter = TruForAdapter(model_path=model_path)
-            logger.info("TruFor adapter initialized successfully")
-        else:
-            logger.warning(f"TruFor model not found at {model_path}, adapter not initialized")
-            detection_adapter = None
-            
+        TruForAdapter = import_app_module("adapters.trufor_adapter").TruForAdapter
+        adapter = TruForAdapter(
+            model_path=model_path,
+            max_batch_size=int(os.getenv("TRUFOR_MAX_BATCH_SIZE", "2")),
+            max_wait_ms=float(os.getenv("TRUFOR_BATCH_WAIT_MS", "10")),
+            tile_size=int(os.getenv("TRUFOR_TILE_SIZE", "512")),
+            tile_overlap=int(os.getenv("TRUFOR_TILE_OVERLAP", "64")),
+            tile_memory_mb=float(os.getenv("TRUFOR_TILE_MEMORY_MB", "2048")),
+            reduced_decode=os.getenv("TRUFOR_REDUCED_DECODE", "1") != "0",
+            backend=os.getenv("TRUFOR_BACKEND", "torch"),
+            onnx_path=os.getenv("TRUFOR_ONNX_PATH") or None,
+            # One ONNX Runtime session is shared by all workers, so it gets their combined budget
+            onnx_threads=int(os.getenv("TRUFOR_ONNX_THREADS", "0")) or total_threads(thread_topology),
+            optimize=os.getenv("TRUFOR_OPTIMIZE", "1") != "0",
+            attention=os.getenv("TRUFOR_ATTENTION", "sdpa"),
+            batcher_initializer=batcher_initializer(thread_topology)
+        )
+        logger.info("TruFor adapter initialized successfully")
+
+        if os.getenv("TRUFOR_WARMUP", "1") != "0":
+            model_readiness.warming_up("trufor")
+            logger.info(f"TruFor warm-up pass took {adapter.warmup():.2f}s")
+        model_readiness.ready("trufor")
+        return adapter
+
     except Exception as e:
         logger.error(f"Failed to initialize detection adapter: {e}")
-        logger.warning("Server will start without TruFor model loaded")
-        detection_adapter = None
+        logger.warning("Server will run without TruFor model loaded")
+        model_readiness.failed("trufor", str(e))
+        if adapter is not None:
+            adapter.close()
+        return None
+
+
+def load_deepfakebench_sync():
+    """
+    Import the DeepfakeBench adapter and detector registry ahead of the first
+    video job, then load the DEEPFAKEBENCH_PRELOAD models into the pool (blocking)
+    """
+    model_readiness.loading("deepfakebench")
+    try:
+        deepfakebench_adapter_class()
+        preload = deepfakebench_preload_keys(os.getenv("DEEPFAKEBENCH_PRELOAD", ""))
+        if preload:
+            logger.info(f"Preloading DeepfakeBench models: {preload}")
+            deepfakebench_pool.preload(preload)
+        model_readiness.ready("deepfakebench")
+    except Exception as e:
+        logger.error(f"Failed to import DeepfakeBench adapter: {e}")
+        model_readiness.failed("deepfakebench", str(e))
+
+
+async def load_models():
+    """Load models off the event loop so the server serves /health while they load"""
+    global detection_adapter
+    loop = asyncio.get_running_loop()
+
+    # Torch thread counts must be set before the first inter-op work
+    await loop.run_in_executor(None, apply_process_topology, thread_topology)
+    detection_adapter = await loop.run_in_executor(None, load_trufor_sync)
+    await loop.run_in_executor(None, load_deepfakebench_sync)
+    logger.info(f"Model loading finished: {model_readiness.snapshot()['models']}")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Initialize resources on startup"""
+    # Drop spool files left behind by uploads interrupted by a restart
+    for stale in UPLOAD_SPOOL_DIR.glob("*.part"):
+        stale.unlink(missing_ok=True)
+
+    model_readiness.register("trufor")
+    model_readiness.register("deepfakebench")
+    loader = asyncio.create_task(load_models())
     yield
     logger.info("Shutting down application")
+    # Loading runs on a thread that cannot be interrupted; wait for it so the adapter is closed
+    await loader
+    if detection_adapter is not None:
+        detection_adapter.close()
 
 
 app = FastAPI(
@@ -106,6 +315,7 @@ app.add_middleware(
 MAX_IMAGE_SIZE = 10 * 1024 * 1024  # 10MB
 MAX_VIDEO_SIZE = 500 * 1024 * 1024  # 500MB
 ALLOWED_IMAGE_TYPES = {"image/jpeg", "image/png"}
+UPLOAD_SUFFIXES = {"image/jpeg": ".jpg", "image/png": ".png"}
 ALLOWED_VIDEO_TYPES = {
     "video/mp4",
     "video/quicktime",
@@ -116,6 +326,20 @@ ALLOWED_VIDEO_TYPES = {
     "application/octet-stream"  # Generic binary, for some MP4 files
 }
 
+# Batch detection: total request size, images per request, accepted archive types
+MAX_BATCH_UPLOAD_SIZE = int(float(os.getenv("DETECT_BATCH_MAX_MB", "1024")) * 1024 * 1024)
+MAX_BATCH_IMAGES = int(os.getenv("DETECT_BATCH_MAX_IMAGES", "500"))
+ALLOWED_ARCHIVE_TYPES = {"application/zip", "application/x-zip-compressed"}
+
+# Reject oversized uploads from Content-Length before the multipart body is parsed
+app.add_middleware(UploadLimitMiddleware, limits={
+    "/detect": MAX_VIDEO_SIZE,
+    "/detect/batch": MAX_BATCH_UPLOAD_SIZE,
+    "/video/analyze": MAX_VIDEO_SIZE,
+    "/api/deepfakebench/analyze": MAX_VIDEO_SIZE,
+    "/api/deepfakebench/ensemble": MAX_VIDEO_SIZE,
+})
+
 
 # =============================================================================
 # Pydantic Models for Request/Response
@@ -382,7 +606,7 @@ async def download_pdf_report(job_id: str, user: dict = Depends(get_current_user
     # Generate PDF if it doesn't exist
     if not pdf_path.exists():
         try:
-            generate_pdf_report(job_id, str(job_dir), details)
+            import_app_module("reports.pdf_generator").generate_pdf_report(job_id, str(job_dir), details)
         except Exception as e:
             logger.error(f"Failed to generate PDF report: {e}")
             raise HTTPException(status_code=500, detail="Failed to generate PDF report")
@@ -419,7 +643,7 @@ async def download_zip_report(
 
     # Generate ZIP if it doesn't exist or needs update
     try:
-        generate_zip_report(str(job_dir), include_video=include_video)
+        import_app_module("reports.zip_generator").generate_zip_report(str(job_dir), include_video=include_video)
     except Exception as e:
         logger.error(f"Failed to generate ZIP report: {e}")
         raise HTTPException(status_code=500, detail="Failed to generate ZIP report")
@@ -434,16 +658,101 @@ async def download_zip_report(
     )
 
 
+@app.get("/api/jobs/{job_id}/media/{kind}")
+async def get_job_media(job_id: str, kind: str, request: Request, user: dict = Depends(get_current_user)):
+    """
+    Serve a job's original upload or its preview thumbnail (requires authentication)
+
+    kind is 'original' or 'preview' (falls back to the original when no preview
+    was stored). Responses carry an ETag and support If-None-Match and Range.
+    """
+    if kind not in ("original", "preview"):
+        raise HTTPException(status_code=404, detail=f"Unknown media: {kind}")
+
+    # Check access permission
+    details = history_manager.get_job_details(
+        job_id=job_id,
+        username=user["username"],
+        role=user["role"]
+    )
+
+    if not details:
+        raise HTTPException(status_code=404, detail="Job not found or access denied")
+
+    job_dir = DATA_DIR / job_id
+    path = job_dir / PREVIEW_FILENAME if kind == "preview" else None
+    if path is None or not path.exists():
+        path = next(iter(sorted(job_dir.glob("input.*"))), None)
+    if path is None:
+        raise HTTPException(status_code=404, detail="Media not found")
+
+    return serve_file(request, path)
+
+
 # =============================================================================
 # Health & Root Endpoints
 # =============================================================================
 
 @app.get("/health")
 async def health_check():
-    """Health check endpoint"""
+    """Liveness probe: the server is up (models may still be loading, see /ready)"""
     return {"status": "healthy", "service": "deepfake-detection", "timestamp": datetime.now().isoformat()}
 
 
+@app.get("/ready")
+async def readiness_check():
+    """
+    Readiness probe: 200 once every model has finished loading (or failed to),
+    503 while any is still loading. Reports per-model state and load/warm-up time.
+    """
+    snapshot = model_readiness.snapshot()
+    snapshot["timestamp"] = datetime.now().isoformat()
+    return JSONResponse(content=snapshot, status_code=200 if snapshot["ready"] else 503)
+
+
+@app.get("/api/inference/stats")
+async def get_inference_stats(user: dict = Depends(get_current_user)):
+    """Get inference queue depth, wait times and batching statistics (requires authentication)"""
+    batcher = getattr(detection_adapter, "batcher", None)
+    return {
+        "queue": inference_executor.stats(),
+        "batching": batcher.stats() if batcher is not None else None,
+        "topology": thread_topology,
+        "deepfakebench_pool": deepfakebench_pool.stats()
+    }
+
+
+@app.get("/api/cache/stats")
+async def get_cache_stats(user: dict = Depends(get_current_user)):
+    """Result cache hit/miss counters and size (requires authentication)"""
+    return result_cache.stats()
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """
+    Prometheus metrics: per-model stage latency histograms plus inference
+    queue, result cache and model pool gauges (disabled with PIPELINE_METRICS=0)
+    """
+    if not metrics.enabled:
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+
+    gauges = []
+    for key, value in inference_executor.stats().items():
+        gauges.append((f"deepfake_inference_{key}", "TruFor inference queue statistic", {}, value))
+    for key, value in result_cache.stats().items():
+        if isinstance(value, (int, float)):
+            gauges.append((f"deepfake_result_cache_{key}", "Result cache statistic", {}, value))
+    for key, value in deepfakebench_pool.stats().items():
+        if isinstance(value, (int, float)):
+            gauges.append((f"deepfake_model_pool_{key}", "DeepfakeBench model pool statistic", {}, value))
+
+    return PlainTextResponse(
+        metrics.render_prometheus(gauges),
+        media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
 @app.get("/api/models/status")
 async def get_models_status(user: dict = Depends(get_current_user)):
     """Get status of all detection models (requires authentication)"""
@@ -476,9 +785,283 @@ async def get_models_status(user: dict = Depends(get_current_user)):
     }
 
 
+def encode_trufor_response_maps(result: dict, map_format: str, map_resolution: str) -> dict:
+    """Downsample and encode the maps of a TruFor result for the API response (in place)"""
+    # BUGFIX-007: Downsample huge heatmap arrays before sending to frontend
+    # This prevents browser crashes when processing large images
+    max_side = OUTPUT_RESOLUTIONS[map_resolution]
+    for key in TRUFOR_MAP_KEYS:
+        if result.get(key) is not None:
+            arr = result[key] if max_side is None else downsample_map(result[key], max_size=max_side)
+            result["image_size"] = arr.shape  # Maps are sent at the returned size
+            result[key] = encode_map(arr, map_format)
+    result.pop("map_size", None)
+    result["map_format"] = map_format
+    result["map_resolution"] = map_resolution
+    return result
+
+
+def trufor_cache_key(content_hash: str, map_resolution: str, tiled: bool = False,
+                     outputs: frozenset = ALL_OUTPUTS) -> str:
+    """Result cache key for a TruFor detection"""
+    params = {"resolution": "full" if map_resolution == "full" else "report", "tiled": tiled}
+    if outputs != ALL_OUTPUTS:
+        params["outputs"] = sorted(outputs)
+    return make_cache_key(
+        content_hash, "trufor",
+        weights_fingerprint(getattr(detection_adapter, "model_path", None)),
+        params
+    )
+
+
+def trufor_history_result(result: dict, original_size) -> dict:
+    """Verdict, scores and analysis metadata of a TruFor result as stored in the job history"""
+    return {
+        # Core verdict and scores
+        "verdict": result.get("decision", "unknown"), # Use 'decision' field
+        "confidence": result.get("confidence", 0),   # Prediction strength (0-1)
+        "score": result.get("score", 0),             # Authenticity score (0-1, 1=real)
+        "integrity": result.get("integrity", 0),     # Integrity score (TruFor specific)
+        "fake_prob": result.get("fake_prob", 0),     # Raw fake probability
+
+        # Metadata about the analysis
+        "image_size": original_size,                 # Original (H, W)
+        "has_confidence_map": result.get("has_confidence_map", False),
+        "has_noiseprint": result.get("has_noiseprint", False),
+        "portrait_note": result.get("portrait_note", "") # Portrait mode hint
+    }
+
+
+def trufor_media_urls(job_id: str) -> dict:
+    """Authenticated URLs of a job's original image and preview thumbnail"""
+    return {
+        "original_image_url": f"/api/jobs/{job_id}/media/original",
+        "preview_image_url": f"/api/jobs/{job_id}/media/preview",
+    }
+
+
+def persist_trufor_result(job_id: str, result: dict, mime_type: str,
+                          cache_key: Optional[str] = None, model_label: str = "trufor"):
+    """
+    Save a successful TruFor result's preview and maps, render its
+    visualizations and store it in the result cache (blocking)
+
+    Pops the thumbnail from result; failures are logged, not raised.
+    """
+    thumbnail = result.pop("thumbnail", None)
+
+    # Generate and save heatmap visualizations for TruFor results
+    if result.get("status") == "success" and mime_type.startswith('image/'):
+        try:
+            # Create job directory for storing visualizations
+            job_dir = DATA_DIR / job_id
+            job_dir.mkdir(parents=True, exist_ok=True)
+
+            maps = {key: result.get(key) for key in TRUFOR_MAP_KEYS}
+            if not result.get("has_noiseprint"):
+                maps["noiseprint_map"] = None
+            has_maps = any(arr is not None for arr in maps.values())
+
+            # Keep the maps so reports can re-render without running the model
+            with metrics.stage(model_label, "persist"):
+                if thumbnail is not None:
+                    Image.fromarray(thumbnail).save(job_dir / PREVIEW_FILENAME, "JPEG", quality=PREVIEW_JPEG_QUALITY)
+                if has_maps:
+                    save_trufor_maps(job_dir, maps)
+
+            rendered = {}
+            if has_maps:
+                with metrics.stage(model_label, "render"):
+                    rendered = render_trufor_visualizations(job_dir, job_id, maps)
+            for name, path in rendered.items():
+                logger.info(f"Saved {name} visualization to {path}")
+
+            if cache_key:
+                payload = {k: v for k, v in result.items() if k not in TRUFOR_MAP_KEYS}
+                artifacts = {MAPS_FILENAME: job_dir / MAPS_FILENAME, PREVIEW_FILENAME: job_dir / PREVIEW_FILENAME}
+                artifacts.update({f"{name}.png": path for name, path in rendered.items()})
+                with metrics.stage(model_label, "persist"):
+                    result_cache.put(cache_key, payload, artifacts)
+
+        except Exception as e:
+            logger.warning(f"Failed to generate heatmap visualizations for job {job_id}: {e}")
+            import traceback
+            traceback.print_exc()
+
+
+def run_trufor_detection_sync(job_id: str, input_path: str, filename: str, mime_type: str,
+                              map_format: str = DEFAULT_MAP_FORMAT,
+                              map_resolution: str = DEFAULT_RESOLUTION,
+                              cache_key: Optional[str] = None, tiled: bool = False,
+                              outputs: frozenset = ALL_OUTPUTS) -> tuple:
+    """
+    Run TruFor detection and render its visualizations (blocking)
+
+    Executed on the inference executor so decoding, the forward pass and
+    heatmap rendering never run on the event loop.
+
+    Maps are produced at report resolution for the saved visualizations (or
+    at full resolution when requested), stay numpy arrays throughout, and are
+    encoded in map_format at map_resolution for the response. Successful
+    results are stored in the result cache under cache_key. tiled selects
+    the native-resolution tiled analysis. The preview thumbnail comes from
+    the adapter's preprocessing decode and is saved as PREVIEW_FILENAME; the
+    response references it and the original by URL instead of embedding them.
+    outputs limits the computed result parts (see parse_outputs); without
+    maps no preview, map files or visualizations are written.
+
+    Returns:
+        Tuple of (response result with downsampled maps, original image size)
+    """
+    with open(input_path, "rb") as f:
+        content = f.read()
+
+    result = detection_adapter.detect_sync(
+        file_bytes=content,
+        filename=filename,
+        mime_type=mime_type,
+        resolution="full" if map_resolution == "full" else "report",
+        tiled=tiled,
+        thumbnail_size=OUTPUT_RESOLUTIONS["preview"] if "maps" in outputs else None,
+        outputs=outputs
+    )
+    del content
+    original_size = result.get("image_size", None)
+    model_label = "trufor-tiled" if tiled else "trufor"
+    persist_trufor_result(job_id, result, mime_type, cache_key, model_label)
+
+    if result.get("status") == "success":
+        result.update(trufor_media_urls(job_id))
+    result["cached"] = False
+    with metrics.stage(model_label, "serialize"):
+        encoded = encode_trufor_response_maps(result, map_format, map_resolution)
+    return encoded, original_size
+
+
+def restore_trufor_from_cache_sync(job_id: str, cache_key: str, cached: dict,
+                                   filename: str, map_format: str,
+                                   map_resolution: str) -> Optional[tuple]:
+    """
+    Build a TruFor response for a new job from a cached result (blocking)
+
+    Copies the cached maps, preview and visualizations into the new job directory.
+
+    Returns:
+        Same tuple as run_trufor_detection_sync, or None if the artifacts are gone
+    """
+    result = restore_trufor_artifacts(job_id, cache_key, cached, filename)
+    if result is None:
+        return None
+
+    result.update(load_trufor_maps(DATA_DIR / job_id))
+    original_size = result.get("image_size", None)
+    return encode_trufor_response_maps(result, map_format, map_resolution), original_size
+
+
+def restore_trufor_artifacts(job_id: str, cache_key: str, cached: dict, filename: str) -> Optional[dict]:
+    """
+    Copy a cached result's maps, preview and visualizations into a new job
+    directory (blocking)
+
+    Returns:
+        The cached result (without maps) for the new job, or None if the artifacts are gone
+    """
+    job_dir = DATA_DIR / job_id
+    rename = {f"{name}.png": f"{job_id}_{name}.png" for name in TRUFOR_VISUALIZATIONS}
+    if not result_cache.restore(cache_key, job_dir, rename=rename):
+        return None
+
+    result = dict(cached)
+    result.update(trufor_media_urls(job_id))
+    result["filename"] = filename
+    result["cached"] = True
+    return result
+
+
+def run_trufor_batch_sync(entries: List[dict], outputs: frozenset) -> List[dict]:
+    """
+    Run TruFor on a chunk of batch images with one forward pass (blocking)
+
+    Images already in the result cache are restored instead of analyzed.
+    Results are persisted like /detect results (preview, maps and
+    visualizations when maps are requested, result cache) but returned
+    without maps, as one NDJSON line each.
+
+    Args:
+        entries: Batch entries with index, job_id, filename, mime_type, path and sha256
+        outputs: Result parts to compute (see parse_outputs)
+
+    Returns:
+        One result line per entry, in order
+    """
+    lines = [None] * len(entries)
+    to_analyze = []
+    for position, entry in enumerate(entries):
+        cache_key = trufor_cache_key(entry["sha256"], "report", False, outputs)
+        cached = result_cache.get(cache_key)
+        restored = None
+        if cached is not None:
+            restored = restore_trufor_artifacts(entry["job_id"], cache_key, cached, entry["filename"])
+        if restored is not None:
+            lines[position] = restored
+        else:
+            to_analyze.append((position, cache_key))
+
+    if to_analyze:
+        items = []
+        for position, _ in to_analyze:
+            entry = entries[position]
+            with open(entry["path"], "rb") as f:
+                items.append((f.read(), entry["filename"], entry["mime_type"]))
+        results = detection_adapter.detect_batch_sync(
+            items,
+            resolution="report",
+            thumbnail_size=OUTPUT_RESOLUTIONS["preview"] if "maps" in outputs else None,
+            outputs=outputs
+        )
+        del items
+
+        for (position, cache_key), result in zip(to_analyze, results):
+            entry = entries[position]
+            success = result.get("status") == "success"
+            persist_trufor_result(entry["job_id"], result, entry["mime_type"], cache_key if success else None)
+            if success:
+                result.update(trufor_media_urls(entry["job_id"]))
+            result["cached"] = False
+            lines[position] = result
+
+    for entry, line in zip(entries, lines):
+        for key in TRUFOR_MAP_KEYS:
+            line.pop(key, None)
+        line.pop("map_size", None)
+        line.update(index=entry["index"], job_id=entry["job_id"], filename=entry["filename"])
+    return lines
+
+
+def discard_job_dir(job_id: str):
+    """Delete the directory of a job that failed before it was recorded in the history"""
+    shutil.rmtree(DATA_DIR / job_id, ignore_errors=True)
+
+
+def require_trufor_adapter():
+    """Raise 503 (with Retry-After while loading) unless the TruFor adapter is loaded"""
+    if detection_adapter is None:
+        if model_readiness.state("trufor") in LOADING_STATES:
+            raise HTTPException(
+                status_code=503,
+                detail="TruFor model is still loading - please retry shortly",
+                headers={"Retry-After": str(TRUFOR_LOADING_RETRY_AFTER)}
+            )
+        raise HTTPException(status_code=503, detail="TruFor model is not available")
+
+
 @app.post("/detect")
 async def detect_deepfake(
     file: UploadFile = File(...),
+    map_format: str = Form(DEFAULT_MAP_FORMAT),
+    map_resolution: str = Form(DEFAULT_RESOLUTION),
+    tiled: bool = Form(False),
+    outputs: str = Form("all"),
     user: dict = Depends(get_current_user)
 ):
     """
@@ -488,8 +1071,34 @@ async def detect_deepfake(
     - Images: JPEG, PNG (max 10MB)
     - Videos: MP4, MOV (max 50MB)
 
+    Maps are returned base64-encoded in map_format: png (default), uint8,
+    float16, or json for the legacy nested-list form. map_resolution selects
+    their size: preview (default, 300px), report (1024px) or full (original).
+    tiled=true analyzes large images at native resolution in overlapping
+    tiles instead of resizing them to the 512px model input.
+    outputs is a comma separated list of result parts to compute: score,
+    maps, noiseprint, portrait (default all). The verdict and integrity
+    score are always returned; outputs=score skips all map work.
+
     Returns detection results including confidence score and verdict
     """
+    if map_format not in MAP_FORMATS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unsupported map format: {map_format}. Allowed: {', '.join(MAP_FORMATS)}"
+        )
+    if map_resolution not in OUTPUT_RESOLUTIONS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unsupported map resolution: {map_resolution}. Allowed: {', '.join(OUTPUT_RESOLUTIONS)}"
+        )
+    try:
+        requested_outputs = parse_outputs(outputs)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    require_trufor_adapter()
+
     # Validate MIME type
     mime_type = file.content_type
     if mime_type not in (ALLOWED_IMAGE_TYPES | ALLOWED_VIDEO_TYPES):
@@ -498,106 +1107,48 @@ async def detect_deepfake(
             detail=f"Unsupported file type: {mime_type}. Allowed: JPEG, PNG, MP4, MOV"
         )
 
-    # Read file content
-    content = await file.read()
-
-    # Validate file size
+    # Stream the upload to disk, hashing it and validating its size on the fly
     is_video = mime_type in ALLOWED_VIDEO_TYPES
     max_size = MAX_VIDEO_SIZE if is_video else MAX_IMAGE_SIZE
-    if len(content) > max_size:
-        size_limit_mb = max_size // (1024 * 1024)
-        raise HTTPException(
-            status_code=400,
-            detail=f"File too large. Maximum size: {size_limit_mb}MB"
-        )
+    try:
+        spooled = await spool_upload(file, UPLOAD_SPOOL_DIR, max_size)
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
     # Log request (without content)
     media_type = "video" if is_video else "image"
-    logger.info(f"User {user['username']} processing {media_type}: {file.filename} ({len(content)} bytes)")
+    logger.info(f"User {user['username']} processing {media_type}: {file.filename} ({spooled['size']} bytes)")
 
     # Generate job ID for tracking
     timestamp = int(time.time())
-    file_hash = hashlib.sha256(content).hexdigest()[:12]
+    content_hash = spooled["sha256"]
+    file_hash = content_hash[:12]
     job_id = f"trufor_{file_hash}_{timestamp}"
+    input_path = str(move_spooled_upload(
+        spooled, DATA_DIR / job_id / f"input{UPLOAD_SUFFIXES.get(mime_type, '.mp4')}"
+    ))
 
     try:
-        # Call detection adapter
-        result = await detection_adapter.detect(
-            file_bytes=content,
-            filename=file.filename,
-            mime_type=mime_type
-        )
-
-        # Generate and save heatmap visualizations for TruFor results
-        if result.get("status") == "success" and mime_type.startswith('image/'):
-            try:
-                import matplotlib
-                matplotlib.use('Agg')  # Non-interactive backend
-                import matplotlib.pyplot as plt
-                import numpy as np
-
-                # Create job directory for storing visualizations
-                job_dir = DATA_DIR / job_id
-                job_dir.mkdir(parents=True, exist_ok=True)
-
-                # Generate anomaly heatmap (prediction_map or weighted_prediction_map)
-                if "weighted_prediction_map" in result and result["weighted_prediction_map"]:
-                    weighted_map = np.array(result["weighted_prediction_map"])
-                    fig, ax = plt.subplots(figsize=(10, 10))
-                    im = ax.imshow(weighted_map, cmap='jet', vmin=0, vmax=1)
-                    ax.set_title("Anomaly Detection Heatmap (Confidence-Weighted)", fontsize=14, fontweight='bold')
-                    ax.axis('off')
-                    cbar = plt.colorbar(im, ax=ax, fraction=0.046, pad=0.04)
-                    cbar.set_label('Anomaly Score', rotation=270, labelpad=20)
-                    heatmap_path = job_dir / f"{job_id}_heatmap.png"
-                    plt.savefig(heatmap_path, dpi=150, bbox_inches='tight')
-                    plt.close()
-                    logger.info(f"Saved anomaly heatmap to {heatmap_path}")
-                elif "prediction_map" in result and result["prediction_map"]:
-                    pred_map = np.array(result["prediction_map"])
-                    fig, ax = plt.subplots(figsize=(10, 10))
-                    im = ax.imshow(pred_map, cmap='jet', vmin=0, vmax=1)
-                    ax.set_title("Anomaly Detection Heatmap", fontsize=14, fontweight='bold')
-                    ax.axis('off')
-                    cbar = plt.colorbar(im, ax=ax, fraction=0.046, pad=0.04)
-                    cbar.set_label('Anomaly Score', rotation=270, labelpad=20)
-                    heatmap_path = job_dir / f"{job_id}_heatmap.png"
-                    plt.savefig(heatmap_path, dpi=150, bbox_inches='tight')
-                    plt.close()
-                    logger.info(f"Saved anomaly heatmap to {heatmap_path}")
-
-                # Generate confidence map
-                if "confidence_map" in result and result["confidence_map"]:
-                    conf_map = np.array(result["confidence_map"])
-                    fig, ax = plt.subplots(figsize=(10, 10))
-                    im = ax.imshow(conf_map, cmap='viridis', vmin=0, vmax=1)
-                    ax.set_title("Model Confidence Map", fontsize=14, fontweight='bold')
-                    ax.axis('off')
-                    cbar = plt.colorbar(im, ax=ax, fraction=0.046, pad=0.04)
-                    cbar.set_label('Confidence', rotation=270, labelpad=20)
-                    conf_path = job_dir / f"{job_id}_conf.png"
-                    plt.savefig(conf_path, dpi=150, bbox_inches='tight')
-                    plt.close()
-                    logger.info(f"Saved confidence map to {conf_path}")
-
-                # Generate noiseprint++ map if available
-                if result.get("has_noiseprint") and "noiseprint_map" in result and result["noiseprint_map"]:
-                    npp_map = np.array(result["noiseprint_map"])
-                    fig, ax = plt.subplots(figsize=(10, 10))
-                    im = ax.imshow(npp_map, cmap='gray', vmin=0, vmax=1)
-                    ax.set_title("Noiseprint++ Forensic Analysis", fontsize=14, fontweight='bold')
-                    ax.axis('off')
-                    cbar = plt.colorbar(im, ax=ax, fraction=0.046, pad=0.04)
-                    cbar.set_label('Noise Pattern', rotation=270, labelpad=20)
-                    npp_path = job_dir / f"{job_id}_noiseprint.png"
-                    plt.savefig(npp_path, dpi=150, bbox_inches='tight')
-                    plt.close()
-                    logger.info(f"Saved noiseprint map to {npp_path}")
+        # Re-submitted evidence is answered from the result cache without running the model
+        cache_key = trufor_cache_key(content_hash, map_resolution, tiled, requested_outputs)
+        cached = result_cache.get(cache_key) if mime_type.startswith('image/') else None
+        restored = None
+        if cached is not None:
+            loop = asyncio.get_running_loop()
+            restored = await loop.run_in_executor(
+                None, restore_trufor_from_cache_sync, job_id, cache_key, cached,
+                file.filename, map_format, map_resolution
+            )
 
-            except Exception as e:
-                logger.warning(f"Failed to generate heatmap visualizations for job {job_id}: {e}")
-                import traceback
-                traceback.print_exc()
+        if restored is not None:
+            result, original_size = restored
+            logger.info(f"Result cache hit for {file.filename} (job {job_id})")
+        else:
+            # Run detection on the inference executor (rejects with 429 when the queue is full)
+            result, original_size = await inference_executor.run(
+                run_trufor_detection_sync, job_id, input_path, file.filename, mime_type,
+                map_format, map_resolution, cache_key, tiled, requested_outputs
+            )
 
         # Create metadata for history
         history_manager.create_job_metadata(
@@ -612,81 +1163,33 @@ async def detect_deepfake(
         history_manager.update_job_status(
             job_id=job_id,
             status="completed",
-            result={
-                # Core verdict and scores
-                "verdict": result.get("decision", "unknown"), # Use 'decision' field
-                "confidence": result.get("confidence", 0),   # Prediction strength (0-1)
-                "score": result.get("score", 0),             # Authenticity score (0-1, 1=real)
-                "integrity": result.get("integrity", 0),     # Integrity score (TruFor specific)
-                "fake_prob": result.get("fake_prob", 0),     # Raw fake probability
-
-                # Metadata about the analysis
-                "image_size": result.get("image_size", None), # Original (H, W)
-                "has_confidence_map": result.get("has_confidence_map", False),
-                "has_noiseprint": result.get("has_noiseprint", False),
-                "portrait_note": result.get("portrait_note", "") # Portrait mode hint
-            }
+            result=trufor_history_result(result, original_size)
         )
 
         logger.info(f"Detection complete for {file.filename}: {result['status']}")
         
-        # BUGFIX-007: Downsample huge heatmap arrays before sending to frontend
-        # This prevents browser crashes when processing large images
-        def downsample_array(data, max_size=300):
-            """Downsample 2D array to max_size x max_size while preserving aspect ratio"""
-            if not data or not isinstance(data, list):
-                return data
-            
-            import numpy as np
-            arr = np.array(data)
-            if arr.size == 0:
-                return data
-            
-            height, width = arr.shape
-            if height <= max_size and width <= max_size:
-                return data  # No downsampling needed
-            
-            # Calculate new dimensions preserving aspect ratio
-            if width > height:
-                new_width = max_size
-                new_height = max(1, int(max_size * height / width))
-            else:
-                new_height = max_size
-                new_width = max(1, int(max_size * width / height))
-            
-            # Downsample using simple averaging
-            from scipy import ndimage
-            zoom_factors = (new_height / height, new_width / width)
-            downsampled = ndimage.zoom(arr, zoom_factors, order=1)  # Bilinear interpolation
-            
-            return downsampled.tolist()
-        
-        # Downsample large arrays and update image_size accordingly
-        downsampled = False
-        for key in ['prediction_map', 'confidence_map', 'weighted_prediction_map', 'noiseprint_map']:
-            if key in result and result[key]:
-                original_data = result[key]
-                result[key] = downsample_array(original_data, max_size=300)
-                
-                # Update image_size to match downsampled data
-                if not downsampled and result[key] != original_data:
-                    import numpy as np
-                    arr = np.array(result[key])
-                    result["image_size"] = arr.shape  # Update to downsampled size
-                    downsampled = True
-        
         result["job_id"] = job_id  # Add job_id to response
         
         return JSONResponse(content=result)
 
+    except InferenceQueueFull as e:
+        logger.warning(f"Rejecting {file.filename}: {e}")
+        discard_job_dir(job_id)
+        raise HTTPException(
+            status_code=429,
+            detail="Detection queue is full - please retry later",
+            headers={"Retry-After": str(e.retry_after)}
+        )
     except TimeoutError:
         logger.error(f"Timeout processing {file.filename}")
+        discard_job_dir(job_id)
         raise HTTPException(
             status_code=504,
             detail="Detection timeout - file may be too complex"
         )
     except Exception as e:
         logger.error(f"Detection failed for {file.filename}: {e}")
+        discard_job_dir(job_id)
         # Check if it's a vendor service issue
         if "reality defender" in str(e).lower():
             raise HTTPException(
@@ -699,6 +1202,188 @@ async def detect_deepfake(
         )
 
 
+async def ingest_batch_uploads(files: List[UploadFile]) -> List[dict]:
+    """
+    Spool the images of a batch request, expanding ZIP archives
+
+    Returns:
+        One entry per image with filename and either mime_type, path, size and
+        sha256 (spooled) or error (rejected image, reported in the stream)
+
+    Raises:
+        HTTPException(400): Too many images, an oversized or invalid archive
+    """
+    loop = asyncio.get_running_loop()
+    entries = []
+    try:
+        for upload in files:
+            is_archive = (upload.content_type in ALLOWED_ARCHIVE_TYPES
+                          or (upload.filename or "").lower().endswith(".zip"))
+            if is_archive:
+                archive = None
+                try:
+                    archive = await spool_upload(upload, UPLOAD_SPOOL_DIR, MAX_BATCH_UPLOAD_SIZE)
+                    entries.extend(await loop.run_in_executor(
+                        None, extract_zip_images, archive["path"], UPLOAD_SPOOL_DIR,
+                        MAX_IMAGE_SIZE, MAX_BATCH_IMAGES - len(entries), MAX_BATCH_UPLOAD_SIZE
+                    ))
+                except (UploadTooLarge, ValueError) as e:
+                    raise HTTPException(status_code=400, detail=f"{upload.filename}: {e}")
+                finally:
+                    discard_spooled_upload(archive)
+            elif upload.content_type in ALLOWED_IMAGE_TYPES:
+                try:
+                    spooled = await spool_upload(upload, UPLOAD_SPOOL_DIR, MAX_IMAGE_SIZE)
+                    entries.append({"filename": upload.filename, "mime_type": upload.content_type, **spooled})
+                except UploadTooLarge as e:
+                    entries.append({"filename": upload.filename, "error": str(e)})
+            else:
+                entries.append({
+                    "filename": upload.filename,
+                    "error": f"Unsupported file type: {upload.content_type}. Allowed: JPEG, PNG, ZIP"
+                })
+
+            if len(entries) > MAX_BATCH_IMAGES:
+                raise HTTPException(status_code=400, detail=f"Too many images. Maximum: {MAX_BATCH_IMAGES}")
+    except BaseException:
+        for entry in entries:
+            discard_spooled_upload(entry if "path" in entry else None)
+        raise
+
+    return entries
+
+
+@app.post("/detect/batch")
+async def detect_batch(
+    files: List[UploadFile] = File(...),
+    outputs: str = Form("score"),
+    user: dict = Depends(get_current_user)
+):
+    """
+    Detect forgeries in many images with batched TruFor forward passes (requires authentication)
+
+    Accepts JPEG/PNG files and ZIP archives of them (up to MAX_BATCH_IMAGES
+    images). Images are analyzed in chunks of the adapter's tile_batch_size,
+    one forward pass per chunk, and the response streams one NDJSON line per
+    image as its chunk completes: index (upload order), filename, job_id and
+    the verdict and scores of /detect, or status 'error' with a message.
+    Maps are not embedded; with outputs including maps they are saved and
+    rendered for the job like /detect results. outputs defaults to score.
+
+    Every analyzed image becomes a history job; all of them are recorded in
+    one bulk write when the stream ends. A failing image does not abort the batch.
+    """
+    try:
+        requested_outputs = parse_outputs(outputs)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if len(files) > MAX_BATCH_IMAGES:
+        raise HTTPException(status_code=400, detail=f"Too many images. Maximum: {MAX_BATCH_IMAGES}")
+    require_trufor_adapter()
+
+    entries = await ingest_batch_uploads(files)
+    timestamp = int(time.time())
+    batch_id = f"batch_{uuid.uuid4().hex[:12]}"
+    rejected, accepted = [], []
+    for index, entry in enumerate(entries):
+        entry["index"] = index
+        if "error" in entry:
+            rejected.append(entry)
+            continue
+        entry["job_id"] = f"trufor_{entry['sha256'][:12]}_{timestamp}_{index}"
+        accepted.append(entry)
+
+    chunk_size = max(1, detection_adapter.tile_batch_size)
+    chunks = [accepted[i:i + chunk_size] for i in range(0, len(accepted), chunk_size)]
+    logger.info(f"User {user['username']} processing batch {batch_id}: {len(accepted)} images "
+                f"in {len(chunks)} chunk(s), {len(rejected)} rejected")
+
+    def place_inputs(chunk):
+        """Move a chunk's spooled images into their job dirs, right before it is submitted"""
+        for entry in chunk:
+            if Path(entry["path"]).name.endswith(".part"):
+                move_spooled_upload(entry, DATA_DIR / entry["job_id"] / f"input{UPLOAD_SUFFIXES[entry['mime_type']]}")
+
+    def discard_entries(entries):
+        """Delete the inputs and job dirs of images that will not be recorded in the history"""
+        for entry in entries:
+            discard_spooled_upload(entry)
+            discard_job_dir(entry["job_id"])
+
+    async def stream_results():
+        history_jobs = []
+        created_at = datetime.now().isoformat()
+        # asyncio task -> (executor future, chunk) of the chunks being analyzed
+        in_flight = {}
+
+        def record(entry, line):
+            history_jobs.append({
+                "job_id": entry["job_id"],
+                "username": user["username"],
+                "filename": entry["filename"],
+                "detection_type": "trufor",
+                "model": "trufor",
+                "created_at": created_at,
+                "batch_id": batch_id,
+                "result": trufor_history_result(line, line.get("image_size")) if line["status"] == "success" else None,
+                "error": None if line["status"] == "success" else line.get("message", "Detection failed")
+            })
+
+        try:
+            for entry in rejected:
+                yield json.dumps({"index": entry["index"], "filename": entry["filename"],
+                                  "status": "error", "message": entry["error"]}) + "\n"
+
+            # Keep one chunk per inference worker in flight; the queue is shared with /detect
+            next_chunk = 0
+            while next_chunk < len(chunks) or in_flight:
+                while next_chunk < len(chunks) and len(in_flight) < inference_executor.max_workers:
+                    place_inputs(chunks[next_chunk])
+                    try:
+                        future = inference_executor.submit(run_trufor_batch_sync, chunks[next_chunk], requested_outputs)
+                    except InferenceQueueFull:
+                        break
+                    in_flight[asyncio.wrap_future(future)] = (future, chunks[next_chunk])
+                    next_chunk += 1
+                if not in_flight:
+                    # Queue full with other requests: resume when one of them finishes
+                    await inference_executor.wait_for_slot(timeout=inference_executor.retry_after())
+                    continue
+
+                done, _ = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    _, chunk = in_flight.pop(task)
+                    try:
+                        lines = task.result()
+                    except Exception as e:
+                        logger.error(f"Batch {batch_id} chunk failed: {e}")
+                        lines = [{"index": entry["index"], "job_id": entry["job_id"], "filename": entry["filename"],
+                                  "status": "error", "message": "Detection failed"} for entry in chunk]
+                    for entry, line in zip(chunk, lines):
+                        record(entry, line)
+                        yield json.dumps(line) + "\n"
+        finally:
+            history_manager.create_completed_jobs(history_jobs)
+            logger.info(f"Batch {batch_id} finished: {len(history_jobs)} of {len(accepted)} images recorded")
+
+            # The stream ended early (client gone): queued chunks are cancelled, running
+            # ones are cleaned up when they finish, and unrecorded images are deleted
+            running = set()
+            for future, chunk in in_flight.values():
+                if not future.cancel():
+                    running.update(entry["job_id"] for entry in chunk)
+                    future.add_done_callback(lambda _, chunk=chunk: discard_entries(chunk))
+            recorded = {job["job_id"] for job in history_jobs}
+            discard_entries([entry for entry in accepted
+                             if entry["job_id"] not in recorded and entry["job_id"] not in running])
+
+    return StreamingResponse(
+        stream_results(),
+        media_type="application/x-ndjson",
+        headers={"X-Batch-Id": batch_id}
+    )
+
+
 @app.get("/", response_class=FileResponse)
 async def root():
     """Serve the main HTML page"""
@@ -721,34 +1406,24 @@ async def analyze_video(file: UploadFile = File(...)):
             detail=f"Unsupported file type: {file.content_type}. Allowed types: MP4, MOV, AVI, MPEG, WebM, MKV"
         )
     
-    # Read file content
-    content = await file.read()
-    file_size_mb = len(content) / (1024 * 1024)
-    logger.info(f"File size: {file_size_mb:.2f}MB")
-    
-    # Validate size
-    if len(content) > MAX_VIDEO_SIZE:
-        logger.error(f"File too large: {file_size_mb:.2f}MB > {MAX_VIDEO_SIZE/(1024*1024)}MB")
-        raise HTTPException(
-            status_code=400,
-            detail=f"File too large: {file_size_mb:.1f}MB. Maximum size: 500MB"
-        )
+    # Stream the upload to disk, hashing it and validating its size on the fly
+    try:
+        spooled = await spool_upload(file, UPLOAD_SPOOL_DIR, MAX_VIDEO_SIZE)
+    except UploadTooLarge as e:
+        logger.error(f"File too large: {e}")
+        raise HTTPException(status_code=400, detail=str(e))
+    logger.info(f"File size: {spooled['size'] / (1024 * 1024):.2f}MB")
     
     # Generate job ID
     timestamp = int(time.time())
-    file_hash = hashlib.sha256(content).hexdigest()[:12]
+    file_hash = spooled["sha256"][:12]
     job_id = f"job_{file_hash}_{timestamp}"
     
-    # Create job directory
+    # Move the spooled video into the job directory
     job_dir = DATA_DIR / job_id
-    job_dir.mkdir(parents=True, exist_ok=True)
+    input_path = move_spooled_upload(spooled, job_dir / "input.mp4")
     
-    # Save input video
-    input_path = job_dir / "input.mp4"
-    with open(input_path, "wb") as f:
-        f.write(content)
-    
-    logger.info(f"Created job {job_id} for video {file.filename} ({len(content)} bytes)")
+    logger.info(f"Created job {job_id} for video {file.filename} ({spooled['size']} bytes)")
     
     # Initialize job status
     jobs[job_id] = {
@@ -903,7 +1578,7 @@ async def get_keyframe(job_id: str, filename: str):
 async def get_deepfakebench_models():
     """Get list of available DeepfakeBench models"""
     try:
-        models = DeepfakeBenchAdapter.get_available_models()
+        models = deepfakebench_adapter_class().get_available_models()
         return JSONResponse(content={"models": models})
     except Exception as e:
         logger.error(f"Failed to get models: {e}")
@@ -916,6 +1591,8 @@ async def analyze_with_deepfakebench(
     model: str = Form("xception"),
     fps: float = Form(3.0),
     threshold: float = Form(0.5),
+    sampling: str = Form("uniform"),
+    frame_budget: int = Form(0),
     user: dict = Depends(get_current_user)
 ):
     """
@@ -926,7 +1603,66 @@ async def analyze_with_deepfakebench(
     - model: Model key (e.g., 'xception', 'meso4', 'f3net')
     - fps: Frame sampling rate (default: 3.0)
     - threshold: Detection threshold (default: 0.5)
+    - sampling: 'uniform' scores every sampled frame; 'adaptive' scores a coarse
+      pass and refines only where the scores approach the threshold or the scene cuts
+    - frame_budget: Cap on frames scored with adaptive sampling (default: 0, no cap)
+    """
+    modes = import_app_module("adapters.deepfakebench_adapter").SAMPLING_MODES
+    if sampling not in modes:
+        raise HTTPException(status_code=400, detail=f"Invalid sampling: {sampling}. Allowed: {', '.join(modes)}")
+    if frame_budget < 0:
+        raise HTTPException(status_code=400, detail="frame_budget must be >= 0")
+
+    return await submit_deepfakebench_job(file, user, [model], fps, threshold,
+                                          sampling=sampling, frame_budget=frame_budget)
+
+
+@app.post("/api/deepfakebench/ensemble")
+async def analyze_with_deepfakebench_ensemble(
+    file: UploadFile = File(...),
+    models: str = Form(...),
+    fusion: str = Form("mean"),
+    fps: float = Form(3.0),
+    threshold: float = Form(0.5),
+    user: dict = Depends(get_current_user)
+):
+    """
+    Analyze a video with several DeepfakeBench models in one job (requires authentication)
+
+    The video is decoded once and every sampled frame batch goes to each
+    model. The result holds the fused timeline plus each model's own under
+    'models'; poll it with /api/deepfakebench/jobs/{job_id}.
+
+    Parameters:
+    - file: Video file
+    - models: Comma-separated model keys (e.g., 'xception,meso4,f3net')
+    - fusion: Per-frame fusion of model probabilities, 'mean' or 'max' (default: mean)
+    - fps: Frame sampling rate (default: 3.0)
+    - threshold: Detection threshold (default: 0.5)
+    """
+    keys = list(dict.fromkeys(key.strip() for key in models.split(",") if key.strip()))
+    if len(keys) < 2:
+        raise HTTPException(status_code=400, detail="An ensemble needs at least two model keys")
+    unknown = [key for key in keys if key not in deepfakebench_adapter_class().AVAILABLE_MODELS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown models: {', '.join(unknown)}")
+    fusions = import_app_module("adapters.deepfakebench_adapter").ENSEMBLE_FUSIONS
+    if fusion not in fusions:
+        raise HTTPException(status_code=400, detail=f"Invalid fusion: {fusion}. Allowed: {', '.join(fusions)}")
+
+    return await submit_deepfakebench_job(file, user, keys, fps, threshold, fusion)
+
+
+async def submit_deepfakebench_job(file: UploadFile, user: dict, model_keys: List[str], fps: float,
+                                   threshold: float, fusion: str = "mean", sampling: str = "uniform",
+                                   frame_budget: int = 0) -> JSONResponse:
     """
+    Spool a video upload and start a DeepfakeBench job for one model, or an
+    ensemble of several (model is then the keys joined with '+')
+    """
+    ensemble = model_keys if len(model_keys) > 1 else None
+    model = "+".join(model_keys)
+
     # Validate file type
     if file.content_type not in ALLOWED_VIDEO_TYPES:
         raise HTTPException(
@@ -934,25 +1670,65 @@ async def analyze_with_deepfakebench(
             detail=f"Invalid file type: {file.content_type}. Allowed: {', '.join(ALLOWED_VIDEO_TYPES)}"
         )
 
-    # Read file content
-    content = await file.read()
-    file_size_mb = len(content) / (1024 * 1024)
+    # Stream the upload to disk, hashing it and validating its size on the fly
+    try:
+        spooled = await spool_upload(file, UPLOAD_SPOOL_DIR, MAX_VIDEO_SIZE)
+    except UploadTooLarge as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    file_size_mb = spooled["size"] / (1024 * 1024)
     logger.info(f"User {user['username']} - DeepfakeBench analysis request - File: {file.filename}, Size: {file_size_mb:.2f}MB, Model: {model}")
 
-    # Validate size
-    if len(content) > MAX_VIDEO_SIZE:
-        raise HTTPException(
-            status_code=400,
-            detail=f"File too large: {file_size_mb:.1f}MB. Maximum size: 500MB"
-        )
-
     # Generate job ID
     timestamp = int(time.time())
-    file_hash = hashlib.sha256(content).hexdigest()[:12]
+    content_hash = spooled["sha256"]
+    file_hash = content_hash[:12]
     job_id = f"dfb_{file_hash}_{timestamp}"
+    input_path = str(move_spooled_upload(spooled, DATA_DIR / job_id / "input.mp4"))
 
     logger.info(f"Created DeepfakeBench job {job_id} for user {user['username']}, video {file.filename}")
 
+    adapter_class = deepfakebench_adapter_class()
+    params = {"fps": fps, "threshold": threshold}
+    if ensemble:
+        params["fusion"] = fusion
+    if sampling != "uniform":
+        params.update(sampling=sampling, frame_budget=frame_budget)
+    cache_key = make_cache_key(
+        content_hash, model,
+        ",".join(weights_fingerprint(adapter_class.get_weight_path(key)) for key in model_keys),
+        params
+    )
+    cached = result_cache.get(cache_key)
+    if cached is not None:
+        loop = asyncio.get_running_loop()
+        if await loop.run_in_executor(None, result_cache.restore, cache_key, DATA_DIR / job_id):
+            logger.info(f"Result cache hit for {file.filename} (job {job_id}, model {model})")
+            jobs[job_id] = {
+                "status": "completed",
+                "job_id": job_id,
+                "filename": file.filename,
+                "model": model,
+                "created_at": timestamp,
+                "progress": 100,
+                "stage": "Complete",
+                "message": "Analysis finished (cached result)",
+                "result": cached,
+                "cached": True
+            }
+            history_manager.create_job_metadata(
+                job_id=job_id,
+                username=user["username"],
+                filename=file.filename,
+                detection_type="deepfakebench",
+                model=model
+            )
+            history_manager.update_job_status(
+                job_id=job_id,
+                status="completed",
+                result=deepfakebench_history_result(cached, model, fps, threshold)
+            )
+            return JSONResponse(content={"job_id": job_id, "model": model, "cached": True})
+
     # Initialize job status FIRST (before saving file)
     jobs[job_id] = {
         "status": "processing",
@@ -961,9 +1737,11 @@ async def analyze_with_deepfakebench(
         "model": model,
         "created_at": timestamp,
         "progress": 0,
-        "stage": "Uploading...",
+        "stage": "Queued...",
         "message": f"Preparing to analyze with {model}"
     }
+    if ensemble:
+        jobs[job_id]["ensemble"] = ensemble
 
     # Create metadata for history
     history_manager.create_job_metadata(
@@ -978,48 +1756,75 @@ async def analyze_with_deepfakebench(
     loop = asyncio.get_event_loop()
     loop.run_in_executor(
         executor,
-        run_deepfakebench_analysis_sync,
-        job_id, content, model, fps, threshold
+        run_deepfakebench_analysis,
+        job_id, input_path, model, fps, threshold, cache_key, ensemble, fusion, sampling, frame_budget
     )
 
-    # Return job_id IMMEDIATELY (before file is saved)
+    # Return job_id IMMEDIATELY
     return JSONResponse(content={"job_id": job_id, "model": model})
 
 
-def run_deepfakebench_analysis_sync(job_id: str, content: bytes, model: str, fps: float, threshold: float):
-    """Save video file and run DeepfakeBench analysis in background thread (synchronous for ThreadPoolExecutor)"""
-    try:
-        # Create job directory
-        job_dir = DATA_DIR / job_id
-        job_dir.mkdir(parents=True, exist_ok=True)
-        
-        # Update progress - saving file
-        jobs[job_id].update({
-            "progress": 5,
-            "stage": "Saving file...",
-            "message": "Writing video to disk"
-        })
-        
-        # Save input video
-        input_path = job_dir / "input.mp4"
-        with open(input_path, "wb") as f:
-            f.write(content)
-        
-        logger.info(f"Saved video file for job {job_id}, starting analysis")
-        
-        # Now run the analysis (synchronous call since we're already in a thread)
-        run_deepfakebench_analysis(job_id, str(input_path), model, fps, threshold)
-        
-    except Exception as e:
-        logger.error(f"Failed to save/analyze video for job {job_id}: {e}")
-        jobs[job_id].update({
-            "status": "error",
-            "message": f"Failed to save video: {str(e)}"
-        })
+def deepfakebench_history_result(result: dict, model: str, fps: float, threshold: float) -> dict:
+    """Summary of a DeepfakeBench result stored in the job history"""
+    return {
+        # Core verdict and scores
+        "verdict": result.get("verdict", "unknown"),
+        "score": result.get("overall_score", 0),          # Overall detection score
+        "average_score": result.get("average_score", 0),   # Average frame score
+        "confidence": result.get("confidence", 0),         # Confidence level
+
+        # Model information
+        "model": result.get("model", model),
+        "model_name": result.get("model_name", model),
+
+        # Analysis parameters
+        "fps": fps,
+        "threshold": threshold,
+        "total_frames": result.get("total_frames", 0),
+
+        # Segment information
+        "suspicious_segments": len(result.get("suspicious_segments", [])),
+        "suspicious_frames": sum(1 for s in result.get("frame_scores", []) if s.get("probability", 0) >= threshold)
+    }
+
 
+def deepfakebench_timeline(result: dict, fps: float, threshold: float) -> dict:
+    """timeline.json content (read by the PDF report) for a DeepfakeBench result"""
+    timeline = {
+        "summary": {
+            "total_frames": result.get("total_frames", 0),
+            "suspicious_frames": sum(1 for s in result.get("frame_scores", []) if s.get("probability", 0) >= threshold),
+            "suspicious_segments": len(result.get("suspicious_segments", [])),
+            "average_score": result.get("average_score", 0),
+            "max_score": result.get("overall_score", 0)
+        },
+        "frame_scores": result.get("frame_scores", []),
+        "segments": [
+            {
+                "start_time": seg["start"],
+                "end_time": seg["end"],
+                "duration": seg["duration"],
+                "avg_score": seg["peak_score"],
+                "frame_count": int(seg["duration"] * fps)
+            }
+            for seg in result.get("suspicious_segments", [])
+        ]
+    }
+    if "sampling" in result:
+        timeline["sampling"] = result["sampling"]
+    return timeline
 
-def run_deepfakebench_analysis(job_id: str, video_path: str, model: str, fps: float, threshold: float):
-    """Run DeepfakeBench analysis in background (synchronous for ThreadPoolExecutor)"""
+
+def run_deepfakebench_analysis(job_id: str, video_path: str, model: str, fps: float, threshold: float,
+                               cache_key: Optional[str] = None, ensemble: Optional[List[str]] = None,
+                               fusion: str = "mean", sampling: str = "uniform", frame_budget: int = 0):
+    """
+    Run DeepfakeBench analysis in background (synchronous for ThreadPoolExecutor)
+
+    With ensemble (a list of model keys), the video is decoded once and
+    scored by every model; model is then the ensemble label. Sampling and
+    frame_budget apply to single-model jobs (see DeepfakeBenchAdapter.analyze_video).
+    """
     try:
         logger.info(f"Starting DeepfakeBench analysis for job {job_id} with model {model}")
         
@@ -1032,9 +1837,6 @@ def run_deepfakebench_analysis(job_id: str, video_path: str, model: str, fps: fl
             "message": f"Initializing {model}"
         })
         
-        # Initialize adapter
-        adapter = DeepfakeBenchAdapter(model_key=model, device="cuda")
-        
         # Progress callback - write to file like TruFor does
         def update_progress(progress, stage, message):
             jobs[job_id].update({
@@ -1055,40 +1857,38 @@ def run_deepfakebench_analysis(job_id: str, video_path: str, model: str, fps: fl
             except Exception as e:
                 logger.warning(f"Failed to write progress file: {e}")
         
-        # Initial progress update
-        update_progress(30, "Analyzing video...", "Starting frame analysis")
-        
-        # Run analysis with progress callback
-        result = adapter.analyze_video(video_path, fps=fps, threshold=threshold, progress_callback=update_progress)
+        # Shared pooled models: loaded on first use, kept resident between jobs
+        with ExitStack() as leases:
+            adapters = [leases.enter_context(deepfakebench_pool.lease(key)) for key in ensemble or [model]]
+
+            # Initial progress update
+            update_progress(30, "Analyzing video...", "Starting frame analysis")
+
+            # Run analysis with progress callback
+            if ensemble:
+                result = import_app_module("adapters.deepfakebench_adapter").analyze_video_ensemble(
+                    adapters, video_path, fps=fps, threshold=threshold, fusion=fusion,
+                    workers=DEEPFAKEBENCH_ENSEMBLE_WORKERS, progress_callback=update_progress
+                )
+            else:
+                result = adapters[0].analyze_video(video_path, fps=fps, threshold=threshold,
+                                                   progress_callback=update_progress,
+                                                   sampling=sampling, frame_budget=frame_budget)
 
         if result["success"]:
             update_progress(95, "Generating report...", "Finalizing results")
 
             # Save timeline.json for PDF report generation
             try:
-                timeline_data = {
-                    "summary": {
-                        "total_frames": result.get("total_frames", 0),
-                        "suspicious_frames": sum(1 for s in result.get("frame_scores", []) if s.get("probability", 0) >= threshold),
-                        "suspicious_segments": len(result.get("suspicious_segments", [])),
-                        "average_score": result.get("average_score", 0),
-                        "max_score": result.get("overall_score", 0)
-                    },
-                    "frame_scores": result.get("frame_scores", []),
-                    "segments": [
-                        {
-                            "start_time": seg["start"],
-                            "end_time": seg["end"],
-                            "duration": seg["duration"],
-                            "avg_score": seg["peak_score"],
-                            "frame_count": int(seg["duration"] * fps)
-                        }
-                        for seg in result.get("suspicious_segments", [])
-                    ]
-                }
+                timeline_data = deepfakebench_timeline(result, fps, threshold)
+                if ensemble:
+                    timeline_data["models"] = {
+                        key: deepfakebench_timeline(model_result, fps, threshold)
+                        for key, model_result in result["models"].items() if model_result["success"]
+                    }
 
                 timeline_path = job_dir / "timeline.json"
-                with open(timeline_path, 'w') as f:
+                with metrics.stage(model, "serialize"), open(timeline_path, 'w') as f:
                     json.dump(timeline_data, f, indent=2)
                 logger.info(f"Saved timeline.json for job {job_id}")
             except Exception as e:
@@ -1106,28 +1906,16 @@ def run_deepfakebench_analysis(job_id: str, video_path: str, model: str, fps: fl
             history_manager.update_job_status(
                 job_id=job_id,
                 status="completed",
-                result={
-                    # Core verdict and scores
-                    "verdict": result.get("verdict", "unknown"),
-                    "score": result.get("overall_score", 0),          # Overall detection score
-                    "average_score": result.get("average_score", 0),   # Average frame score
-                    "confidence": result.get("confidence", 0),         # Confidence level
-
-                    # Model information
-                    "model": result.get("model", model),
-                    "model_name": result.get("model_name", model),
-
-                    # Analysis parameters
-                    "fps": fps,
-                    "threshold": threshold,
-                    "total_frames": result.get("total_frames", 0),
-
-                    # Segment information
-                    "suspicious_segments": len(result.get("suspicious_segments", [])),
-                    "suspicious_frames": sum(1 for s in result.get("frame_scores", []) if s.get("probability", 0) >= threshold)
-                }
+                result=deepfakebench_history_result(result, model, fps, threshold)
             )
 
+            if cache_key:
+                with metrics.stage(model, "persist"):
+                    result_cache.put(cache_key, result, {
+                        "timeline.json": job_dir / "timeline.json",
+                        "keyframes": job_dir / "keyframes"
+                    })
+
             update_progress(100, "Complete", "Analysis finished")
             logger.info(f"Job {job_id} completed successfully")
         else:
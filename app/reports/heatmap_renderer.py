@@ -0,0 +1,220 @@
+"""
+Heatmap Renderer
+Fast rasterization of TruFor maps to colored PNG files
+
+Maps are quantized to uint8 and colored through precomputed 256-entry lookup
+tables, an optional legend strip (color bar, ticks and label) is composited
+on the right, and the result is encoded with OpenCV. This replaces building
+a matplotlib figure per map and takes a few milliseconds per map.
+
+Maps are also stored next to the rendered files (maps.npz) so reports can
+re-render visualizations without running the model again.
+"""
+
+from pathlib import Path
+from typing import Dict, Optional
+
+import cv2
+import numpy as np
+
+try:
+    from utils.map_encoding import quantize_map
+except ImportError:
+    from app.utils.map_encoding import quantize_map
+
+
+MAPS_FILENAME = "maps.npz"
+
+# Rendered TruFor visualizations: file suffix -> (colormap, legend label)
+TRUFOR_VISUALIZATIONS = {
+    "heatmap": ("jet", "Anomaly Score"),
+    "conf": ("viridis", "Confidence"),
+    "noiseprint": ("gray", "Noise Pattern"),
+}
+
+_OPENCV_COLORMAPS = {
+    "jet": cv2.COLORMAP_JET,
+    "viridis": cv2.COLORMAP_VIRIDIS,
+    "hot": cv2.COLORMAP_HOT,
+}
+
+# BGR lookup tables shaped (256, 1, 3) as expected by cv2.applyColorMap
+_LUT_CACHE: Dict[str, np.ndarray] = {}
+
+
+def _bgr_lut(name: str) -> np.ndarray:
+    lut = _LUT_CACHE.get(name)
+    if lut is not None:
+        return lut
+
+    ramp = np.arange(256, dtype=np.uint8).reshape(256, 1)
+    if name == "gray":
+        lut = np.repeat(ramp[:, :, None], 3, axis=2)
+    elif name in _OPENCV_COLORMAPS:
+        lut = cv2.applyColorMap(ramp, _OPENCV_COLORMAPS[name])
+    else:
+        raise ValueError(f"Unsupported colormap: {name}")
+
+    lut = np.ascontiguousarray(lut.reshape(256, 1, 3))
+    _LUT_CACHE[name] = lut
+    return lut
+
+
+def get_colormap_lut(name: str) -> np.ndarray:
+    """
+    Return a (256, 3) uint8 RGB lookup table for a colormap
+
+    Args:
+        name: One of 'jet', 'viridis', 'hot' or 'gray'
+    """
+    return _bgr_lut(name)[:, 0, ::-1]
+
+
+def _legend_strip(height: int, cmap: str, label: Optional[str]) -> np.ndarray:
+    """Build a white BGR legend strip with a vertical color bar, ticks and a rotated label"""
+    width = max(48, height // 8)
+    strip = np.full((height, width, 3), 255, dtype=np.uint8)
+
+    margin = max(4, height // 20)
+    bar_top, bar_bottom = margin, height - margin
+    bar_height = max(1, bar_bottom - bar_top)
+    bar_left = max(3, width // 12)
+    bar_width = max(6, width // 5)
+
+    # Top of the bar is 1.0, bottom is 0.0
+    values = np.linspace(255, 0, bar_height).round().astype(np.uint8)
+    strip[bar_top:bar_top + bar_height, bar_left:bar_left + bar_width] = _bgr_lut(cmap)[values]
+
+    font = cv2.FONT_HERSHEY_SIMPLEX
+    scale = max(0.3, height / 1400)
+    thickness = 1 if scale < 0.7 else 2
+    text_x = bar_left + bar_width + 5
+    for value in (1.0, 0.5, 0.0):
+        y = bar_top + int(round((1.0 - value) * (bar_height - 1)))
+        cv2.line(strip, (bar_left + bar_width, y), (bar_left + bar_width + 2, y), (0, 0, 0), 1)
+        (_, text_h), _ = cv2.getTextSize(f"{value:.1f}", font, scale, thickness)
+        baseline_y = min(height - 1, max(text_h, y + text_h // 2))
+        cv2.putText(strip, f"{value:.1f}", (text_x, baseline_y), font, scale, (0, 0, 0), thickness, cv2.LINE_AA)
+
+    if label:
+        (text_w, text_h), baseline = cv2.getTextSize(label, font, scale, thickness)
+        text_img = np.full((text_h + baseline + 2, text_w + 2, 3), 255, dtype=np.uint8)
+        cv2.putText(text_img, label, (1, text_h + 1), font, scale, (0, 0, 0), thickness, cv2.LINE_AA)
+        text_img = np.rot90(text_img, k=-1)  # Read top to bottom, like a matplotlib colorbar label
+        th, tw = text_img.shape[:2]
+        x0 = width - tw - 2
+        y0 = max(0, (height - th) // 2)
+        if x0 > text_x and th <= height:
+            strip[y0:y0 + th, x0:x0 + tw] = np.minimum(strip[y0:y0 + th, x0:x0 + tw], text_img)
+
+    return strip
+
+
+def _render_bgr(arr: np.ndarray, cmap: str, legend: bool, label: Optional[str]) -> np.ndarray:
+    arr = np.asarray(arr)
+    if arr.ndim != 2:
+        raise ValueError(f"Expected a 2D map, got shape {arr.shape}")
+
+    indices = arr if arr.dtype == np.uint8 else quantize_map(arr)
+    bgr = cv2.applyColorMap(indices, _bgr_lut(cmap))
+
+    if legend:
+        bgr = np.concatenate([bgr, _legend_strip(bgr.shape[0], cmap, label)], axis=1)
+    return bgr
+
+
+def render_heatmap(arr: np.ndarray, cmap: str = "jet", legend: bool = True,
+                   label: Optional[str] = None) -> np.ndarray:
+    """
+    Color a [0, 1] map through a lookup table
+
+    Args:
+        arr: 2D float map in [0, 1] (or an already quantized uint8 map)
+        cmap: Colormap name, see get_colormap_lut
+        legend: Whether to append a legend strip on the right
+        label: Legend label
+
+    Returns:
+        RGB image as a (H, W', 3) uint8 array
+    """
+    return _render_bgr(arr, cmap, legend, label)[..., ::-1]
+
+
+def encode_png(rgb: np.ndarray) -> bytes:
+    """Encode an RGB image as PNG bytes"""
+    ok, buf = cv2.imencode(".png", np.ascontiguousarray(rgb[..., ::-1]))
+    if not ok:
+        raise RuntimeError("PNG encoding failed")
+    return buf.tobytes()
+
+
+def render_heatmap_png(arr: np.ndarray, cmap: str = "jet", legend: bool = True,
+                       label: Optional[str] = None) -> bytes:
+    """Render a map straight to PNG bytes (no intermediate RGB copy)"""
+    ok, buf = cv2.imencode(".png", _render_bgr(arr, cmap, legend, label))
+    if not ok:
+        raise RuntimeError("PNG encoding failed")
+    return buf.tobytes()
+
+
+def save_heatmap(arr: np.ndarray, path, cmap: str = "jet", legend: bool = True,
+                 label: Optional[str] = None) -> str:
+    """Render a map and write it as a PNG file; returns the path"""
+    path = Path(path)
+    path.write_bytes(render_heatmap_png(arr, cmap=cmap, legend=legend, label=label))
+    return str(path)
+
+
+def save_trufor_maps(job_dir, maps: Dict[str, Optional[np.ndarray]]) -> str:
+    """
+    Store TruFor maps (float16, compressed) so visualizations can be re-rendered later
+
+    Args:
+        job_dir: Job directory
+        maps: Mapping of map name to 2D array; None entries are skipped
+    """
+    path = Path(job_dir) / MAPS_FILENAME
+    arrays = {k: np.asarray(v, dtype=np.float16) for k, v in maps.items() if v is not None}
+    np.savez_compressed(path, **arrays)
+    return str(path)
+
+
+def load_trufor_maps(job_dir) -> Dict[str, np.ndarray]:
+    """Load maps stored by save_trufor_maps (empty dict if none)"""
+    path = Path(job_dir) / MAPS_FILENAME
+    if not path.exists():
+        return {}
+    with np.load(path) as data:
+        return {k: data[k].astype(np.float32) for k in data.files}
+
+
+def render_trufor_visualizations(job_dir, job_id: str, maps: Dict[str, Optional[np.ndarray]]) -> Dict[str, str]:
+    """
+    Write the TruFor visualization PNGs for a job
+
+    Uses the confidence-weighted anomaly map for the heatmap when available.
+
+    Args:
+        job_dir: Job directory
+        job_id: Job ID used as file prefix
+        maps: Map name ('prediction_map', 'weighted_prediction_map',
+            'confidence_map', 'noiseprint_map') to 2D array
+
+    Returns:
+        Mapping of visualization name ('heatmap', 'conf', 'noiseprint') to file path
+    """
+    job_dir = Path(job_dir)
+    sources = {
+        "heatmap": maps.get("weighted_prediction_map") if maps.get("weighted_prediction_map") is not None
+        else maps.get("prediction_map"),
+        "conf": maps.get("confidence_map"),
+        "noiseprint": maps.get("noiseprint_map"),
+    }
+
+    paths = {}
+    for name, arr in sources.items():
+        if arr is None:
+            continue
+        cmap, label = TRUFOR_VISUALIZATIONS[name]
+        paths[name] = save_heatmap(arr, job_dir / f"{job_id}_{name}.png", cmap=cmap, label=label)
+    return paths
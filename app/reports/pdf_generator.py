@@ -25,6 +25,11 @@ matplotlib.use('Agg')  # Non-interactive backend
 import matplotlib.pyplot as plt
 import numpy as np
 
+try:
+    from .heatmap_renderer import load_trufor_maps, render_trufor_visualizations
+except ImportError:
+    from app.reports.heatmap_renderer import load_trufor_maps, render_trufor_visualizations
+
 
 class PDFReportGenerator:
     """Generates PDF reports for deepfake detection results"""
@@ -162,6 +167,17 @@ class PDFReportGenerator:
             print(f"Warning: Failed to create score distribution: {e}")
             return None
 
+    def _ensure_trufor_visualizations(self):
+        """Re-render TruFor heatmaps from stored maps if the PNG files are missing"""
+        try:
+            if list(self.job_dir.glob("*_heatmap.png")):
+                return
+            maps = load_trufor_maps(self.job_dir)
+            if maps:
+                render_trufor_visualizations(self.job_dir, self.job_dir.name, maps)
+        except Exception as e:
+            print(f"Warning: Failed to render TruFor visualizations: {e}")
+
     def generate_report(self, metadata: Dict) -> str:
         """
         Generate comprehensive PDF report
@@ -416,6 +432,7 @@ class PDFReportGenerator:
                 story.append(seg_table)
 
         # TruFor forensic visualizations (if exists)
+        self._ensure_trufor_visualizations()
         try:
             heatmap_path = list(self.job_dir.glob("*_heatmap.png"))
             conf_path = list(self.job_dir.glob("*_conf.png"))
@@ -0,0 +1,137 @@
+"""
+Coarse-to-fine frame sampling for video analysis
+
+Uniform sampling scores every frame of the target_fps grid, so a long,
+mostly clean video costs as much as a heavily manipulated one. Adaptive
+sampling scores the grid in two passes:
+1. coarse: every `stride`-th grid frame (about coarse_fps)
+2. fine: every grid frame in the intervals between coarse frames where the
+   outcome is uncertain, i.e. where the scores cross or come within
+   `margin` of the threshold (raw or smoothed), or where the picture
+   changes abruptly (scene cut)
+
+Frames that were not scored are interpolated linearly between their scored
+neighbours, so the timeline has one entry per grid frame like a uniform run.
+Intervals that stay clearly below or clearly above the threshold are the
+ones interpolated, which is where that is harmless.
+
+A frame budget caps the frames scored: the coarse pass gets at most half of
+it, and fine intervals are taken most uncertain first (crossings and scene
+cuts, then by distance to the threshold) while the budget lasts.
+
+Events shorter than the coarse stride that fall between two clean coarse
+frames without a scene cut can be missed; lower coarse_fps trades that
+risk for fewer scored frames.
+"""
+
+import math
+from typing import Dict, Iterable, List
+
+import cv2
+import numpy as np
+
+# Defaults for DeepfakeBenchAdapter.analyze_video(sampling="adaptive")
+COARSE_FPS = 1.0
+MARGIN = 0.15
+SCENE_CUT_THRESHOLD = 30.0
+
+# Side of the grayscale thumbnails compared for scene cuts
+SIGNATURE_SIZE = 32
+
+
+def coarse_stride(fps: float, grid_frames: int, frame_budget: int = 0, coarse_fps: float = COARSE_FPS) -> int:
+    """Grid frames between coarse samples: about fps / coarse_fps, widened to keep the coarse pass within half the budget"""
+    stride = max(int(round(fps / coarse_fps)), 1)
+    if frame_budget > 0:
+        stride = max(stride, math.ceil(grid_frames / max(frame_budget // 2, 1)))
+    return stride
+
+
+def frame_signature(frame: np.ndarray) -> np.ndarray:
+    """Small grayscale thumbnail of a BGR frame, compared between coarse frames to find scene cuts"""
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+    return cv2.resize(gray, (SIGNATURE_SIZE, SIGNATURE_SIZE), interpolation=cv2.INTER_AREA).astype(np.float32)
+
+
+def scene_cuts(signatures: Dict[int, np.ndarray], threshold: float = SCENE_CUT_THRESHOLD) -> List[int]:
+    """Grid indices of coarse frames whose signature differs from the previous coarse frame's by more than threshold (mean abs grey level)"""
+    indices = sorted(signatures)
+    return [b for a, b in zip(indices, indices[1:])
+            if float(np.abs(signatures[b] - signatures[a]).mean()) > threshold]
+
+
+def plan_refinement(coarse: Dict[int, float], grid_frames: int, threshold: float, margin: float = MARGIN,
+                    cuts: Iterable[int] = (), frame_budget: int = 0) -> List[int]:
+    """
+    Grid indices to score in the fine pass
+
+    Args:
+        coarse: Grid index -> fake probability of the coarse frames
+        grid_frames: Frames on the uniform grid (0 if unknown: only the gaps
+            between coarse frames are refined)
+        threshold: Detection threshold
+        margin: Gaps whose scores come this close to the threshold are refined
+        cuts: Grid indices of coarse frames that follow a scene cut
+        frame_budget: Cap on coarse + fine frames (0 = no cap)
+    """
+    indices = sorted(coarse)
+    if not indices:
+        return []
+    raw = np.array([coarse[i] for i in indices])
+    smoothed = np.convolve(raw, np.ones(3) / 3, mode="same") if len(raw) >= 3 else raw
+    cuts = set(cuts)
+
+    # (priority class, distance to threshold, grid indices); class 0 is always wanted first
+    gaps = []
+    for k, (a, b) in enumerate(zip(indices, indices[1:])):
+        missing = list(range(a + 1, b))
+        if not missing:
+            continue
+        values = (raw[k], raw[k + 1], smoothed[k], smoothed[k + 1])
+        lo, hi = min(values), max(values)
+        crossing = (raw[k] >= threshold) != (raw[k + 1] >= threshold)
+        if crossing or b in cuts:
+            gaps.append((0, 0.0, missing))
+        elif lo < threshold + margin and hi > threshold - margin:
+            gaps.append((1, min(abs(v - threshold) for v in values), missing))
+
+    # Frames after the last coarse frame: scored so the timeline ends on real scores
+    tail = list(range(indices[-1] + 1, grid_frames))
+    if tail:
+        gaps.append((0, 0.0, tail))
+
+    remaining = frame_budget - len(indices) if frame_budget > 0 else math.inf
+    planned = []
+    for _, _, missing in sorted(gaps, key=lambda gap: (gap[0], gap[1])):
+        if len(missing) <= remaining:
+            planned.extend(missing)
+            remaining -= len(missing)
+    return sorted(planned)
+
+
+def fill_grid(scored: Dict[int, Dict], fps: float) -> List[Dict]:
+    """
+    Frame scores for every grid index up to the last scored one
+
+    Scored frames are kept (marked interpolated: False); the others get a
+    probability interpolated linearly between their scored neighbours and
+    are anomalous only if both neighbours are.
+    """
+    indices = sorted(scored)
+    grid = []
+    for a, b in zip(indices, indices[1:] + [None]):
+        grid.append(dict(scored[a], interpolated=False))
+        if b is None:
+            break
+        left, right = scored[a], scored[b]
+        for i in range(a + 1, b):
+            weight = (i - a) / (b - a)
+            grid.append({
+                "frame": i,
+                "timestamp": i / fps,
+                "probability": float((1 - weight) * left["probability"] + weight * right["probability"]),
+                "is_anomalous": bool(left["is_anomalous"] and right["is_anomalous"]),
+                "interpolated": True
+            })
+    return grid
+
@@ -0,0 +1,121 @@
+"""
+Cacheable file responses
+
+Serves job files (uploaded originals, previews) with validators and partial
+content support, independent of the installed Starlette version:
+
+- ETag (size + mtime) and Last-Modified headers
+- If-None-Match -> 304 Not Modified
+- Single byte ranges (Range / If-Range) -> 206 Partial Content, 416 when unsatisfiable
+"""
+
+import mimetypes
+import os
+from email.utils import formatdate
+from pathlib import Path
+from typing import Iterator, Optional, Tuple
+
+from fastapi import Request
+from fastapi.responses import FileResponse, Response, StreamingResponse
+
+CHUNK_SIZE = 256 * 1024
+DEFAULT_CACHE_CONTROL = "private, max-age=86400"
+
+
+def make_etag(stat: os.stat_result) -> str:
+    """Strong ETag from file size and modification time"""
+    return f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """
+    Parse a single-range Range header
+
+    Returns:
+        Inclusive (start, end) byte positions, or None when the header is not a
+        single byte range (the full file should be served)
+
+    Raises:
+        ValueError: If the range cannot be satisfied
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+
+    start_s, sep, end_s = spec.strip().partition("-")
+    if not sep or not (start_s or end_s).isdigit() or (start_s and end_s and not end_s.isdigit()):
+        return None
+
+    if not start_s:
+        # Suffix range: last N bytes
+        length = int(end_s)
+        if length == 0 or size == 0:
+            raise ValueError(f"Range {header} not satisfiable for {size} bytes")
+        return max(0, size - length), size - 1
+
+    start = int(start_s)
+    end = int(end_s) if end_s else size - 1
+    if start >= size or end < start:
+        raise ValueError(f"Range {header} not satisfiable for {size} bytes")
+    return start, min(end, size - 1)
+
+
+def _iter_range(path: Path, start: int, end: int) -> Iterator[bytes]:
+    with open(path, "rb") as f:
+        f.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = f.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def serve_file(request: Request, path: Path, media_type: Optional[str] = None,
+               cache_control: str = DEFAULT_CACHE_CONTROL) -> Response:
+    """
+    Build a response for a file honoring conditional and range requests
+
+    Args:
+        request: Incoming request (for If-None-Match, Range and If-Range)
+        path: File to serve
+        media_type: Content type (guessed from the name if None)
+        cache_control: Cache-Control header value
+    """
+    path = Path(path)
+    media_type = media_type or mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+    stat = os.stat(path)
+    etag = make_etag(stat)
+    headers = {
+        "ETag": etag,
+        "Last-Modified": formatdate(stat.st_mtime, usegmt=True),
+        "Cache-Control": cache_control,
+        "Accept-Ranges": "bytes",
+    }
+
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match:
+        tags = [tag.strip() for tag in if_none_match.split(",")]
+        tags = [tag[2:] if tag.startswith("W/") else tag for tag in tags]
+        if "*" in tags or etag in tags:
+            return Response(status_code=304, headers=headers)
+
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if range_header and (if_range is None or if_range.strip() == etag):
+        try:
+            byte_range = parse_range(range_header, stat.st_size)
+        except ValueError:
+            return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{stat.st_size}"})
+
+        if byte_range is not None:
+            start, end = byte_range
+            headers.update({
+                "Content-Range": f"bytes {start}-{end}/{stat.st_size}",
+                "Content-Length": str(end - start + 1),
+            })
+            return StreamingResponse(_iter_range(path, start, end), status_code=206,
+                                     media_type=media_type, headers=headers)
+
+    return FileResponse(path, media_type=media_type, headers=headers, stat_result=stat)
@@ -0,0 +1,138 @@
+"""
+Frame preprocessing for DeepfakeBench detectors
+
+The detectors take square RGB frames at the registry input_size, scaled to
+[0, 1] and normalized with the ImageNet mean and std. Doing that per frame
+with a torchvision Compose (ToPILImage, Resize, ToTensor, Normalize) builds
+the pipeline and a PIL image for every frame and converts at full
+resolution.
+
+PreprocessPlan holds what depends only on the model (input size, fused
+normalization constants) and is built once per model. FrameBatch holds the
+buffers for one consumer:
+- each frame is resized with cv2 straight into a preallocated uint8 batch
+  buffer (pinned when the batch goes to CUDA), then converted to RGB at
+  input size
+- luminance statistics for the black/low-contrast check are computed on
+  that downscaled frame
+- the whole batch is converted to float and normalized in place with one
+  multiply-add per element: x * 1/(255*std) - mean/std
+
+Example:
+    plan = PreprocessPlan(299)
+    frames = plan.new_batch(capacity=8, device="cuda")
+    for frame in bgr_frames:
+        mean, std = frames.add(frame)
+        if len(frames) == 8:
+            scores = model(frames.tensor())
+            frames.clear()
+"""
+
+from typing import Callable, Optional, Sequence, Tuple
+
+import cv2
+import numpy as np
+import torch
+
+IMAGENET_MEAN = (0.485, 0.456, 0.406)
+IMAGENET_STD = (0.229, 0.224, 0.225)
+
+
+class PreprocessPlan:
+    """Per-model preprocessing constants: input size and fused normalization"""
+
+    def __init__(self, input_size: int, mean: Sequence[float] = IMAGENET_MEAN,
+                 std: Sequence[float] = IMAGENET_STD):
+        if input_size < 1:
+            raise ValueError("input_size must be >= 1")
+        self.input_size = input_size
+        mean_t = torch.tensor(mean, dtype=torch.float32).view(1, 3, 1, 1)
+        std_t = torch.tensor(std, dtype=torch.float32).view(1, 3, 1, 1)
+        # (x / 255 - mean) / std == x * scale + bias
+        self.scale = 1.0 / (255.0 * std_t)
+        self.bias = -mean_t / std_t
+
+    def resize(self, frame: np.ndarray, out: np.ndarray, bgr: bool = True) -> np.ndarray:
+        """Resize a uint8 HxWx3 frame into out (input_size x input_size x 3, RGB)"""
+        size = self.input_size
+        h, w = frame.shape[:2]
+        # Area averaging when shrinking (like PIL's antialiased resize), bilinear when enlarging
+        interpolation = cv2.INTER_AREA if h >= size and w >= size else cv2.INTER_LINEAR
+        cv2.resize(frame, (size, size), dst=out, interpolation=interpolation)
+        if bgr:
+            cv2.cvtColor(out, cv2.COLOR_BGR2RGB, dst=out)
+        return out
+
+    def new_batch(self, capacity: int, device: str = "cpu",
+                  transform_fn: Optional[Callable] = None) -> "FrameBatch":
+        """Buffers for batches of up to capacity frames on device"""
+        return FrameBatch(self, capacity, device, transform_fn)
+
+
+def luminance(rgb_frame: np.ndarray) -> Tuple[float, float]:
+    """Mean and standard deviation of the grayscale frame"""
+    gray = cv2.cvtColor(rgb_frame, cv2.COLOR_RGB2GRAY)
+    mean, std = cv2.meanStdDev(gray)
+    return float(mean[0, 0]), float(std[0, 0])
+
+
+class FrameBatch:
+    """
+    Preallocated buffers for one batch of frames at a time
+
+    Not thread-safe: each video analysis uses its own batch. The tensor
+    returned by tensor() is a view of the output buffer and is overwritten
+    by the next batch.
+
+    With a model transform_fn the frames go through it instead (one tensor
+    per frame, concatenated); luminance still comes from the downscaled frame.
+    """
+
+    def __init__(self, plan: PreprocessPlan, capacity: int, device: str = "cpu",
+                 transform_fn: Optional[Callable] = None):
+        if capacity < 1:
+            raise ValueError("capacity must be >= 1")
+        size = plan.input_size
+        self.plan = plan
+        self.capacity = capacity
+        self.device = torch.device(device)
+        self.transform_fn = transform_fn
+        # Pinned host memory lets the host-to-device copy run asynchronously
+        self._pinned = self.device.type == "cuda" and torch.cuda.is_available()
+        self._staging = torch.empty((capacity, size, size, 3), dtype=torch.uint8, pin_memory=self._pinned)
+        self._pixels = self._staging.numpy()
+        self._output = torch.empty((capacity, 3, size, size), dtype=torch.float32, device=self.device)
+        self._scale = plan.scale.to(self.device)
+        self._bias = plan.bias.to(self.device)
+        self._custom = []
+        self._count = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def add(self, frame: np.ndarray, bgr: bool = True) -> Tuple[float, float]:
+        """Add a uint8 frame (BGR unless bgr=False); returns its luminance (mean, std) at input size"""
+        if self._count == self.capacity:
+            raise ValueError(f"Frame batch is full ({self.capacity} frames)")
+        small = self.plan.resize(frame, self._pixels[self._count], bgr=bgr)
+        if self.transform_fn is not None:
+            rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB) if bgr else frame
+            tensor = self.transform_fn(rgb)
+            self._custom.append(tensor if tensor.dim() == 4 else tensor.unsqueeze(0))
+        self._count += 1
+        return luminance(small)
+
+    def tensor(self) -> torch.Tensor:
+        """The added frames as a normalized [N, 3, S, S] float tensor on the batch device"""
+        if self.transform_fn is not None:
+            return torch.cat(self._custom).to(self.device)
+
+        n = self._count
+        out = self._output[:n]
+        out.copy_(self._staging[:n].permute(0, 3, 1, 2), non_blocking=self._pinned)
+        return out.mul_(self._scale).add_(self._bias)
+
+    def clear(self):
+        """Start a new batch; the buffers are reused"""
+        self._custom.clear()
+        self._count = 0
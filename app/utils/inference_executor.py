@@ -0,0 +1,222 @@
+"""
+Bounded inference executor
+
+Runs blocking model work (decoding, forward passes, map post-processing and
+rendering) on dedicated worker threads so the asyncio event loop keeps
+serving health checks, logins and polling while images are analyzed.
+
+The number of requests waiting for a worker is bounded. When the queue is
+full, submissions are rejected immediately with InferenceQueueFull, which
+carries a Retry-After estimate derived from recent service times. Callers
+that would rather wait than fail can await wait_for_slot(), which wakes up
+as soon as a running or queued request finishes.
+"""
+
+import asyncio
+import logging
+import math
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class InferenceQueueFull(Exception):
+    """Raised when the inference queue cannot accept more work"""
+
+    def __init__(self, retry_after: int, queue_depth: int):
+        self.retry_after = retry_after
+        self.queue_depth = queue_depth
+        super().__init__(f"Inference queue is full ({queue_depth} waiting), retry after {retry_after}s")
+
+
+class InferenceExecutor:
+    """
+    Thread pool with a bounded waiting queue and queue statistics
+    """
+
+    def __init__(self, max_workers: int = 2, max_queue_size: int = 8, name: str = "inference",
+                 initializer: Optional[Callable[[], None]] = None):
+        """
+        Initialize the executor
+
+        Args:
+            max_workers: Number of requests processed concurrently
+            max_queue_size: Number of requests allowed to wait for a free worker
+            name: Thread name prefix
+            initializer: Called once in every worker thread before its first task
+                (e.g. thread_topology.worker_initializer)
+        """
+        if max_workers < 1:
+            raise ValueError("max_workers must be >= 1")
+        if max_queue_size < 0:
+            raise ValueError("max_queue_size must be >= 0")
+
+        self.max_workers = max_workers
+        self.max_queue_size = max_queue_size
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name, initializer=initializer)
+        self._lock = threading.Lock()
+        self._pending = 0   # Submitted and not finished (waiting + running)
+        self._running = 0
+        self._stats = {
+            "submitted": 0,
+            "rejected": 0,
+            "completed": 0,
+            "failed": 0,
+            "total_wait_s": 0.0,
+            "max_wait_s": 0.0,
+            "total_run_s": 0.0,
+        }
+        # Exponential moving average of run time, used for Retry-After estimates
+        self._avg_run_s = None
+        # (event loop, asyncio future) of the wait_for_slot() callers
+        self._slot_waiters = []
+
+    @property
+    def queue_depth(self) -> int:
+        """Number of requests waiting for a free worker"""
+        with self._lock:
+            return self._pending - self._running
+
+    def submit(self, fn: Callable[..., Any], *args, **kwargs) -> Future:
+        """
+        Submit blocking work, rejecting it if the waiting queue is full
+
+        Raises:
+            InferenceQueueFull: If max_queue_size requests are already waiting
+        """
+        with self._lock:
+            # Capacity is one slot per worker plus the waiting queue
+            if self._pending >= self.max_workers + self.max_queue_size:
+                waiting = self._pending - self._running
+                self._stats["rejected"] += 1
+                raise InferenceQueueFull(self._estimate_retry_after(waiting), waiting)
+            self._pending += 1
+            self._stats["submitted"] += 1
+
+        enqueued_at = time.monotonic()
+        try:
+            future = self._pool.submit(self._run, enqueued_at, fn, args, kwargs)
+        except Exception:
+            with self._lock:
+                self._pending -= 1
+            self._wake_slot_waiters()
+            raise
+        # Cancelled futures never reach a worker, so release their slot here
+        future.add_done_callback(self._on_done)
+        return future
+
+    async def run(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """Submit work and await its result from the event loop"""
+        return await asyncio.wrap_future(self.submit(fn, *args, **kwargs))
+
+    async def wait_for_slot(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until submit() has room again, or for at most timeout seconds
+
+        Returns:
+            True if a slot is free, False on timeout
+        """
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._pending < self.max_workers + self.max_queue_size:
+                return True
+            waiter = (loop, loop.create_future())
+            self._slot_waiters.append(waiter)
+        try:
+            await asyncio.wait_for(waiter[1], timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            with self._lock:
+                if waiter in self._slot_waiters:
+                    self._slot_waiters.remove(waiter)
+
+    def retry_after(self) -> int:
+        """Current Retry-After estimate in seconds"""
+        with self._lock:
+            return self._estimate_retry_after(self._pending - self._running)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return queue depth, wait and run time statistics"""
+        with self._lock:
+            stats = dict(self._stats)
+            pending, running = self._pending, self._running
+            retry_after = self._estimate_retry_after(pending - running)
+
+        started = stats["completed"] + stats["failed"]
+        return {
+            "max_workers": self.max_workers,
+            "max_queue_size": self.max_queue_size,
+            "running": running,
+            "queue_depth": pending - running,
+            "submitted": stats["submitted"],
+            "completed": stats["completed"],
+            "failed": stats["failed"],
+            "rejected": stats["rejected"],
+            "avg_wait_ms": stats["total_wait_s"] / started * 1000.0 if started else 0.0,
+            "max_wait_ms": stats["max_wait_s"] * 1000.0,
+            "avg_run_ms": stats["total_run_s"] / started * 1000.0 if started else 0.0,
+            "retry_after_s": retry_after,
+        }
+
+    def shutdown(self, wait: bool = True):
+        """Stop accepting work and shut down the worker threads"""
+        self._pool.shutdown(wait=wait, cancel_futures=True)
+
+    def _estimate_retry_after(self, waiting: int) -> int:
+        """Estimate seconds until a queue slot frees up (lock must be held)"""
+        avg_run = self._avg_run_s if self._avg_run_s is not None else 1.0
+        return max(1, math.ceil(avg_run * (waiting + 1) / self.max_workers))
+
+    def _run(self, enqueued_at: float, fn: Callable[..., Any], args, kwargs) -> Any:
+        """Worker wrapper recording wait and run times"""
+        started = time.monotonic()
+        wait = started - enqueued_at
+        with self._lock:
+            self._running += 1
+            self._stats["total_wait_s"] += wait
+            self._stats["max_wait_s"] = max(self._stats["max_wait_s"], wait)
+
+        failed = False
+        try:
+            return fn(*args, **kwargs)
+        except Exception:
+            failed = True
+            raise
+        finally:
+            elapsed = time.monotonic() - started
+            with self._lock:
+                self._running -= 1
+                self._pending -= 1
+                self._stats["failed" if failed else "completed"] += 1
+                self._stats["total_run_s"] += elapsed
+                if self._avg_run_s is None:
+                    self._avg_run_s = elapsed
+                else:
+                    self._avg_run_s = 0.8 * self._avg_run_s + 0.2 * elapsed
+            self._wake_slot_waiters()
+
+    def _on_done(self, future: Future):
+        if future.cancelled():
+            with self._lock:
+                self._pending -= 1
+            self._wake_slot_waiters()
+
+    def _wake_slot_waiters(self):
+        """Resolve the wait_for_slot() futures after a slot was released"""
+        with self._lock:
+            waiters, self._slot_waiters = self._slot_waiters, []
+        for loop, waiter in waiters:
+            try:
+                loop.call_soon_threadsafe(_resolve, waiter)
+            except RuntimeError:
+                pass  # Event loop already closed
+
+
+def _resolve(waiter: asyncio.Future):
+    if not waiter.done():
+        waiter.set_result(None)
@@ -0,0 +1,122 @@
+"""
+Compact encoding for TruFor localization maps
+
+TruFor maps (anomaly, confidence-weighted anomaly, confidence, Noiseprint++)
+are float arrays in [0, 1]. Sending them as nested JSON lists costs tens of
+bytes per pixel and a lot of serialization time, so the API ships them as
+base64-encoded buffers instead:
+
+- ``png``: 8-bit grayscale PNG (smallest, decodable by any browser)
+- ``uint8``: raw 8-bit quantized values, row-major
+- ``float16``: raw little-endian half floats, row-major
+- ``json``: nested lists (legacy fallback, opt-in only)
+
+Encoded maps are dictionaries::
+
+    {"encoding": "png", "shape": [H, W], "scale": 1/255, "data": "<base64>"}
+
+where ``value = stored * scale`` for the quantized encodings.
+"""
+
+import base64
+from typing import Any, Dict, Union
+
+import cv2
+import numpy as np
+
+MAP_FORMATS = ("png", "uint8", "float16", "json")
+DEFAULT_MAP_FORMAT = "png"
+
+_UINT8_SCALE = 1.0 / 255.0
+
+
+def quantize_map(arr: np.ndarray) -> np.ndarray:
+    """Quantize a [0, 1] float map to uint8"""
+    arr = np.asarray(arr, dtype=np.float32)
+    return np.clip(np.rint(arr * 255.0), 0, 255).astype(np.uint8)
+
+
+def downsample_map(arr: np.ndarray, max_size: int = 300) -> np.ndarray:
+    """
+    Downsample a 2D map so its longest side is at most max_size, preserving aspect ratio
+
+    Uses area interpolation, which averages the source pixels covered by each
+    output pixel. Maps that already fit are returned unchanged.
+    """
+    arr = np.asarray(arr, dtype=np.float32)
+    height, width = arr.shape
+    if height <= max_size and width <= max_size:
+        return arr
+
+    if width > height:
+        new_width = max_size
+        new_height = max(1, int(max_size * height / width))
+    else:
+        new_height = max_size
+        new_width = max(1, int(max_size * width / height))
+
+    return cv2.resize(arr, (new_width, new_height), interpolation=cv2.INTER_AREA)
+
+
+def encode_map(arr: np.ndarray, fmt: str = DEFAULT_MAP_FORMAT) -> Union[Dict[str, Any], list]:
+    """
+    Encode a 2D [0, 1] map for an API response
+
+    Args:
+        arr: 2D float map
+        fmt: One of MAP_FORMATS
+
+    Returns:
+        Encoded map dictionary, or a nested list for the ``json`` format
+    """
+    if fmt not in MAP_FORMATS:
+        raise ValueError(f"Unsupported map format: {fmt}. Allowed: {', '.join(MAP_FORMATS)}")
+
+    arr = np.asarray(arr, dtype=np.float32)
+    if arr.ndim != 2:
+        raise ValueError(f"Expected a 2D map, got shape {arr.shape}")
+
+    if fmt == "json":
+        return arr.tolist()
+
+    scale = _UINT8_SCALE
+    if fmt == "float16":
+        data = arr.astype("<f2").tobytes()
+        scale = 1.0
+    elif fmt == "uint8":
+        data = quantize_map(arr).tobytes()
+    else:
+        ok, buf = cv2.imencode(".png", quantize_map(arr))
+        if not ok:
+            raise RuntimeError("PNG encoding failed")
+        data = buf.tobytes()
+
+    return {
+        "encoding": fmt,
+        "shape": [int(arr.shape[0]), int(arr.shape[1])],
+        "scale": scale,
+        "data": base64.b64encode(data).decode("ascii"),
+    }
+
+
+def decode_map(payload: Union[Dict[str, Any], list]) -> np.ndarray:
+    """Decode a map produced by encode_map back into a float32 array"""
+    if isinstance(payload, list):
+        return np.asarray(payload, dtype=np.float32)
+
+    fmt = payload.get("encoding")
+    height, width = payload["shape"]
+    raw = base64.b64decode(payload["data"])
+
+    if fmt == "float16":
+        arr = np.frombuffer(raw, dtype="<f2").reshape(height, width)
+    elif fmt == "uint8":
+        arr = np.frombuffer(raw, dtype=np.uint8).reshape(height, width)
+    elif fmt == "png":
+        arr = cv2.imdecode(np.frombuffer(raw, dtype=np.uint8), cv2.IMREAD_GRAYSCALE)
+        if arr is None or arr.shape != (height, width):
+            raise ValueError("Invalid PNG map payload")
+    else:
+        raise ValueError(f"Unsupported map encoding: {fmt}")
+
+    return arr.astype(np.float32) * np.float32(payload.get("scale", 1.0))
@@ -0,0 +1,152 @@
+"""
+Per-stage latency metrics
+
+Detection pipelines record how long each stage takes (decode, preprocess,
+forward, postprocess, render, persist, serialize), per model, into
+cumulative histograms that are exposed in Prometheus text format on
+/metrics.
+
+Timing is a perf_counter() pair and a short locked update per stage. With
+PIPELINE_METRICS=0, stage() returns a shared no-op context manager and
+nothing is recorded.
+"""
+
+import bisect
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Dict, Iterable, List, Optional, Tuple
+
+STAGES = ("decode", "preprocess", "forward", "postprocess", "render", "persist", "serialize")
+
+# Upper bounds in seconds; spans per-frame video stages (ms) to tiled full-resolution images (minutes)
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                   1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+METRIC_NAME = "deepfake_stage_duration_seconds"
+
+_NOOP = nullcontext()
+
+
+class Histogram:
+    """Cumulative histogram with fixed buckets (not thread-safe, guarded by PipelineMetrics)"""
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> List[int]:
+        """Counts of observations <= each bucket bound, +Inf last"""
+        total, out = 0, []
+        for c in self.counts:
+            total += c
+            out.append(total)
+        return out
+
+
+class PipelineMetrics:
+    """
+    Thread-safe registry of stage latency histograms keyed by (model, stage)
+    """
+
+    def __init__(self, enabled: bool = True, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.enabled = enabled
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._histograms: Dict[Tuple[str, str], Histogram] = {}
+
+    def observe(self, model: str, stage: str, seconds: float):
+        """Record one stage duration"""
+        if not self.enabled:
+            return
+        with self._lock:
+            hist = self._histograms.get((model, stage))
+            if hist is None:
+                hist = self._histograms[(model, stage)] = Histogram(self.buckets)
+            hist.observe(seconds)
+
+    def stage(self, model: str, stage: str):
+        """
+        Context manager timing a block as one stage
+
+        Example:
+            with metrics.stage("trufor", "forward"):
+                outputs = model(x)
+        """
+        if not self.enabled:
+            return _NOOP
+        return self._timed(model, stage)
+
+    @contextmanager
+    def _timed(self, model: str, stage: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(model, stage, time.perf_counter() - start)
+
+    def summary(self) -> Dict[str, Dict[str, dict]]:
+        """Count, total and mean seconds per model and stage"""
+        with self._lock:
+            out: Dict[str, Dict[str, dict]] = {}
+            for (model, stage), hist in sorted(self._histograms.items()):
+                out.setdefault(model, {})[stage] = {
+                    "count": hist.count,
+                    "total_s": round(hist.sum, 6),
+                    "mean_s": round(hist.sum / hist.count, 6) if hist.count else 0.0,
+                }
+            return out
+
+    def render_prometheus(self, gauges: Optional[Iterable[Tuple[str, str, Dict[str, str], float]]] = None) -> str:
+        """
+        Render all histograms (and optional extra gauges) in Prometheus text format
+
+        Args:
+            gauges: (name, help, labels, value) tuples, e.g. queue depth or cache size
+        """
+        lines = [
+            f"# HELP {METRIC_NAME} Time spent in each detection pipeline stage",
+            f"# TYPE {METRIC_NAME} histogram",
+        ]
+        with self._lock:
+            items = sorted((key, hist.cumulative(), hist.sum, hist.count)
+                           for key, hist in self._histograms.items())
+
+        for (model, stage), cumulative, total, count in items:
+            labels = f'model="{_escape(model)}",stage="{_escape(stage)}"'
+            for bound, c in zip(self.buckets, cumulative):
+                lines.append(f'{METRIC_NAME}_bucket{{{labels},le="{bound:g}"}} {c}')
+            lines.append(f'{METRIC_NAME}_bucket{{{labels},le="+Inf"}} {cumulative[-1]}')
+            lines.append(f"{METRIC_NAME}_sum{{{labels}}} {total:.6f}")
+            lines.append(f"{METRIC_NAME}_count{{{labels}}} {count}")
+
+        described = set()
+        for name, help_text, labels, value in gauges or ():
+            if name not in described:
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} gauge")
+                described.add(name)
+            label_str = ",".join(f'{k}="{_escape(str(v))}"' for k, v in labels.items())
+            lines.append(f"{name}{{{label_str}}} {float(value):g}" if label_str else f"{name} {float(value):g}")
+
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+# Global registry shared by the adapters and the API server
+metrics = PipelineMetrics(enabled=os.getenv("PIPELINE_METRICS", "1").lower() not in ("0", "false", "no"))
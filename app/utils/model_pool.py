@@ -0,0 +1,188 @@
+"""
+Memory-budgeted pool of loaded models
+
+Building a DeepfakeBench detector (config, architecture, torch.load of the
+weights) takes seconds, which used to be paid by every video job. The pool
+keeps loaded models resident, keyed by model key, and hands the same
+instance to every job that asks for it.
+
+Resident models are kept under a byte budget. When a load pushes the total
+over it, idle models are evicted least-recently-used first. Models leased
+by a running job are never evicted; if they alone exceed the budget, the
+pool runs over it until they are released.
+
+Concurrent requests for a model that is not resident wait for a single
+load instead of each loading their own copy.
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class ModelPool:
+    """
+    Thread-safe LRU of loaded models under a memory budget
+    """
+
+    def __init__(self, loader: Callable[[str], Any], budget_bytes: int,
+                 size_fn: Optional[Callable[[Any], int]] = None, name: str = "models"):
+        """
+        Initialize the pool
+
+        Args:
+            loader: Builds the model for a key (called at most once per key at a time)
+            budget_bytes: Memory budget for resident models; 0 keeps nothing resident
+            size_fn: Bytes held by a loaded model (default: model.memory_bytes())
+            name: Name used in log messages
+        """
+        if budget_bytes < 0:
+            raise ValueError("budget_bytes must be >= 0")
+
+        self.budget_bytes = budget_bytes
+        self.name = name
+        self._loader = loader
+        self._size_fn = size_fn or (lambda model: model.memory_bytes())
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()  # LRU first
+        self._load_locks: Dict[str, threading.Lock] = {}
+        self._uses: Dict[str, int] = {}
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "load_failures": 0}
+
+    @contextmanager
+    def lease(self, key: str) -> Iterator[Any]:
+        """Use the model for key, loading it if needed; it is not evicted while leased"""
+        model = self._acquire(key)
+        try:
+            yield model
+        finally:
+            self._release(key)
+
+    def preload(self, keys: Iterable[str]) -> Dict[str, Optional[str]]:
+        """
+        Load models ahead of the first job
+
+        Returns:
+            key -> None if the model is resident, else the error message
+        """
+        results = {}
+        for key in keys:
+            try:
+                with self.lease(key):
+                    pass
+                results[key] = None
+            except Exception as e:
+                logger.warning(f"Could not preload {self.name} model {key}: {e}")
+                results[key] = str(e)
+        return results
+
+    def _checkout_locked(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        self._entries.move_to_end(key)
+        entry["leases"] += 1
+        self._stats["hits"] += 1
+        return entry["model"]
+
+    def _acquire(self, key: str) -> Any:
+        with self._lock:
+            self._uses[key] = self._uses.get(key, 0) + 1
+            model = self._checkout_locked(key)
+            if model is not None:
+                return model
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+
+        with load_lock:
+            # Another job may have loaded it while we waited
+            with self._lock:
+                model = self._checkout_locked(key)
+                if model is not None:
+                    return model
+                self._stats["misses"] += 1
+
+            started = time.perf_counter()
+            try:
+                model = self._loader(key)
+                size = int(self._size_fn(model))
+            except Exception:
+                with self._lock:
+                    self._stats["load_failures"] += 1
+                raise
+            load_seconds = time.perf_counter() - started
+            logger.info(f"Loaded {self.name} model {key} ({size / 1024 ** 2:.1f} MB) in {load_seconds:.2f}s")
+
+            with self._lock:
+                self._entries[key] = {
+                    "model": model, "bytes": size, "leases": 1, "load_seconds": load_seconds
+                }
+                self._evict_locked()
+            return model
+
+    def _release(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry["leases"] -= 1
+                self._evict_locked()
+
+    def _resident_bytes_locked(self) -> int:
+        return sum(entry["bytes"] for entry in self._entries.values())
+
+    def _evict_locked(self):
+        """Drop idle models, least recently used first, until the pool fits its budget"""
+        resident = self._resident_bytes_locked()
+        for key in list(self._entries):
+            if resident <= self.budget_bytes:
+                break
+            entry = self._entries[key]
+            if entry["leases"] > 0:
+                continue
+            del self._entries[key]
+            resident -= entry["bytes"]
+            self._stats["evictions"] += 1
+            logger.info(f"Evicted {self.name} model {key} ({entry['bytes'] / 1024 ** 2:.1f} MB) from the pool")
+
+    def is_resident(self, key: str) -> bool:
+        """True if the model for key is loaded"""
+        with self._lock:
+            return key in self._entries
+
+    def usage(self) -> Dict[str, int]:
+        """Leases per model key since startup, most used first"""
+        with self._lock:
+            uses = dict(self._uses)
+        return dict(sorted(uses.items(), key=lambda item: item[1], reverse=True))
+
+    def clear(self):
+        """Drop every idle model"""
+        with self._lock:
+            for key in [key for key, entry in self._entries.items() if entry["leases"] == 0]:
+                del self._entries[key]
+
+    def stats(self) -> Dict[str, Any]:
+        """Return budget, resident models (least recently used first) and hit/miss counters"""
+        with self._lock:
+            models = [
+                {
+                    "key": key,
+                    "memory_mb": round(entry["bytes"] / 1024 ** 2, 1),
+                    "leases": entry["leases"],
+                    "load_seconds": round(entry["load_seconds"], 3),
+                }
+                for key, entry in self._entries.items()
+            ]
+            resident = self._resident_bytes_locked()
+            stats = dict(self._stats)
+
+        return {
+            "budget_mb": round(self.budget_bytes / 1024 ** 2, 1),
+            "resident_mb": round(resident / 1024 ** 2, 1),
+            "models": models,
+            **stats,
+        }
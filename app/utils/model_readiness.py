@@ -0,0 +1,93 @@
+"""
+Model load state for the readiness probe
+
+Models are loaded in the background after the server starts accepting
+connections, so /health (liveness) answers immediately while /ready reports
+whether every model has finished loading. Each model moves through
+
+    pending -> loading -> warming_up -> ready
+                       \\-> failed / unavailable
+
+and records how long loading and warm-up took.
+"""
+
+import threading
+import time
+from typing import Any, Dict, Optional
+
+# States in which a model is still on its way
+LOADING_STATES = ("pending", "loading", "warming_up")
+
+
+class ModelReadiness:
+    """
+    Thread-safe per-model load state (models load on a background thread)
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._models: Dict[str, Dict[str, Any]] = {}
+
+    @staticmethod
+    def _new_entry() -> Dict[str, Any]:
+        return {"state": "pending", "load_seconds": None, "warmup_seconds": None, "error": None, "_started": None}
+
+    def register(self, name: str):
+        """Track a model that will be loaded (state 'pending')"""
+        with self._lock:
+            self._models[name] = self._new_entry()
+
+    def _update(self, name: str, **fields):
+        with self._lock:
+            self._models.setdefault(name, self._new_entry()).update(fields)
+
+    def loading(self, name: str):
+        """Model load started"""
+        self._update(name, state="loading", _started=time.perf_counter())
+
+    def warming_up(self, name: str):
+        """Weights are loaded; the warm-up pass is running"""
+        with self._lock:
+            entry = self._models[name]
+            now = time.perf_counter()
+            entry.update(state="warming_up", load_seconds=round(now - entry["_started"], 3), _started=now)
+
+    def ready(self, name: str):
+        """Model is loaded (and warmed up, if it was warmed up)"""
+        with self._lock:
+            entry = self._models[name]
+            elapsed = round(time.perf_counter() - entry["_started"], 3)
+            if entry["state"] == "warming_up":
+                entry["warmup_seconds"] = elapsed
+            else:
+                entry["load_seconds"] = elapsed
+            entry["state"] = "ready"
+
+    def failed(self, name: str, error: str):
+        """Model load or warm-up raised"""
+        self._update(name, state="failed", error=error)
+
+    def unavailable(self, name: str, reason: str):
+        """Model will not be loaded (e.g. the checkpoint is missing)"""
+        self._update(name, state="unavailable", error=reason)
+
+    def state(self, name: str) -> Optional[str]:
+        """Current state of a model, None if it is not tracked"""
+        with self._lock:
+            entry = self._models.get(name)
+            return entry["state"] if entry else None
+
+    def is_ready(self) -> bool:
+        """True once no model is still loading"""
+        with self._lock:
+            return all(entry["state"] not in LOADING_STATES for entry in self._models.values())
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Readiness and per-model state for the /ready endpoint"""
+        with self._lock:
+            models = {name: {k: v for k, v in entry.items() if not k.startswith("_")}
+                      for name, entry in self._models.items()}
+        return {
+            "ready": all(model["state"] not in LOADING_STATES for model in models.values()),
+            "models": models,
+        }
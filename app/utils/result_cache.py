@@ -0,0 +1,254 @@
+"""
+Content-addressed result cache
+
+Analysts frequently re-submit the same evidence file. Detection results are
+cached under a key derived from the file content hash, the model key, a
+fingerprint of the model weights and the analysis parameters, so a repeated
+submission can be answered from stored artifacts instead of rerunning the
+model.
+
+Two tiers are used:
+- memory: LRU of result payloads (small JSON-serializable dicts)
+- disk: one directory per key under data/cache with result.json and the
+  artifact files (maps, rendered heatmaps, timelines, keyframes), evicted
+  least-recently-used first once the total size exceeds a byte budget
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+RESULT_FILENAME = "result.json"
+
+_fingerprints: Dict[str, str] = {}
+_fingerprint_lock = threading.Lock()
+
+
+def weights_fingerprint(path: Optional[str]) -> str:
+    """
+    Fingerprint a weights file without hashing its full content
+
+    Combines resolved path, size and modification time, so replacing the
+    checkpoint invalidates cached results. Returns 'none' for missing files.
+    """
+    if not path or not os.path.exists(path):
+        return "none"
+
+    stat = os.stat(path)
+    ident = f"{os.path.realpath(path)}:{stat.st_size}:{stat.st_mtime_ns}"
+    with _fingerprint_lock:
+        fingerprint = _fingerprints.get(ident)
+        if fingerprint is None:
+            fingerprint = hashlib.sha256(ident.encode()).hexdigest()[:16]
+            _fingerprints[ident] = fingerprint
+    return fingerprint
+
+
+def make_cache_key(content_hash: str, model_key: str, weights_fp: str, params: Optional[Dict[str, Any]] = None) -> str:
+    """Build a cache key from content hash, model key, weights fingerprint and parameters"""
+    payload = json.dumps(
+        {"content": content_hash, "model": model_key, "weights": weights_fp, "params": params or {}},
+        sort_keys=True
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _dir_size(path: Path) -> int:
+    return sum(f.stat().st_size for f in path.rglob("*") if f.is_file())
+
+
+class ResultCache:
+    """Two-tier (memory LRU + disk) cache of detection results and artifacts"""
+
+    def __init__(self, cache_dir: str = "data/cache", max_memory_entries: int = 256,
+                 max_disk_bytes: int = 2 * 1024 ** 3):
+        """
+        Initialize the cache
+
+        Args:
+            cache_dir: Directory for the disk tier
+            max_memory_entries: Number of result payloads kept in memory
+            max_disk_bytes: Disk budget; least recently used entries are evicted beyond it
+        """
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_bytes = max_disk_bytes
+
+        self._lock = threading.RLock()
+        self._memory: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        # key -> (size in bytes, last access time) for the disk tier
+        self._disk: Dict[str, list] = {}
+        self._stats = {"hits": 0, "memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+
+        self._scan_disk()
+
+    def _entry_dir(self, key: str) -> Path:
+        return self.cache_dir / key[:2] / key
+
+    def _scan_disk(self):
+        """Index existing disk entries (size and last access) on startup"""
+        for result_file in self.cache_dir.glob(f"*/*/{RESULT_FILENAME}"):
+            entry_dir = result_file.parent
+            try:
+                self._disk[entry_dir.name] = [_dir_size(entry_dir), result_file.stat().st_mtime]
+            except OSError:
+                continue
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up a cached result
+
+        Returns:
+            The cached result payload, or None on a miss
+        """
+        with self._lock:
+            result = self._memory.get(key)
+            if result is not None and key in self._disk:
+                self._memory.move_to_end(key)
+                self._touch(key)
+                self._stats["hits"] += 1
+                self._stats["memory_hits"] += 1
+                return result
+
+            if key in self._disk:
+                try:
+                    with open(self._entry_dir(key) / RESULT_FILENAME, "r", encoding="utf-8") as f:
+                        result = json.load(f)
+                except (OSError, json.JSONDecodeError) as e:
+                    logger.warning(f"Dropping unreadable cache entry {key}: {e}")
+                    self._remove(key)
+                    result = None
+
+                if result is not None:
+                    self._remember(key, result)
+                    self._touch(key)
+                    self._stats["hits"] += 1
+                    self._stats["disk_hits"] += 1
+                    return result
+
+            self._memory.pop(key, None)
+            self._stats["misses"] += 1
+            return None
+
+    def put(self, key: str, result: Dict[str, Any], artifacts: Optional[Dict[str, Path]] = None):
+        """
+        Store a result payload and copies of its artifact files
+
+        Args:
+            key: Cache key from make_cache_key
+            result: JSON-serializable result payload
+            artifacts: Mapping of cache-relative name to source file or directory
+        """
+        entry_dir = self._entry_dir(key)
+        tmp_dir = entry_dir.with_name(f".{key}.{threading.get_ident()}.tmp")
+        try:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            tmp_dir.mkdir(parents=True)
+            for name, src in (artifacts or {}).items():
+                src = Path(src)
+                if src.is_dir():
+                    shutil.copytree(src, tmp_dir / name)
+                elif src.exists():
+                    shutil.copy2(src, tmp_dir / name)
+            with open(tmp_dir / RESULT_FILENAME, "w", encoding="utf-8") as f:
+                json.dump(result, f)
+
+            with self._lock:
+                if entry_dir.exists():
+                    shutil.rmtree(entry_dir, ignore_errors=True)
+                os.replace(tmp_dir, entry_dir)
+                self._disk[key] = [_dir_size(entry_dir), time.time()]
+                self._remember(key, result)
+                self._stats["stores"] += 1
+                self._evict()
+        except Exception as e:
+            logger.warning(f"Failed to store cache entry {key}: {e}")
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    def restore(self, key: str, dest_dir: Path, rename: Optional[Dict[str, str]] = None) -> bool:
+        """
+        Copy the artifacts of a cached entry into a job directory
+
+        Args:
+            key: Cache key
+            dest_dir: Destination job directory
+            rename: Optional mapping of cache-relative name to destination name
+
+        Returns:
+            True if the entry existed and its artifacts were copied
+        """
+        entry_dir = self._entry_dir(key)
+        dest_dir = Path(dest_dir)
+        rename = rename or {}
+        with self._lock:
+            if not (entry_dir / RESULT_FILENAME).exists():
+                return False
+            dest_dir.mkdir(parents=True, exist_ok=True)
+            for item in entry_dir.iterdir():
+                if item.name == RESULT_FILENAME:
+                    continue
+                target = dest_dir / rename.get(item.name, item.name)
+                if item.is_dir():
+                    shutil.copytree(item, target, dirs_exist_ok=True)
+                else:
+                    shutil.copy2(item, target)
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        """Return hit/miss counters and tier sizes"""
+        with self._lock:
+            stats = dict(self._stats)
+            lookups = stats["hits"] + stats["misses"]
+            stats.update({
+                "hit_rate": stats["hits"] / lookups if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "disk_entries": len(self._disk),
+                "disk_bytes": sum(size for size, _ in self._disk.values()),
+                "max_disk_bytes": self.max_disk_bytes,
+            })
+        return stats
+
+    def clear(self):
+        """Remove every cached entry"""
+        with self._lock:
+            for key in list(self._disk):
+                self._remove(key)
+            self._memory.clear()
+
+    def _remember(self, key: str, result: Dict[str, Any]):
+        self._memory[key] = result
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def _touch(self, key: str):
+        self._disk[key][1] = time.time()
+        try:
+            os.utime(self._entry_dir(key) / RESULT_FILENAME)
+        except OSError:
+            pass
+
+    def _remove(self, key: str):
+        self._disk.pop(key, None)
+        self._memory.pop(key, None)
+        shutil.rmtree(self._entry_dir(key), ignore_errors=True)
+
+    def _evict(self):
+        """Drop least recently used disk entries until the budget is met"""
+        total = sum(size for size, _ in self._disk.values())
+        for key, (size, _) in sorted(self._disk.items(), key=lambda item: item[1][1]):
+            if total <= self.max_disk_bytes:
+                break
+            self._remove(key)
+            total -= size
+            self._stats["evictions"] += 1
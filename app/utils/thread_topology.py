@@ -0,0 +1,171 @@
+"""
+CPU thread topology for inference workers
+
+Torch uses every core for intra-op parallelism by default, so two inference
+workers running at the same time each start a full-size thread team and
+oversubscribe the CPU. A topology fixes the layout instead:
+
+- workers: concurrent inference workers (TruFor and DeepfakeBench pools)
+- intra_op_threads: torch threads per worker (default: cores // workers)
+- inter_op_threads: torch inter-op pool size (process-wide, set once)
+- pin_cores: pin every worker to its own slice of the available cores
+
+With torch's OpenMP backend the intra-op thread count of threads not
+created by OpenMP is effectively process-wide, so every worker (and the
+TruFor micro-batcher) uses the same value. Core pinning is per thread, and
+the OpenMP team a worker starts inherits its affinity.
+
+Configured with INFERENCE_WORKERS, INFERENCE_INTRA_OP_THREADS (0 = auto),
+INFERENCE_INTER_OP_THREADS and INFERENCE_PIN_CORES. Worker threads apply
+their slot's settings through the initializer returned by
+worker_initializer; tools/benchmarks/thread_topology.py sweeps layouts
+to find the best one for a host.
+"""
+
+import itertools
+import logging
+import os
+import threading
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WORKERS = 2
+DEFAULT_INTER_OP_THREADS = 1
+
+
+def available_cpus() -> List[int]:
+    """CPU ids this process may run on"""
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def make_topology(workers: int = DEFAULT_WORKERS, intra_op_threads: Optional[int] = None,
+                  inter_op_threads: int = DEFAULT_INTER_OP_THREADS, pin_cores: bool = False,
+                  cpus: Optional[Sequence[int]] = None) -> Dict[str, Any]:
+    """
+    Build a worker thread layout
+
+    Args:
+        workers: Number of concurrent inference workers
+        intra_op_threads: Torch threads per worker (None = available cores // workers)
+        inter_op_threads: Torch inter-op threads for the process
+        pin_cores: Assign each worker slot a contiguous slice of the cores
+        cpus: CPU ids to lay out (default: the process affinity mask)
+
+    Returns:
+        Topology dictionary; 'core_sets' lists the cores of each worker slot
+        (None without pinning)
+    """
+    cpus = list(cpus) if cpus is not None else available_cpus()
+    if workers < 1:
+        raise ValueError("workers must be >= 1")
+    if intra_op_threads is not None and intra_op_threads < 1:
+        raise ValueError("intra_op_threads must be >= 1")
+    if inter_op_threads < 1:
+        raise ValueError("inter_op_threads must be >= 1")
+
+    intra = intra_op_threads or max(1, len(cpus) // workers)
+    core_sets = None
+    if pin_cores:
+        # Slots wrap around when workers x threads exceeds the core count
+        core_sets = [[cpus[(slot * intra + k) % len(cpus)] for k in range(min(intra, len(cpus)))]
+                     for slot in range(workers)]
+
+    return {
+        "workers": workers,
+        "intra_op_threads": intra,
+        "inter_op_threads": inter_op_threads,
+        "pin_cores": bool(pin_cores),
+        "cpus": len(cpus),
+        "core_sets": core_sets,
+    }
+
+
+def topology_from_env() -> Dict[str, Any]:
+    """Topology configured by the INFERENCE_* environment variables"""
+    return make_topology(
+        workers=int(os.getenv("INFERENCE_WORKERS", str(DEFAULT_WORKERS))),
+        intra_op_threads=int(os.getenv("INFERENCE_INTRA_OP_THREADS", "0")) or None,
+        inter_op_threads=int(os.getenv("INFERENCE_INTER_OP_THREADS", str(DEFAULT_INTER_OP_THREADS))),
+        pin_cores=os.getenv("INFERENCE_PIN_CORES", "0").lower() not in ("0", "false", "no", ""),
+    )
+
+
+def describe_topology(topology: Dict[str, Any]) -> str:
+    """One-line summary for logs"""
+    text = (f"{topology['workers']} worker(s) x {topology['intra_op_threads']} intra-op thread(s), "
+            f"{topology['inter_op_threads']} inter-op, {topology['cpus']} CPU(s)")
+    if topology["core_sets"]:
+        text += ", pinned to " + " | ".join(",".join(map(str, cores)) for cores in topology["core_sets"])
+    return text
+
+
+def total_threads(topology: Dict[str, Any]) -> int:
+    """Thread budget of all workers together, for a shared ONNX Runtime session"""
+    return min(topology["workers"] * topology["intra_op_threads"], topology["cpus"])
+
+
+def apply_process_topology(topology: Dict[str, Any]):
+    """
+    Apply the process-wide settings (torch intra-op and inter-op thread counts)
+
+    Torch only accepts the inter-op size before the first inter-op work, so
+    call this early; later calls keep the existing pool and log a warning.
+    """
+    import torch
+
+    torch.set_num_threads(topology["intra_op_threads"])
+    if torch.get_num_interop_threads() != topology["inter_op_threads"]:
+        try:
+            torch.set_num_interop_threads(topology["inter_op_threads"])
+        except RuntimeError as e:
+            logger.warning(f"Cannot change torch inter-op threads ({e}); "
+                           f"keeping {torch.get_num_interop_threads()}")
+    logger.info(f"Inference thread topology: {describe_topology(topology)}")
+
+
+def configure_current_thread(intra_op_threads: int, cores: Optional[Sequence[int]] = None):
+    """Set the torch intra-op threads and optionally the CPU affinity of the calling thread"""
+    import torch
+
+    # Pin first: OpenMP threads started by this thread inherit its affinity
+    if cores and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, set(cores))
+    torch.set_num_threads(intra_op_threads)
+
+
+def worker_initializer(topology: Dict[str, Any]) -> Callable[[], None]:
+    """
+    Thread initializer giving each new worker the next slot of the topology
+
+    Each pool should get its own initializer, so slot numbers restart per pool.
+    """
+    slots = itertools.count()
+    lock = threading.Lock()
+
+    def initialize():
+        with lock:
+            slot = next(slots) % topology["workers"]
+        cores = topology["core_sets"][slot] if topology["core_sets"] else None
+        configure_current_thread(topology["intra_op_threads"], cores)
+
+    return initialize
+
+
+def batcher_initializer(topology: Dict[str, Any]) -> Callable[[], None]:
+    """
+    Thread initializer for a shared forward thread (TruFor micro-batcher)
+
+    A batched forward pass serves all workers at once, so it may run on the
+    cores of every worker slot.
+    """
+    cores = None
+    if topology["core_sets"]:
+        cores = sorted({core for slot in topology["core_sets"] for core in slot})
+
+    def initialize():
+        configure_current_thread(topology["intra_op_threads"], cores)
+
+    return initialize
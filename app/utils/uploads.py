@@ -0,0 +1,274 @@
+"""
+Streaming upload ingestion
+
+Uploads are copied in fixed-size chunks to a spool file instead of being read
+into memory with ``await file.read()``. The SHA-256 used for job IDs and the
+result cache is computed while copying, and uploads are rejected as soon as
+their running size exceeds the limit. Downstream stages receive the spool
+path, so a 500MB video never has to be held in memory. Images inside a ZIP
+archive (batch detection) are extracted to spool files the same way.
+
+UploadLimitMiddleware rejects oversized requests even earlier, from their
+Content-Length header (or running body size for chunked requests), before
+the multipart body is parsed.
+"""
+
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import uuid
+import zipfile
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from starlette.exceptions import HTTPException
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_CHUNK_SIZE = 1024 * 1024  # 1MB
+
+# Allowance for multipart boundaries and form fields on top of the file size limit
+MULTIPART_OVERHEAD = 64 * 1024
+
+# Image types accepted inside ZIP archives, by file extension
+ZIP_IMAGE_TYPES = {".jpg": "image/jpeg", ".jpeg": "image/jpeg", ".png": "image/png"}
+
+
+class UploadTooLarge(Exception):
+    """Raised when an upload exceeds its size limit"""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        super().__init__(f"File too large. Maximum size: {max_size // (1024 * 1024)}MB")
+
+
+async def spool_upload(upload, spool_dir: Path, max_size: int,
+                       chunk_size: int = UPLOAD_CHUNK_SIZE) -> Dict[str, Any]:
+    """
+    Stream an UploadFile to a spool file, hashing it on the fly
+
+    Args:
+        upload: FastAPI/Starlette UploadFile
+        spool_dir: Directory for the spool file (same filesystem as the job
+            directories, so it can be moved there with move_spooled_upload)
+        max_size: Size limit in bytes
+        chunk_size: Read size
+
+    Returns:
+        Dict with 'path', 'size' and 'sha256'
+
+    Raises:
+        UploadTooLarge: As soon as the running size exceeds max_size
+    """
+    spool_dir = Path(spool_dir)
+    spool_dir.mkdir(parents=True, exist_ok=True)
+    path = spool_dir / f"{uuid.uuid4().hex}.part"
+
+    sha256 = hashlib.sha256()
+    size = 0
+    loop = asyncio.get_running_loop()
+    f = open(path, "wb")
+    try:
+        while True:
+            chunk = await upload.read(chunk_size)
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > max_size:
+                raise UploadTooLarge(max_size)
+            sha256.update(chunk)
+            await loop.run_in_executor(None, f.write, chunk)
+    except BaseException:
+        f.close()
+        path.unlink(missing_ok=True)
+        raise
+    f.close()
+
+    return {"path": path, "size": size, "sha256": sha256.hexdigest()}
+
+
+def extract_zip_images(zip_path: Path, spool_dir: Path, max_size: int, max_images: int,
+                       max_total: int = 0, chunk_size: int = UPLOAD_CHUNK_SIZE) -> List[Dict[str, Any]]:
+    """
+    Extract the images of a ZIP archive to spool files (blocking)
+
+    Directories, hidden files and macOS resource forks are skipped. Members
+    that are not JPEG/PNG or exceed max_size are returned with an 'error'
+    instead of failing the archive; sizes are counted while extracting, not
+    taken from the (untrusted) archive header alone. The running total of
+    extracted bytes is capped by max_total, so a small archive cannot expand
+    to many full-size images (zip bomb).
+
+    Args:
+        zip_path: Spooled ZIP upload
+        spool_dir: Directory for the extracted spool files
+        max_size: Size limit per image in bytes
+        max_images: Maximum number of members considered
+        max_total: Size limit for all extracted images together (0 = no limit)
+
+    Returns:
+        One dict per member with 'filename' and either 'mime_type', 'path',
+        'size' and 'sha256' (as spool_upload) or 'error'
+
+    Raises:
+        ValueError: If the file is not a ZIP archive or has more than max_images members
+        UploadTooLarge: If the extracted images exceed max_total; nothing stays spooled
+    """
+    spool_dir = Path(spool_dir)
+    spool_dir.mkdir(parents=True, exist_ok=True)
+    try:
+        archive = zipfile.ZipFile(zip_path)
+    except zipfile.BadZipFile:
+        raise ValueError("Uploaded archive is not a valid ZIP file")
+
+    with archive:
+        members = [
+            info for info in archive.infolist()
+            if not info.is_dir() and not info.filename.startswith("__MACOSX/")
+            and not Path(info.filename).name.startswith(".")
+        ]
+        if len(members) > max_images:
+            raise ValueError(f"Archive contains {len(members)} files. Maximum: {max_images}")
+
+        entries = []
+        total = 0
+        for info in members:
+            entry = {"filename": info.filename}
+            mime_type = ZIP_IMAGE_TYPES.get(Path(info.filename).suffix.lower())
+            if mime_type is None:
+                entry["error"] = "Unsupported file type. Allowed: JPEG, PNG"
+            elif info.file_size > max_size:
+                entry["error"] = str(UploadTooLarge(max_size))
+            else:
+                remaining = max_total - total if max_total > 0 else max_size
+                try:
+                    entry.update(_extract_member(archive, info, spool_dir, min(max_size, remaining), chunk_size))
+                    entry["mime_type"] = mime_type
+                    total += entry["size"]
+                except UploadTooLarge as e:
+                    if remaining < max_size:
+                        _discard_entries(entries)
+                        raise UploadTooLarge(max_total)
+                    entry["error"] = str(e)
+                except (zipfile.BadZipFile, OSError, RuntimeError) as e:
+                    entry["error"] = f"Cannot extract file: {e}"
+            entries.append(entry)
+        return entries
+
+
+def _discard_entries(entries: List[Dict[str, Any]]) -> None:
+    """Delete the spool files of extracted entries"""
+    for entry in entries:
+        if "path" in entry:
+            Path(entry["path"]).unlink(missing_ok=True)
+
+
+def _extract_member(archive: zipfile.ZipFile, info: zipfile.ZipInfo, spool_dir: Path,
+                    max_size: int, chunk_size: int) -> Dict[str, Any]:
+    """Copy one archive member to a spool file, hashing it and enforcing max_size"""
+    path = spool_dir / f"{uuid.uuid4().hex}.part"
+    sha256 = hashlib.sha256()
+    size = 0
+    try:
+        with archive.open(info) as src, open(path, "wb") as dst:
+            while True:
+                chunk = src.read(chunk_size)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_size:
+                    raise UploadTooLarge(max_size)
+                sha256.update(chunk)
+                dst.write(chunk)
+    except BaseException:
+        path.unlink(missing_ok=True)
+        raise
+    return {"path": path, "size": size, "sha256": sha256.hexdigest()}
+
+
+def move_spooled_upload(spooled: Dict[str, Any], dest: Path) -> Path:
+    """Move a spool file to its final location (e.g. job_dir/input.mp4)"""
+    dest = Path(dest)
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    os.replace(spooled["path"], dest)
+    spooled["path"] = dest
+    return dest
+
+
+def discard_spooled_upload(spooled: Optional[Dict[str, Any]]):
+    """Delete a spool file that was not moved into a job directory"""
+    if spooled and Path(spooled["path"]).name.endswith(".part"):
+        Path(spooled["path"]).unlink(missing_ok=True)
+
+
+class UploadLimitMiddleware:
+    """
+    ASGI middleware rejecting oversized upload requests with 413
+
+    Requests to the configured paths are refused from their Content-Length
+    header before the body is read. Bodies without a length are counted
+    while they are received and aborted with an HTTPException(413) once
+    they pass the limit.
+    """
+
+    def __init__(self, app, limits: Dict[str, int]):
+        """
+        Args:
+            app: ASGI application
+            limits: Mapping of request path to maximum file size in bytes
+        """
+        self.app = app
+        self.limits = {path: size + MULTIPART_OVERHEAD for path, size in limits.items()}
+
+    async def __call__(self, scope, receive, send):
+        limit = self.limits.get(scope.get("path")) if scope["type"] == "http" else None
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope.get("headers") or [])
+        content_length = headers.get(b"content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > limit:
+            await self._reject(send, limit)
+            return
+
+        received = 0
+        response_started = False
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    raise HTTPException(status_code=413, detail=self._detail(limit))
+            return message
+
+        async def tracking_send(message):
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, limited_receive, tracking_send)
+        except HTTPException as e:
+            if response_started or e.status_code != 413:
+                raise
+            await self._reject(send, limit)
+
+    @staticmethod
+    def _detail(limit: int) -> str:
+        return f"File too large. Maximum size: {(limit - MULTIPART_OVERHEAD) // (1024 * 1024)}MB"
+
+    async def _reject(self, send, limit: int):
+        body = json.dumps({"detail": self._detail(limit)}).encode()
+        logger.warning(f"Rejected upload: {self._detail(limit)}")
+        await send({
+            "type": "http.response.start",
+            "status": 413,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,304 @@
+"""
+Sampled video frame source
+
+Video analysis scores a few frames per second out of 25-60 fps sources.
+Reading every frame with cap.read() fully decodes and converts frames that
+are then thrown away, and decoding runs in turn with inference.
+
+VideoFrameSource reads only what sampling needs:
+- opencv backend: grab() for skipped frames (demux + decode, no conversion
+  to a BGR array) and retrieve() only for sampled ones
+- pyav backend: threaded decoding (thread_type AUTO), converting only
+  sampled frames to arrays; needs the optional av package
+
+With prefetch > 0 a background thread decodes into a bounded queue while the
+caller runs inference on earlier frames. Both backends release the GIL
+while decoding.
+
+Sampled frames are not kept for the whole video. KeyframeCache holds the
+few highest-scoring ones JPEG-encoded, and read_frames re-reads any other
+frame that turns out to be needed.
+"""
+
+import heapq
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+DECODE_BACKENDS = ("opencv", "pyav")
+
+# End-of-video marker in the prefetch queue
+_END = object()
+
+
+def sample_step(source_fps: float, target_fps: float) -> int:
+    """Keep every n-th source frame to sample target_fps out of source_fps"""
+    return max(int(round(source_fps / target_fps)), 1)
+
+
+class OpenCVReader:
+    """cv2.VideoCapture that skips unsampled frames with grab()"""
+
+    def __init__(self, video_path: str):
+        self._cap = cv2.VideoCapture(video_path)
+        if not self._cap.isOpened():
+            raise RuntimeError(f"Failed to open video: {video_path}")
+        self.fps = self._cap.get(cv2.CAP_PROP_FPS) or 25.0
+        self.frame_count = int(self._cap.get(cv2.CAP_PROP_FRAME_COUNT))
+
+    def frames(self, step: int = 1, keep: Optional[Callable[[int], bool]] = None,
+               last: Optional[int] = None) -> Iterator[Tuple[int, np.ndarray]]:
+        """Yield (source frame index, BGR frame) for every step-th frame, or the frames keep() accepts, up to last"""
+        keep = keep or (lambda index: index % step == 0)
+        index = 0
+        while (last is None or index <= last) and self._cap.grab():
+            if keep(index):
+                ok, frame = self._cap.retrieve()
+                if not ok:
+                    break
+                yield index, frame
+            index += 1
+
+    def close(self):
+        self._cap.release()
+
+
+class PyAVReader:
+    """PyAV container with threaded decoding; only sampled frames are converted"""
+
+    def __init__(self, video_path: str):
+        try:
+            import av
+        except ImportError as e:
+            raise ImportError("The pyav decode backend requires PyAV (pip install av)") from e
+
+        try:
+            self._container = av.open(video_path)
+        except Exception as e:
+            raise RuntimeError(f"Failed to open video: {video_path}") from e
+        if not self._container.streams.video:
+            self._container.close()
+            raise RuntimeError(f"Failed to open video: {video_path} has no video stream")
+        self._stream = self._container.streams.video[0]
+        self._stream.thread_type = "AUTO"
+        rate = self._stream.average_rate or self._stream.guessed_rate
+        self.fps = float(rate) if rate else 25.0
+        self.frame_count = int(self._stream.frames or 0)
+
+    def frames(self, step: int = 1, keep: Optional[Callable[[int], bool]] = None,
+               last: Optional[int] = None) -> Iterator[Tuple[int, np.ndarray]]:
+        """Yield (source frame index, BGR frame) for every step-th frame, or the frames keep() accepts, up to last"""
+        keep = keep or (lambda index: index % step == 0)
+        for index, frame in enumerate(self._container.decode(self._stream)):
+            if last is not None and index > last:
+                break
+            if keep(index):
+                yield index, frame.to_ndarray(format="bgr24")
+
+    def close(self):
+        self._container.close()
+
+
+def open_reader(video_path: str, backend: str = "opencv"):
+    """Open a video with one of DECODE_BACKENDS"""
+    if backend == "opencv":
+        return OpenCVReader(video_path)
+    if backend == "pyav":
+        return PyAVReader(video_path)
+    raise ValueError(f"Unknown decode backend '{backend}', expected one of {DECODE_BACKENDS}")
+
+
+class VideoFrameSource:
+    """
+    Frames of a video sampled at target_fps, optionally decoded ahead on a
+    background thread
+
+    Iterating yields dicts with index (sampled frame number), source_index,
+    timestamp (index / target_fps), frame (BGR uint8) and decode_seconds
+    (decoding time since the previous sampled frame, skipped frames included).
+    With indices, only those sampled frame numbers are yielded; decoding
+    stops after the last of them.
+
+    Example:
+        with VideoFrameSource(path, target_fps=3.0, prefetch=16) as source:
+            for sampled in source:
+                ...
+    """
+
+    def __init__(self, video_path: str, target_fps: float, backend: str = "opencv", prefetch: int = 16,
+                 indices: Optional[Iterable[int]] = None):
+        """
+        Open the video
+
+        Args:
+            video_path: Video file
+            target_fps: Sampled frames per second of video
+            backend: One of DECODE_BACKENDS
+            prefetch: Sampled frames decoded ahead of the consumer; 0 decodes
+                on the consuming thread
+            indices: Sampled frame numbers to yield (default: all)
+        """
+        if prefetch < 0:
+            raise ValueError("prefetch must be >= 0")
+
+        self.target_fps = target_fps
+        self.backend = backend
+        self.prefetch = prefetch
+        self.indices = None if indices is None else set(indices)
+        self._reader = open_reader(video_path, backend)
+        self.source_fps = self._reader.fps
+        self.total_frames = self._reader.frame_count
+        self.frame_step = sample_step(self.source_fps, target_fps)
+
+    @property
+    def sampled_frames(self) -> int:
+        """Sampled frames in the whole video, from the container's frame count (0 if unknown)"""
+        return -(-self.total_frames // self.frame_step)
+
+    def __enter__(self) -> "VideoFrameSource":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        """Release the decoder"""
+        self._reader.close()
+
+    def _sampled(self) -> Iterator[Dict[str, Any]]:
+        if self.indices is None:
+            frames = self._reader.frames(self.frame_step)
+        elif self.indices:
+            wanted = {index * self.frame_step for index in self.indices}
+            frames = self._reader.frames(keep=wanted.__contains__, last=max(wanted))
+        else:
+            return
+
+        last = time.perf_counter()
+        for source_idx, frame in frames:
+            index = source_idx // self.frame_step
+            now = time.perf_counter()
+            yield {
+                "index": index,
+                "source_index": source_idx,
+                "timestamp": index / self.target_fps,
+                "frame": frame,
+                "decode_seconds": now - last,
+            }
+            last = time.perf_counter()
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        if self.prefetch == 0:
+            yield from self._sampled()
+            return
+
+        frames: "queue.Queue" = queue.Queue(maxsize=self.prefetch)
+        stop = threading.Event()
+
+        def put(item) -> bool:
+            # Give up when the consumer has stopped, instead of blocking on a full queue
+            while not stop.is_set():
+                try:
+                    frames.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def produce():
+            try:
+                for sampled in self._sampled():
+                    if not put(sampled):
+                        return
+                put(_END)
+            except Exception as e:
+                put(e)
+
+        producer = threading.Thread(target=produce, name="video-decode", daemon=True)
+        producer.start()
+        try:
+            while True:
+                item = frames.get()
+                if item is _END:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            stop.set()
+            producer.join()
+
+
+def read_frames(video_path: str, source_indices: Iterable[int], backend: str = "opencv") -> Dict[int, np.ndarray]:
+    """
+    Re-read specific source frames (BGR) of a video
+
+    Decodes from the start up to the last requested frame, grabbing the
+    frames in between. Slower than seeking, but exact: seeking by frame
+    number lands on the wrong frame with some codecs and containers.
+    """
+    wanted = set(source_indices)
+    if not wanted:
+        return {}
+
+    reader = open_reader(video_path, backend)
+    try:
+        return dict(reader.frames(keep=wanted.__contains__, last=max(wanted)))
+    finally:
+        reader.close()
+
+
+class KeyframeCache:
+    """
+    The highest-scoring sampled frames of a video, JPEG-encoded
+
+    Segment keyframes are the peak-probability frames of suspicious
+    segments, which are mostly among the highest-scoring frames of the
+    video. Keeping only the top `capacity` frames bounds memory regardless
+    of video length; the rare keyframe that is not cached is re-read from
+    the file (read_frames).
+
+    Frames are encoded with cv2.imencode defaults, so the bytes equal what
+    cv2.imwrite writes for a .jpg.
+    """
+
+    def __init__(self, capacity: int = 16):
+        if capacity < 0:
+            raise ValueError("capacity must be >= 0")
+        self.capacity = capacity
+        self._heap: List[Tuple[float, int]] = []  # (probability, index), lowest first
+        self._jpegs: Dict[int, bytes] = {}
+
+    def offer(self, index: int, probability: float, frame: np.ndarray):
+        """Cache the frame if it is among the top `capacity` by probability so far"""
+        if self.capacity == 0:
+            return
+        if len(self._heap) >= self.capacity and (probability, index) <= self._heap[0]:
+            return
+
+        ok, encoded = cv2.imencode(".jpg", frame)
+        if not ok:
+            return
+        if len(self._heap) >= self.capacity:
+            _, evicted = heapq.heapreplace(self._heap, (probability, index))
+            del self._jpegs[evicted]
+        else:
+            heapq.heappush(self._heap, (probability, index))
+        self._jpegs[index] = encoded.tobytes()
+
+    def get(self, index: int) -> Optional[bytes]:
+        """JPEG bytes of a cached frame, None if it is not cached"""
+        return self._jpegs.get(index)
+
+    def __len__(self) -> int:
+        return len(self._jpegs)
+
+    @property
+    def nbytes(self) -> int:
+        """Total size of the cached JPEGs"""
+        return sum(len(jpeg) for jpeg in self._jpegs.values())
+
@@ -147,6 +147,7 @@ async function handleFile(file) {
     // Create FormData
     const formData = new FormData();
     formData.append('file', file);
+    formData.append('map_format', 'json');  // This client reads maps as nested arrays
     
     try {
         const response = await fetch('/detect', {
@@ -185,6 +186,29 @@ async function handleFile(file) {
     }
 }
 
+// Load an image served by an authenticated /api endpoint (plain URLs are assigned directly)
+async function loadJobImage(img, url) {
+    if (!url.startsWith('/api/')) {
+        img.src = url;
+        return;
+    }
+    try {
+        const response = await fetch(url, {
+            headers: { 'Authorization': `Bearer ${localStorage.getItem('access_token')}` }
+        });
+        if (!response.ok) {
+            throw new Error(`HTTP ${response.status}`);
+        }
+        if (img.dataset.objectUrl) {
+            URL.revokeObjectURL(img.dataset.objectUrl);
+        }
+        img.dataset.objectUrl = URL.createObjectURL(await response.blob());
+        img.src = img.dataset.objectUrl;
+    } catch (error) {
+        console.error('Failed to load image:', error);
+    }
+}
+
 // Display results
 function displayResult(data) {
     // Determine if this is TruFor response
@@ -389,15 +413,11 @@ function displayTruForVisualization(data) {
         }
     }
     
-    // Display original image
-    if (data.original_image_url) {
+    // Display original image (the preview thumbnail is enough for the overlays)
+    const imageUrl = data.preview_image_url || data.original_image_url;
+    if (imageUrl) {
         elements.originalImage.onload = setupVisualizationsWithAspectRatio;
-        elements.originalImage.src = data.original_image_url;
-        
-        // Handle case where image is already cached and loaded
-        if (elements.originalImage.complete && elements.originalImage.naturalWidth > 0) {
-            setupVisualizationsWithAspectRatio();
-        }
+        loadJobImage(elements.originalImage, imageUrl);
     } else {
         // If no original image URL, we'll need to create one from the uploaded file
         // For now, we'll show a placeholder
@@ -6,11 +6,20 @@ Tests include:
 - DeepfakeBench adapter configuration
 - Model path validation
 - Adapter interface consistency
+- TruFor batched detection
+- TruFor integrity head shared by concurrent detections
+- DeepfakeBench model list cache
+- DeepfakeBench batched frame inference
+- DeepfakeBench keyframe memory bound and re-read keyframes
+- DeepfakeBench single-decode model ensembles
+- DeepfakeBench adaptive (coarse-to-fine) frame sampling
 """
 import pytest
 import sys
 from pathlib import Path
 
+import numpy as np
+
 # Add project root to path
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
@@ -289,3 +298,626 @@ def test_prediction_values():
     for pred in our_predictions:
         assert pred in valid_predictions
 
+
+
+@pytest.mark.unit
+def test_trufor_map_restoration_resolutions():
+    """Test that maps are cropped and resized in one pass to the requested resolution"""
+    try:
+        import torch
+        from app.adapters.trufor_adapter import TruForAdapter
+    except ImportError as e:
+        pytest.skip(f"Cannot import TruFor adapter: {e}")
+
+    # No model needed for post-processing
+    adapter = TruForAdapter.__new__(TruForAdapter)
+
+    # 4000x3000 (W x H) photo resized to 512x384 and padded top/bottom by 64
+    meta = {'W0': 4000, 'H0': 3000, 'W1': 512, 'H1': 384,
+            'left': 0, 'right': 0, 'top': 64, 'bottom': 64}
+
+    assert adapter._map_size(meta, "preview") == (225, 300)
+    assert adapter._map_size(meta, "report") == (768, 1024)
+    assert adapter._map_size(meta, "full") == (3000, 4000)
+    with pytest.raises(ValueError):
+        adapter._map_size(meta, "huge")
+
+    maps = torch.zeros(1, 3, 512, 512)
+    maps[:, 0, 64:448] = 1.0  # Unpadded region only
+    maps[:, 1] = 0.5
+
+    restored = adapter._restore_maps(maps, meta, adapter._map_size(meta, "preview"))
+    assert restored.shape == (3, 225, 300)
+    assert restored.dtype.name == "float32"
+    # Padding rows are cropped before resizing, so no 0-valued border leaks in
+    assert abs(float(restored[0].min()) - 1.0) < 1e-5
+    assert abs(float(restored[1].mean()) - 0.5) < 1e-5
+
+
+def _smooth_jpeg(width, height, orientation=None):
+    """Encode a smooth synthetic photo as JPEG, optionally with an EXIF orientation"""
+    import io
+    import cv2
+    from PIL import Image
+
+    rng = np.random.default_rng(0)
+    base = cv2.resize(rng.random((60, 80, 3)).astype(np.float32), (width, height), interpolation=cv2.INTER_CUBIC)
+    buf = io.BytesIO()
+    exif = Image.Exif()
+    if orientation:
+        exif[0x0112] = orientation
+    Image.fromarray((np.clip(base, 0, 1) * 255).astype(np.uint8)).save(buf, "JPEG", quality=90, exif=exif.tobytes())
+    return buf.getvalue()
+
+
+@pytest.mark.unit
+def test_trufor_integrity_head_created_once():
+    """Test that concurrent first detections share one randomly initialized integrity head"""
+    import threading
+
+    try:
+        import torch
+        from app.adapters.trufor_adapter import TruForAdapter
+    except ImportError as e:
+        pytest.skip(f"Cannot import TruFor adapter: {e}")
+
+    adapter = TruForAdapter.__new__(TruForAdapter)
+    adapter.device = torch.device("cpu")
+    features = torch.rand(1, 8)
+    barrier = threading.Barrier(8)
+    heads, scores = [], []
+
+    def first_detection():
+        barrier.wait()
+        heads.append(adapter._get_integrity_head())
+        scores.append(adapter._integrity_from_features(features, torch.zeros(1)))
+
+    threads = [threading.Thread(target=first_detection) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert all(head is heads[0] for head in heads)
+    assert scores == [scores[0]] * 8
+
+
+@pytest.mark.unit
+def test_trufor_reduced_jpeg_decode():
+    """Test DCT-domain JPEG downscaling, EXIF orientation and the PNG fallback"""
+    try:
+        import io
+        import torch
+        from PIL import Image
+        from app.adapters.trufor_adapter import TruForAdapter
+    except ImportError as e:
+        pytest.skip(f"Cannot import TruFor adapter: {e}")
+
+    adapter = TruForAdapter.__new__(TruForAdapter)
+    adapter.device = torch.device("cpu")
+    adapter.reduced_decode = True
+
+    # 4000x3000 stored, rotated 90 degrees by EXIF: upright original is 3000x4000
+    data = _smooth_jpeg(4000, 3000, orientation=6)
+    image, original = adapter._load_image(data, target_size=512)
+    assert original == (3000, 4000)
+    assert image.size == (750, 1000)  # 1/4 scale keeps both sides >= the 512px fit
+
+    fast, fast_meta = adapter._preprocess_image(data)
+    adapter.reduced_decode = False
+    full, full_meta = adapter._preprocess_image(data)
+    assert fast_meta == full_meta
+    assert (fast - full).abs().mean().item() < 0.02
+
+    # PNG and small JPEGs are decoded at full size
+    buf = io.BytesIO()
+    Image.new("RGB", (2000, 1000)).save(buf, "PNG")
+    adapter.reduced_decode = True
+    assert adapter._load_image(buf.getvalue(), target_size=512)[0].size == (2000, 1000)
+    assert adapter._load_image(_smooth_jpeg(900, 600), target_size=512)[0].size == (900, 600)
+
+
+@pytest.mark.unit
+def test_trufor_preview_thumbnail():
+    """Test that the preview thumbnail comes from the preprocessing decode"""
+    try:
+        import torch
+        from app.adapters.trufor_adapter import TruForAdapter
+    except ImportError as e:
+        pytest.skip(f"Cannot import TruFor adapter: {e}")
+
+    adapter = TruForAdapter.__new__(TruForAdapter)
+    adapter.device = torch.device("cpu")
+    adapter.reduced_decode = True
+
+    data = _smooth_jpeg(4000, 3000, orientation=6)
+    _, meta = adapter._preprocess_image(data, thumbnail_size=300)
+    assert meta['thumbnail'].shape == (300, 225, 3)
+    assert meta['thumbnail'].dtype == np.uint8
+
+    _, meta = adapter._preprocess_image(data, thumbnail_size=800)
+    assert max(meta['thumbnail'].shape[:2]) == 800
+
+    # Small images are not upscaled, and no thumbnail is made unless requested
+    _, meta = adapter._preprocess_image(_smooth_jpeg(200, 100), thumbnail_size=300)
+    assert meta['thumbnail'].shape == (100, 200, 3)
+    assert 'thumbnail' not in adapter._preprocess_image(data)[1]
+
+
+@pytest.mark.unit
+@pytest.mark.slow
+def test_trufor_reduced_decode_score_parity():
+    """Test that detection scores and maps match between reduced and full JPEG decode"""
+    try:
+        import torch
+        from app.adapters.trufor_adapter import TruForAdapter
+    except ImportError as e:
+        pytest.skip(f"Cannot import TruFor adapter: {e}")
+
+    model_path = Path("models/trufor.pth.tar")
+    # Random weights still exercise the full pipeline when the checkpoint is absent
+    adapter = TruForAdapter(model_path=str(model_path) if model_path.exists() else None, device="cpu")
+    data = _smooth_jpeg(4000, 3000)
+
+    fast = adapter.detect_sync(data, "photo.jpg", "image/jpeg")
+    adapter.reduced_decode = False
+    full = adapter.detect_sync(data, "photo.jpg", "image/jpeg")
+
+    assert fast["status"] == full["status"] == "success"
+    assert fast["image_size"] == full["image_size"] == (3000, 4000)
+    assert abs(fast["integrity"] - full["integrity"]) < 0.02
+    assert np.abs(fast["prediction_map"] - full["prediction_map"]).mean() < 0.02
+    assert np.abs(fast["confidence_map"] - full["confidence_map"]).mean() < 0.02
+
+
+@pytest.mark.unit
+def test_trufor_selective_outputs():
+    """Test that unrequested result parts are neither computed nor returned"""
+    try:
+        import torch
+        from app.adapters.trufor_adapter import ALL_OUTPUTS, TruForAdapter, parse_outputs
+    except ImportError as e:
+        pytest.skip(f"Cannot import TruFor adapter: {e}")
+
+    assert parse_outputs(None) == parse_outputs("all") == ALL_OUTPUTS
+    assert parse_outputs("maps") == {"score", "maps"}
+    assert parse_outputs(["Portrait", "score"]) == {"score", "portrait"}
+    with pytest.raises(ValueError):
+        parse_outputs("score,heatmap")
+
+    # Deterministic stand-in for the network, so no model is needed
+    def fake_forward(x):
+        ramp = torch.linspace(-2, 2, x.shape[-1]).expand(x.shape[0], 1, x.shape[-2], -1)
+        return ramp, -ramp, torch.zeros(x.shape[0], 1), ramp.repeat(1, 3, 1, 1)
+
+    adapter = TruForAdapter.__new__(TruForAdapter)
+    adapter.device = torch.device("cpu")
+    adapter.reduced_decode = True
+    adapter.batcher = None
+    adapter.forward_fn = fake_forward
+    data = _smooth_jpeg(640, 480)
+
+    full = adapter.detect_sync(data, "photo.jpg", "image/jpeg")
+    score = adapter.detect_sync(data, "photo.jpg", "image/jpeg", outputs="score")
+    noiseprint = adapter.detect_sync(data, "photo.jpg", "image/jpeg", outputs="noiseprint")
+
+    assert full["status"] == score["status"] == "success"
+    assert full["outputs"] == sorted(ALL_OUTPUTS) and score["outputs"] == ["score"]
+    assert "prediction_map" in full and "portrait_note" in full and full["has_noiseprint"]
+    for key in ("prediction_map", "weighted_prediction_map", "confidence_map", "noiseprint_map", "portrait_note"):
+        assert key not in score
+    assert not score["has_confidence_map"] and not score["has_noiseprint"]
+    assert score["integrity"] == full["integrity"]
+
+    assert "prediction_map" not in noiseprint
+    np.testing.assert_allclose(noiseprint["noiseprint_map"], full["noiseprint_map"], atol=1e-6)
+
+
+@pytest.mark.unit
+def test_trufor_batch_detection():
+    """Test that a batched forward pass gives each image its own result and isolates failures"""
+    try:
+        import torch
+        from app.adapters.trufor_adapter import TruForAdapter
+    except ImportError as e:
+        pytest.skip(f"Cannot import TruFor adapter: {e}")
+
+    calls = []
+
+    # Content-dependent stand-in for the network, so mixed-up batch slices would show
+    def fake_forward(x):
+        calls.append(x.shape[0])
+        scale = x.mean(dim=(1, 2, 3)).view(-1, 1, 1, 1) * 4
+        ramp = torch.linspace(-2, 2, x.shape[-1]).expand(x.shape[0], 1, x.shape[-2], -1) * scale
+        return ramp, -ramp, x.mean(dim=(1, 2, 3)).view(-1, 1), ramp.repeat(1, 3, 1, 1)
+
+    adapter = TruForAdapter.__new__(TruForAdapter)
+    adapter.device = torch.device("cpu")
+    adapter.reduced_decode = True
+    adapter.batcher = None
+    adapter.forward_fn = fake_forward
+    images = [_smooth_jpeg(640, 480), _smooth_jpeg(300, 500)]
+
+    results = adapter.detect_batch_sync([
+        (images[0], "a.jpg", "image/jpeg"),
+        (b"not an image", "broken.jpg", "image/jpeg"),
+        (images[1], "b.jpg", "image/jpeg"),
+        (b"", "clip.mp4", "video/mp4"),
+    ], resolution="report", outputs="maps")
+
+    assert calls == [2]
+    assert [r["status"] for r in results] == ["success", "error", "success", "error"]
+    for result, data, name in zip((results[0], results[2]), images, ("a.jpg", "b.jpg")):
+        single = adapter.detect_sync(data, name, "image/jpeg", resolution="report", outputs="maps")
+        assert result["filename"] == name
+        assert result["integrity"] == pytest.approx(single["integrity"], abs=1e-6)
+        np.testing.assert_allclose(result["prediction_map"], single["prediction_map"], atol=1e-5)
+    assert results[0]["integrity"] != results[2]["integrity"]
+
+    # A failing forward pass fails its batch, not the caller
+    adapter.forward_fn = lambda x: (_ for _ in ()).throw(RuntimeError("out of memory"))
+    results = adapter.detect_batch_sync([(images[0], "a.jpg", "image/jpeg")])
+    assert results[0]["status"] == "error" and "out of memory" in results[0]["message"]
+
+
+@pytest.mark.unit
+def test_deepfakebench_model_list_cache(tmp_path, monkeypatch):
+    """Test that the model list is cached until the weights directory changes"""
+    try:
+        from app.adapters.deepfakebench_adapter import DeepfakeBenchAdapter, WEIGHTS_BY_MODEL
+    except ImportError as e:
+        pytest.skip(f"Cannot import DeepfakeBench adapter: {e}")
+
+    monkeypatch.setattr(DeepfakeBenchAdapter, "WEIGHTS_DIR", str(tmp_path))
+    monkeypatch.setattr(DeepfakeBenchAdapter, "_available_models_cache", None)
+
+    models = DeepfakeBenchAdapter.get_available_models()
+    assert [model["key"] for model in models] == list(DeepfakeBenchAdapter.AVAILABLE_MODELS)
+    assert not any(model["available"] for model in models)
+
+    # Served from the cache: callers cannot mutate it, and no per-model stat happens
+    models[0]["available"] = True
+    exists_calls = []
+    monkeypatch.setattr("os.path.exists", lambda path: exists_calls.append(path) or False)
+    assert not any(model["available"] for model in DeepfakeBenchAdapter.get_available_models())
+    assert exists_calls == []
+    monkeypatch.undo()
+
+    # Adding a weight file updates the directory mtime and rebuilds the list
+    monkeypatch.setattr(DeepfakeBenchAdapter, "WEIGHTS_DIR", str(tmp_path))
+    (tmp_path / WEIGHTS_BY_MODEL["xception"][0]).write_bytes(b"weights")
+    available = {model["key"] for model in DeepfakeBenchAdapter.get_available_models() if model["available"]}
+    assert available == {"xception"}
+    assert DeepfakeBenchAdapter.get_weight_path("xception") == str(tmp_path / WEIGHTS_BY_MODEL["xception"][0])
+    assert DeepfakeBenchAdapter.get_weight_path("unknown") is None
+
+
+def _write_test_video(path, num_frames=20, size=(64, 48), fps=10.0):
+    """MJPG AVI whose frames get brighter over time (frame i has mean ~ 10 * i)"""
+    import cv2
+
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"MJPG"), fps, size)
+    if not writer.isOpened():
+        pytest.skip("OpenCV cannot write MJPG video here")
+    gradient = np.tile(np.linspace(0, 60, size[0], dtype=np.float32), (size[1], 1))
+    for i in range(num_frames):
+        frame = np.clip(gradient + 10 * i, 0, 255).astype(np.uint8)
+        writer.write(cv2.merge([frame, frame, frame]))
+    writer.release()
+    return path
+
+
+def _deepfakebench_test_adapter(model, batch_size=1, input_size=32, keyframe_cache_size=16):
+    """DeepfakeBenchAdapter around a stand-in network (no DeepfakeBench sources or weights needed)"""
+    from app.adapters.deepfakebench_adapter import DeepfakeBenchAdapter
+    from app.utils.frame_preprocess import PreprocessPlan
+
+    adapter = DeepfakeBenchAdapter.__new__(DeepfakeBenchAdapter)
+    adapter.model_key = "xception"
+    adapter.device = "cpu"
+    adapter.batch_size = batch_size
+    adapter.decode_backend = "opencv"
+    adapter.decode_prefetch = 4
+    adapter.keyframe_cache_size = keyframe_cache_size
+    adapter.model = model.eval()
+    adapter.transform_fn = None
+    adapter.input_size = input_size
+    adapter.preprocess_plan = PreprocessPlan(input_size)
+    adapter.call_style = adapter._resolve_call_style()
+    return adapter
+
+
+def _brightness_model():
+    """Stand-in detector with xception-style output whose fake probability follows frame brightness"""
+    import torch
+
+    class BrightnessModel(torch.nn.Module):
+        def __init__(self):
+            super().__init__()
+            self.batch_sizes = []
+
+        def forward(self, data_dict, inference=False):
+            x = data_dict["image"]
+            self.batch_sizes.append(x.shape[0])
+            brightness = x.mean(dim=(1, 2, 3))
+            cls = torch.stack([-brightness, brightness], dim=1)
+            return {"cls": cls, "prob": torch.softmax(cls, dim=1)[:, 1], "feat": x.mean(dim=(2, 3))}
+
+    return BrightnessModel()
+
+
+@pytest.mark.unit
+def test_deepfakebench_fake_probabilities():
+    """Test vectorized fake-probability extraction for every detector output convention"""
+    try:
+        import torch
+        from app.adapters.deepfakebench_adapter import fake_probabilities
+    except ImportError as e:
+        pytest.skip(f"Cannot import DeepfakeBench adapter: {e}")
+
+    cls = torch.tensor([[0.0, 2.0], [1.0, -1.0], [0.5, 0.5]])
+    two_class = torch.softmax(cls, dim=1)[:, 1]
+
+    # xception-style dict: prob is already the fake probability
+    assert torch.allclose(fake_probabilities({"cls": cls, "prob": two_class, "feat": cls}, 3), two_class)
+    # Two logits per frame, as a bare tensor or under a known key
+    assert torch.allclose(fake_probabilities(cls, 3), two_class)
+    assert torch.allclose(fake_probabilities({"logits": cls}, 3), two_class)
+    # One logit per frame, [B, 1] or [B]
+    single = torch.tensor([[0.0], [2.0], [-2.0]])
+    assert torch.allclose(fake_probabilities(single, 3), torch.sigmoid(single[:, 0]))
+    assert torch.allclose(fake_probabilities({"pred": single[:, 0]}, 3), torch.sigmoid(single[:, 0]))
+    # More classes: last one is fake
+    multi = torch.randn(3, 4)
+    assert torch.allclose(fake_probabilities(multi, 3), torch.softmax(multi, dim=1)[:, -1])
+    # Unbatched two-class output of a single frame
+    assert torch.allclose(fake_probabilities(torch.tensor([0.0, 2.0]), 1), two_class[:1])
+
+    with pytest.raises(ValueError):
+        fake_probabilities(torch.tensor([0.0, 1.0]), 3)
+
+
+@pytest.mark.unit
+def test_deepfakebench_call_style_resolution():
+    """Test that the call signature is found once at load time"""
+    try:
+        import torch
+    except ImportError as e:
+        pytest.skip(f"Cannot import torch: {e}")
+
+    class DictInferenceModel(torch.nn.Module):
+        def forward(self, data_dict, inference=False):
+            assert data_dict["label"].shape[0] == data_dict["image"].shape[0]
+            return {"cls": torch.zeros(data_dict["image"].shape[0], 2)}
+
+    class DictModel(torch.nn.Module):
+        def forward(self, data_dict):
+            return {"cls": torch.zeros(data_dict["image"].shape[0], 2)}
+
+    class TensorModel(torch.nn.Module):
+        def forward(self, x):
+            return torch.zeros(x.shape[0], 1)
+
+    try:
+        assert _deepfakebench_test_adapter(DictInferenceModel()).call_style == "dict_inference"
+    except ImportError as e:
+        pytest.skip(f"Cannot import DeepfakeBench adapter: {e}")
+    assert _deepfakebench_test_adapter(DictModel()).call_style == "dict"
+    assert _deepfakebench_test_adapter(TensorModel()).call_style == "tensor"
+
+
+@pytest.mark.unit
+def test_deepfakebench_batched_video_analysis(tmp_path):
+    """Test that batched frame inference scores a video exactly like one frame at a time"""
+    try:
+        from app.adapters.deepfakebench_adapter import DeepfakeBenchAdapter  # noqa: F401
+    except ImportError as e:
+        pytest.skip(f"Cannot import DeepfakeBench adapter: {e}")
+
+    video = _write_test_video(tmp_path / "clip.avi", num_frames=20, fps=10.0)
+
+    results = {}
+    for batch_size in (1, 3):
+        model = _brightness_model()
+        adapter = _deepfakebench_test_adapter(model, batch_size=batch_size)
+        model.batch_sizes.clear()  # drop the call-style probe
+        results[batch_size] = adapter.analyze_video(str(video), fps=5.0, threshold=0.5)
+        # 20 frames at 10 fps sampled at 5 fps -> 10 frames
+        assert sum(model.batch_sizes) == 10
+        assert max(model.batch_sizes) == batch_size
+
+    assert model.batch_sizes == [3, 3, 3, 1]
+    single, batched = results[1], results[3]
+    assert single["success"] and batched["success"]
+    assert [s["frame"] for s in batched["frame_scores"]] == list(range(10))
+    assert [s["timestamp"] for s in batched["frame_scores"]] == [s["timestamp"] for s in single["frame_scores"]]
+    np.testing.assert_allclose([s["probability"] for s in batched["frame_scores"]],
+                               [s["probability"] for s in single["frame_scores"]], atol=1e-6)
+    # Brighter frames score higher, so a mixed-up batch order would show
+    probs = [s["probability"] for s in batched["frame_scores"]]
+    assert probs == sorted(probs)
+    assert batched["overall_score"] == pytest.approx(single["overall_score"], abs=1e-6)
+
+
+def _write_segment_video(path, num_frames, bright_from, size=(320, 240), fps=10.0):
+    """MJPG AVI of dark frames that turn bright (suspicious to _brightness_model) at bright_from"""
+    import cv2
+
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"MJPG"), fps, size)
+    if not writer.isOpened():
+        pytest.skip("OpenCV cannot write MJPG video here")
+    gradient = np.tile(np.linspace(0, 40, size[0]), (size[1], 1))
+    for i in range(num_frames):
+        level = 200 if i >= bright_from else 0
+        # Frame number in the top row so every frame is distinct
+        frame = np.clip(gradient + level + (i % 7), 0, 255).astype(np.uint8)
+        frame[0, :8] = i % 256
+        writer.write(cv2.merge([frame, frame, frame]))
+    writer.release()
+    return path
+
+
+@pytest.mark.unit
+def test_deepfakebench_uncached_keyframes_are_reread(tmp_path):
+    """Test that keyframes missing from the keyframe cache are re-read from the video exactly"""
+    try:
+        from app.adapters.deepfakebench_adapter import DeepfakeBenchAdapter  # noqa: F401
+    except ImportError as e:
+        pytest.skip(f"Cannot import DeepfakeBench adapter: {e}")
+
+    keyframes = {}
+    for cache_size in (16, 0):
+        video_dir = tmp_path / f"cache_{cache_size}"
+        video_dir.mkdir()
+        video = _write_segment_video(video_dir / "clip.avi", num_frames=60, bright_from=30)
+        adapter = _deepfakebench_test_adapter(_brightness_model(), batch_size=4, keyframe_cache_size=cache_size)
+        result = adapter.analyze_video(str(video), fps=10.0, threshold=0.5)
+
+        assert len(result["suspicious_segments"]) == 1
+        segment = result["suspicious_segments"][0]
+        assert segment["start"] >= 2.5
+        keyframes[cache_size] = (video_dir / segment["keyframe_path"]).read_bytes()
+
+    assert keyframes[0] == keyframes[16]
+
+
+@pytest.mark.unit
+def test_deepfakebench_adaptive_sampling(tmp_path):
+    """Test that adaptive sampling finds the uniform segment while scoring a fraction of the frames"""
+    try:
+        from app.adapters.deepfakebench_adapter import DeepfakeBenchAdapter  # noqa: F401
+    except ImportError as e:
+        pytest.skip(f"Cannot import DeepfakeBench adapter: {e}")
+
+    video = _write_segment_video(tmp_path / "clip.avi", num_frames=300, bright_from=155)
+    model = _brightness_model()
+    adapter = _deepfakebench_test_adapter(model, batch_size=8)
+    uniform = adapter.analyze_video(str(video), fps=10.0, threshold=0.5)
+    model.batch_sizes.clear()
+    adaptive = adapter.analyze_video(str(video), fps=10.0, threshold=0.5, sampling="adaptive")
+
+    # 30 coarse frames at 1 fps, the 9 of the gap with the cut at 15.5s, the 9 of the gap before it
+    # (its smoothed score nears the threshold) and the 9 after the last coarse frame
+    sampling = adaptive["sampling"]
+    assert sampling["mode"] == "adaptive"
+    assert sampling["scored_frames"] == sum(model.batch_sizes) == 57
+    assert sampling["grid_frames"] == adaptive["total_frames"] == uniform["total_frames"] == 300
+    assert sampling["scene_cuts"] == [16.0]
+    assert sum(not s["interpolated"] for s in adaptive["frame_scores"]) == 57
+    assert [s["frame"] for s in adaptive["frame_scores"]] == list(range(300))
+
+    assert len(adaptive["suspicious_segments"]) == len(uniform["suspicious_segments"]) == 1
+    for key in ("start", "end"):
+        assert adaptive["suspicious_segments"][0][key] == pytest.approx(uniform["suspicious_segments"][0][key])
+    assert adaptive["overall_score"] == pytest.approx(uniform["overall_score"], abs=0.01)
+    assert adaptive["verdict"] == uniform["verdict"]
+    assert (tmp_path / adaptive["suspicious_segments"][0]["keyframe_path"]).exists()
+    assert "sampling" not in uniform
+
+    # A budget caps the frames scored, at the cost of a coarser timeline
+    model.batch_sizes.clear()
+    capped = adapter.analyze_video(str(video), fps=10.0, threshold=0.5, sampling="adaptive", frame_budget=20)
+    assert capped["sampling"]["scored_frames"] == sum(model.batch_sizes) <= 20
+
+    with pytest.raises(ValueError):
+        adapter.analyze_video(str(video), sampling="sparse")
+
+
+@pytest.mark.unit
+def test_deepfakebench_ensemble_decodes_once(tmp_path, monkeypatch):
+    """Test that an ensemble decodes the video once and matches each model analyzed alone"""
+    try:
+        import torch
+        import app.adapters.deepfakebench_adapter as dfb
+    except ImportError as e:
+        pytest.skip(f"Cannot import DeepfakeBench adapter: {e}")
+
+    class DarknessModel(torch.nn.Module):
+        """Bare-tensor detector scoring dark frames as fake"""
+        def forward(self, x):
+            return -x.mean(dim=(1, 2, 3), keepdim=True)[:, :, 0, 0]
+
+    def make_adapters():
+        bright = _deepfakebench_test_adapter(_brightness_model(), batch_size=4, input_size=32)
+        dark = _deepfakebench_test_adapter(DarknessModel(), batch_size=3, input_size=48)
+        dark.model_key = "meso4"
+        return [bright, dark]
+
+    video = _write_segment_video(tmp_path / "clip.avi", num_frames=60, bright_from=30)
+    alone = [adapter.analyze_video(str(video), fps=10.0, threshold=0.5) for adapter in make_adapters()]
+
+    opened = []
+
+    class CountingSource(dfb.VideoFrameSource):
+        def __init__(self, *args, **kwargs):
+            opened.append(args[0])
+            super().__init__(*args, **kwargs)
+
+    monkeypatch.setattr(dfb, "VideoFrameSource", CountingSource)
+    results = {workers: dfb.analyze_video_ensemble(make_adapters(), str(video), fps=10.0, threshold=0.5,
+                                                   workers=workers)
+               for workers in (1, 2)}
+    assert opened == [str(video), str(video)]
+
+    result = results[2]
+    assert result["success"]
+    assert result["model"] == "xception+meso4" and result["ensemble"] == ["xception", "meso4"]
+    for key, single in zip(result["ensemble"], alone):
+        assert result["models"][key]["frame_scores"] == single["frame_scores"]
+        assert result["models"][key]["overall_score"] == pytest.approx(single["overall_score"])
+        assert len(result["models"][key]["suspicious_segments"]) == 1
+        assert result["models"][key]["suspicious_segments"][0]["keyframe_path"] == f"keyframes/{key}_segment_1_keyframe.jpg"
+        assert (tmp_path / "keyframes" / f"{key}_segment_1_keyframe.jpg").exists()
+
+    # Fused scores are the per-frame mean, in frame order
+    expected = np.mean([[s["probability"] for s in single["frame_scores"]] for single in alone], axis=0)
+    np.testing.assert_allclose([s["probability"] for s in result["frame_scores"]], expected)
+    assert result["frame_scores"][0]["model_probabilities"] == {
+        "xception": alone[0]["frame_scores"][0]["probability"],
+        "meso4": alone[1]["frame_scores"][0]["probability"]
+    }
+    assert results[1]["frame_scores"] == result["frame_scores"]
+
+    fused_max = dfb.analyze_video_ensemble(make_adapters(), str(video), fps=10.0, threshold=0.5, fusion="max")
+    assert all(s["probability"] == max(s["model_probabilities"].values()) for s in fused_max["frame_scores"])
+    with pytest.raises(ValueError, match="Unknown fusion"):
+        dfb.analyze_video_ensemble(make_adapters(), str(video), fusion="median")
+    with pytest.raises(ValueError, match="Duplicate"):
+        dfb.analyze_video_ensemble(make_adapters()[:1] * 2, str(video))
+
+
+@pytest.mark.unit
+@pytest.mark.slow
+def test_deepfakebench_memory_independent_of_video_length(tmp_path):
+    """Test that peak memory during analysis does not grow with the number of sampled frames"""
+    import tracemalloc
+
+    try:
+        from app.adapters.deepfakebench_adapter import DeepfakeBenchAdapter  # noqa: F401
+    except ImportError as e:
+        pytest.skip(f"Cannot import DeepfakeBench adapter: {e}")
+
+    videos = {}
+    for num_frames in (60, 360):
+        video_dir = tmp_path / str(num_frames)
+        video_dir.mkdir()
+        videos[num_frames] = _write_segment_video(video_dir / "clip.avi", num_frames=num_frames,
+                                                  bright_from=num_frames // 2)
+    adapter = _deepfakebench_test_adapter(_brightness_model(), batch_size=4)
+    # Untraced first run, so one-time imports and caches do not count towards the short video
+    adapter.analyze_video(str(videos[60]), fps=10.0, threshold=0.5)
+
+    peaks = {}
+    for num_frames, video in videos.items():
+        tracemalloc.start()
+        try:
+            result = adapter.analyze_video(str(video), fps=10.0, threshold=0.5)
+            peaks[num_frames] = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        assert result["total_frames"] == num_frames
+
+    # Keeping every sampled 320x240 frame would add 300 * 230 KB = 69 MB for the long video
+    frame_bytes = 320 * 240 * 3
+    assert peaks[360] - peaks[60] < 10 * frame_bytes, peaks
+
@@ -0,0 +1,89 @@
+"""
+Unit tests for coarse-to-fine adaptive frame sampling
+
+Tests include:
+- Coarse stride from the sampling rates and the frame budget
+- Refinement of gaps crossing or nearing the threshold, and of scene cuts
+- Budget spent on the most uncertain gaps first
+- Interpolated timeline over the full sampling grid
+"""
+import pytest
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.utils.adaptive_sampling import coarse_stride, fill_grid, frame_signature, plan_refinement, scene_cuts
+
+
+@pytest.mark.unit
+def test_coarse_stride():
+    """Test that the coarse pass runs at about coarse_fps and within half the budget"""
+    assert coarse_stride(3.0, 300) == 3
+    assert coarse_stride(0.5, 300) == 1
+    assert coarse_stride(10.0, 300, coarse_fps=2.0) == 5
+    # 300 grid frames, budget 40: at most 20 coarse frames
+    assert coarse_stride(3.0, 300, frame_budget=40) == 15
+    assert coarse_stride(3.0, 300, frame_budget=1000) == 3
+
+
+@pytest.mark.unit
+def test_plan_refines_uncertain_gaps():
+    """Test that only gaps crossing or nearing the threshold, or following a scene cut, are refined"""
+    coarse = {0: 0.05, 10: 0.05, 20: 0.9, 30: 0.9, 40: 0.45, 50: 0.1, 60: 0.1, 70: 0.1}
+
+    planned = plan_refinement(coarse, 71, threshold=0.5)
+    # 10-20 crosses; 20-30 (smoothed), 30-40 and 40-50 come within the margin; clean 0-10, 50-60 and 60-70 stay coarse
+    assert planned == [*range(11, 20), *range(21, 30), *range(31, 40), *range(41, 50)]
+    # A smoothed score nearing the threshold counts: 0.1 next to 0.9 smooths to 0.37
+    assert plan_refinement({**coarse, 0: 0.1, 10: 0.1}, 71, threshold=0.5)[:9] == list(range(1, 10))
+
+    # A scene cut between two clean coarse frames is refined too
+    assert set(range(61, 70)) <= set(plan_refinement(coarse, 71, threshold=0.5, cuts=[70]))
+    # Frames after the last coarse frame are always scored
+    assert plan_refinement({0: 0.1, 10: 0.1}, 14, threshold=0.5) == [11, 12, 13]
+    assert plan_refinement({}, 10, threshold=0.5) == []
+
+
+@pytest.mark.unit
+def test_plan_respects_frame_budget():
+    """Test that a budget takes crossings first, then the gaps nearest the threshold"""
+    coarse = {0: 0.1, 10: 0.9, 20: 0.9, 30: 0.4, 40: 0.1, 50: 0.6, 60: 0.6}
+
+    # 7 coarse frames + 9 for the crossing 0-10; the remaining gaps do not fit
+    assert plan_refinement(coarse, 61, threshold=0.5, frame_budget=16) == list(range(1, 10))
+    # Crossings 0-10, 20-30 and 40-50 first, then 30-40, whose smoothed score is nearest the threshold
+    planned = plan_refinement(coarse, 61, threshold=0.5, frame_budget=7 + 36)
+    assert planned == [*range(1, 10), *range(21, 30), *range(31, 40), *range(41, 50)]
+    assert len(plan_refinement(coarse, 61, threshold=0.5)) == 54
+
+
+@pytest.mark.unit
+def test_scene_cuts():
+    """Test that abrupt picture changes between coarse frames are found"""
+    dark = np.zeros((48, 64, 3), dtype=np.uint8)
+    bright = np.full((48, 64, 3), 200, dtype=np.uint8)
+    signatures = {0: frame_signature(dark), 10: frame_signature(dark + 5), 20: frame_signature(bright),
+                  30: frame_signature(bright)}
+
+    assert frame_signature(dark).shape == (32, 32)
+    assert scene_cuts(signatures) == [20]
+
+
+@pytest.mark.unit
+def test_fill_grid_interpolates():
+    """Test that unscored grid frames are interpolated between their scored neighbours"""
+    def score(index, probability, anomalous=False):
+        return {"frame": index, "timestamp": index / 2.0, "probability": probability, "is_anomalous": anomalous}
+
+    grid = fill_grid({0: score(0, 0.0), 4: score(4, 0.8, True), 5: score(5, 0.4, True)}, fps=2.0)
+
+    assert [s["frame"] for s in grid] == [0, 1, 2, 3, 4, 5]
+    assert [s["probability"] for s in grid] == pytest.approx([0.0, 0.2, 0.4, 0.6, 0.8, 0.4])
+    assert [s["timestamp"] for s in grid] == pytest.approx([0.0, 0.5, 1.0, 1.5, 2.0, 2.5])
+    assert [s["interpolated"] for s in grid] == [False, True, True, True, False, False]
+    assert [s["is_anomalous"] for s in grid] == [False, False, False, False, True, True]
+    assert fill_grid({}, fps=2.0) == []
@@ -0,0 +1,95 @@
+"""
+Unit tests for cacheable file responses
+
+Tests include:
+- ETag validation with If-None-Match (304)
+- Byte ranges, suffix ranges and If-Range (206)
+- Unsatisfiable ranges (416)
+- Range header parsing
+"""
+import pytest
+import sys
+from pathlib import Path
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+from app.utils.file_serving import parse_range, serve_file
+
+CONTENT = bytes(range(256)) * 4
+
+
+@pytest.fixture
+def client(tmp_path):
+    path = tmp_path / "input.jpg"
+    path.write_bytes(CONTENT)
+
+    app = FastAPI()
+
+    @app.get("/file")
+    async def get_file(request: Request):
+        return serve_file(request, path)
+
+    return TestClient(app)
+
+
+@pytest.mark.unit
+def test_full_response_and_etag(client):
+    """Test that full responses carry validators and revalidate with 304"""
+    response = client.get("/file")
+    assert response.status_code == 200
+    assert response.content == CONTENT
+    assert response.headers["content-type"] == "image/jpeg"
+    assert response.headers["accept-ranges"] == "bytes"
+    assert "private" in response.headers["cache-control"]
+    etag = response.headers["etag"]
+
+    revalidated = client.get("/file", headers={"If-None-Match": etag})
+    assert revalidated.status_code == 304
+    assert revalidated.content == b""
+    assert client.get("/file", headers={"If-None-Match": '"other"'}).status_code == 200
+
+
+@pytest.mark.unit
+def test_range_requests(client):
+    """Test explicit, open-ended and suffix ranges"""
+    response = client.get("/file", headers={"Range": "bytes=10-19"})
+    assert response.status_code == 206
+    assert response.content == CONTENT[10:20]
+    assert response.headers["content-range"] == f"bytes 10-19/{len(CONTENT)}"
+    assert response.headers["content-length"] == "10"
+
+    assert client.get("/file", headers={"Range": "bytes=1000-"}).content == CONTENT[1000:]
+    assert client.get("/file", headers={"Range": "bytes=-24"}).content == CONTENT[-24:]
+    assert client.get("/file", headers={"Range": "bytes=1020-5000"}).content == CONTENT[1020:]
+
+
+@pytest.mark.unit
+def test_if_range_and_unsatisfiable(client):
+    """Test that stale If-Range returns the full file and bad ranges return 416"""
+    etag = client.get("/file").headers["etag"]
+    assert client.get("/file", headers={"Range": "bytes=0-9", "If-Range": etag}).status_code == 206
+
+    stale = client.get("/file", headers={"Range": "bytes=0-9", "If-Range": '"stale"'})
+    assert stale.status_code == 200 and stale.content == CONTENT
+
+    response = client.get("/file", headers={"Range": f"bytes={len(CONTENT)}-"})
+    assert response.status_code == 416
+    assert response.headers["content-range"] == f"bytes */{len(CONTENT)}"
+
+
+@pytest.mark.unit
+def test_parse_range():
+    """Test Range header parsing edge cases"""
+    assert parse_range("bytes=0-0", 10) == (0, 0)
+    assert parse_range("bytes=-100", 10) == (0, 9)
+    assert parse_range("items=0-5", 10) is None
+    assert parse_range("bytes=0-1,4-5", 10) is None
+    assert parse_range("bytes=a-b", 10) is None
+    with pytest.raises(ValueError):
+        parse_range("bytes=5-2", 10)
+    with pytest.raises(ValueError):
+        parse_range("bytes=-0", 10)
@@ -0,0 +1,108 @@
+"""
+Unit tests for DeepfakeBench frame preprocessing
+
+Tests include:
+- Batched cv2 preprocessing matches the per-frame torchvision pipeline
+- Luminance of the downscaled frame flags black and low-contrast frames
+- Buffers are reused across batches; custom transform_fn is still honoured
+"""
+import pytest
+import sys
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+torch = pytest.importorskip("torch")
+
+from app.utils.frame_preprocess import PreprocessPlan, luminance
+
+
+def _test_frame(size=(1280, 720), shift=0):
+    """Smooth BGR frame with a gradient and a bright disc"""
+    w, h = size
+    xx, yy = np.meshgrid(np.arange(w), np.arange(h))
+    frame = cv2.merge([((xx + shift) % 256).astype(np.uint8), (yy % 256).astype(np.uint8),
+                       np.full((h, w), 90, dtype=np.uint8)])
+    cv2.circle(frame, (w // 2, h // 2), min(w, h) // 4, (255, 255, 255), -1)
+    return cv2.GaussianBlur(frame, (5, 5), 0)
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("size,input_size", [((1280, 720), 299), ((320, 240), 256), ((64, 48), 128)])
+def test_matches_torchvision_pipeline(size, input_size):
+    """Test that the batch tensor matches ToPILImage/Resize/ToTensor/Normalize per frame"""
+    transforms = pytest.importorskip("torchvision.transforms")
+    reference = transforms.Compose([
+        transforms.ToPILImage(),
+        transforms.Resize((input_size, input_size)),
+        transforms.ToTensor(),
+        transforms.Normalize(mean=[0.485, 0.456, 0.406], std=[0.229, 0.224, 0.225]),
+    ])
+    frames = [_test_frame(size, shift) for shift in (0, 40, 80)]
+
+    batch = PreprocessPlan(input_size).new_batch(capacity=4)
+    for frame in frames:
+        batch.add(frame)
+    tensor = batch.tensor()
+
+    assert tensor.shape == (3, 3, input_size, input_size)
+    assert tensor.dtype == torch.float32
+    for i, frame in enumerate(frames):
+        expected = reference(cv2.cvtColor(frame, cv2.COLOR_BGR2RGB))
+        # cv2 and PIL resampling differ by a fraction of a grey level on average
+        diff = (tensor[i] - expected).abs()
+        assert diff.mean() < 0.01
+        assert diff.max() < 0.5
+
+
+@pytest.mark.unit
+def test_luminance_on_downscaled_frame():
+    """Test that luminance at input size agrees with full resolution for the anomaly check"""
+    plan = PreprocessPlan(256)
+    batch = plan.new_batch(capacity=3)
+
+    textured = _test_frame()
+    mean, std = batch.add(textured)
+    gray = cv2.cvtColor(textured, cv2.COLOR_BGR2GRAY)
+    assert mean == pytest.approx(gray.mean(), abs=1.0)
+    assert std == pytest.approx(gray.std(), abs=2.0)
+
+    black = np.full((720, 1280, 3), 5, dtype=np.uint8)
+    assert batch.add(black)[0] < 15
+    uniform = np.full((720, 1280, 3), 128, dtype=np.uint8)
+    assert batch.add(uniform)[1] < 10
+
+    with pytest.raises(ValueError, match="full"):
+        batch.add(textured)
+    assert luminance(np.zeros((8, 8, 3), dtype=np.uint8)) == (0.0, 0.0)
+
+
+@pytest.mark.unit
+def test_buffers_reused_and_transform_fn():
+    """Test that batches reuse the same buffers and a model transform_fn takes over"""
+    plan = PreprocessPlan(32)
+    batch = plan.new_batch(capacity=2)
+    batch.add(_test_frame((64, 48)))
+    first = batch.tensor()
+    batch.clear()
+    assert len(batch) == 0
+    batch.add(_test_frame((64, 48), shift=100), bgr=False)
+    second = batch.tensor()
+    assert second.data_ptr() == first.data_ptr()
+    assert second.shape == (1, 3, 32, 32)
+
+    def transform_fn(rgb):
+        return torch.full((3, 8, 8), float(rgb[0, 0, 0]))
+
+    custom = plan.new_batch(capacity=2, transform_fn=transform_fn)
+    frame = np.zeros((48, 64, 3), dtype=np.uint8)
+    frame[..., 2] = 200  # red in BGR
+    custom.add(frame)
+    custom.add(frame, bgr=False)
+    tensor = custom.tensor()
+    assert tensor.shape == (2, 3, 8, 8)
+    assert tensor[0, 0, 0, 0] == 200 and tensor[1, 0, 0, 0] == 0
@@ -0,0 +1,85 @@
+"""
+Unit tests for the heatmap renderer
+
+Tests include:
+- Colormap lookup tables
+- Rendering with and without legend strip
+- PNG output and map storage for report re-rendering
+"""
+import pytest
+import sys
+from pathlib import Path
+
+import numpy as np
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+cv2 = pytest.importorskip("cv2")
+
+from app.reports.heatmap_renderer import (
+    get_colormap_lut, render_heatmap, save_heatmap,
+    save_trufor_maps, load_trufor_maps, render_trufor_visualizations
+)
+
+
+@pytest.mark.unit
+def test_colormap_luts():
+    """Test LUT shape and endpoints"""
+    gray = get_colormap_lut("gray")
+    assert gray.shape == (256, 3)
+    assert tuple(gray[0]) == (0, 0, 0) and tuple(gray[255]) == (255, 255, 255)
+
+    jet = get_colormap_lut("jet")
+    # Jet runs from blue to red (RGB order)
+    assert jet[0][2] > jet[0][0]
+    assert jet[255][0] > jet[255][2]
+
+    with pytest.raises(ValueError):
+        get_colormap_lut("rainbow-unicorn")
+
+
+@pytest.mark.unit
+def test_render_heatmap_colors_and_legend():
+    """Test that pixels map through the LUT and the legend widens the image"""
+    arr = np.zeros((64, 80), dtype=np.float32)
+    arr[:, 40:] = 1.0
+
+    plain = render_heatmap(arr, "jet", legend=False)
+    assert plain.shape == (64, 80, 3)
+    jet = get_colormap_lut("jet")
+    assert tuple(plain[0, 0]) == tuple(jet[0])
+    assert tuple(plain[0, 79]) == tuple(jet[255])
+
+    with_legend = render_heatmap(arr, "viridis", legend=True, label="Confidence")
+    assert with_legend.shape[0] == 64
+    assert with_legend.shape[1] > 80
+
+
+@pytest.mark.unit
+def test_save_heatmap_png(tmp_path):
+    """Test that saved heatmaps are valid PNG files"""
+    arr = np.random.default_rng(0).random((30, 40), dtype=np.float32)
+    path = save_heatmap(arr, tmp_path / "map.png", "gray", legend=False)
+    img = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+    assert img.shape == (30, 40)
+    assert np.abs(img.astype(np.float32) / 255 - arr).max() <= 0.5 / 255 + 1e-6
+
+
+@pytest.mark.unit
+def test_trufor_maps_round_trip_and_render(tmp_path):
+    """Test storing maps and re-rendering the visualizations from them"""
+    arr = np.linspace(0, 1, 20 * 30, dtype=np.float32).reshape(20, 30)
+    save_trufor_maps(tmp_path, {"prediction_map": arr, "confidence_map": arr, "noiseprint_map": None})
+
+    maps = load_trufor_maps(tmp_path)
+    assert set(maps) == {"prediction_map", "confidence_map"}
+    assert np.abs(maps["prediction_map"] - arr).max() < 1e-3
+
+    paths = render_trufor_visualizations(tmp_path, "job1", maps)
+    assert set(paths) == {"heatmap", "conf"}
+    assert (tmp_path / "job1_heatmap.png").exists()
+    assert (tmp_path / "job1_conf.png").exists()
+    assert not (tmp_path / "job1_noiseprint.png").exists()
+
+    assert load_trufor_maps(tmp_path / "missing") == {}
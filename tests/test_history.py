@@ -6,6 +6,8 @@ Tests include:
 - Record creation and retrieval
 - Data persistence
 - User-specific history filtering
+- Bulk recording of batch jobs
+- Per-model usage counts
 """
 import pytest
 import sys
@@ -270,3 +272,46 @@ def test_history_statistics():
     assert fake_count == 2
     assert 0.8 < avg_confidence < 0.9
 
+
+
+@pytest.mark.unit
+def test_history_bulk_completed_jobs(tmp_path):
+    """Test that batch jobs are written once in their final state and listed in history"""
+    from app.history.history_manager import HistoryManager
+
+    manager = HistoryManager(data_dir=str(tmp_path))
+    written = manager.create_completed_jobs([
+        {"job_id": "trufor_a", "username": "alice", "filename": "a.jpg", "detection_type": "trufor",
+         "model": "trufor", "result": {"verdict": "real"}, "batch_id": "batch_1"},
+        {"job_id": "trufor_b", "username": "alice", "filename": "b.jpg", "detection_type": "trufor",
+         "model": "trufor", "error": "Detection failed", "batch_id": "batch_1"},
+    ])
+
+    assert written == 2
+    completed = manager.get_job_details("trufor_a", "alice", "analyst")
+    assert completed["status"] == "completed" and completed["result"] == {"verdict": "real"}
+    assert completed["completed_at"] is not None and completed["batch_id"] == "batch_1"
+    failed = manager.get_job_details("trufor_b", "alice", "analyst")
+    assert failed["status"] == "failed" and failed["error"] == "Detection failed"
+    assert manager.get_job_details("trufor_a", "bob", "analyst") is None
+
+
+@pytest.mark.unit
+def test_history_model_usage(tmp_path):
+    """Test that jobs are counted per model for one detection type, most used first"""
+    from app.history.history_manager import HistoryManager
+
+    manager = HistoryManager(data_dir=str(tmp_path))
+    manager.create_completed_jobs([
+        {"job_id": f"dfb_{i}", "username": "alice", "filename": "v.mp4", "detection_type": "deepfakebench",
+         "model": model, "result": {}}
+        for i, model in enumerate(["meso4", "xception", "xception", "f3net", "xception", "meso4+f3net"])
+    ] + [
+        {"job_id": "trufor_a", "username": "alice", "filename": "a.jpg", "detection_type": "trufor",
+         "model": "trufor", "result": {}},
+    ])
+
+    # The ensemble job counts for both of its models
+    usage = manager.get_model_usage("deepfakebench")
+    assert usage == {"xception": 3, "meso4": 2, "f3net": 2}
+    assert list(usage) == ["xception", "meso4", "f3net"]
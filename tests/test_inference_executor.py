@@ -0,0 +1,122 @@
+"""
+Unit tests for the bounded inference executor
+
+Tests include:
+- Running work off the caller thread
+- Queue-full rejection with Retry-After
+- Queue depth and wait statistics
+- Waiting for a free slot instead of polling
+"""
+import pytest
+import sys
+import asyncio
+import threading
+from pathlib import Path
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.utils.inference_executor import InferenceExecutor, InferenceQueueFull
+
+
+@pytest.mark.unit
+def test_submit_runs_work():
+    """Test that submitted work runs and returns its result"""
+    executor = InferenceExecutor(max_workers=1, max_queue_size=1)
+    try:
+        assert executor.submit(lambda a, b: a + b, 2, 3).result(timeout=5) == 5
+        stats = executor.stats()
+        assert stats["completed"] == 1
+        assert stats["queue_depth"] == 0
+        assert stats["running"] == 0
+    finally:
+        executor.shutdown()
+
+
+@pytest.mark.unit
+def test_queue_full_rejects_with_retry_after():
+    """Test that submissions beyond workers + queue are rejected"""
+    gate = threading.Event()
+    executor = InferenceExecutor(max_workers=1, max_queue_size=1)
+    try:
+        running = executor.submit(gate.wait)
+        queued = executor.submit(gate.wait)
+
+        with pytest.raises(InferenceQueueFull) as exc_info:
+            executor.submit(gate.wait)
+        assert exc_info.value.retry_after >= 1
+
+        stats = executor.stats()
+        assert stats["rejected"] == 1
+        assert stats["queue_depth"] + stats["running"] == 2
+
+        gate.set()
+        running.result(timeout=5)
+        queued.result(timeout=5)
+
+        # Capacity is released once work finishes
+        assert executor.submit(lambda: 1).result(timeout=5) == 1
+    finally:
+        gate.set()
+        executor.shutdown()
+
+
+@pytest.mark.unit
+def test_failures_are_counted_and_raised():
+    """Test that exceptions propagate and are counted"""
+    def fail():
+        raise ValueError("bad image")
+
+    executor = InferenceExecutor(max_workers=1, max_queue_size=0)
+    try:
+        with pytest.raises(ValueError):
+            executor.submit(fail).result(timeout=5)
+        assert executor.stats()["failed"] == 1
+    finally:
+        executor.shutdown()
+
+
+@pytest.mark.unit
+def test_run_keeps_event_loop_responsive():
+    """Test that awaiting blocking work does not block other coroutines"""
+    gate = threading.Event()
+    executor = InferenceExecutor(max_workers=1, max_queue_size=0)
+
+    async def scenario():
+        task = asyncio.ensure_future(executor.run(gate.wait, 5))
+        # The loop is still free while the worker blocks
+        await asyncio.sleep(0.01)
+        assert not task.done()
+        gate.set()
+        return await task
+
+    try:
+        assert asyncio.run(scenario()) is True
+    finally:
+        gate.set()
+        executor.shutdown()
+
+
+@pytest.mark.unit
+def test_wait_for_slot_wakes_on_completion():
+    """Test that wait_for_slot returns when work finishes, or False on timeout"""
+    gate = threading.Event()
+    executor = InferenceExecutor(max_workers=1, max_queue_size=0)
+
+    async def scenario():
+        assert await executor.wait_for_slot(timeout=0.01) is True
+        executor.submit(gate.wait, 5)
+        assert await executor.wait_for_slot(timeout=0.05) is False
+
+        waiter = asyncio.ensure_future(executor.wait_for_slot(timeout=5))
+        await asyncio.sleep(0.01)
+        assert not waiter.done()
+        gate.set()
+        return await asyncio.wait_for(waiter, 1)
+
+    try:
+        assert asyncio.run(scenario()) is True
+        assert executor._slot_waiters == []
+    finally:
+        gate.set()
+        executor.shutdown()
@@ -3,10 +3,18 @@ Integration tests for API endpoints
 
 Tests include:
 - Health check endpoint
+- Readiness endpoint and background model loading
+- Prometheus metrics endpoint
 - User registration and login
 - Model status endpoint
 - Detection history endpoint
 - Authentication flow
+- Detection request validation
+- Failed detections and abandoned batch streams leave no job directories behind
+- Batch detection streaming (NDJSON) with ZIP archives and bulk history
+- DeepfakeBench jobs sharing pooled models
+- DeepfakeBench ensemble requests and jobs
+- DeepfakeBench adaptive sampling requests
 """
 import pytest
 import time
@@ -69,6 +77,66 @@ def test_health_endpoint(client):
     assert "timestamp" in data
 
 
+@pytest.mark.integration
+def test_ready_endpoint_reports_model_state(client, monkeypatch):
+    """Test that /ready returns 503 while a model loads and 200 once it is loaded"""
+    import app.main as main
+    from app.utils.model_readiness import ModelReadiness
+
+    readiness = ModelReadiness()
+    readiness.register("trufor")
+    monkeypatch.setattr(main, "model_readiness", readiness)
+
+    response = client.get("/ready")
+    assert response.status_code == 503
+    assert response.json()["models"]["trufor"]["state"] == "pending"
+
+    readiness.loading("trufor")
+    readiness.ready("trufor")
+    response = client.get("/ready")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["ready"] is True
+    assert data["models"]["trufor"]["load_seconds"] >= 0
+
+
+@pytest.mark.integration
+def test_models_load_in_background(monkeypatch, tmp_path):
+    """Test that startup does not wait for model loading and /ready settles afterwards"""
+    torch = pytest.importorskip("torch")
+    import app.main as main
+    from app.utils.model_readiness import ModelReadiness
+
+    monkeypatch.setenv("MODEL_PATH", str(tmp_path / "missing.pth.tar"))
+    monkeypatch.setattr(main, "model_readiness", ModelReadiness())
+    previous_threads = torch.get_num_threads()
+    try:
+        with TestClient(main.app) as lifespan_client:
+            assert lifespan_client.get("/health").status_code == 200
+            deadline = time.time() + 120
+            while (response := lifespan_client.get("/ready")).status_code == 503 and time.time() < deadline:
+                time.sleep(0.1)
+            assert response.status_code == 200
+            models = response.json()["models"]
+            assert models["trufor"]["state"] == "unavailable"
+            assert models["deepfakebench"]["state"] in ("ready", "failed")
+    finally:
+        torch.set_num_threads(previous_threads)
+
+
+@pytest.mark.integration
+def test_metrics_endpoint(client):
+    """Test that /metrics serves Prometheus text with queue and cache gauges"""
+    response = client.get("/metrics")
+    
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert "# TYPE deepfake_stage_duration_seconds histogram" in response.text
+    assert "deepfake_inference_queue_depth" in response.text
+    assert "deepfake_result_cache_hits" in response.text
+    assert "deepfake_model_pool_resident_mb" in response.text
+
+
 @pytest.mark.integration
 def test_register_user(client, test_user_credentials):
     """Test user registration endpoint"""
@@ -187,6 +255,209 @@ def test_detect_endpoint_requires_auth(client):
     assert response.status_code in [401, 403, 422]  # 422 if no file provided
 
 
+@pytest.mark.integration
+def test_detect_rejects_unknown_outputs(client, auth_token):
+    """Test that an unknown entry in the outputs list is rejected before any work"""
+    headers = {"Authorization": f"Bearer {auth_token}"}
+    response = client.post(
+        "/detect",
+        headers=headers,
+        files={"file": ("photo.jpg", b"not inspected", "image/jpeg")},
+        data={"outputs": "score,heatmap"}
+    )
+
+    assert response.status_code == 400
+    assert "heatmap" in response.json()["detail"]
+
+
+@pytest.mark.integration
+def test_detect_while_model_loading(client, auth_token, monkeypatch):
+    """Test that /detect answers 503 with Retry-After until TruFor has loaded"""
+    import app.main as main
+    from app.utils.model_readiness import ModelReadiness
+
+    readiness = ModelReadiness()
+    readiness.register("trufor")
+    monkeypatch.setattr(main, "model_readiness", readiness)
+    monkeypatch.setattr(main, "detection_adapter", None)
+    headers = {"Authorization": f"Bearer {auth_token}"}
+    files = {"file": ("photo.jpg", b"not inspected", "image/jpeg")}
+
+    response = client.post("/detect", headers=headers, files=files)
+    assert response.status_code == 503
+    assert "Retry-After" in response.headers
+
+    readiness.unavailable("trufor", "Model not found")
+    response = client.post("/detect", headers=headers, files=files)
+    assert response.status_code == 503
+    assert "Retry-After" not in response.headers
+
+
+@pytest.fixture
+def batch_app(monkeypatch, tmp_path):
+    """app.main with a TruFor adapter on a stand-in network and job storage in tmp_path"""
+    torch = pytest.importorskip("torch")
+    import app.main as main
+    from app.adapters.trufor_adapter import TruForAdapter
+    from app.history.history_manager import HistoryManager
+    from app.utils.result_cache import ResultCache
+
+    calls = []
+
+    def fake_forward(x):
+        calls.append(x.shape[0])
+        ramp = torch.linspace(-2, 2, x.shape[-1]).expand(x.shape[0], 1, x.shape[-2], -1)
+        ramp = ramp * x.mean(dim=(1, 2, 3)).view(-1, 1, 1, 1)
+        return ramp, -ramp, torch.zeros(x.shape[0], 1), ramp.repeat(1, 3, 1, 1)
+
+    adapter = TruForAdapter.__new__(TruForAdapter)
+    adapter.device = torch.device("cpu")
+    adapter.reduced_decode = True
+    adapter.batcher = None
+    adapter.forward_fn = fake_forward
+    adapter.model_path = None
+    adapter.tile_batch_size = 2
+
+    monkeypatch.setattr(main, "detection_adapter", adapter)
+    monkeypatch.setattr(main, "DATA_DIR", tmp_path / "jobs")
+    monkeypatch.setattr(main, "UPLOAD_SPOOL_DIR", tmp_path / "jobs" / ".incoming")
+    monkeypatch.setattr(main, "history_manager", HistoryManager(data_dir=str(tmp_path / "jobs")))
+    monkeypatch.setattr(main, "result_cache", ResultCache(cache_dir=str(tmp_path / "cache")))
+    return main, calls
+
+
+def _png_bytes(value, size=(64, 48)):
+    """Solid-colour PNG"""
+    import io
+    from PIL import Image
+
+    buf = io.BytesIO()
+    Image.new("RGB", size, (value, value // 2, 255 - value)).save(buf, "PNG")
+    return buf.getvalue()
+
+
+@pytest.mark.integration
+def test_detect_batch_streams_ndjson(client, auth_token, batch_app):
+    """Test batch detection of files and a ZIP archive with per-image failures"""
+    import io
+    import json
+    import zipfile
+
+    main, calls = batch_app
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, "w") as zf:
+        zf.writestr("folder/c.png", _png_bytes(200))
+        zf.writestr("folder/notes.txt", b"not an image")
+        zf.writestr("folder/broken.jpg", b"not a jpeg")
+        zf.writestr("__MACOSX/folder/._c.png", b"resource fork")
+
+    headers = {"Authorization": f"Bearer {auth_token}"}
+    files = [
+        ("files", ("a.png", _png_bytes(10), "image/png")),
+        ("files", ("b.png", _png_bytes(120), "image/png")),
+        ("files", ("clip.gif", b"GIF89a", "image/gif")),
+        ("files", ("photos.zip", archive.getvalue(), "application/zip")),
+    ]
+    response = client.post("/detect/batch", headers=headers, files=files, data={"outputs": "score,maps"})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    by_name = {line["filename"]: line for line in lines}
+    assert len(lines) == 6
+    assert sorted(line["index"] for line in lines) == list(range(6))
+    for name in ("a.png", "b.png", "folder/c.png"):
+        assert by_name[name]["status"] == "success"
+        assert "prediction_map" not in by_name[name]
+        assert (main.DATA_DIR / by_name[name]["job_id"] / main.PREVIEW_FILENAME).exists()
+    for name in ("clip.gif", "folder/notes.txt", "folder/broken.jpg"):
+        assert by_name[name]["status"] == "error"
+    assert sorted(calls) == [1, 2]  # Chunks [a, b] and [c, broken]; broken.jpg fails preprocessing
+
+    # One history job per image that reached the model, written at the end of the stream
+    user = client.get("/api/auth/me", headers=headers).json()
+    good = main.history_manager.get_job_details(by_name["folder/c.png"]["job_id"], user["username"], user["role"])
+    assert good["status"] == "completed" and good["batch_id"] == response.headers["X-Batch-Id"]
+    broken = main.history_manager.get_job_details(by_name["folder/broken.jpg"]["job_id"], user["username"], user["role"])
+    assert broken["status"] == "failed"
+    assert "job_id" not in by_name["clip.gif"]
+
+    # Re-submitted images are answered from the result cache
+    calls.clear()
+    response = client.post("/detect/batch", headers=headers, files=files[:1], data={"outputs": "score,maps"})
+    assert json.loads(response.text)["cached"] is True
+    assert calls == []
+
+
+@pytest.mark.integration
+def test_detect_batch_rejects_invalid_archive(client, auth_token, batch_app):
+    """Test that a corrupt archive fails the request before streaming"""
+    headers = {"Authorization": f"Bearer {auth_token}"}
+    files = [("files", ("photos.zip", b"not a zip", "application/zip"))]
+    response = client.post("/detect/batch", headers=headers, files=files)
+
+    assert response.status_code == 400
+    assert "ZIP" in response.json()["detail"]
+
+
+@pytest.mark.integration
+def test_detect_failures_remove_job_dir(client, auth_token, batch_app, monkeypatch):
+    """Test that rejected and failed detections delete the uploaded input"""
+    main, calls = batch_app
+
+    class FailingExecutor:
+        def __init__(self, error):
+            self.error = error
+
+        async def run(self, fn, *args, **kwargs):
+            raise self.error
+
+    headers = {"Authorization": f"Bearer {auth_token}"}
+    files = {"file": ("photo.png", _png_bytes(80), "image/png")}
+    for error, status in [(main.InferenceQueueFull(retry_after=3, queue_depth=8), 429),
+                          (TimeoutError(), 504), (RuntimeError("boom"), 500)]:
+        monkeypatch.setattr(main, "inference_executor", FailingExecutor(error))
+        response = client.post("/detect", headers=headers, files=files)
+        assert response.status_code == status
+        assert [p.name for p in main.DATA_DIR.iterdir() if not p.name.startswith(".")] == []
+        assert list((main.DATA_DIR / ".incoming").iterdir()) == []
+
+
+@pytest.mark.integration
+def test_detect_batch_disconnect_removes_unrecorded_jobs(batch_app):
+    """Test that closing a batch stream early keeps only the inputs of recorded jobs"""
+    import asyncio
+    import io
+    import json
+    from starlette.datastructures import Headers, UploadFile
+
+    main, calls = batch_app
+    user = {"username": "alice", "role": "analyst"}
+
+    async def first_line_only():
+        files = [UploadFile(file=io.BytesIO(_png_bytes(20 * i)), filename=f"{i}.png",
+                            headers=Headers({"content-type": "image/png"})) for i in range(7)]
+        response = await main.detect_batch(files=files, outputs="score,maps", user=user)
+        stream = response.body_iterator
+        line = json.loads(await stream.__anext__())
+        await stream.aclose()
+        return line
+
+    line = asyncio.run(first_line_only())
+    # Chunks still running when the stream closed clean up once they finish
+    deadline = time.time() + 30
+    while main.inference_executor.stats()["running"] or main.inference_executor.queue_depth:
+        assert time.time() < deadline
+        time.sleep(0.05)
+    time.sleep(0.2)
+
+    assert line["status"] == "success"
+    job_dirs = sorted(p.name for p in main.DATA_DIR.iterdir() if p.is_dir() and p.name.startswith("trufor_"))
+    assert job_dirs == [line["job_id"]]
+    assert main.history_manager.get_job_details(line["job_id"], "alice", "analyst")["status"] == "completed"
+    assert [p for p in (main.DATA_DIR / ".incoming").iterdir()] == []
+
+
 @pytest.mark.integration
 def test_invalid_token(client):
     """Test API with invalid token"""
@@ -233,3 +504,129 @@ def test_concurrent_requests(client, auth_token):
     # All requests should succeed
     assert all(results), "Some concurrent requests failed"
 
+
+@pytest.mark.integration
+def test_deepfakebench_jobs_share_pooled_model(monkeypatch, tmp_path):
+    """Test that video jobs lease one pooled model instead of building their own"""
+    import app.main as main
+    from app.history.history_manager import HistoryManager
+    from app.utils.model_pool import ModelPool
+
+    class FakeAdapter:
+        def __init__(self, model_key):
+            self.model_key = model_key
+            self.videos = []
+
+        def memory_bytes(self):
+            return 1024
+
+        def analyze_video(self, video_path, fps, threshold, progress_callback=None, **kwargs):
+            self.videos.append(video_path)
+            return {"success": False, "error": "No frames decoded"}
+
+    loaded = []
+
+    def loader(model_key):
+        loaded.append(FakeAdapter(model_key))
+        return loaded[-1]
+
+    history = HistoryManager(data_dir=str(tmp_path / "jobs"))
+    pool = ModelPool(loader=loader, budget_bytes=1024 * 1024)
+    monkeypatch.setattr(main, "DATA_DIR", tmp_path / "jobs")
+    monkeypatch.setattr(main, "history_manager", history)
+    monkeypatch.setattr(main, "deepfakebench_pool", pool)
+
+    for job_id in ("dfb_1", "dfb_2"):
+        history.create_job_metadata(job_id, "alice", f"{job_id}.mp4", "deepfakebench", "xception")
+        monkeypatch.setitem(main.jobs, job_id, {"status": "processing"})
+        main.run_deepfakebench_analysis(job_id, f"{job_id}.mp4", "xception", fps=3.0, threshold=0.5)
+        assert main.jobs[job_id]["message"] == "No frames decoded"
+        assert history.get_job_details(job_id, "alice", "analyst")["status"] == "failed"
+
+    assert len(loaded) == 1
+    assert loaded[0].videos == ["dfb_1.mp4", "dfb_2.mp4"]
+    assert pool.stats()["hits"] == 1
+
+
+
+@pytest.mark.integration
+def test_deepfakebench_ensemble_validation(client, auth_token):
+    """Test that ensemble requests need two known models and a known fusion"""
+    headers = {"Authorization": f"Bearer {auth_token}"}
+    files = {"file": ("clip.mp4", b"not a video", "video/mp4")}
+
+    for form, detail in [
+        ({"models": "xception"}, "at least two"),
+        ({"models": "xception,nope"}, "Unknown models: nope"),
+        ({"models": "xception,meso4", "fusion": "median"}, "Invalid fusion"),
+    ]:
+        response = client.post("/api/deepfakebench/ensemble", files=files, data=form, headers=headers)
+        assert response.status_code == 400
+        assert detail in response.json()["detail"]
+
+
+@pytest.mark.integration
+def test_deepfakebench_sampling_validation(client, auth_token):
+    """Test that analyze requests need a known sampling mode and a non-negative frame budget"""
+    headers = {"Authorization": f"Bearer {auth_token}"}
+    files = {"file": ("clip.mp4", b"not a video", "video/mp4")}
+
+    for form, detail in [
+        ({"sampling": "sparse"}, "Invalid sampling"),
+        ({"sampling": "adaptive", "frame_budget": "-1"}, "frame_budget"),
+    ]:
+        response = client.post("/api/deepfakebench/analyze", files=files, data=form, headers=headers)
+        assert response.status_code == 400
+        assert detail in response.json()["detail"]
+
+
+@pytest.mark.integration
+def test_deepfakebench_ensemble_job(monkeypatch, tmp_path):
+    """Test that an ensemble job leases every pooled model and stores per-model timelines"""
+    import json
+    import app.main as main
+    import app.adapters.deepfakebench_adapter as dfb
+    from app.history.history_manager import HistoryManager
+    from app.utils.model_pool import ModelPool
+
+    class FakeAdapter:
+        def __init__(self, model_key):
+            self.model_key = model_key
+
+        def memory_bytes(self):
+            return 1024
+
+    def fake_ensemble(adapters, video_path, fps, threshold, fusion, workers, progress_callback=None):
+        calls.append(([adapter.model_key for adapter in adapters], fusion))
+        scores = [{"frame": 0, "timestamp": 0.0, "probability": 0.8, "is_anomalous": False}]
+        model_result = {"success": True, "overall_score": 0.8, "frame_scores": scores, "suspicious_segments": []}
+        return {
+            "success": True, "model": "xception+meso4", "overall_score": 0.8, "average_score": 0.8,
+            "total_frames": 1, "frame_scores": scores, "suspicious_segments": [], "verdict": "FAKE",
+            "models": {adapter.model_key: model_result for adapter in adapters}
+        }
+
+    calls = []
+    pool = ModelPool(loader=FakeAdapter, budget_bytes=1024 * 1024)
+    history = HistoryManager(data_dir=str(tmp_path / "jobs"))
+    monkeypatch.setattr(main, "DATA_DIR", tmp_path / "jobs")
+    monkeypatch.setattr(main, "history_manager", history)
+    monkeypatch.setattr(main, "deepfakebench_pool", pool)
+    monkeypatch.setattr(dfb, "analyze_video_ensemble", fake_ensemble)
+
+    job_id = "dfb_ensemble"
+    (tmp_path / "jobs" / job_id).mkdir(parents=True)
+    history.create_job_metadata(job_id, "alice", "clip.mp4", "deepfakebench", "xception+meso4")
+    monkeypatch.setitem(main.jobs, job_id, {"status": "processing"})
+    main.run_deepfakebench_analysis(job_id, "clip.mp4", "xception+meso4", fps=3.0, threshold=0.5,
+                                    ensemble=["xception", "meso4"], fusion="max")
+
+    assert calls == [(["xception", "meso4"], "max")]
+    assert main.jobs[job_id]["status"] == "completed"
+    assert [model["key"] for model in pool.stats()["models"]] == ["xception", "meso4"]
+    assert all(model["leases"] == 0 for model in pool.stats()["models"])
+
+    timeline = json.loads((tmp_path / "jobs" / job_id / "timeline.json").read_text())
+    assert timeline["summary"]["suspicious_frames"] == 1
+    assert set(timeline["models"]) == {"xception", "meso4"}
+    assert history.get_model_usage("deepfakebench") == {"xception": 1, "meso4": 1}
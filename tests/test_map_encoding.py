@@ -0,0 +1,74 @@
+"""
+Unit tests for compact TruFor map encoding
+
+Tests include:
+- Round trips for every encoding
+- Legacy JSON fallback
+- Aspect-preserving downsampling
+"""
+import pytest
+import sys
+import json
+from pathlib import Path
+
+import numpy as np
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+pytest.importorskip("cv2")
+
+from app.utils.map_encoding import MAP_FORMATS, encode_map, decode_map, downsample_map
+
+
+@pytest.fixture
+def sample_map():
+    rng = np.random.default_rng(0)
+    return rng.random((37, 53), dtype=np.float32)
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("fmt,tolerance", [("png", 0.5 / 255), ("uint8", 0.5 / 255), ("float16", 1e-3), ("json", 1e-7)])
+def test_round_trip(sample_map, fmt, tolerance):
+    """Test that every format decodes back to the original map within quantization error"""
+    payload = encode_map(sample_map, fmt)
+    # Payload must survive a JSON round trip, as it does in the API response
+    decoded = decode_map(json.loads(json.dumps(payload)))
+    assert decoded.shape == sample_map.shape
+    assert np.abs(decoded - sample_map).max() <= tolerance + 1e-6
+
+
+@pytest.mark.unit
+def test_json_format_is_nested_list(sample_map):
+    """Test that the JSON fallback keeps the legacy nested-list layout"""
+    payload = encode_map(sample_map, "json")
+    assert isinstance(payload, list)
+    assert len(payload) == 37 and len(payload[0]) == 53
+
+
+@pytest.mark.unit
+def test_compact_formats_are_smaller(sample_map):
+    """Test that compact encodings are much smaller than JSON"""
+    json_size = len(json.dumps(encode_map(sample_map, "json")))
+    for fmt in ("png", "uint8", "float16"):
+        assert len(json.dumps(encode_map(sample_map, fmt))) * 3 < json_size
+
+
+@pytest.mark.unit
+def test_invalid_format(sample_map):
+    """Test that unknown formats are rejected"""
+    assert "bmp" not in MAP_FORMATS
+    with pytest.raises(ValueError):
+        encode_map(sample_map, "bmp")
+
+
+@pytest.mark.unit
+def test_downsample_map_preserves_aspect():
+    """Test that downsampling caps the longest side and keeps small maps untouched"""
+    large = np.ones((1200, 600), dtype=np.float32) * 0.25
+    small = downsample_map(large, max_size=300)
+    assert small.shape == (300, 150)
+    assert np.allclose(small, 0.25)
+
+    tiny = np.zeros((10, 20), dtype=np.float32)
+    assert downsample_map(tiny, max_size=300) is tiny
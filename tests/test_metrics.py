@@ -0,0 +1,95 @@
+"""
+Unit tests for per-stage latency metrics
+
+Tests include:
+- Histogram bucketing, sums and counts
+- Prometheus text rendering (histograms and gauges)
+- Disabled registry records nothing
+- Concurrent observations
+"""
+import pytest
+import sys
+import threading
+from pathlib import Path
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.utils.metrics import METRIC_NAME, PipelineMetrics
+
+
+@pytest.mark.unit
+def test_histogram_buckets_and_summary():
+    """Test that observations land in cumulative buckets per model and stage"""
+    m = PipelineMetrics(buckets=(0.01, 0.1, 1.0))
+    for value in (0.005, 0.05, 0.05, 5.0):
+        m.observe("trufor", "forward", value)
+    m.observe("xception", "decode", 0.01)
+
+    summary = m.summary()
+    assert summary["trufor"]["forward"]["count"] == 4
+    assert summary["trufor"]["forward"]["total_s"] == pytest.approx(5.105)
+    assert summary["xception"]["decode"]["count"] == 1
+
+    text = m.render_prometheus()
+    labels = 'model="trufor",stage="forward"'
+    assert f'{METRIC_NAME}_bucket{{{labels},le="0.01"}} 1' in text
+    assert f'{METRIC_NAME}_bucket{{{labels},le="0.1"}} 3' in text
+    assert f'{METRIC_NAME}_bucket{{{labels},le="1"}} 3' in text
+    assert f'{METRIC_NAME}_bucket{{{labels},le="+Inf"}} 4' in text
+    assert f"{METRIC_NAME}_count{{{labels}}} 4" in text
+    # Bucket bounds are inclusive
+    assert f'{METRIC_NAME}_bucket{{model="xception",stage="decode",le="0.01"}} 1' in text
+
+
+@pytest.mark.unit
+def test_stage_timer_and_gauges():
+    """Test the stage context manager and gauge rendering"""
+    m = PipelineMetrics()
+    with m.stage("trufor", "render"):
+        pass
+    with pytest.raises(RuntimeError):
+        with m.stage("trufor", "persist"):
+            raise RuntimeError("failed")
+
+    assert m.summary()["trufor"]["render"]["count"] == 1
+    assert m.summary()["trufor"]["persist"]["count"] == 1  # Failed stages are still timed
+
+    text = m.render_prometheus([
+        ("deepfake_queue_depth", "Waiting requests", {}, 3),
+        ("deepfake_cache_bytes", "Cache size", {"tier": 'di"sk'}, 1024),
+    ])
+    assert "# TYPE deepfake_queue_depth gauge" in text
+    assert "deepfake_queue_depth 3" in text
+    assert 'deepfake_cache_bytes{tier="di\\"sk"} 1024' in text
+    assert text.endswith("\n")
+
+
+@pytest.mark.unit
+def test_disabled_metrics_record_nothing():
+    """Test that a disabled registry returns a shared no-op timer"""
+    m = PipelineMetrics(enabled=False)
+    assert m.stage("trufor", "forward") is m.stage("xception", "decode")
+    with m.stage("trufor", "forward"):
+        pass
+    m.observe("trufor", "forward", 1.0)
+    assert m.summary() == {}
+    assert "_bucket" not in m.render_prometheus()
+
+
+@pytest.mark.unit
+def test_concurrent_observations():
+    """Test that counts are exact when many threads record at once"""
+    m = PipelineMetrics()
+
+    def worker():
+        for _ in range(1000):
+            m.observe("trufor", "forward", 0.02)
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert m.summary()["trufor"]["forward"]["count"] == 8000
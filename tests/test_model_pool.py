@@ -0,0 +1,159 @@
+"""
+Unit tests for the memory-budgeted model pool used for DeepfakeBench models
+
+Tests include:
+- Loaded models are reused across leases
+- LRU eviction under the memory budget, sparing leased models
+- Concurrent leases of a model that is not resident load it once
+- Preloading, failed loads and usage counts
+"""
+import pytest
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.utils.model_pool import ModelPool
+
+MB = 1024 * 1024
+
+
+class FakeModel:
+    def __init__(self, key, size):
+        self.key = key
+        self.size = size
+
+    def memory_bytes(self):
+        return self.size
+
+
+def make_pool(budget_mb, sizes_mb=None, delay=0.0):
+    """Pool whose loader records every load"""
+    loads = []
+
+    def loader(key):
+        if key == "broken":
+            raise FileNotFoundError("Model weights not found")
+        time.sleep(delay)
+        loads.append(key)
+        return FakeModel(key, (sizes_mb or {}).get(key, 100) * MB)
+
+    return ModelPool(loader=loader, budget_bytes=budget_mb * MB), loads
+
+
+@pytest.mark.unit
+def test_models_are_reused():
+    """Test that a resident model is handed out again instead of reloaded"""
+    pool, loads = make_pool(budget_mb=1024)
+
+    with pool.lease("xception") as first:
+        pass
+    with pool.lease("xception") as second:
+        assert second is first
+
+    stats = pool.stats()
+    assert loads == ["xception"]
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["resident_mb"] == 100.0
+    assert stats["models"][0]["key"] == "xception"
+    assert stats["models"][0]["leases"] == 0
+
+
+@pytest.mark.unit
+def test_lru_eviction_under_budget():
+    """Test that idle models are evicted least recently used first"""
+    pool, loads = make_pool(budget_mb=250)
+
+    for key in ("xception", "meso4", "xception", "f3net"):
+        with pool.lease(key):
+            pass
+
+    # meso4 was the least recently used when f3net pushed the pool to 300 MB
+    assert [model["key"] for model in pool.stats()["models"]] == ["xception", "f3net"]
+    assert pool.stats()["evictions"] == 1
+    assert not pool.is_resident("meso4")
+
+    with pool.lease("meso4"):
+        pass
+    assert loads == ["xception", "meso4", "f3net", "meso4"]
+
+
+@pytest.mark.unit
+def test_leased_models_are_not_evicted():
+    """Test that the pool runs over budget rather than evicting a model in use"""
+    pool, _ = make_pool(budget_mb=150)
+
+    with pool.lease("xception"):
+        with pool.lease("meso4"):
+            stats = pool.stats()
+            assert stats["resident_mb"] == 200.0
+            assert stats["evictions"] == 0
+
+        # meso4 is idle again but most recently used; xception is still leased
+        assert pool.is_resident("xception")
+        assert not pool.is_resident("meso4")
+
+    assert pool.stats()["resident_mb"] == 100.0
+
+
+@pytest.mark.unit
+def test_zero_budget_keeps_nothing_resident():
+    """Test that a zero budget loads per lease and drops the model afterwards"""
+    pool, loads = make_pool(budget_mb=0)
+
+    for _ in range(2):
+        with pool.lease("xception"):
+            assert pool.is_resident("xception")
+        assert not pool.is_resident("xception")
+
+    assert loads == ["xception", "xception"]
+
+
+@pytest.mark.unit
+def test_concurrent_leases_load_once():
+    """Test that jobs asking for the same cold model share a single load"""
+    pool, loads = make_pool(budget_mb=1024, delay=0.2)
+    barrier = threading.Barrier(4)
+
+    def job(_):
+        barrier.wait()
+        with pool.lease("xception") as model:
+            return model
+
+    with ThreadPoolExecutor(max_workers=4) as workers:
+        models = list(workers.map(job, range(4)))
+
+    assert loads == ["xception"]
+    assert all(model is models[0] for model in models)
+    stats = pool.stats()
+    assert stats["misses"] == 1
+    assert stats["hits"] == 3
+    assert stats["models"][0]["leases"] == 0
+
+
+@pytest.mark.unit
+def test_preload_failures_and_usage():
+    """Test preloading, a failing load and per-model usage counts"""
+    pool, loads = make_pool(budget_mb=1024)
+
+    assert pool.preload(["xception", "broken"]) == {"xception": None, "broken": "Model weights not found"}
+    assert loads == ["xception"]
+    assert pool.stats()["load_failures"] == 1
+    assert not pool.is_resident("broken")
+
+    with pytest.raises(FileNotFoundError):
+        with pool.lease("broken"):
+            pass
+
+    for _ in range(2):
+        with pool.lease("meso4"):
+            pass
+    assert pool.usage() == {"meso4": 2, "broken": 2, "xception": 1}
+
+    pool.clear()
+    assert pool.stats()["models"] == []
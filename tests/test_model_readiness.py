@@ -0,0 +1,73 @@
+"""
+Unit tests for the model load state behind /ready
+
+Tests include:
+- State transitions with load and warm-up durations
+- Readiness only once no model is still loading
+- Failed and unavailable models are reported but do not block readiness
+"""
+import pytest
+import sys
+from pathlib import Path
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.utils.model_readiness import ModelReadiness
+
+
+@pytest.mark.unit
+def test_load_and_warmup_durations():
+    """Test that loading and warm-up are timed separately"""
+    readiness = ModelReadiness()
+    readiness.register("trufor")
+    assert readiness.state("trufor") == "pending"
+    assert readiness.is_ready() is False
+
+    readiness.loading("trufor")
+    readiness.warming_up("trufor")
+    assert readiness.snapshot()["models"]["trufor"]["state"] == "warming_up"
+    readiness.ready("trufor")
+
+    snapshot = readiness.snapshot()
+    model = snapshot["models"]["trufor"]
+    assert snapshot["ready"] is True
+    assert model["state"] == "ready"
+    assert model["load_seconds"] >= 0
+    assert model["warmup_seconds"] >= 0
+    assert model["error"] is None
+    assert not any(key.startswith("_") for key in model)
+
+
+@pytest.mark.unit
+def test_ready_without_warmup():
+    """Test a model that goes straight from loading to ready"""
+    readiness = ModelReadiness()
+    readiness.register("deepfakebench")
+    readiness.loading("deepfakebench")
+    readiness.ready("deepfakebench")
+
+    model = readiness.snapshot()["models"]["deepfakebench"]
+    assert model["load_seconds"] >= 0
+    assert model["warmup_seconds"] is None
+
+
+@pytest.mark.unit
+def test_failed_and_unavailable_models_settle():
+    """Test that readiness waits for every model but not for successful loads"""
+    readiness = ModelReadiness()
+    readiness.register("trufor")
+    readiness.register("deepfakebench")
+
+    readiness.unavailable("trufor", "Model not found")
+    assert readiness.is_ready() is False
+
+    readiness.loading("deepfakebench")
+    readiness.failed("deepfakebench", "import error")
+    snapshot = readiness.snapshot()
+    assert snapshot["ready"] is True
+    assert snapshot["models"]["trufor"] == {
+        "state": "unavailable", "load_seconds": None, "warmup_seconds": None, "error": "Model not found"
+    }
+    assert snapshot["models"]["deepfakebench"]["error"] == "import error"
+    assert readiness.state("missing") is None
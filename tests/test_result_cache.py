@@ -0,0 +1,110 @@
+"""
+Unit tests for the content-addressed result cache
+
+Tests include:
+- Cache key determinism and sensitivity to every component
+- Weights fingerprint invalidation
+- Memory and disk tier hits, miss counters
+- Artifact restore with renaming
+- LRU eviction under a disk budget
+"""
+import pytest
+import sys
+import os
+import time
+from pathlib import Path
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.utils.result_cache import ResultCache, make_cache_key, weights_fingerprint
+
+
+@pytest.fixture
+def artifacts(tmp_path):
+    src = tmp_path / "job"
+    (src / "keyframes").mkdir(parents=True)
+    (src / "maps.npz").write_bytes(b"\x00" * 64)
+    (src / "job_heatmap.png").write_bytes(b"png")
+    (src / "keyframes" / "segment_1_keyframe.jpg").write_bytes(b"jpg")
+    return src
+
+
+@pytest.mark.unit
+def test_cache_key_components():
+    """Test that keys are deterministic and change with content, model, weights and params"""
+    key = make_cache_key("abc", "trufor", "w1", {"resolution": "report", "fps": 3.0})
+    assert key == make_cache_key("abc", "trufor", "w1", {"fps": 3.0, "resolution": "report"})
+    assert key != make_cache_key("abd", "trufor", "w1", {"resolution": "report", "fps": 3.0})
+    assert key != make_cache_key("abc", "xception", "w1", {"resolution": "report", "fps": 3.0})
+    assert key != make_cache_key("abc", "trufor", "w2", {"resolution": "report", "fps": 3.0})
+    assert key != make_cache_key("abc", "trufor", "w1", {"resolution": "full", "fps": 3.0})
+
+
+@pytest.mark.unit
+def test_weights_fingerprint(tmp_path):
+    """Test that replacing the weights file changes the fingerprint"""
+    weights = tmp_path / "model.pth"
+    weights.write_bytes(b"a" * 10)
+    first = weights_fingerprint(str(weights))
+    assert first == weights_fingerprint(str(weights))
+
+    weights.write_bytes(b"b" * 20)
+    os.utime(weights, ns=(time.time_ns(), time.time_ns() + 1_000_000))
+    assert weights_fingerprint(str(weights)) != first
+    assert weights_fingerprint(str(tmp_path / "missing.pth")) == "none"
+    assert weights_fingerprint(None) == "none"
+
+
+@pytest.mark.unit
+def test_hits_and_misses(tmp_path, artifacts):
+    """Test memory hits, disk hits after a restart, and miss counting"""
+    cache = ResultCache(cache_dir=str(tmp_path / "cache"))
+    assert cache.get("k" * 64) is None
+
+    cache.put("k" * 64, {"score": 0.25}, {"maps.npz": artifacts / "maps.npz"})
+    assert cache.get("k" * 64) == {"score": 0.25}
+
+    # A new instance indexes the disk tier and serves from it
+    reopened = ResultCache(cache_dir=str(tmp_path / "cache"))
+    assert reopened.get("k" * 64) == {"score": 0.25}
+
+    stats = cache.stats()
+    assert stats["misses"] == 1 and stats["memory_hits"] == 1 and stats["hit_rate"] == 0.5
+    assert reopened.stats()["disk_hits"] == 1
+    assert stats["disk_entries"] == 1 and stats["disk_bytes"] > 64
+
+
+@pytest.mark.unit
+def test_restore_with_rename(tmp_path, artifacts):
+    """Test that files and directories are copied into a new job directory"""
+    cache = ResultCache(cache_dir=str(tmp_path / "cache"))
+    cache.put("a" * 64, {"ok": True}, {
+        "heatmap.png": artifacts / "job_heatmap.png",
+        "keyframes": artifacts / "keyframes",
+        "missing.json": artifacts / "missing.json",
+    })
+
+    dest = tmp_path / "new_job"
+    assert cache.restore("a" * 64, dest, rename={"heatmap.png": "new_job_heatmap.png"})
+    assert (dest / "new_job_heatmap.png").read_bytes() == b"png"
+    assert (dest / "keyframes" / "segment_1_keyframe.jpg").exists()
+    assert not (dest / "result.json").exists()
+    assert not cache.restore("b" * 64, tmp_path / "other")
+
+
+@pytest.mark.unit
+def test_disk_eviction(tmp_path, artifacts):
+    """Test that least recently used entries are evicted beyond the disk budget"""
+    cache = ResultCache(cache_dir=str(tmp_path / "cache"), max_disk_bytes=160)
+    for i, key in enumerate(("a" * 64, "b" * 64, "c" * 64)):
+        cache.put(key, {"i": i}, {"maps.npz": artifacts / "maps.npz"})
+        if i == 1:
+            time.sleep(0.01)
+            cache.get("a" * 64)  # Make 'b' the least recently used entry
+        time.sleep(0.01)
+
+    assert cache.stats()["evictions"] >= 1
+    assert cache.stats()["disk_bytes"] <= 160
+    assert cache.get("b" * 64) is None
+    assert cache.get("c" * 64) == {"i": 2}
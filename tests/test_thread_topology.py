@@ -0,0 +1,96 @@
+"""
+Unit tests for the inference worker thread topology
+
+Tests include:
+- Splitting cores between workers, with and without pinning
+- Wrap-around of core slices and validation errors
+- Configuration from INFERENCE_* environment variables
+- Worker initializer applying thread count and affinity inside an executor
+"""
+import os
+import pytest
+import sys
+from pathlib import Path
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.utils.thread_topology import (
+    available_cpus, make_topology, topology_from_env, total_threads, worker_initializer
+)
+
+
+@pytest.mark.unit
+def test_make_topology_splits_cores():
+    """Test that workers get an equal share of the cores"""
+    topology = make_topology(workers=2, cpus=range(8))
+    assert topology["intra_op_threads"] == 4
+    assert topology["core_sets"] is None
+    assert total_threads(topology) == 8
+
+    pinned = make_topology(workers=2, pin_cores=True, cpus=range(8))
+    assert pinned["core_sets"] == [[0, 1, 2, 3], [4, 5, 6, 7]]
+
+
+@pytest.mark.unit
+def test_make_topology_oversubscribed():
+    """Test more workers than cores: one thread each, slices wrap around"""
+    topology = make_topology(workers=3, pin_cores=True, cpus=[4, 5])
+    assert topology["intra_op_threads"] == 1
+    assert topology["core_sets"] == [[4], [5], [4]]
+    assert total_threads(topology) == 2
+
+    wide = make_topology(workers=2, intra_op_threads=3, pin_cores=True, cpus=range(4))
+    assert wide["core_sets"] == [[0, 1, 2], [3, 0, 1]]
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("kwargs", [{"workers": 0}, {"intra_op_threads": 0}, {"inter_op_threads": 0}])
+def test_make_topology_rejects_invalid(kwargs):
+    """Test validation of the layout values"""
+    with pytest.raises(ValueError):
+        make_topology(cpus=range(4), **kwargs)
+
+
+@pytest.mark.unit
+def test_topology_from_env(monkeypatch):
+    """Test configuration through environment variables"""
+    monkeypatch.setenv("INFERENCE_WORKERS", "3")
+    monkeypatch.setenv("INFERENCE_INTRA_OP_THREADS", "2")
+    monkeypatch.setenv("INFERENCE_INTER_OP_THREADS", "1")
+    monkeypatch.setenv("INFERENCE_PIN_CORES", "true")
+    topology = topology_from_env()
+    assert topology["workers"] == 3
+    assert topology["intra_op_threads"] == 2
+    assert topology["pin_cores"] is True
+    assert len(topology["core_sets"]) == 3
+
+    monkeypatch.setenv("INFERENCE_INTRA_OP_THREADS", "0")
+    monkeypatch.setenv("INFERENCE_PIN_CORES", "0")
+    topology = topology_from_env()
+    assert topology["intra_op_threads"] == max(1, len(available_cpus()) // 3)
+    assert topology["core_sets"] is None
+
+
+@pytest.mark.unit
+def test_worker_initializer_configures_threads():
+    """Test that executor workers run with the topology's threads and cores"""
+    torch = pytest.importorskip("torch")
+    from app.utils.inference_executor import InferenceExecutor
+
+    cpus = available_cpus()
+    topology = make_topology(workers=1, intra_op_threads=1, pin_cores=True, cpus=cpus[:1])
+    previous_threads = torch.get_num_threads()
+    executor = InferenceExecutor(max_workers=1, max_queue_size=1, name="topology-test",
+                                 initializer=worker_initializer(topology))
+    try:
+        threads = executor.submit(torch.get_num_threads).result()
+        assert threads == 1
+        if hasattr(os, "sched_getaffinity"):
+            cores = executor.submit(lambda: os.sched_getaffinity(0)).result()
+            assert cores == {cpus[0]}
+            # Pinning is per thread, the caller keeps its mask
+            assert sorted(os.sched_getaffinity(0)) == cpus
+    finally:
+        executor.shutdown()
+        torch.set_num_threads(previous_threads)
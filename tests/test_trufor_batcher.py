@@ -0,0 +1,113 @@
+"""
+Unit tests for the TruFor micro-batching engine
+
+Tests include:
+- Output splitting per request
+- Coalescing of concurrent requests into one forward pass
+- Passthrough of None outputs
+- Error propagation and shutdown behaviour
+"""
+import pytest
+import sys
+import threading
+from pathlib import Path
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+torch = pytest.importorskip("torch")
+
+from app.adapters.trufor_batcher import TruForBatcher
+
+
+class RecordingForward:
+    """Fake model forward that records batch sizes"""
+
+    def __init__(self, gate=None):
+        self.batch_sizes = []
+        self.gate = gate
+
+    def __call__(self, x):
+        if self.gate is not None:
+            self.gate.wait()
+        self.batch_sizes.append(x.shape[0])
+        return x * 2, x.mean(dim=(1, 2, 3)), None
+
+
+@pytest.mark.unit
+def test_single_request_outputs():
+    """Test that a single request gets its own outputs back"""
+    batcher = TruForBatcher(RecordingForward(), max_batch_size=4, max_wait_ms=0)
+    try:
+        x = torch.randn(1, 3, 8, 8)
+        doubled, mean, npp = batcher.infer(x)
+        assert torch.allclose(doubled, x * 2)
+        assert mean.shape == (1,)
+        assert npp is None
+    finally:
+        batcher.close()
+
+
+@pytest.mark.unit
+def test_concurrent_requests_are_batched():
+    """Test that requests queued together share a forward pass and are split correctly"""
+    gate = threading.Event()
+    forward = RecordingForward(gate)
+    batcher = TruForBatcher(forward, max_batch_size=4, max_wait_ms=50)
+    try:
+        # The first request blocks the worker, the next three queue up behind it
+        inputs = [torch.full((1, 3, 8, 8), float(i)) for i in range(4)]
+        futures = [batcher.submit(x) for x in inputs]
+        gate.set()
+        results = [f.result(timeout=5) for f in futures]
+    finally:
+        batcher.close()
+
+    for x, (doubled, _, _) in zip(inputs, results):
+        assert torch.equal(doubled, x * 2)
+    assert sum(forward.batch_sizes) == 4
+    assert max(forward.batch_sizes) > 1
+    assert batcher.stats()["requests"] == 4
+
+
+@pytest.mark.unit
+def test_max_batch_size_respected():
+    """Test that batches never exceed the configured size"""
+    gate = threading.Event()
+    forward = RecordingForward(gate)
+    batcher = TruForBatcher(forward, max_batch_size=2, max_wait_ms=20)
+    try:
+        futures = [batcher.submit(torch.randn(1, 3, 8, 8)) for _ in range(5)]
+        gate.set()
+        for f in futures:
+            f.result(timeout=5)
+    finally:
+        batcher.close()
+
+    assert max(forward.batch_sizes) <= 2
+    assert sum(forward.batch_sizes) == 5
+
+
+@pytest.mark.unit
+def test_forward_error_propagates():
+    """Test that a failing forward pass fails every request in the batch"""
+    def failing_forward(x):
+        raise RuntimeError("boom")
+
+    batcher = TruForBatcher(failing_forward, max_batch_size=2, max_wait_ms=0)
+    try:
+        with pytest.raises(RuntimeError, match="boom"):
+            batcher.infer(torch.randn(1, 3, 8, 8))
+    finally:
+        batcher.close()
+
+
+@pytest.mark.unit
+def test_invalid_input_and_closed_batcher():
+    """Test input validation and submission after close"""
+    batcher = TruForBatcher(RecordingForward(), max_batch_size=2)
+    with pytest.raises(ValueError):
+        batcher.submit(torch.randn(2, 3, 8, 8))
+    batcher.close()
+    with pytest.raises(RuntimeError):
+        batcher.submit(torch.randn(1, 3, 8, 8))
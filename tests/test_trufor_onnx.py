@@ -0,0 +1,95 @@
+"""
+Unit tests for the TruFor ONNX Runtime backend
+
+Tests include:
+- Numerical parity of every output with the torch model (dynamic batch)
+- Adapter-level parity of maps and scores between the torch and onnx backends
+- Backend validation
+"""
+import pytest
+import sys
+import io
+from pathlib import Path
+
+import numpy as np
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("onnx")
+pytest.importorskip("onnxruntime")
+
+from PIL import Image
+
+
+@pytest.fixture(scope="module")
+def exported(tmp_path_factory):
+    """Randomly initialized torch adapter and its model exported to ONNX"""
+    try:
+        from app.adapters.trufor_adapter import TruForAdapter
+        from app.adapters.trufor_onnx import export_trufor_onnx
+    except ImportError as e:
+        pytest.skip(f"Cannot import TruFor adapter: {e}")
+
+    torch.manual_seed(0)
+    adapter = TruForAdapter(model_path=None, device="cpu")
+    onnx_path = export_trufor_onnx(adapter.model, tmp_path_factory.mktemp("onnx") / "trufor.onnx")
+    return adapter, onnx_path
+
+
+@pytest.mark.unit
+@pytest.mark.slow
+def test_onnx_outputs_match_torch(exported):
+    """Test that ONNX Runtime reproduces every torch output with a dynamic batch"""
+    from app.adapters.trufor_onnx import OnnxTruForSession
+
+    adapter, onnx_path = exported
+    x = torch.randn(2, 3, 512, 512)
+    with torch.no_grad():
+        expected = adapter.model(x)
+    actual = OnnxTruForSession(onnx_path, intra_op_threads=1)(x)
+
+    assert len(actual) == 4
+    for a, e in zip(actual, expected):
+        assert a.shape == e.shape
+        np.testing.assert_allclose(a.numpy(), e.numpy(), rtol=1e-3, atol=1e-4)
+
+
+@pytest.mark.unit
+@pytest.mark.slow
+def test_onnx_backend_detection_parity(exported):
+    """Test that the adapter produces the same maps and scores on both backends"""
+    from app.adapters.trufor_adapter import TruForAdapter
+
+    torch_adapter, onnx_path = exported
+    onnx_adapter = TruForAdapter(model_path=None, backend="onnx", onnx_path=str(onnx_path))
+    assert onnx_adapter.model is None and onnx_adapter.get_model_info()["backend"] == "onnx"
+
+    rng = np.random.default_rng(0)
+    buf = io.BytesIO()
+    Image.fromarray(rng.integers(0, 256, size=(300, 400, 3), dtype=np.uint8)).save(buf, "PNG")
+
+    # Share the randomly initialized integrity head so scores are comparable
+    torch_result = torch_adapter.detect_sync(buf.getvalue(), "noise.png", "image/png")
+    onnx_adapter._integrity_head = torch_adapter._integrity_head
+    onnx_result = onnx_adapter.detect_sync(buf.getvalue(), "noise.png", "image/png")
+
+    assert onnx_result["status"] == "success"
+    assert onnx_result["integrity"] == pytest.approx(torch_result["integrity"], abs=1e-4)
+    for key in ("prediction_map", "confidence_map", "noiseprint_map"):
+        np.testing.assert_allclose(onnx_result[key], torch_result[key], atol=1e-4)
+
+
+@pytest.mark.unit
+def test_backend_validation():
+    """Test that unknown backends and non-512 ONNX tiles are rejected before loading"""
+    try:
+        from app.adapters.trufor_adapter import TruForAdapter
+    except ImportError as e:
+        pytest.skip(f"Cannot import TruFor adapter: {e}")
+
+    with pytest.raises(ValueError):
+        TruForAdapter(model_path=None, backend="tensorrt")
+    with pytest.raises(ValueError):
+        TruForAdapter(model_path=None, backend="onnx", tile_size=256)
@@ -0,0 +1,113 @@
+"""
+Unit tests for the TruFor inference-time optimizations
+
+Tests include:
+- DnCNN BatchNorm folding and conv+ReLU fusion parity (non-trivial BN statistics)
+- ImageNet normalization folded into a padded strided conv, exact at the borders
+- End-to-end parity of all TruFor outputs with and without the rewrites
+"""
+import pytest
+import sys
+from pathlib import Path
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+torch = pytest.importorskip("torch")
+import torch.nn as nn
+
+
+def _randomize_batchnorms(module):
+    """Give every BatchNorm non-trivial affine parameters and running statistics"""
+    for bn in module.modules():
+        if isinstance(bn, nn.BatchNorm2d):
+            bn.weight.data.uniform_(0.5, 1.5)
+            bn.bias.data.uniform_(-0.2, 0.2)
+            bn.running_mean.uniform_(-0.5, 0.5)
+            bn.running_var.uniform_(0.5, 2.0)
+
+
+@pytest.mark.unit
+def test_dncnn_folding_parity():
+    """Test that the folded, fused, channels_last DnCNN matches the original"""
+    try:
+        import app.adapters.trufor_adapter  # noqa: F401 (puts the TruFor sources on sys.path)
+        from models.DnCNN import make_net
+        from app.adapters.trufor_optimize import ConvReLU2d, fuse_sequential
+    except ImportError as e:
+        pytest.skip(f"Cannot import TruFor modules: {e}")
+
+    torch.manual_seed(0)
+    dncnn = make_net(3, kernels=[3] * 17, features=[64] * 16 + [1],
+                     bns=[False] + [True] * 15 + [False], acts=["relu"] * 16 + ["linear"],
+                     dilats=[1] * 17, bn_momentum=0.1, padding=1)
+    _randomize_batchnorms(dncnn)
+    dncnn.eval()
+
+    fused, counts = fuse_sequential(dncnn)
+    fused = fused.to(memory_format=torch.channels_last)
+    assert counts == {"bn_folded": 15, "conv_relu_fused": 16}
+    assert not any(isinstance(m, (nn.BatchNorm2d, nn.ReLU)) for m in fused.modules())
+    assert sum(isinstance(m, ConvReLU2d) for m in fused) == 16
+
+    x = torch.randn(2, 3, 48, 40)
+    with torch.no_grad():
+        expected = dncnn(x)
+        actual = fused(x)
+    assert actual.shape == expected.shape
+    assert (actual - expected).abs().max() <= 1e-5 * expected.abs().max()
+
+
+@pytest.mark.unit
+def test_normalized_input_conv_parity():
+    """Test that folding (x - mean) / std into a conv is exact, including padded borders"""
+    from app.adapters.trufor_optimize import IMAGENET_MEAN, IMAGENET_STD, NormalizedInputConv2d
+
+    torch.manual_seed(0)
+    conv = nn.Conv2d(3, 8, kernel_size=7, stride=4, padding=3)
+    folded = NormalizedInputConv2d(conv, IMAGENET_MEAN, IMAGENET_STD)
+    mean = torch.tensor(IMAGENET_MEAN).view(1, 3, 1, 1)
+    std = torch.tensor(IMAGENET_STD).view(1, 3, 1, 1)
+
+    for size in ((64, 64), (37, 50)):
+        x = torch.rand(2, 3, *size)
+        with torch.no_grad():
+            expected = conv((x - mean) / std)
+            actual = folded(x)
+        assert actual.shape == expected.shape
+        assert torch.allclose(actual, expected, atol=1e-5)
+    assert len(folded._corrections) == 2
+
+    with pytest.raises(ValueError):
+        NormalizedInputConv2d(nn.Conv2d(3, 8, 3, padding=1, padding_mode="reflect"), IMAGENET_MEAN, IMAGENET_STD)
+
+
+@pytest.mark.unit
+@pytest.mark.slow
+def test_optimized_trufor_matches_original():
+    """Test that every TruFor output is unchanged by the load-time rewrites"""
+    try:
+        from app.adapters.trufor_adapter import MODEL_INPUT_SIZE, build_trufor_model
+        from app.adapters.trufor_optimize import optimize_trufor_for_inference
+    except ImportError as e:
+        pytest.skip(f"Cannot import TruFor adapter: {e}")
+
+    torch.manual_seed(0)
+    model, _ = build_trufor_model(None, torch.device("cpu"))
+    _randomize_batchnorms(model.dncnn)
+    x = torch.randn(1, 3, MODEL_INPUT_SIZE, MODEL_INPUT_SIZE)
+    with torch.no_grad():
+        expected = model(x)
+
+    summary = optimize_trufor_for_inference(model)
+    assert summary["bn_folded"] == 15 and summary["prepro_folded"] >= 1
+    assert model.prepro is None
+    with torch.no_grad():
+        actual = model(x)
+
+    for a, e in zip(actual, expected):
+        if e is None:
+            assert a is None
+            continue
+        assert a.shape == e.shape
+        assert torch.allclose(a, e, rtol=1e-3, atol=1e-4)
@@ -0,0 +1,164 @@
+"""
+Unit tests for tiled full-resolution TruFor inference
+
+Tests include:
+- Tile grid coverage and overlap ownership
+- Seamless blending (tiled output equals the untiled per-pixel result)
+- Streaming statistics pooling parity with TruFor's one-shot pooling
+- Output-size accumulation and batch streaming
+- Score-only runs without blending
+- Memory reporting without the Unix-only resource module
+"""
+import pytest
+import sys
+import math
+from pathlib import Path
+
+import numpy as np
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("cv2")
+
+import cv2
+import torch.nn.functional as F
+
+from app.adapters.trufor_tiling import (
+    IMAGENET_MEAN, IMAGENET_STD, StreamingStatsPool, ownership_bounds, peak_rss_mb, run_tiled, tile_origins,
+    tiles_per_batch
+)
+
+
+class PixelwiseNet:
+    """Stand-in for myEncoderDecoder whose outputs depend only on each input pixel"""
+
+    def __init__(self):
+        self.batch_sizes = []
+
+    def __call__(self, x):
+        self.batch_sizes.append(x.shape[0])
+        pred = 2.0 * x[:, :1]
+        conf = x[:, 1:2]
+        det = x.mean(dim=(1, 2, 3)).view(-1, 1)
+        npp = x[:, 2:3]
+        return pred, conf, det, npp
+
+
+def reference_maps(image):
+    """Untiled probability maps computed by PixelwiseNet on the whole image"""
+    x = (image.astype(np.float32) / 255.0 - IMAGENET_MEAN) / IMAGENET_STD
+    x = torch.from_numpy(x).permute(2, 0, 1).unsqueeze(0)
+    pred, conf, _, npp = PixelwiseNet()(x)
+    return torch.sigmoid(pred), torch.sigmoid(conf), npp
+
+
+def reference_pooling(x, log_w=None):
+    """TruFor's weighted statistics pooling, as in TruForAdapter._weighted_statistics_pooling"""
+    x = x.reshape(1, 1, -1).double()
+    log_w = torch.zeros_like(x) if log_w is None else log_w.reshape(1, 1, -1).double()
+    log_w = F.log_softmax(log_w, dim=-1)
+    w = torch.exp(log_w)
+    return torch.cat((
+        -torch.logsumexp(log_w - x, dim=-1), torch.logsumexp(log_w + x, dim=-1),
+        torch.sum(w * x, dim=-1), torch.sum(w * x * x, dim=-1)
+    ), dim=1).float()
+
+
+@pytest.fixture
+def image():
+    rng = np.random.default_rng(0)
+    return rng.integers(0, 256, size=(150, 230, 3), dtype=np.uint8)
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("length", [64, 100, 150, 230, 1000])
+def test_tile_grid_covers_and_partitions(length):
+    """Test that tiles cover the axis and ownership splits it without gaps or overlaps"""
+    origins = tile_origins(length, 64, 16)
+    assert origins[0] == 0
+    assert origins[-1] + 64 >= length
+    assert all(b - a <= 64 - 16 for a, b in zip(origins, origins[1:]))
+
+    bounds = ownership_bounds(origins, 64, length)
+    assert bounds[0][0] == 0 and bounds[-1][1] == length
+    assert all(prev[1] == cur[0] for prev, cur in zip(bounds, bounds[1:]))
+    assert all(o <= s and e <= o + 64 for o, (s, e) in zip(origins, bounds))
+
+
+@pytest.mark.unit
+def test_tiled_maps_are_seamless(image):
+    """Test that blended tiles reproduce the untiled maps exactly at full size"""
+    net = PixelwiseNet()
+    result = run_tiled(net, image, image.shape[:2], tile_size=64, overlap=16, batch_size=3)
+
+    a, c, npp = reference_maps(image)
+    np.testing.assert_allclose(result["anomaly"], a[0, 0].numpy(), atol=1e-5)
+    np.testing.assert_allclose(result["confidence"], c[0, 0].numpy(), atol=1e-5)
+    np.testing.assert_allclose(result["noiseprint"], npp[0, 0].numpy(), atol=1e-5)
+    assert result["noiseprint_std"] == pytest.approx(npp.std(unbiased=False).item(), rel=1e-4)
+
+    stats = result["stats"]
+    assert stats["grid"] == [len(tile_origins(150, 64, 16)), len(tile_origins(230, 64, 16))]
+    assert stats["tiles"] == sum(net.batch_sizes)
+    assert max(net.batch_sizes) <= 3 and len(net.batch_sizes) == math.ceil(stats["tiles"] / 3)
+    assert stats["tiles_per_sec"] > 0 and stats["peak_rss_mb"] > 0
+
+
+@pytest.mark.unit
+def test_tiled_pooling_matches_global_pooling(image):
+    """Test that detection features pooled over tiles equal pooling over the whole image"""
+    result = run_tiled(PixelwiseNet(), image, (75, 115), tile_size=64, overlap=16, batch_size=4)
+
+    a, c, _ = reference_maps(image)
+    expected = torch.cat((reference_pooling(c), reference_pooling(a, F.logsigmoid(c))), dim=-1)
+    np.testing.assert_allclose(result["features"].numpy(), expected.numpy(), rtol=1e-4, atol=1e-5)
+
+    # Score-only runs skip blending but pool the same features
+    unblended = run_tiled(PixelwiseNet(), image, (75, 115), tile_size=64, overlap=16, batch_size=4,
+                          blend=False, noiseprint=False)
+    assert unblended["anomaly"] is None and unblended["noiseprint"] is None
+    assert unblended["noiseprint_std"] == 0.0
+    np.testing.assert_allclose(unblended["features"].numpy(), result["features"].numpy(), rtol=1e-6)
+    assert unblended["det_logit"].item() == pytest.approx(result["det_logit"].item())
+
+
+@pytest.mark.unit
+def test_streaming_pool_chunks():
+    """Test that pooling in uneven chunks matches pooling everything at once"""
+    rng = np.random.default_rng(1)
+    x = torch.from_numpy(rng.normal(size=1000).astype(np.float32))
+    log_w = torch.from_numpy(rng.normal(scale=3.0, size=1000).astype(np.float32))
+
+    pool = StreamingStatsPool()
+    for start, end in [(0, 10), (10, 500), (500, 501), (501, 1000)]:
+        pool.update(x[start:end], log_w[start:end])
+    np.testing.assert_allclose(pool.result().numpy(), reference_pooling(x, log_w).numpy(), rtol=1e-5, atol=1e-6)
+
+
+@pytest.mark.unit
+def test_downscaled_output_and_validation(image):
+    """Test accumulation at a reduced output size and argument validation"""
+    result = run_tiled(PixelwiseNet(), image, (75, 115), tile_size=64, overlap=16)
+    a, _, _ = reference_maps(image)
+    expected = cv2.resize(a[0, 0].numpy(), (115, 75), interpolation=cv2.INTER_AREA)
+    assert result["anomaly"].shape == (75, 115)
+    assert np.abs(result["anomaly"] - expected).mean() < 0.01
+
+    with pytest.raises(ValueError):
+        run_tiled(PixelwiseNet(), image, (75, 115), tile_size=60)
+    with pytest.raises(ValueError):
+        run_tiled(PixelwiseNet(), image, (75, 115), tile_size=64, overlap=64)
+
+    assert tiles_per_batch(512, 0) == 1
+    assert tiles_per_batch(256, 4096) > tiles_per_batch(512, 4096)
+
+
+@pytest.mark.unit
+def test_peak_rss_without_resource_module(monkeypatch):
+    """Test that the peak RSS falls back to 0 where the resource module is missing (Windows)"""
+    if sys.platform != "win32":
+        assert peak_rss_mb() > 0
+    monkeypatch.setitem(sys.modules, "resource", None)
+    assert peak_rss_mb() == 0.0
@@ -0,0 +1,161 @@
+"""
+Unit tests for streaming upload ingestion
+
+Tests include:
+- Chunked spooling with incremental SHA-256
+- Early rejection of oversized uploads while streaming
+- Content-Length and running-size rejection in UploadLimitMiddleware
+- Extraction of images from ZIP archives with per-file errors and limits
+- Rejection of archives whose extracted images exceed the total size limit
+"""
+import pytest
+import sys
+import io
+import asyncio
+import hashlib
+from pathlib import Path
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from fastapi import FastAPI, File, UploadFile
+from fastapi.testclient import TestClient
+
+from app.utils.uploads import (
+    UploadLimitMiddleware, UploadTooLarge, extract_zip_images, move_spooled_upload, spool_upload
+)
+
+
+class CountingUpload:
+    """UploadFile stand-in recording how much was read"""
+
+    def __init__(self, data: bytes):
+        self.stream = io.BytesIO(data)
+        self.reads = []
+
+    async def read(self, size: int = -1) -> bytes:
+        chunk = self.stream.read(size)
+        self.reads.append(len(chunk))
+        return chunk
+
+
+@pytest.mark.unit
+def test_spool_upload_hashes_in_chunks(tmp_path):
+    """Test that uploads are copied chunk by chunk and hashed on the fly"""
+    data = bytes(range(256)) * 4000
+    upload = CountingUpload(data)
+    spooled = asyncio.run(spool_upload(upload, tmp_path / "spool", max_size=len(data), chunk_size=64 * 1024))
+
+    assert spooled["size"] == len(data)
+    assert spooled["sha256"] == hashlib.sha256(data).hexdigest()
+    assert spooled["path"].read_bytes() == data
+    assert max(upload.reads) <= 64 * 1024
+
+    dest = move_spooled_upload(spooled, tmp_path / "job" / "input.mp4")
+    assert dest.read_bytes() == data and spooled["path"] == dest
+    assert list((tmp_path / "spool").iterdir()) == []
+
+
+@pytest.mark.unit
+def test_spool_upload_rejects_early(tmp_path):
+    """Test that oversized uploads stop at the limit and leave no spool file"""
+    upload = CountingUpload(b"x" * (10 * 1024))
+    with pytest.raises(UploadTooLarge):
+        asyncio.run(spool_upload(upload, tmp_path, max_size=2048, chunk_size=1024))
+
+    assert sum(upload.reads) == 3 * 1024
+    assert list(tmp_path.iterdir()) == []
+
+
+@pytest.mark.unit
+def test_extract_zip_images(tmp_path):
+    """Test that archive images are spooled and hashed, other members reported or skipped"""
+    import zipfile
+
+    archive = tmp_path / "batch.zip"
+    with zipfile.ZipFile(archive, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr("a.JPG", b"jpeg bytes")
+        zf.writestr("big.png", b"x" * 4096)
+        zf.writestr("readme.txt", b"text")
+        zf.writestr("nested/", b"")
+        zf.writestr(".DS_Store", b"")
+        zf.writestr("__MACOSX/._a.JPG", b"")
+
+    spool = tmp_path / "spool"
+    entries = extract_zip_images(archive, spool, max_size=1024, max_images=10)
+
+    assert [entry["filename"] for entry in entries] == ["a.JPG", "big.png", "readme.txt"]
+    good, big, text = entries
+    assert good["mime_type"] == "image/jpeg"
+    assert good["sha256"] == hashlib.sha256(b"jpeg bytes").hexdigest()
+    assert Path(good["path"]).read_bytes() == b"jpeg bytes"
+    assert "error" in big and "error" in text
+    assert list(spool.iterdir()) == [Path(good["path"])]
+
+    with pytest.raises(ValueError):
+        extract_zip_images(archive, spool, max_size=1024, max_images=2)
+    with pytest.raises(ValueError):
+        extract_zip_images(tmp_path / "spool" / Path(good["path"]).name, spool, max_size=1024, max_images=10)
+
+
+@pytest.mark.unit
+def test_extract_zip_images_total_limit(tmp_path):
+    """Test that an archive expanding past max_total is rejected and leaves no spool files"""
+    import zipfile
+
+    archive = tmp_path / "bomb.zip"
+    with zipfile.ZipFile(archive, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+        for i in range(4):
+            zf.writestr(f"{i}.png", b"\0" * 1000)
+
+    spool = tmp_path / "spool"
+    assert archive.stat().st_size < 1000
+    assert len(extract_zip_images(archive, spool, max_size=1024, max_images=10, max_total=4000)) == 4
+
+    for path in spool.iterdir():
+        path.unlink()
+    with pytest.raises(UploadTooLarge):
+        extract_zip_images(archive, spool, max_size=1024, max_images=10, max_total=2500)
+    assert list(spool.iterdir()) == []
+
+
+@pytest.fixture
+def limited_client():
+    app = FastAPI()
+
+    @app.post("/upload")
+    async def upload(file: UploadFile = File(...)):
+        return {"size": len(await file.read())}
+
+    @app.post("/other")
+    async def other(file: UploadFile = File(...)):
+        return {"size": len(await file.read())}
+
+    app.add_middleware(UploadLimitMiddleware, limits={"/upload": 100 * 1024})
+    return TestClient(app)
+
+
+@pytest.mark.unit
+def test_middleware_content_length(limited_client):
+    """Test that requests are rejected from Content-Length only on limited paths"""
+    small = limited_client.post("/upload", files={"file": ("a.bin", b"a" * 1024)})
+    assert small.status_code == 200 and small.json()["size"] == 1024
+
+    big = limited_client.post("/upload", files={"file": ("a.bin", b"a" * 300 * 1024)})
+    assert big.status_code == 413
+    assert "Maximum size" in big.json()["detail"]
+
+    assert limited_client.post("/other", files={"file": ("a.bin", b"a" * 300 * 1024)}).status_code == 200
+
+
+@pytest.mark.unit
+def test_middleware_running_size(limited_client):
+    """Test that bodies without Content-Length are cut off once they pass the limit"""
+    def body():
+        for _ in range(400):
+            yield b"z" * 1024
+
+    response = limited_client.post(
+        "/upload", content=body(), headers={"content-type": "multipart/form-data; boundary=xyz"}
+    )
+    assert response.status_code == 413
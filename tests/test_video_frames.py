@@ -0,0 +1,192 @@
+"""
+Unit tests for the sampled video frame source
+
+Tests include:
+- Sampled frames match decoding every frame with cap.read()
+- Background prefetch yields the same frames in order
+- Decoding selected sampled frames only
+- Stopping early and decoder errors do not leave the decode thread behind
+- Backend selection (OpenCV, PyAV when installed)
+- Top-K keyframe cache and exact re-reads of single frames
+"""
+import pytest
+import sys
+import threading
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+# Add project root to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.utils.video_frames import KeyframeCache, VideoFrameSource, read_frames, sample_step
+
+
+def _write_video(path, num_frames=30, size=(64, 48), fps=30.0):
+    """MJPG AVI whose frame i has brightness ~ 8 * i"""
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"MJPG"), fps, size)
+    if not writer.isOpened():
+        pytest.skip("OpenCV cannot write MJPG video here")
+    for i in range(num_frames):
+        writer.write(np.full((size[1], size[0], 3), 8 * i, dtype=np.uint8))
+    writer.release()
+    return str(path)
+
+
+def _read_every_frame(path, step):
+    """Reference: cap.read() on every frame, keeping every step-th"""
+    cap = cv2.VideoCapture(path)
+    frames = []
+    index = 0
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        if index % step == 0:
+            frames.append(frame)
+        index += 1
+    cap.release()
+    return frames
+
+
+def _decode_threads():
+    return [t for t in threading.enumerate() if t.name == "video-decode"]
+
+
+@pytest.mark.unit
+def test_sample_step():
+    """Test the sampling step for common source and target rates"""
+    assert sample_step(30.0, 3.0) == 10
+    assert sample_step(29.97, 5.0) == 6
+    assert sample_step(25.0, 30.0) == 1
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("prefetch", [0, 4])
+def test_sampled_frames_match_full_decode(tmp_path, prefetch):
+    """Test that grab/retrieve sampling returns the frames cap.read() would keep"""
+    path = _write_video(tmp_path / "clip.avi", num_frames=30, fps=30.0)
+
+    with VideoFrameSource(path, target_fps=5.0, prefetch=prefetch) as source:
+        assert source.source_fps == pytest.approx(30.0)
+        assert source.total_frames == 30
+        assert source.frame_step == 6
+        sampled = list(source)
+
+    reference = _read_every_frame(path, step=6)
+    assert [s["index"] for s in sampled] == [0, 1, 2, 3, 4]
+    assert [s["source_index"] for s in sampled] == [0, 6, 12, 18, 24]
+    assert [s["timestamp"] for s in sampled] == pytest.approx([0.0, 0.2, 0.4, 0.6, 0.8])
+    for s, frame in zip(sampled, reference):
+        np.testing.assert_array_equal(s["frame"], frame)
+        assert s["decode_seconds"] >= 0
+    assert _decode_threads() == []
+
+
+@pytest.mark.unit
+@pytest.mark.parametrize("prefetch", [0, 4])
+def test_selected_sampled_frames(tmp_path, prefetch):
+    """Test that indices restricts the source to those sampled frames, numbered as on the full grid"""
+    path = _write_video(tmp_path / "clip.avi", num_frames=30, fps=30.0)
+
+    with VideoFrameSource(path, target_fps=5.0, prefetch=prefetch, indices=[3, 1, 9]) as source:
+        assert source.sampled_frames == 5
+        sampled = list(source)
+
+    reference = _read_every_frame(path, step=6)
+    assert [s["index"] for s in sampled] == [1, 3]
+    assert [s["source_index"] for s in sampled] == [6, 18]
+    assert [s["timestamp"] for s in sampled] == pytest.approx([0.2, 0.6])
+    np.testing.assert_array_equal(sampled[1]["frame"], reference[3])
+
+    with VideoFrameSource(path, target_fps=5.0, prefetch=prefetch, indices=[]) as source:
+        assert list(source) == []
+    assert _decode_threads() == []
+
+
+@pytest.mark.unit
+def test_prefetch_stops_with_consumer(tmp_path):
+    """Test that breaking out of the loop stops the decode thread"""
+    path = _write_video(tmp_path / "clip.avi", num_frames=60, fps=30.0)
+
+    with VideoFrameSource(path, target_fps=30.0, prefetch=2) as source:
+        for sampled in source:
+            if sampled["index"] == 3:
+                break
+
+    assert _decode_threads() == []
+
+
+@pytest.mark.unit
+def test_decode_errors_reach_consumer(tmp_path):
+    """Test that a failing decoder raises in the consuming thread"""
+    path = _write_video(tmp_path / "clip.avi", num_frames=10, fps=30.0)
+
+    def broken_frames(step):
+        yield 0, np.zeros((48, 64, 3), dtype=np.uint8)
+        raise RuntimeError("corrupt packet")
+
+    source = VideoFrameSource(path, target_fps=30.0, prefetch=4)
+    source._reader.frames = broken_frames
+    with source, pytest.raises(RuntimeError, match="corrupt packet"):
+        assert [s["index"] for s in source] == [0]
+
+    assert _decode_threads() == []
+
+
+@pytest.mark.unit
+def test_backend_selection(tmp_path):
+    """Test unknown backends, unreadable files and the optional PyAV backend"""
+    with pytest.raises(ValueError, match="Unknown decode backend"):
+        VideoFrameSource(str(tmp_path / "clip.avi"), target_fps=3.0, backend="gstreamer")
+
+    (tmp_path / "broken.mp4").write_bytes(b"not a video")
+    with pytest.raises(RuntimeError, match="Failed to open video"):
+        VideoFrameSource(str(tmp_path / "broken.mp4"), target_fps=3.0)
+
+    pytest.importorskip("av")
+    path = _write_video(tmp_path / "clip.avi", num_frames=30, fps=30.0)
+    with VideoFrameSource(path, target_fps=5.0, backend="pyav") as source:
+        sampled = list(source)
+    assert [s["source_index"] for s in sampled] == [0, 6, 12, 18, 24]
+    for s, frame in zip(sampled, _read_every_frame(path, step=6)):
+        # Decoders may differ by rounding in the colour conversion
+        assert np.abs(s["frame"].astype(int) - frame.astype(int)).mean() < 2
+
+
+@pytest.mark.unit
+def test_keyframe_cache_keeps_top_frames(tmp_path):
+    """Test that only the highest-scoring frames stay cached, as imwrite-identical JPEGs"""
+    cache = KeyframeCache(capacity=2)
+    frames = [np.full((48, 64, 3), 30 * i, dtype=np.uint8) for i in range(5)]
+    for index, probability in enumerate([0.2, 0.9, 0.1, 0.7, 0.8]):
+        cache.offer(index, probability, frames[index])
+
+    assert len(cache) == 2
+    assert cache.get(0) is None and cache.get(3) is None
+    path = tmp_path / "frame.jpg"
+    cv2.imwrite(str(path), frames[1])
+    assert cache.get(1) == path.read_bytes()
+    assert cache.get(4) is not None
+    assert cache.nbytes == len(cache.get(1)) + len(cache.get(4))
+
+    disabled = KeyframeCache(capacity=0)
+    disabled.offer(0, 1.0, frames[0])
+    assert len(disabled) == 0
+
+
+@pytest.mark.unit
+def test_read_frames_exact(tmp_path):
+    """Test that single frames are re-read exactly as a full decode returns them"""
+    path = _write_video(tmp_path / "clip.avi", num_frames=30, fps=30.0)
+    reference = _read_every_frame(path, step=1)
+
+    frames = read_frames(path, [17, 3, 17, 29])
+    assert sorted(frames) == [3, 17, 29]
+    for index, frame in frames.items():
+        np.testing.assert_array_equal(frame, reference[index])
+
+    assert read_frames(path, []) == {}
+    assert read_frames(path, [500]) == {}
+
@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+# tools/benchmarks/deepfakebench_batching.py
+"""
+Benchmark DeepfakeBench frame throughput per model and batch size.
+
+For every model with weights present, synthetic video frames are
+preprocessed and run through the adapter's batched inference path in
+batches of each requested size, and the script reports frames/sec for the
+forward pass alone and for preprocess + forward. analyze_video uses the
+same path with DEEPFAKEBENCH_BATCH_SIZE frames per batch.
+
+The weights under models/vendors/DeepfakeBench/training/weights are
+required (see docs/guides/WEIGHTS_DOWNLOAD_GUIDE.md).
+"""
+
+import os
+import sys
+import time
+import argparse
+
+import numpy as np
+import torch
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from app.adapters.deepfakebench_adapter import DeepfakeBenchAdapter
+
+
+def parse_list(value, cast):
+    """Parse a comma separated list."""
+    return [cast(v) for v in value.split(",") if v.strip()]
+
+
+def measure(adapter, frames, batch_size, repeats):
+    """Best-of-repeats seconds for (forward only, preprocess + forward) over all frames."""
+    best_forward = best_total = float("inf")
+    frame_batch = adapter.preprocess_plan.new_batch(batch_size, adapter.device, adapter.transform_fn)
+    for _ in range(repeats):
+        forward_s = 0.0
+        start = time.perf_counter()
+        for i in range(0, len(frames), batch_size):
+            frame_batch.clear()
+            for frame in frames[i:i + batch_size]:
+                frame_batch.add(frame)
+            batch = frame_batch.tensor()
+            forward_start = time.perf_counter()
+            adapter._run_inference(batch, i)
+            forward_s += time.perf_counter() - forward_start
+        best_total = min(best_total, time.perf_counter() - start)
+        best_forward = min(best_forward, forward_s)
+    return best_forward, best_total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark DeepfakeBench batched frame inference")
+    parser.add_argument("--models", default="",
+                        help="Comma separated model keys (default: every model with weights)")
+    parser.add_argument("--batch-sizes", default="1,4,8,16",
+                        help="Comma separated batch sizes (default: 1,4,8,16)")
+    parser.add_argument("--frames", type=int, default=48,
+                        help="Frames per measurement (default: 48)")
+    parser.add_argument("--frame-size", default="1280x720",
+                        help="Synthetic frame size WxH (default: 1280x720)")
+    parser.add_argument("--repeats", type=int, default=3,
+                        help="Repeats per measurement, best is reported (default: 3)")
+    parser.add_argument("--device", default="cuda", choices=["cuda", "cpu"],
+                        help="Device (default: cuda, falls back to cpu)")
+    parser.add_argument("--threads", type=int, default=0,
+                        help="torch intra-op threads (default: torch default)")
+    args = parser.parse_args()
+
+    if args.threads:
+        torch.set_num_threads(args.threads)
+
+    available = [m["key"] for m in DeepfakeBenchAdapter.get_available_models() if m["available"]]
+    models = parse_list(args.models, str) if args.models else available
+    missing = [key for key in models if key not in available]
+    if missing:
+        print(f"[WARN] No weights for {', '.join(missing)}, skipping")
+    models = [key for key in models if key in available]
+    if not models:
+        print(f"[ERROR] No model weights found in {DeepfakeBenchAdapter.WEIGHTS_DIR}")
+        sys.exit(1)
+
+    width, height = (int(v) for v in args.frame_size.lower().split("x"))
+    rng = np.random.default_rng(0)
+    frames = [rng.integers(0, 256, (height, width, 3), dtype=np.uint8) for _ in range(args.frames)]
+    batch_sizes = parse_list(args.batch_sizes, int)
+
+    print(f"[INFO] {args.frames} frames of {width}x{height}, batch sizes {batch_sizes}, "
+          f"{torch.get_num_threads()} torch threads")
+    print()
+    print(f"{'model':<16} {'call_style':<15} {'batch':<6} {'forward_fps':<12} {'total_fps':<10} {'speedup':<8}")
+    print("-" * 72)
+
+    for key in models:
+        adapter = DeepfakeBenchAdapter(model_key=key, device=args.device)
+        # Warm-up at the largest batch size
+        measure(adapter, frames[:max(batch_sizes)], max(batch_sizes), 1)
+
+        baseline = None
+        for batch_size in batch_sizes:
+            forward_s, total_s = measure(adapter, frames, batch_size, args.repeats)
+            baseline = baseline or total_s
+            print(f"{key:<16} {adapter.call_style:<15} {batch_size:<6} {len(frames) / forward_s:<12.1f} "
+                  f"{len(frames) / total_s:<10.1f} {baseline / total_s:<8.2f}x")
+        del adapter
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+#!/usr/bin/env python
+# tools/benchmarks/deepfakebench_ensemble.py
+"""
+Benchmark multi-model video analysis: separate runs against one-decode ensembles.
+
+Strategies:
+- separate: DeepfakeBenchAdapter.analyze_video once per model (one decode each)
+- ensemble: analyze_video_ensemble with the models run in turn on each batch
+- ensemble+parallel: analyze_video_ensemble with one thread per model
+
+The report lists wall time next to the sum and the max of the single-model
+runs; an ensemble approaches the max when the models run in parallel and
+the host has the cores (or GPU) for it.
+
+Without --models, randomly initialized torchvision networks stand in for
+detectors (ResNet-18 at 224, MobileNetV3 at 256, ResNet-34 at 299), since
+only their cost matters; --models uses DeepfakeBench models (needs weights).
+Without --video a 720p clip is generated.
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+import cv2
+import torch
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from app.adapters.deepfakebench_adapter import DeepfakeBenchAdapter, analyze_video_ensemble
+from app.utils.frame_preprocess import PreprocessPlan
+
+# Benchmarks share the clip generator
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from video_decode import write_test_video  # noqa: E402
+
+# (adapter key, torchvision constructor, input size) for the stand-ins
+STAND_INS = [("xception", "resnet18", 224), ("meso4", "mobilenet_v3_small", 256), ("f3net", "resnet34", 299)]
+
+
+def parse_list(value, cast):
+    """Parse a comma separated list."""
+    return [cast(v) for v in value.split(",") if v.strip()]
+
+
+def stand_in_adapter(model_key, network, input_size, batch_size):
+    """DeepfakeBenchAdapter around a randomly initialized torchvision network (no weights needed)."""
+    import torchvision
+
+    adapter = DeepfakeBenchAdapter.__new__(DeepfakeBenchAdapter)
+    adapter.model_key = model_key
+    adapter.device = "cpu"
+    adapter.batch_size = batch_size
+    adapter.decode_backend = "opencv"
+    adapter.decode_prefetch = 16
+    adapter.keyframe_cache_size = 16
+    adapter.model = getattr(torchvision.models, network)(num_classes=2).eval()
+    adapter.transform_fn = None
+    adapter.input_size = input_size
+    adapter.preprocess_plan = PreprocessPlan(input_size)
+    adapter.call_style = adapter._resolve_call_style()
+    return adapter
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark one-decode DeepfakeBench ensembles")
+    parser.add_argument("--video", default="",
+                        help="Video to analyze (default: a generated 30 fps 720p clip)")
+    parser.add_argument("--seconds", type=float, default=10,
+                        help="Length of the generated clip (default: 10)")
+    parser.add_argument("--fps", type=float, default=3.0,
+                        help="Sampling rate (default: 3)")
+    parser.add_argument("--models", default="",
+                        help="Comma separated DeepfakeBench model keys (default: torchvision stand-ins)")
+    parser.add_argument("--device", default="cpu", choices=["cuda", "cpu"],
+                        help="Device for --models (default: cpu)")
+    parser.add_argument("--batch-size", type=int, default=8,
+                        help="Frames per forward pass (default: 8)")
+    parser.add_argument("--repeats", type=int, default=2,
+                        help="Runs per measurement, best is reported (default: 2)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if args.models:
+            adapters = [DeepfakeBenchAdapter(model_key=key, device=args.device, batch_size=args.batch_size)
+                        for key in parse_list(args.models, str)]
+        else:
+            adapters = [stand_in_adapter(key, network, size, args.batch_size)
+                        for key, network, size in STAND_INS]
+
+        # Keyframes are written next to the video, so analyze it through the temp dir
+        video_path = os.path.join(tmp, "clip.mp4")
+        if args.video:
+            os.symlink(os.path.abspath(args.video), video_path)
+        else:
+            print(f"[INFO] Writing a {args.seconds:.0f}s 30 fps 1280x720 test clip...")
+            write_test_video(video_path, args.seconds)
+
+        cap = cv2.VideoCapture(video_path)
+        print(f"[INFO] {int(cap.get(cv2.CAP_PROP_FRAME_COUNT))} frames at {cap.get(cv2.CAP_PROP_FPS):.2f} fps "
+              f"sampled at {args.fps:g} fps, models {', '.join(a.model_key for a in adapters)}, "
+              f"batch {args.batch_size}, {torch.get_num_threads()} torch threads")
+        cap.release()
+
+        def best(run):
+            times = []
+            for _ in range(args.repeats):
+                start = time.perf_counter()
+                run()
+                times.append(time.perf_counter() - start)
+            return min(times)
+
+        # Warm up every model and the file cache
+        for adapter in adapters:
+            adapter.analyze_video(video_path, fps=args.fps)
+
+        singles = {adapter.model_key: best(lambda: adapter.analyze_video(video_path, fps=args.fps))
+                   for adapter in adapters}
+        results = [
+            ("separate", sum(singles.values())),
+            ("ensemble", best(lambda: analyze_video_ensemble(adapters, video_path, fps=args.fps, workers=1))),
+            ("ensemble+parallel", best(lambda: analyze_video_ensemble(adapters, video_path, fps=args.fps))),
+        ]
+
+        print()
+        for key, seconds in singles.items():
+            print(f"[INFO] {key} alone: {seconds:.2f}s")
+        print(f"[INFO] sum {sum(singles.values()):.2f}s, max {max(singles.values()):.2f}s")
+        print()
+        print(f"{'strategy':<19} {'wall_s':<8} {'vs_sum':<8} {'vs_max':<8}")
+        print("-" * 45)
+        for strategy, seconds in results:
+            print(f"{strategy:<19} {seconds:<8.2f} {seconds / sum(singles.values()):<8.2f} "
+                  f"{seconds / max(singles.values()):<8.2f}")
+
+
+if __name__ == "__main__":
+    main()
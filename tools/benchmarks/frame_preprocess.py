@@ -0,0 +1,140 @@
+#!/usr/bin/env python
+# tools/benchmarks/frame_preprocess.py
+"""
+Benchmark DeepfakeBench frame preprocessing in microseconds per frame.
+
+Compares, for each frame size and model input size:
+- torchvision: the former per-frame path of DeepfakeBenchAdapter.analyze_video
+  (BGR->RGB at full resolution, full-resolution grayscale mean/std for the
+  black/low-contrast check, a new Compose of ToPILImage/Resize/ToTensor/
+  Normalize per frame, torch.cat per batch)
+- plan: PreprocessPlan/FrameBatch (cv2 resize into a preallocated batch
+  buffer, luminance at input size, fused normalization per batch)
+
+Model input sizes come from tools/weight_registry.py; no weights are needed.
+"""
+
+import os
+import sys
+import time
+import argparse
+
+import cv2
+import numpy as np
+import torch
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from app.utils.frame_preprocess import PreprocessPlan
+from tools.weight_registry import WEIGHT_REGISTRY
+
+
+def parse_list(value, cast):
+    """Parse a comma separated list."""
+    return [cast(v) for v in value.split(",") if v.strip()]
+
+
+def make_frames(count, width, height):
+    """Smooth BGR frames with moving content, like decoded video."""
+    xx, yy = np.meshgrid(np.arange(width), np.arange(height))
+    frames = []
+    for i in range(count):
+        frame = cv2.merge([((xx + 8 * i) % 256).astype(np.uint8), ((yy + 4 * i) % 256).astype(np.uint8),
+                           np.full((height, width), 96, dtype=np.uint8)])
+        cv2.circle(frame, ((40 + 30 * i) % width, height // 2), height // 6, (255, 255, 255), -1)
+        frames.append(frame)
+    return frames
+
+
+def torchvision_path(frames, input_size, batch_size, device):
+    """The former per-frame preprocessing; returns the batches."""
+    from torchvision import transforms
+
+    batches = []
+    for i in range(0, len(frames), batch_size):
+        tensors = []
+        for frame in frames[i:i + batch_size]:
+            rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            _ = np.mean(gray) < 15 or np.std(gray) < 10
+            transform = transforms.Compose([
+                transforms.ToPILImage(),
+                transforms.Resize((input_size, input_size)),
+                transforms.ToTensor(),
+                transforms.Normalize(mean=[0.485, 0.456, 0.406], std=[0.229, 0.224, 0.225]),
+            ])
+            tensors.append(transform(rgb).unsqueeze(0))
+        batches.append(torch.cat(tensors).to(device))
+    return batches
+
+
+def plan_path(frames, input_size, batch_size, device):
+    """PreprocessPlan/FrameBatch; returns the number of batches (the tensor buffer is reused)."""
+    frame_batch = PreprocessPlan(input_size).new_batch(batch_size, device)
+    batches = 0
+    for i in range(0, len(frames), batch_size):
+        frame_batch.clear()
+        for frame in frames[i:i + batch_size]:
+            mean, std = frame_batch.add(frame)
+            _ = mean < 15 or std < 10
+        frame_batch.tensor()
+        batches += 1
+    if device == "cuda":
+        torch.cuda.synchronize()
+    return batches
+
+
+def measure(fn, frames, input_size, batch_size, device, repeats):
+    """Best-of-repeats microseconds per frame."""
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn(frames, input_size, batch_size, device)
+        best = min(best, time.perf_counter() - start)
+    return best / len(frames) * 1e6
+
+
+def main():
+    input_sizes = sorted({meta["input_size"] for meta in WEIGHT_REGISTRY.values()})
+
+    parser = argparse.ArgumentParser(description="Benchmark DeepfakeBench frame preprocessing")
+    parser.add_argument("--frame-sizes", default="640x360,1280x720,1920x1080",
+                        help="Comma separated frame sizes WxH (default: 640x360,1280x720,1920x1080)")
+    parser.add_argument("--input-sizes", default=",".join(str(s) for s in input_sizes),
+                        help="Comma separated model input sizes (default: all registry sizes)")
+    parser.add_argument("--frames", type=int, default=32,
+                        help="Frames per measurement (default: 32)")
+    parser.add_argument("--batch-size", type=int, default=8,
+                        help="Frames per batch (default: 8)")
+    parser.add_argument("--device", default="cpu", choices=["cuda", "cpu"],
+                        help="Device the batches go to (default: cpu)")
+    parser.add_argument("--repeats", type=int, default=3,
+                        help="Runs per measurement, best is reported (default: 3)")
+    args = parser.parse_args()
+
+    device = args.device if args.device == "cpu" or torch.cuda.is_available() else "cpu"
+    if device != args.device:
+        print("[WARN] CUDA is not available, using cpu")
+
+    print(f"[INFO] {args.frames} frames, batch {args.batch_size}, device {device}, "
+          f"{torch.get_num_threads()} torch threads, {cv2.getNumThreads()} OpenCV threads")
+    print()
+    print(f"{'frame':<11} {'input':<6} {'torchvision_us':<15} {'plan_us':<9} {'speedup':<8}")
+    print("-" * 52)
+
+    for frame_size in parse_list(args.frame_sizes, str):
+        width, height = (int(v) for v in frame_size.lower().split("x"))
+        frames = make_frames(args.frames, width, height)
+        for input_size in parse_list(args.input_sizes, int):
+            # Warm up both paths
+            torchvision_path(frames[:args.batch_size], input_size, args.batch_size, device)
+            plan_path(frames[:args.batch_size], input_size, args.batch_size, device)
+
+            before = measure(torchvision_path, frames, input_size, args.batch_size, device, args.repeats)
+            after = measure(plan_path, frames, input_size, args.batch_size, device, args.repeats)
+            print(f"{frame_size:<11} {input_size:<6} {before:<15.0f} {after:<9.0f} {before / after:<8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
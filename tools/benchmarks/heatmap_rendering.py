@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+# tools/benchmarks/heatmap_rendering.py
+"""
+Benchmark heatmap rendering.
+
+Compares the LUT-based renderer in app.reports.heatmap_renderer with the
+previous per-map matplotlib figure (10x10 inch, 150 dpi, colorbar) for a
+smooth synthetic map at report resolution.
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+import numpy as np
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from app.reports.heatmap_renderer import render_heatmap, render_heatmap_png
+
+
+def synthetic_map(height, width):
+    yy, xx = np.mgrid[0:height, 0:width].astype(np.float32)
+    return (np.sin(xx / 50) * np.cos(yy / 70) * 0.5 + 0.5).astype(np.float32)
+
+
+def timed(fn, repeats):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    return (time.perf_counter() - start) / repeats * 1000.0
+
+
+def render_matplotlib(arr, path):
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+
+    fig, ax = plt.subplots(figsize=(10, 10))
+    im = ax.imshow(arr, cmap='jet', vmin=0, vmax=1)
+    ax.set_title("Anomaly Detection Heatmap", fontsize=14, fontweight='bold')
+    ax.axis('off')
+    cbar = plt.colorbar(im, ax=ax, fraction=0.046, pad=0.04)
+    cbar.set_label('Anomaly Score', rotation=270, labelpad=20)
+    plt.savefig(path, dpi=150, bbox_inches='tight')
+    plt.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark heatmap rendering")
+    parser.add_argument("--width", type=int, default=1024, help="Map width (default: 1024)")
+    parser.add_argument("--height", type=int, default=768, help="Map height (default: 768)")
+    parser.add_argument("--repeats", type=int, default=10, help="Repetitions (default: 10)")
+    parser.add_argument("--skip-matplotlib", action="store_true", help="Skip the matplotlib baseline")
+    args = parser.parse_args()
+
+    arr = synthetic_map(args.height, args.width)
+    print(f"[INFO] Map: {args.height}x{args.width}, {args.repeats} repeats\n")
+    print(f"{'renderer':<28} {'ms/map':>10}")
+    print("-" * 40)
+
+    lut_ms = timed(lambda: render_heatmap(arr, "jet", label="Anomaly Score"), args.repeats)
+    print(f"{'LUT colorize + legend':<28} {lut_ms:>10.1f}")
+    png_ms = timed(lambda: render_heatmap_png(arr, "jet", label="Anomaly Score"), args.repeats)
+    print(f"{'LUT + PNG encode':<28} {png_ms:>10.1f}")
+
+    if not args.skip_matplotlib:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "heatmap.png")
+            mpl_ms = timed(lambda: render_matplotlib(arr, path), max(1, args.repeats // 5))
+        print(f"{'matplotlib figure + PNG':<28} {mpl_ms:>10.1f}")
+        print(f"\nSpeedup (PNG files): {mpl_ms / png_ms:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
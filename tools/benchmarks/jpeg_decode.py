@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+# tools/benchmarks/jpeg_decode.py
+"""
+Benchmark TruFor image decoding and preprocessing.
+
+Compares the reduced-resolution JPEG decode (PIL draft, DCT-domain
+downscaling) with a full decode for synthetic JPEGs of several sizes, and
+reports decode and full preprocessing (decode + resize + normalize + pad)
+times. No model is loaded.
+"""
+
+import io
+import os
+import sys
+import time
+import argparse
+
+import cv2
+import numpy as np
+import torch
+from PIL import Image
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from app.adapters.trufor_adapter import MODEL_INPUT_SIZE, TruForAdapter
+
+
+def synthetic_jpeg(width, height, quality):
+    """Smooth synthetic photo encoded as JPEG."""
+    rng = np.random.default_rng(0)
+    base = cv2.resize(rng.random((60, 80, 3)).astype(np.float32), (width, height), interpolation=cv2.INTER_CUBIC)
+    buf = io.BytesIO()
+    Image.fromarray((np.clip(base, 0, 1) * 255).astype(np.uint8)).save(buf, "JPEG", quality=quality)
+    return buf.getvalue()
+
+
+def timed(fn, repeats):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        fn()
+    return (time.perf_counter() - start) / repeats * 1000.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark reduced-resolution JPEG decoding")
+    parser.add_argument("--sizes", default="1024x768,2048x1536,4000x3000,6000x4000",
+                        help="Comma separated WxH image sizes (default: 1024x768,2048x1536,4000x3000,6000x4000)")
+    parser.add_argument("--quality", type=int, default=90, help="JPEG quality (default: 90)")
+    parser.add_argument("--repeats", type=int, default=5, help="Repetitions (default: 5)")
+    args = parser.parse_args()
+
+    # Preprocessing does not need the network
+    adapter = TruForAdapter.__new__(TruForAdapter)
+    adapter.device = torch.device("cpu")
+
+    print(f"[INFO] Target size {MODEL_INPUT_SIZE}px, JPEG quality {args.quality}, {args.repeats} repeats")
+    print()
+    print(f"{'size':<12} {'MP':<6} {'decoded_as':<12} {'full_ms':<9} {'reduced_ms':<11} {'prep_full':<10} "
+          f"{'prep_reduced':<13} {'speedup':<8} {'mean_diff':<9}")
+    print("-" * 100)
+
+    stdout = sys.stdout
+    for size in args.sizes.split(","):
+        width, height = (int(v) for v in size.lower().split("x"))
+        data = synthetic_jpeg(width, height, args.quality)
+
+        results = {}
+        for reduced in (False, True):
+            adapter.reduced_decode = reduced
+            decoded = adapter._load_image(data, target_size=MODEL_INPUT_SIZE)[0]
+            decode_ms = timed(lambda: adapter._load_image(data, target_size=MODEL_INPUT_SIZE)[0].load(), args.repeats)
+            # Silence the per-image debug prints of _preprocess_image
+            sys.stdout = open(os.devnull, "w")
+            try:
+                prep_ms = timed(lambda: adapter._preprocess_image(data), args.repeats)
+                tensor = adapter._preprocess_image(data)[0]
+            finally:
+                sys.stdout.close()
+                sys.stdout = stdout
+            results[reduced] = (decoded.size, decode_ms, prep_ms, tensor)
+
+        full, fast = results[False], results[True]
+        diff = (full[3] - fast[3]).abs().mean().item()
+        print(f"{size:<12} {width * height / 1e6:<6.1f} {'%dx%d' % fast[0]:<12} {full[1]:<9.1f} {fast[1]:<11.1f} "
+              f"{full[2]:<10.1f} {fast[2]:<13.1f} {full[2] / fast[2]:<8.2f} {diff:<9.4f}")
+
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+# tools/benchmarks/map_encoding.py
+"""
+Benchmark TruFor map serialization.
+
+Compares payload size and encode time of the legacy nested-list JSON maps
+against the compact encodings in app.utils.map_encoding, both for a full
+resolution map (what the adapter used to return) and for the 300px preview
+that the API actually sends.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+
+import numpy as np
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from app.utils.map_encoding import MAP_FORMATS, encode_map, downsample_map
+
+
+def synthetic_map(height, width, seed=0):
+    """Smooth anomaly-like map in [0, 1] with a bit of noise"""
+    rng = np.random.default_rng(seed)
+    yy, xx = np.mgrid[0:height, 0:width].astype(np.float32)
+    blob = np.exp(-(((xx - width * 0.6) / (width * 0.15)) ** 2 + ((yy - height * 0.4) / (height * 0.15)) ** 2))
+    noise = rng.random((height, width), dtype=np.float32) * 0.05
+    return np.clip(blob + noise, 0, 1).astype(np.float32)
+
+
+def time_encoding(arr, fmt, repeats):
+    """Return (bytes in JSON response, seconds per encode + json.dumps)"""
+    start = time.perf_counter()
+    for _ in range(repeats):
+        body = json.dumps(encode_map(arr, fmt))
+    elapsed = (time.perf_counter() - start) / repeats
+    return len(body), elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark TruFor map serialization")
+    parser.add_argument("--width", type=int, default=6000, help="Full-resolution width (default: 6000, ~24MP)")
+    parser.add_argument("--height", type=int, default=4000, help="Full-resolution height (default: 4000)")
+    parser.add_argument("--repeats", type=int, default=3, help="Repetitions per measurement (default: 3)")
+    parser.add_argument("--skip-full-json", action="store_true",
+                        help="Skip the (slow, memory hungry) full-resolution JSON measurement")
+    args = parser.parse_args()
+
+    full = synthetic_map(args.height, args.width)
+    preview = downsample_map(full, max_size=300)
+
+    for label, arr in (("full", full), ("preview", preview)):
+        print(f"\n[INFO] {label} map: {arr.shape[0]}x{arr.shape[1]}")
+        print(f"{'format':<10} {'bytes':>14} {'encode_ms':>12} {'vs json':>10}")
+        print("-" * 50)
+        json_size = json_time = None
+        for fmt in ("json",) + tuple(f for f in MAP_FORMATS if f != "json"):
+            if fmt == "json" and label == "full" and args.skip_full_json:
+                print(f"{fmt:<10} {'skipped':>14}")
+                continue
+            repeats = 1 if (fmt == "json" and label == "full") else args.repeats
+            size, seconds = time_encoding(arr, fmt, repeats)
+            if fmt == "json":
+                json_size, json_time = size, seconds
+            ratio = f"{json_size / size:.0f}x" if json_size else "-"
+            print(f"{fmt:<10} {size:>14,} {seconds * 1000:>12.1f} {ratio:>10}")
+
+
+if __name__ == "__main__":
+    main()
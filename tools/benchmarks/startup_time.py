@@ -0,0 +1,135 @@
+#!/usr/bin/env python
+# tools/benchmarks/startup_time.py
+"""
+Benchmark server startup: time until /health answers and until /ready
+reports every model loaded.
+
+Each run starts `uvicorn app.main:app` in a fresh process from the project
+root and polls both endpoints. Models load in the background, so /health
+(liveness) answers as soon as the app module is imported, while /ready
+waits for the TruFor checkpoint load plus warm-up pass and the DeepfakeBench
+registry import. Before background loading, /health only answered after all
+of that, i.e. at the /ready time.
+
+Without --model-path a randomly initialized TruFor checkpoint is written to
+a temporary file so the load and warm-up are measured with real sizes.
+"""
+
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import tempfile
+import statistics
+import subprocess
+import urllib.error
+import urllib.request
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Add project root to path
+sys.path.insert(0, PROJECT_ROOT)
+
+
+def write_random_checkpoint(path):
+    """Save a randomly initialized TruFor checkpoint in the release layout."""
+    import torch
+    from app.adapters.trufor_adapter import build_trufor_model
+
+    model, _ = build_trufor_model(None, torch.device("cpu"))
+    torch.save({"state_dict": model.state_dict()}, path)
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def get(url):
+    """(status, JSON body) or (None, None) while the server is not listening."""
+    try:
+        with urllib.request.urlopen(url, timeout=2) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+    except (urllib.error.URLError, ConnectionError, socket.timeout):
+        return None, None
+
+
+def measure_startup(model_path, warmup, timeout):
+    """Start the server once: (seconds to /health, seconds to /ready, /ready body)."""
+    port = free_port()
+    env = dict(os.environ, MODEL_PATH=model_path, TRUFOR_WARMUP="1" if warmup else "0", LOG_LEVEL="WARNING")
+    base = f"http://127.0.0.1:{port}"
+
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--log-level", "warning"],
+        cwd=PROJECT_ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        health_s = ready_s = body = None
+        while time.perf_counter() - started < timeout:
+            if health_s is None and get(f"{base}/health")[0] == 200:
+                health_s = time.perf_counter() - started
+            if health_s is not None:
+                status, body = get(f"{base}/ready")
+                if status == 200:
+                    ready_s = time.perf_counter() - started
+                    break
+            time.sleep(0.02)
+        return health_s, ready_s, body
+    finally:
+        server.terminate()
+        server.wait(timeout=60)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark time to /health and /ready")
+    parser.add_argument("--model-path", default="",
+                        help="TruFor checkpoint (default: a random-weight checkpoint in a temp dir)")
+    parser.add_argument("--runs", type=int, default=3,
+                        help="Server starts to measure (default: 3)")
+    parser.add_argument("--no-warmup", action="store_true",
+                        help="Start with TRUFOR_WARMUP=0")
+    parser.add_argument("--timeout", type=float, default=300,
+                        help="Give up on a run after this many seconds (default: 300)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        model_path = args.model_path
+        if not model_path:
+            model_path = os.path.join(tmp, "trufor_random.pth.tar")
+            print("[INFO] Writing a random-weight TruFor checkpoint...")
+            write_random_checkpoint(model_path)
+
+        print(f"[INFO] {args.runs} runs, checkpoint {model_path}, warm-up {'off' if args.no_warmup else 'on'}")
+        print()
+        print(f"{'run':<5} {'health_s':<10} {'ready_s':<9} {'trufor_load_s':<15} {'trufor_warmup_s':<17} {'dfb_import_s':<12}")
+        print("-" * 72)
+
+        health_times, ready_times = [], []
+        for run in range(1, args.runs + 1):
+            health_s, ready_s, body = measure_startup(model_path, not args.no_warmup, args.timeout)
+            if ready_s is None:
+                print(f"{run:<5} timed out after {args.timeout:.0f}s (last /ready: {body})")
+                continue
+            models = body["models"]
+            trufor, dfb = models.get("trufor", {}), models.get("deepfakebench", {})
+            health_times.append(health_s)
+            ready_times.append(ready_s)
+            print(f"{run:<5} {health_s:<10.2f} {ready_s:<9.2f} {trufor.get('load_seconds') or 0:<15.2f} "
+                  f"{trufor.get('warmup_seconds') or 0:<17.2f} {dfb.get('load_seconds') or 0:<12.2f}")
+
+    if health_times:
+        print()
+        print(f"[INFO] Median time to /health: {statistics.median(health_times):.2f}s, "
+              f"to /ready: {statistics.median(ready_times):.2f}s")
+
+
+if __name__ == "__main__":
+    main()
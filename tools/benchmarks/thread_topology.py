@@ -0,0 +1,127 @@
+#!/usr/bin/env python
+# tools/benchmarks/thread_topology.py
+"""
+Sweep inference worker thread layouts and report the best one for this host.
+
+Every layout (workers x intra-op threads, with and without core pinning)
+runs in a fresh process, because torch thread counts are process-wide. The
+process builds TruFor (random weights unless --model-path is given, with the
+adapter's load-time optimizations), starts an InferenceExecutor configured
+by app.utils.thread_topology and pushes --requests forward passes through
+it concurrently. Throughput (images/sec) and request latency are reported,
+together with the "untuned" layout torch gives two workers by default
+(every worker using every core).
+
+The best layout is printed as INFERENCE_* environment variables.
+"""
+
+import os
+import sys
+import time
+import argparse
+import statistics
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from app.utils.thread_topology import available_cpus
+
+
+def candidate_layouts(cpus, workers_list=None):
+    """(label, make_topology kwargs) for every layout to sweep."""
+    if workers_list is None:
+        workers_list = [w for w in range(1, cpus + 1) if cpus % w == 0] or [1]
+    layouts = [("untuned", {"workers": 2, "intra_op_threads": cpus})]
+    for workers in workers_list:
+        intra = max(1, cpus // workers)
+        layouts.append(("split", {"workers": workers, "intra_op_threads": intra}))
+        if hasattr(os, "sched_setaffinity"):
+            layouts.append(("pinned", {"workers": workers, "intra_op_threads": intra, "pin_cores": True}))
+    return layouts
+
+
+def run_layout(layout, model_path, size, requests):
+    """Run in a child process: throughput and latencies of one layout."""
+    import torch
+    from app.adapters.trufor_adapter import build_trufor_model
+    from app.adapters.trufor_optimize import optimize_trufor_for_inference
+    from app.utils.inference_executor import InferenceExecutor
+    from app.utils.thread_topology import apply_process_topology, make_topology, worker_initializer
+
+    topology = make_topology(**layout)
+    apply_process_topology(topology)
+
+    model, _ = build_trufor_model(model_path, torch.device("cpu"))
+    optimize_trufor_for_inference(model)
+    x = torch.randn(1, 3, size, size)
+
+    def forward():
+        started = time.perf_counter()
+        with torch.no_grad():
+            model(x)
+        return time.perf_counter() - started
+
+    executor = InferenceExecutor(max_workers=topology["workers"], max_queue_size=requests,
+                                 name="sweep", initializer=worker_initializer(topology))
+    # Warm every worker once (thread start, allocator, oneDNN primitives)
+    for future in [executor.submit(forward) for _ in range(topology["workers"])]:
+        future.result()
+
+    started = time.perf_counter()
+    latencies = [future.result() for future in [executor.submit(forward) for _ in range(requests)]]
+    elapsed = time.perf_counter() - started
+    executor.shutdown()
+
+    return {
+        "throughput": requests / elapsed,
+        "p50_ms": statistics.median(latencies) * 1000,
+        "max_ms": max(latencies) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sweep inference worker thread layouts")
+    parser.add_argument("--model-path", default="",
+                        help="Optional TruFor checkpoint (random weights if omitted)")
+    parser.add_argument("--size", type=int, default=512,
+                        help="Input side in pixels (default: 512)")
+    parser.add_argument("--requests", type=int, default=0,
+                        help="Concurrent requests per layout (default: 2 x the largest worker count)")
+    parser.add_argument("--workers", default="",
+                        help="Comma separated worker counts to sweep (default: divisors of the CPU count)")
+    args = parser.parse_args()
+
+    model_path = args.model_path if args.model_path and os.path.exists(args.model_path) else None
+    cpus = len(available_cpus())
+    workers_list = [int(w) for w in args.workers.split(",") if w.strip()] or None
+    layouts = candidate_layouts(cpus, workers_list)
+    requests = args.requests or 2 * max(layout["workers"] for _, layout in layouts)
+
+    print(f"[INFO] {cpus} CPUs available, {len(layouts)} layouts, {requests} requests of {args.size}x{args.size} each")
+    print(f"[INFO] TruFor with {'checkpoint: ' + model_path if model_path else 'random weights'}")
+    print()
+    print(f"{'layout':<8} {'workers':<8} {'intra':<6} {'pinned':<7} {'img/s':<8} {'p50_ms':<9} {'max_ms':<9}")
+    print("-" * 60)
+
+    context = multiprocessing.get_context("spawn")
+    results = []
+    for label, layout in layouts:
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+            result = pool.submit(run_layout, layout, model_path, args.size, requests).result()
+        results.append((label, layout, result))
+        print(f"{label:<8} {layout['workers']:<8} {layout['intra_op_threads']:<6} "
+              f"{'yes' if layout.get('pin_cores') else 'no':<7} {result['throughput']:<8.3f} "
+              f"{result['p50_ms']:<9.0f} {result['max_ms']:<9.0f}")
+
+    label, best, result = max(results, key=lambda item: item[2]["throughput"])
+    print()
+    print(f"[INFO] Best layout: {label}, {result['throughput']:.3f} img/s")
+    print(f"       INFERENCE_WORKERS={best['workers']} "
+          f"INFERENCE_INTRA_OP_THREADS={best['intra_op_threads']} "
+          f"INFERENCE_PIN_CORES={1 if best.get('pin_cores') else 0}")
+
+
+if __name__ == "__main__":
+    main()
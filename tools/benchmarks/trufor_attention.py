@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+# tools/benchmarks/trufor_attention.py
+"""
+Benchmark the TruFor encoder attention: original (manual) vs. fused
+scaled_dot_product_attention (app/adapters/trufor_attention.py).
+
+For every input (batch x side, e.g. 1x512 for a single image or 4x512 for a
+batch of tiles in tiled analysis) and every encoder stage, the script times
+one call of the Segformer self-attention and of the CMX cross-attention
+with the stage's token count and width (MiT-B2 configuration), and reports
+the peak memory the call adds on top of its inputs (reported as 0 where the
+peak RSS is unavailable, e.g. on Windows).
+
+Each measurement runs in a fresh process so the peak RSS is not polluted
+by earlier runs.
+"""
+
+import os
+import sys
+import time
+import argparse
+import statistics
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+# MiT-B2 encoder of TruFor: (embed dim, heads, spatial reduction, downsampling) per stage
+STAGES = [(64, 1, 8, 4), (128, 2, 4, 8), (320, 5, 2, 16), (512, 8, 1, 32)]
+
+
+def parse_inputs(value):
+    """Parse '1x512,4x512' into [(1, 512), (4, 512)]."""
+    inputs = []
+    for item in value.split(","):
+        if item.strip():
+            batch, side = item.lower().split("x")
+            inputs.append((int(batch), int(side)))
+    return inputs
+
+
+def measure(kind, impl, stage, batch, side, threads, runs):
+    """Run in a child process: (median ms, peak MB added by the first call)."""
+    import torch
+    import app.adapters.trufor_adapter  # noqa: F401 (puts the TruFor sources on sys.path)
+    from app.adapters.trufor_attention import Attention, CrossAttention, set_attention_impl
+    from app.adapters.trufor_tiling import peak_rss_mb
+
+    torch.set_num_threads(threads)
+    torch.manual_seed(0)
+    dim, heads, sr_ratio, down = STAGES[stage]
+    h = w = side // down
+
+    if kind == "self":
+        module = Attention(dim, num_heads=heads, qkv_bias=True, sr_ratio=sr_ratio)
+        inputs = (torch.randn(batch, h * w, dim), h, w)
+    else:
+        module = CrossAttention(dim, num_heads=heads)
+        inputs = (torch.randn(batch, h * w, dim), torch.randn(batch, h * w, dim))
+    set_attention_impl(module, impl)
+    module.eval()
+
+    with torch.no_grad():
+        before = peak_rss_mb()
+        module(*inputs)
+        peak_mb = peak_rss_mb() - before
+        times = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            module(*inputs)
+            times.append(time.perf_counter() - start)
+    return statistics.median(times) * 1000, peak_mb
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark TruFor manual vs. SDPA attention per encoder stage")
+    parser.add_argument("--inputs", default="1x512,4x512,1x1024",
+                        help="Comma separated BATCHxSIDE inputs (default: 1x512,4x512,1x1024)")
+    parser.add_argument("--threads", type=int, default=1,
+                        help="Torch threads (default: 1)")
+    parser.add_argument("--runs", type=int, default=3,
+                        help="Timed runs per configuration (default: 3)")
+    args = parser.parse_args()
+
+    print(f"[INFO] {os.cpu_count()} CPUs, {args.threads} thread(s), {args.runs} runs, one process per measurement")
+    print()
+    print(f"{'input':<8} {'stage':<6} {'tokens':<8} {'module':<7} {'impl':<7} {'latency_ms':<11} {'peak_mb':<9} {'speedup':<8}")
+    print("-" * 70)
+
+    context = multiprocessing.get_context("spawn")
+    for batch, side in parse_inputs(args.inputs):
+        for stage, (_, _, _, down) in enumerate(STAGES):
+            tokens = (side // down) ** 2
+            for kind in ("self", "cross"):
+                baseline = None
+                for impl in ("manual", "sdpa"):
+                    with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                        latency, peak_mb = pool.submit(measure, kind, impl, stage, batch, side,
+                                                       args.threads, args.runs).result()
+                    if baseline is None:
+                        baseline = latency
+                    print(f"{batch}x{side:<6} {stage + 1:<6} {tokens:<8} {kind:<7} {impl:<7} "
+                          f"{latency:<11.1f} {peak_mb:<9.1f} {baseline / latency:<8.2f}x")
+
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+#!/usr/bin/env python
+# tools/benchmarks/trufor_batching.py
+"""
+Benchmark TruFor micro-batching throughput.
+
+Simulates bursty concurrent uploads: several client threads submit
+preprocessed 512x512 tensors to a TruForBatcher at the same time, and the
+script reports images/sec for every (max batch size, max wait) combination.
+
+Without --model-path the network is randomly initialized, which is fine for
+throughput measurements since the cost does not depend on the weights.
+"""
+
+import os
+import sys
+import time
+import argparse
+import threading
+
+import torch
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from app.adapters.trufor_adapter import build_trufor_model
+from app.adapters.trufor_batcher import TruForBatcher
+
+
+def parse_list(value, cast):
+    """Parse a comma separated list of numbers."""
+    return [cast(v) for v in value.split(",") if v.strip()]
+
+
+def run_burst(batcher, clients, requests_per_client, size):
+    """Fire requests from several client threads at once; return elapsed seconds."""
+    barrier = threading.Barrier(clients + 1)
+    errors = []
+
+    def client():
+        tensor = torch.randn(1, 3, size, size)
+        barrier.wait()
+        try:
+            for _ in range(requests_per_client):
+                batcher.infer(tensor)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    for t in threads:
+        t.start()
+
+    barrier.wait()
+    start = time.perf_counter()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    if errors:
+        raise errors[0]
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark TruFor micro-batching throughput")
+    parser.add_argument("--model-path", default="",
+                        help="Optional TruFor checkpoint (random weights if omitted)")
+    parser.add_argument("--batch-sizes", default="1,2,4,8",
+                        help="Comma separated max batch sizes (default: 1,2,4,8)")
+    parser.add_argument("--wait-ms", default="0,10,25",
+                        help="Comma separated batching windows in ms (default: 0,10,25)")
+    parser.add_argument("--clients", type=int, default=8,
+                        help="Number of concurrent clients (default: 8)")
+    parser.add_argument("--requests", type=int, default=2,
+                        help="Requests per client (default: 2)")
+    parser.add_argument("--size", type=int, default=512,
+                        help="Input resolution (default: 512, must be a multiple of 32)")
+    parser.add_argument("--threads", type=int, default=0,
+                        help="torch intra-op threads (default: torch default)")
+    args = parser.parse_args()
+
+    if args.threads > 0:
+        torch.set_num_threads(args.threads)
+
+    model_path = args.model_path if args.model_path and os.path.exists(args.model_path) else None
+    print(f"[INFO] Building TruFor ({'checkpoint: ' + model_path if model_path else 'random weights'})")
+    model, _ = build_trufor_model(model_path, torch.device("cpu"))
+
+    # Warm-up so one-time allocations do not skew the first configuration
+    with torch.no_grad():
+        model(torch.randn(1, 3, args.size, args.size))
+
+    total_images = args.clients * args.requests
+    print(f"[INFO] {args.clients} clients x {args.requests} requests = {total_images} images "
+          f"at {args.size}x{args.size}, torch threads={torch.get_num_threads()}")
+    print()
+    print(f"{'max_batch':<10} {'wait_ms':<8} {'seconds':<9} {'img/s':<8} {'avg_batch':<10} {'avg_wait_ms':<12} {'speedup':<8}")
+    print("-" * 70)
+
+    baseline = None
+    for batch_size in parse_list(args.batch_sizes, int):
+        windows = [0.0] if batch_size == 1 else parse_list(args.wait_ms, float)
+        for wait_ms in windows:
+            batcher = TruForBatcher(model, max_batch_size=batch_size, max_wait_ms=wait_ms)
+            try:
+                elapsed = run_burst(batcher, args.clients, args.requests, args.size)
+                stats = batcher.stats()
+            finally:
+                batcher.close()
+
+            throughput = total_images / elapsed
+            if baseline is None:
+                baseline = throughput
+            print(f"{batch_size:<10} {wait_ms:<8.1f} {elapsed:<9.2f} {throughput:<8.2f} "
+                  f"{stats['avg_batch_size']:<10.2f} {stats['avg_wait_ms']:<12.1f} {throughput / baseline:<8.2f}x")
+
+    print()
+
+
+if __name__ == "__main__":
+    main()
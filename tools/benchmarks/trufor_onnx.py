@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+# tools/benchmarks/trufor_onnx.py
+"""
+Benchmark TruFor on eager PyTorch vs. ONNX Runtime (CPU).
+
+For every thread count the script measures single-image latency (median
+over --runs forward passes at batch size 1) and throughput (images/sec at
+--batch-size) on both backends, using the same weights and inputs.
+
+Without --model-path the network is randomly initialized, which is fine for
+timing since the cost does not depend on the weights. The ONNX graph is
+exported to --onnx-path first if it does not exist.
+"""
+
+import os
+import sys
+import time
+import argparse
+import statistics
+
+import torch
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from app.adapters.trufor_adapter import MODEL_INPUT_SIZE, build_trufor_model
+from app.adapters.trufor_onnx import OnnxTruForSession, export_trufor_onnx
+
+
+def parse_list(value, cast):
+    """Parse a comma separated list of numbers."""
+    return [cast(v) for v in value.split(",") if v.strip()]
+
+
+def time_forward(forward_fn, x, runs, warmup):
+    """Median seconds per call of forward_fn(x)."""
+    with torch.no_grad():
+        for _ in range(warmup):
+            forward_fn(x)
+        times = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            forward_fn(x)
+            times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark TruFor torch vs. ONNX Runtime backends")
+    parser.add_argument("--model-path", default="",
+                        help="Optional TruFor checkpoint (random weights if omitted)")
+    parser.add_argument("--onnx-path", default="temp/trufor_benchmark.onnx",
+                        help="ONNX graph, exported if missing (default: temp/trufor_benchmark.onnx)")
+    parser.add_argument("--threads", default="1,2,4",
+                        help="Comma separated thread counts (default: 1,2,4)")
+    parser.add_argument("--batch-size", type=int, default=4,
+                        help="Batch size for the throughput measurement (default: 4)")
+    parser.add_argument("--runs", type=int, default=3,
+                        help="Timed runs per configuration (default: 3)")
+    parser.add_argument("--warmup", type=int, default=1,
+                        help="Untimed warm-up runs per configuration (default: 1)")
+    args = parser.parse_args()
+
+    model_path = args.model_path if args.model_path and os.path.exists(args.model_path) else None
+    print(f"[INFO] Building TruFor ({'checkpoint: ' + model_path if model_path else 'random weights'})")
+    model, _ = build_trufor_model(model_path, torch.device("cpu"))
+
+    if not os.path.exists(args.onnx_path):
+        print(f"[INFO] Exporting ONNX graph to {args.onnx_path}")
+        export_trufor_onnx(model, args.onnx_path)
+
+    single = torch.randn(1, 3, MODEL_INPUT_SIZE, MODEL_INPUT_SIZE)
+    batch = torch.randn(args.batch_size, 3, MODEL_INPUT_SIZE, MODEL_INPUT_SIZE)
+
+    print(f"[INFO] {os.cpu_count()} CPUs, batch size {args.batch_size}, {args.runs} runs")
+    print()
+    print(f"{'threads':<8} {'backend':<8} {'latency_ms':<11} {'img/s':<8} {'speedup':<8}")
+    print("-" * 46)
+
+    for threads in parse_list(args.threads, int):
+        torch.set_num_threads(threads)
+        session = OnnxTruForSession(args.onnx_path, intra_op_threads=threads)
+
+        baseline = None
+        for name, forward_fn in (("torch", model), ("onnx", session)):
+            latency = time_forward(forward_fn, single, args.runs, args.warmup)
+            throughput = args.batch_size / time_forward(forward_fn, batch, args.runs, args.warmup)
+            if baseline is None:
+                baseline = throughput
+            print(f"{threads:<8} {name:<8} {latency * 1000:<11.0f} {throughput:<8.2f} {throughput / baseline:<8.2f}x")
+        del session
+
+    print()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+#!/usr/bin/env python
+# tools/benchmarks/video_decode.py
+"""
+Benchmark end-to-end video analysis wall time per decoding strategy.
+
+Each run decodes a 30 fps video, samples it at every requested rate and
+scores the sampled frames in batches, the way DeepfakeBenchAdapter.analyze_video
+does. Strategies:
+- read: cap.read() on every frame, decoding in turn with inference (the old loop)
+- grab: grab() for skipped frames, retrieve() for sampled ones, same thread
+- grab+prefetch: as grab, decoded ahead on a background thread
+- pyav+prefetch: PyAV threaded decoding on a background thread (if av is installed)
+
+Without --video a 720p clip with moving content is generated. Without
+--model a randomly initialized ResNet-18 stands in for the detector, since
+only its cost matters here; --model scores with a DeepfakeBench model instead
+(needs its weights).
+"""
+
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+import cv2
+import numpy as np
+import torch
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from app.utils.video_frames import VideoFrameSource, sample_step
+
+
+def parse_list(value, cast):
+    """Parse a comma separated list."""
+    return [cast(v) for v in value.split(",") if v.strip()]
+
+
+def write_test_video(path, seconds, fps=30.0, size=(1280, 720)):
+    """MPEG-4 clip with a moving gradient and shapes, so frames differ like real footage."""
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), fps, size)
+    if not writer.isOpened():
+        raise RuntimeError("OpenCV cannot write mp4v video here, pass --video")
+    w, h = size
+    xx, yy = np.meshgrid(np.arange(w), np.arange(h))
+    for i in range(int(seconds * fps)):
+        base = ((xx + 4 * i) % 256).astype(np.uint8)
+        frame = cv2.merge([base, ((yy + 2 * i) % 256).astype(np.uint8), np.full_like(base, 96)])
+        cv2.circle(frame, ((40 + 9 * i) % w, h // 2), 80, (255, 255, 255), -1)
+        cv2.putText(frame, f"{i:05d}", (50, 100), cv2.FONT_HERSHEY_SIMPLEX, 2, (0, 0, 0), 4)
+        writer.write(frame)
+    writer.release()
+
+
+def make_scorer(model_key, device):
+    """(input size, batch scoring function) for a DeepfakeBench model or the ResNet-18 stand-in."""
+    if model_key:
+        from app.adapters.deepfakebench_adapter import DeepfakeBenchAdapter
+
+        adapter = DeepfakeBenchAdapter(model_key=model_key, device=device)
+        return adapter.input_size, lambda batch: adapter._run_inference(batch)
+
+    import torchvision
+
+    model = torchvision.models.resnet18(num_classes=2).eval()
+
+    def score(batch):
+        with torch.no_grad():
+            return torch.softmax(model(batch), dim=1)[:, 1].tolist()
+
+    return 224, score
+
+
+def sampled_frames(strategy, video_path, fps):
+    """Sampled BGR frames for a strategy."""
+    if strategy == "read":
+        cap = cv2.VideoCapture(video_path)
+        step = sample_step(cap.get(cv2.CAP_PROP_FPS) or 25.0, fps)
+        index = 0
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            if index % step == 0:
+                yield frame
+            index += 1
+        cap.release()
+        return
+
+    backend = "pyav" if strategy.startswith("pyav") else "opencv"
+    prefetch = 16 if strategy.endswith("prefetch") else 0
+    with VideoFrameSource(video_path, fps, backend=backend, prefetch=prefetch) as source:
+        for sampled in source:
+            yield sampled["frame"]
+
+
+def run(strategy, video_path, fps, input_size, score, batch_size):
+    """Decode, preprocess and score one video; (wall seconds, frames scored)."""
+    mean = torch.tensor([0.485, 0.456, 0.406]).view(1, 3, 1, 1)
+    std = torch.tensor([0.229, 0.224, 0.225]).view(1, 3, 1, 1)
+    pending, scored = [], 0
+
+    def flush():
+        batch = torch.from_numpy(np.stack(pending)).permute(0, 3, 1, 2).float().div_(255)
+        score((batch - mean) / std)
+        pending.clear()
+
+    start = time.perf_counter()
+    for frame in sampled_frames(strategy, video_path, fps):
+        rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        pending.append(cv2.resize(rgb, (input_size, input_size), interpolation=cv2.INTER_LINEAR))
+        scored += 1
+        if len(pending) == batch_size:
+            flush()
+    if pending:
+        flush()
+    return time.perf_counter() - start, scored
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark video decode strategies end to end")
+    parser.add_argument("--video", default="",
+                        help="Video to analyze (default: a generated 30 fps 720p clip)")
+    parser.add_argument("--seconds", type=float, default=20,
+                        help="Length of the generated clip (default: 20)")
+    parser.add_argument("--fps", default="1,2,3,5",
+                        help="Comma separated sampling rates (default: 1,2,3,5)")
+    parser.add_argument("--strategies", default="read,grab,grab+prefetch,pyav+prefetch",
+                        help="Comma separated strategies (default: all)")
+    parser.add_argument("--model", default="",
+                        help="DeepfakeBench model key (default: ResNet-18 stand-in)")
+    parser.add_argument("--device", default="cpu", choices=["cuda", "cpu"],
+                        help="Device for --model (default: cpu)")
+    parser.add_argument("--batch-size", type=int, default=8,
+                        help="Frames per forward pass (default: 8)")
+    parser.add_argument("--repeats", type=int, default=2,
+                        help="Runs per measurement, best is reported (default: 2)")
+    args = parser.parse_args()
+
+    strategies = parse_list(args.strategies, str)
+    if any(s.startswith("pyav") for s in strategies):
+        try:
+            import av  # noqa: F401
+        except ImportError:
+            print("[WARN] PyAV is not installed, skipping pyav strategies")
+            strategies = [s for s in strategies if not s.startswith("pyav")]
+
+    input_size, score = make_scorer(args.model, args.device)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        video_path = args.video
+        if not video_path:
+            video_path = os.path.join(tmp, "clip.mp4")
+            print(f"[INFO] Writing a {args.seconds:.0f}s 30 fps 1280x720 test clip...")
+            write_test_video(video_path, args.seconds)
+
+        cap = cv2.VideoCapture(video_path)
+        print(f"[INFO] {video_path}: {int(cap.get(cv2.CAP_PROP_FRAME_COUNT))} frames at "
+              f"{cap.get(cv2.CAP_PROP_FPS):.2f} fps, {args.model or 'ResNet-18 stand-in'}, "
+              f"batch {args.batch_size}, {torch.get_num_threads()} torch threads")
+        cap.release()
+
+        # Warm up the model and the file cache
+        run("grab", video_path, max(parse_list(args.fps, float)), input_size, score, args.batch_size)
+
+        print()
+        print(f"{'fps':<6} {'strategy':<15} {'frames':<8} {'wall_s':<9} {'speedup':<8}")
+        print("-" * 50)
+        for fps in parse_list(args.fps, float):
+            baseline = None
+            for strategy in strategies:
+                results = [run(strategy, video_path, fps, input_size, score, args.batch_size)
+                           for _ in range(args.repeats)]
+                wall_s, frames = min(results)
+                baseline = baseline or wall_s
+                print(f"{fps:<6g} {strategy:<15} {frames:<8} {wall_s:<9.2f} {baseline / wall_s:<8.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+# tools/export_trufor_onnx.py
+"""
+Export TruFor (myEncoderDecoder) to ONNX for the ONNX Runtime backend.
+
+The graph has a fixed 512x512 input and a dynamic batch dimension, and
+outputs (pred_logits, conf_logits, det_logit, npp). After exporting, the
+script runs the graph with ONNX Runtime and reports the largest absolute
+difference to the torch model on a random batch.
+
+Select the backend in the API server with TRUFOR_BACKEND=onnx
+(and TRUFOR_ONNX_PATH if the file is not at models/trufor.onnx).
+"""
+
+import os
+import sys
+import time
+import argparse
+
+import torch
+
+# Add project root to path
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.adapters.trufor_adapter import MODEL_INPUT_SIZE, build_trufor_model
+from app.adapters.trufor_onnx import DEFAULT_ONNX_PATH, DEFAULT_OPSET, OnnxTruForSession, export_trufor_onnx
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export TruFor to ONNX")
+    parser.add_argument("--model-path", default="models/trufor.pth.tar",
+                        help="TruFor checkpoint (default: models/trufor.pth.tar)")
+    parser.add_argument("--output", default=DEFAULT_ONNX_PATH,
+                        help=f"Output .onnx file (default: {DEFAULT_ONNX_PATH})")
+    parser.add_argument("--opset", type=int, default=DEFAULT_OPSET,
+                        help=f"ONNX opset version (default: {DEFAULT_OPSET})")
+    parser.add_argument("--random-weights", action="store_true",
+                        help="Export a randomly initialized network (for benchmarks without a checkpoint)")
+    parser.add_argument("--verify-batch", type=int, default=2,
+                        help="Batch size of the parity check, 0 to skip (default: 2)")
+    args = parser.parse_args()
+
+    model_path = None if args.random_weights else args.model_path
+    if model_path and not os.path.exists(model_path):
+        print(f"[ERROR] Checkpoint not found: {model_path} (use --random-weights to export without one)")
+        sys.exit(1)
+
+    print(f"[INFO] Building TruFor ({'checkpoint: ' + model_path if model_path else 'random weights'})")
+    model, _ = build_trufor_model(model_path, torch.device("cpu"))
+
+    print(f"[INFO] Exporting to {args.output} (opset {args.opset})")
+    start = time.perf_counter()
+    export_trufor_onnx(model, args.output, input_size=MODEL_INPUT_SIZE, opset=args.opset)
+    size_mb = os.path.getsize(args.output) / (1024 * 1024)
+    print(f"[INFO] Exported in {time.perf_counter() - start:.1f}s ({size_mb:.1f} MB)")
+
+    if args.verify_batch > 0:
+        print(f"[INFO] Verifying against torch with batch size {args.verify_batch}")
+        x = torch.randn(args.verify_batch, 3, MODEL_INPUT_SIZE, MODEL_INPUT_SIZE)
+        with torch.no_grad():
+            expected = model(x)
+        actual = OnnxTruForSession(args.output)(x)
+        for name, a, e in zip(("pred_logits", "conf_logits", "det_logit", "npp"), actual, expected):
+            print(f"       {name:<12} shape={tuple(a.shape)} max_abs_diff={(a - e).abs().max().item():.2e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -15,6 +15,7 @@ import numpy as np
 import torch
 from pathlib import Path
 from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 
 # Add project root to path
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -22,6 +23,9 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 # Import our registry and model builder
 from tools.weight_registry import WEIGHT_REGISTRY
 from tools.build_dfbench_model import build_model_and_transforms
+from app.adapters.deepfakebench_adapter import ENSEMBLE_FUSIONS, fuse_probabilities
+from app.utils.frame_preprocess import PreprocessPlan
+from app.utils.video_frames import DECODE_BACKENDS, VideoFrameSource
 
 DFB_WEIGHTS_DIR = "models/vendors/DeepfakeBench/training/weights"
 
@@ -60,39 +64,20 @@ def ensure_directory(path):
     os.makedirs(path, exist_ok=True)
 
 
-def extract_frames(video_path, target_fps):
+def extract_frames(video_path, target_fps, backend="opencv", prefetch=16):
     """
     Extract frames from video at specified FPS.
+    Skipped frames are not converted, and frames are decoded ahead on a
+    background thread (see app/utils/video_frames.py).
     Yields: (frame_index, timestamp, rgb_frame)
     """
-    cap = cv2.VideoCapture(video_path)
-    
-    if not cap.isOpened():
-        raise RuntimeError(f"Failed to open video: {video_path}")
-    
-    source_fps = cap.get(cv2.CAP_PROP_FPS) or 25.0
-    frame_step = max(int(round(source_fps / target_fps)), 1)
-    
-    frame_idx = 0
-    output_idx = 0
-    
-    while True:
-        ret, frame = cap.read()
-        if not ret:
-            break
-        
-        if frame_idx % frame_step == 0:
-            timestamp = output_idx / target_fps
-            rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            yield output_idx, timestamp, rgb_frame
-            output_idx += 1
-        
-        frame_idx += 1
-    
-    cap.release()
+    with VideoFrameSource(video_path, target_fps, backend=backend, prefetch=prefetch) as source:
+        for sampled in source:
+            rgb_frame = cv2.cvtColor(sampled["frame"], cv2.COLOR_BGR2RGB)
+            yield sampled["index"], sampled["timestamp"], rgb_frame
 
 
-def preprocess_frame(frame, input_size, transform_fn=None):
+def preprocess_frame(frame, input_size, transform_fn=None, frame_batch=None):
     """
     Preprocess a frame for model input.
     
@@ -100,6 +85,8 @@ def preprocess_frame(frame, input_size, transform_fn=None):
         frame: RGB numpy array
         input_size: Target size for the model
         transform_fn: Optional custom transform function
+        frame_batch: Optional one-frame FrameBatch (PreprocessPlan.new_batch(1))
+            to reuse across frames; its buffers are overwritten by the next call
     
     Returns:
         PyTorch tensor ready for model input [1, C, H, W]
@@ -107,18 +94,12 @@ def preprocess_frame(frame, input_size, transform_fn=None):
     if transform_fn is not None:
         return transform_fn(frame)
     
-    # Default preprocessing
-    from torchvision import transforms
-    
-    default_transform = transforms.Compose([
-        transforms.ToPILImage(),
-        transforms.Resize((input_size, input_size)),
-        transforms.ToTensor(),
-        transforms.Normalize(mean=[0.485, 0.456, 0.406], std=[0.229, 0.224, 0.225]),
-    ])
-    
-    tensor = default_transform(frame)
-    return tensor.unsqueeze(0)  # Add batch dimension
+    # Default preprocessing: cv2 resize and fused ImageNet normalization
+    if frame_batch is None:
+        frame_batch = PreprocessPlan(input_size).new_batch(1)
+    frame_batch.clear()
+    frame_batch.add(frame, bgr=False)
+    return frame_batch.tensor()
 
 
 def run_inference(model, frame_tensor, device):
@@ -378,7 +359,6 @@ def process_video(video_path, model, input_size, transform_fn, args, device, mod
     ensure_directory(output_dir)
     
     csv_path = os.path.join(output_dir, "scores.csv")
-    timeline_path = os.path.join(output_dir, "timeline.json")
     
     print(f"\n[INFO] Processing: {video_path}")
     print(f"[INFO] Output directory: {output_dir}")
@@ -402,14 +382,15 @@ def process_video(video_path, model, input_size, transform_fn, args, device, mod
     # Extract frames and run inference
     scores_data = []
     start_time = time.time()
+    frame_batch = PreprocessPlan(input_size).new_batch(1, device)
     
     with open(csv_path, "w", newline="", encoding="utf-8") as f:
         writer = csv.writer(f)
         writer.writerow(["frame_idx", "timestamp", "prob_fake"])
         
-        for frame_idx, timestamp, rgb_frame in extract_frames(video_path, args.fps):
+        for frame_idx, timestamp, rgb_frame in extract_frames(video_path, args.fps, backend=args.decode_backend):
             # Preprocess
-            frame_tensor = preprocess_frame(rgb_frame, input_size, transform_fn)
+            frame_tensor = preprocess_frame(rgb_frame, input_size, transform_fn, frame_batch)
             
             # Inference
             prob_fake = run_inference(model, frame_tensor, device)
@@ -442,6 +423,14 @@ def process_video(video_path, model, input_size, transform_fn, args, device, mod
     print(f"\n[INFO] Completed: {len(scores_data)} frames in {elapsed:.1f}s")
     print(f"[INFO] Scores saved to: {csv_path}")
     
+    write_outputs(output_dir, video_name, args.model_name, checkpoint_path, input_size,
+                  scores_data, elapsed, args, device)
+
+
+def write_outputs(output_dir, video_name, model_key, checkpoint_path, input_size, scores_data, elapsed, args, device):
+    """Write timeline.json, plot, SRT and metadata for one model's frame scores of a video."""
+    timeline_path = os.path.join(output_dir, "timeline.json")
+    
     # Generate timeline
     if len(scores_data) == 0:
         print("[WARN] No frames processed")
@@ -465,7 +454,7 @@ def process_video(video_path, model, input_size, transform_fn, args, device, mod
     # Save timeline
     timeline_data = {
         "video": video_name,
-        "model": args.model_name,
+        "model": model_key,
         "threshold": args.threshold,
         "total_frames": len(scores_data),
         "fps": args.fps,
@@ -501,55 +490,38 @@ def process_video(video_path, model, input_size, transform_fn, args, device, mod
     
     # 3. Metadata
     meta_path = os.path.join(output_dir, "meta.txt")
-    if generate_meta(meta_path, args.model_name, checkpoint_path, input_size, 
+    if generate_meta(meta_path, model_key, checkpoint_path, input_size, 
                      args.fps, args.threshold, len(scores_data), elapsed, device):
         print(f"[INFO] Metadata saved to: {meta_path}")
 
 
-def main():
-    parser = argparse.ArgumentParser(
-        description="Frame-by-frame deepfake detection using DeepfakeBench models"
-    )
-    parser.add_argument("--input", required=True, 
-                       help="Input video file or directory")
-    parser.add_argument("--model", required=True,
-                       help="Model key (e.g., 'xception') or weight filename (e.g., 'xception_best.pth')")
-    parser.add_argument("--ckpt", default="",
-                       help="Optional checkpoint path (overrides default)")
-    parser.add_argument("--fps", type=float, default=3.0,
-                       help="Frame extraction rate (default: 3)")
-    parser.add_argument("--threshold", type=float, default=0.5,
-                       help="Threshold for suspicious segments (default: 0.5)")
-    parser.add_argument("--outdir", default="runs/image_infer",
-                       help="Output directory (default: runs/image_infer)")
-    parser.add_argument("--device", default="cuda",
-                       help="Device to use (cuda/cpu, default: cuda)")
-    parser.add_argument("--save-vis", "--save_vis", action="store_true", dest="save_vis",
-                       help="Save visualization video with probability bar and sparkline")
-    
-    args = parser.parse_args()
+def resolve_model(spec, ckpt=""):
+    """
+    Resolve a model key (e.g. 'xception') or weight filename (e.g. 'xception_best.pth').
     
-    # Parse model and checkpoint
-    if args.model.endswith(".pth"):
+    Returns:
+        (model_key, input_size, checkpoint_path), or None if unknown or missing
+    """
+    if spec.endswith(".pth"):
         # Model specified by weight filename
-        weight_filename = os.path.basename(args.model)
+        weight_filename = os.path.basename(spec)
         
         if weight_filename not in WEIGHT_REGISTRY:
             print(f"[ERROR] Unknown weight filename: {weight_filename}")
             print(f"[ERROR] Available weights: {list(WEIGHT_REGISTRY.keys())}")
-            return
+            return None
         
         meta = WEIGHT_REGISTRY[weight_filename]
         model_key = meta["model_key"]
         input_size = meta["input_size"]
         
-        if os.path.isabs(args.model):
-            checkpoint_path = args.model
+        if os.path.isabs(spec):
+            checkpoint_path = spec
         else:
             checkpoint_path = os.path.join(DFB_WEIGHTS_DIR, weight_filename)
     else:
         # Model specified by key
-        model_key = args.model.lower()
+        model_key = spec.lower()
         
         # Find corresponding weight file
         weight_filename = None
@@ -562,24 +534,20 @@ def main():
         if not weight_filename:
             print(f"[ERROR] Unknown model key: {model_key}")
             print(f"[ERROR] Available models: {set(m['model_key'] for m in WEIGHT_REGISTRY.values())}")
-            return
+            return None
         
-        checkpoint_path = args.ckpt or os.path.join(DFB_WEIGHTS_DIR, weight_filename)
+        checkpoint_path = ckpt or os.path.join(DFB_WEIGHTS_DIR, weight_filename)
     
     # Check if checkpoint exists
     if not os.path.exists(checkpoint_path):
         print(f"[ERROR] Checkpoint not found: {checkpoint_path}")
-        return
+        return None
     
-    # Set device
-    device = args.device if torch.cuda.is_available() and args.device == "cuda" else "cpu"
-    print(f"[INFO] Using device: {device}")
-    
-    # Store model name for output organization
-    args.model_name = model_key
-    model_name_pretty = model_key.upper()
-    
-    # Build model
+    return model_key, input_size, checkpoint_path
+
+
+def load_model(model_key, input_size, checkpoint_path, device):
+    """Build a model, load its checkpoint and move it to device; (model, transform_fn) or None."""
     print(f"[INFO] Building model: {model_key}")
     print(f"[INFO] Input size: {input_size}x{input_size}")
     
@@ -589,7 +557,7 @@ def main():
         print(f"[ERROR] Failed to build model: {e}")
         import traceback
         traceback.print_exc()
-        return
+        return None
     
     # Load checkpoint
     try:
@@ -598,12 +566,150 @@ def main():
         print(f"[ERROR] Failed to load checkpoint: {e}")
         import traceback
         traceback.print_exc()
-        return
+        return None
     
     # Move to device and set eval mode
     model.to(device)
     model.eval()
     print(f"[INFO] Model ready for inference")
+    return model, transform_fn
+
+
+def process_video_ensemble(video_path, members, args, device):
+    """
+    Score a video with several models, decoding it once.
+    
+    Each sampled frame is preprocessed and scored by every model, on up to
+    args.workers threads (0 = one per model). Writes each model's results to
+    <outdir>/<model>/<video>/, as separate runs would, and the fused scores
+    (args.fusion) to <outdir>/ensemble/<video>/.
+    """
+    video_name = Path(video_path).stem
+    print(f"\n[INFO] Processing: {video_path}")
+    print(f"[INFO] Ensemble: {', '.join(m['key'] for m in members)} ({args.fusion} fusion)")
+    if args.save_vis:
+        print(f"[WARN] Visualization is not available for ensembles, skipping vis.mp4")
+    
+    for member in members:
+        member["frame_batch"] = PreprocessPlan(member["input_size"]).new_batch(1, device)
+        member["scores"] = []
+    
+    def score(member, rgb_frame):
+        frame_tensor = preprocess_frame(rgb_frame, member["input_size"], member["transform_fn"], member["frame_batch"])
+        return run_inference(member["model"], frame_tensor, device)
+    
+    workers = min(args.workers or len(members), len(members))
+    fan_out = ThreadPoolExecutor(max_workers=workers) if workers > 1 else None
+    fused_scores = []
+    start_time = time.time()
+    
+    try:
+        for frame_idx, timestamp, rgb_frame in extract_frames(video_path, args.fps, backend=args.decode_backend):
+            if fan_out is not None:
+                probs = list(fan_out.map(lambda member: score(member, rgb_frame), members))
+            else:
+                probs = [score(member, rgb_frame) for member in members]
+            
+            for member, prob in zip(members, probs):
+                member["scores"].append((frame_idx, timestamp, prob))
+            fused_scores.append((frame_idx, timestamp, fuse_probabilities([[p] for p in probs], args.fusion)[0]))
+            
+            # Progress
+            if (frame_idx + 1) % 10 == 0:
+                print(f"  Processed {frame_idx + 1} frames...", end="\r")
+    finally:
+        if fan_out is not None:
+            fan_out.shutdown()
+    
+    elapsed = time.time() - start_time
+    print(f"\n[INFO] Completed: {len(fused_scores)} frames x {len(members)} models in {elapsed:.1f}s")
+    
+    for member in members:
+        output_dir = os.path.join(args.outdir, member["key"], video_name)
+        ensure_directory(output_dir)
+        write_scores_csv(os.path.join(output_dir, "scores.csv"), member["scores"])
+        write_outputs(output_dir, video_name, member["key"], member["checkpoint_path"], member["input_size"],
+                      member["scores"], elapsed, args, device)
+    
+    output_dir = os.path.join(args.outdir, args.model_name, video_name)
+    ensure_directory(output_dir)
+    write_scores_csv(os.path.join(output_dir, "scores.csv"), fused_scores)
+    write_outputs(output_dir, video_name, "+".join(m["key"] for m in members),
+                  ",".join(m["checkpoint_path"] for m in members),
+                  ",".join(str(m["input_size"]) for m in members), fused_scores, elapsed, args, device)
+
+
+def write_scores_csv(csv_path, scores_data):
+    """Write (frame_idx, timestamp, prob_fake) rows as scores.csv."""
+    with open(csv_path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["frame_idx", "timestamp", "prob_fake"])
+        for frame_idx, timestamp, prob_fake in scores_data:
+            writer.writerow([frame_idx, f"{timestamp:.3f}", f"{prob_fake:.6f}"])
+    print(f"[INFO] Scores saved to: {csv_path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Frame-by-frame deepfake detection using DeepfakeBench models"
+    )
+    parser.add_argument("--input", required=True, 
+                       help="Input video file or directory")
+    parser.add_argument("--model", required=True,
+                       help="Model key (e.g., 'xception') or weight filename (e.g., 'xception_best.pth'); "
+                            "several comma separated run as an ensemble on one decode")
+    parser.add_argument("--ckpt", default="",
+                       help="Optional checkpoint path (overrides default)")
+    parser.add_argument("--fps", type=float, default=3.0,
+                       help="Frame extraction rate (default: 3)")
+    parser.add_argument("--threshold", type=float, default=0.5,
+                       help="Threshold for suspicious segments (default: 0.5)")
+    parser.add_argument("--outdir", default="runs/image_infer",
+                       help="Output directory (default: runs/image_infer)")
+    parser.add_argument("--device", default="cuda",
+                       help="Device to use (cuda/cpu, default: cuda)")
+    parser.add_argument("--decode-backend", default="opencv", choices=DECODE_BACKENDS,
+                       help="Video decoder (default: opencv; pyav needs the av package)")
+    parser.add_argument("--fusion", default="mean", choices=ENSEMBLE_FUSIONS,
+                       help="Ensemble: per-frame fusion of model probabilities (default: mean)")
+    parser.add_argument("--workers", type=int, default=1,
+                       help="Ensemble: threads running the models on each frame, 0 = one per model (default: 1)")
+    parser.add_argument("--save-vis", "--save_vis", action="store_true", dest="save_vis",
+                       help="Save visualization video with probability bar and sparkline (single model only)")
+    
+    args = parser.parse_args()
+    
+    model_specs = [spec.strip() for spec in args.model.split(",") if spec.strip()]
+    ensemble = len(model_specs) > 1
+    if ensemble and args.ckpt:
+        print("[ERROR] --ckpt applies to a single model, not an ensemble")
+        return
+    
+    # Set device
+    device = args.device if torch.cuda.is_available() and args.device == "cuda" else "cpu"
+    print(f"[INFO] Using device: {device}")
+    
+    # Build models
+    members = []
+    for spec in model_specs:
+        resolved = resolve_model(spec, args.ckpt)
+        if resolved is None:
+            return
+        model_key, input_size, checkpoint_path = resolved
+        loaded = load_model(model_key, input_size, checkpoint_path, device)
+        if loaded is None:
+            return
+        model, transform_fn = loaded
+        members.append({
+            "key": model_key,
+            "model": model,
+            "input_size": input_size,
+            "transform_fn": transform_fn,
+            "checkpoint_path": checkpoint_path
+        })
+    
+    # Store model name for output organization
+    args.model_name = "ensemble" if ensemble else members[0]["key"]
     
     # Collect video files
     video_files = []
@@ -630,8 +736,12 @@ def main():
         print(f"\n{'='*80}")
         print(f"[INFO] Video {i}/{len(video_files)}")
         try:
-            process_video(video_path, model, input_size, transform_fn, args, device, 
-                         model_name_pretty, checkpoint_path)
+            if ensemble:
+                process_video_ensemble(video_path, members, args, device)
+            else:
+                member = members[0]
+                process_video(video_path, member["model"], member["input_size"], member["transform_fn"],
+                              args, device, member["key"].upper(), member["checkpoint_path"])
         except Exception as e:
             print(f"[ERROR] Failed to process {video_path}: {e}")
             import traceback
@@ -640,6 +750,9 @@ def main():
     
     print(f"\n{'='*80}")
     print("[INFO] All videos processed!")
+    if ensemble:
+        for member in members:
+            print(f"[INFO] Results saved to: {args.outdir}/{member['key']}/")
     print(f"[INFO] Results saved to: {args.outdir}/{args.model_name}/")
 
 